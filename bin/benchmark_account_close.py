@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""
+账户关闭/删除性能基准脚本
+对比逐个账户调用 close()（旧路径）与按ID集合批量关闭、删除整棵子树（新路径）的耗时与查询次数
+
+所有数据在事务中创建并在结束时回滚，不会在数据库中留下记录。
+
+使用方法：
+  # 从项目根目录运行
+  python bin/benchmark_account_close.py --branches 20 --leaves 24
+
+  # 在容器中运行
+  docker exec <container_id> python bin/benchmark_account_close.py --branches 20 --leaves 24
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# 确保能找到项目根目录
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+
+# 将项目根目录添加到 Python 路径
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+# 切换工作目录到项目根
+os.chdir(project_root)
+
+import django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings.develop')
+django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from project.apps.account.models import Account
+from project.apps.maps.models import Expense
+
+
+class Rollback(Exception):
+    """用于在基准结束后回滚事务"""
+
+
+def build_subtree(owner, root_path, branches, leaves):
+    root = Account.objects.create(account=root_path, owner=owner)
+    branch_accounts = Account.objects.bulk_create([
+        Account(account=f'{root_path}:Branch{i}', owner=owner, parent=root) for i in range(branches)
+    ])
+    leaf_accounts = Account.objects.bulk_create([
+        Account(account=f'{branch.account}:Leaf{j}', owner=owner, parent=branch)
+        for branch in branch_accounts for j in range(leaves)
+    ])
+    # 每个叶子账户一条支出映射
+    Expense.objects.bulk_create([
+        Expense(key=f'{leaf.account}:key', expend=leaf, owner=owner) for leaf in leaf_accounts
+    ])
+    return root
+
+
+def legacy_close(root, migrate_to):
+    """旧路径：逐个账户统计、迁移映射、取消待办并保存"""
+    for account in [root, *root.get_descendants()]:
+        account.close(migrate_to=migrate_to)
+
+
+def timed(func):
+    with CaptureQueriesContext(connection) as context:
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+    return seconds, len(context.captured_queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='账户子树关闭/删除性能基准')
+    parser.add_argument('--branches', type=int, default=20, help='子树分支数')
+    parser.add_argument('--leaves', type=int, default=24, help='每个分支的叶子账户数')
+    args = parser.parse_args()
+
+    accounts = 1 + args.branches * (args.leaves + 1)
+    print(f"构造 {accounts} 个账户的子树...")
+
+    try:
+        with transaction.atomic():
+            user = User.objects.create_user(username=f'benchmark-{uuid.uuid4().hex[:8]}')
+            target = Account.objects.create(account='Expenses:Target', owner=user)
+
+            legacy_root = build_subtree(user, 'Expenses:Legacy', args.branches, args.leaves)
+            legacy = timed(lambda: legacy_close(legacy_root, target))
+
+            close_root = build_subtree(user, 'Expenses:Close', args.branches, args.leaves)
+            closed = timed(lambda: close_root.close_subtree(migrate_to=target))
+
+            delete_root = build_subtree(user, 'Expenses:Delete', args.branches, args.leaves)
+            deleted = timed(lambda: delete_root.delete_subtree(migrate_to=target))
+
+            remaining = sum(
+                Account.objects.filter(owner=user, account__startswith=root.account, enable=True).count()
+                for root in (legacy_root, close_root, delete_root)
+            )
+            raise Rollback((legacy, closed, deleted, remaining))
+    except Rollback as result:
+        (legacy_seconds, legacy_queries), (close_seconds, close_queries), \
+            (delete_seconds, delete_queries), remaining = result.args[0]
+
+    print(f"✓ 旧路径（逐个关闭账户）: {legacy_seconds:.3f}s，{legacy_queries} 次查询")
+    print(f"✓ 新路径（集合关闭子树）: {close_seconds:.3f}s，{close_queries} 次查询")
+    print(f"✓ 新路径（集合删除子树并迁移映射）: {delete_seconds:.3f}s，{delete_queries} 次查询")
+    print(f"  关闭加速比: {legacy_seconds / close_seconds:.1f}x")
+    if remaining:
+        print(f"✗ 仍有 {remaining} 个启用账户未被关闭或删除")
+        return 1
+    print("✓ 子树已全部关闭/删除（事务已回滚）")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+账户子树操作性能基准脚本
+对比逐个保存子账户（旧路径）与按路径前缀批量更新（新路径）重命名整棵子树的耗时与查询次数
+
+所有数据在事务中创建并在结束时回滚，不会在数据库中留下记录。
+
+使用方法：
+  # 从项目根目录运行
+  python bin/benchmark_account_subtree.py --branches 40 --leaves 25
+
+  # 在容器中运行
+  docker exec <container_id> python bin/benchmark_account_subtree.py --branches 40 --leaves 25
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# 确保能找到项目根目录
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+
+# 将项目根目录添加到 Python 路径
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+# 切换工作目录到项目根
+os.chdir(project_root)
+
+import django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings.develop')
+django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from project.apps.account.models import Account
+
+
+class Rollback(Exception):
+    """用于在基准结束后回滚事务"""
+
+
+def build_subtree(owner, root_path, branches, leaves):
+    root = Account.objects.create(account=root_path, owner=owner)
+    branch_accounts = Account.objects.bulk_create([
+        Account(account=f'{root_path}:Branch{i}', owner=owner, parent=root) for i in range(branches)
+    ])
+    Account.objects.bulk_create([
+        Account(account=f'{branch.account}:Leaf{j}', owner=owner, parent=branch)
+        for branch in branch_accounts for j in range(leaves)
+    ])
+    return root
+
+
+def legacy_rename(account, old_path):
+    """旧路径：逐层遍历子账户并逐个保存（每次保存重新查询旧实例与父账户）"""
+    for child in account.children.all():
+        old_child_path = child.account
+        if old_child_path.startswith(old_path + ':'):
+            child.account = account.account + old_child_path[len(old_path):]
+            # 保存时跳过新的批量重命名，逐层递归模拟原有行为
+            Account.objects.filter(pk=child.pk).first()
+            Account.objects.filter(account=':'.join(child.account.split(':')[:-1]), owner=child.owner).first()
+            Account.objects.filter(pk=child.pk).update(account=child.account)
+            legacy_rename(child, old_child_path)
+
+
+def timed(func):
+    with CaptureQueriesContext(connection) as context:
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+    return seconds, len(context.captured_queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='账户子树重命名性能基准')
+    parser.add_argument('--branches', type=int, default=40, help='子树分支数')
+    parser.add_argument('--leaves', type=int, default=25, help='每个分支的叶子账户数')
+    args = parser.parse_args()
+
+    descendants = args.branches * (args.leaves + 1)
+    print(f"构造 {descendants} 个后代账户的子树...")
+
+    try:
+        with transaction.atomic():
+            user = User.objects.create_user(username=f'benchmark-{uuid.uuid4().hex[:8]}')
+
+            legacy_root = build_subtree(user, 'Expenses:Legacy', args.branches, args.leaves)
+            legacy_root.account = 'Expenses:LegacyRenamed'
+            Account.objects.filter(pk=legacy_root.pk).update(account=legacy_root.account)
+            legacy_seconds, legacy_queries = timed(lambda: legacy_rename(legacy_root, 'Expenses:Legacy'))
+
+            current_root = build_subtree(user, 'Expenses:Current', args.branches, args.leaves)
+            current_root.account = 'Expenses:CurrentRenamed'
+            current_seconds, current_queries = timed(current_root.save)
+
+            renamed = Account.objects.filter(owner=user, account__startswith='Expenses:CurrentRenamed:').count()
+            raise Rollback((legacy_seconds, legacy_queries, current_seconds, current_queries, renamed))
+    except Rollback as result:
+        legacy_seconds, legacy_queries, current_seconds, current_queries, renamed = result.args[0]
+
+    print(f"✓ 旧路径（逐个保存子账户）: {legacy_seconds:.3f}s，{legacy_queries} 次查询")
+    print(f"✓ 新路径（路径前缀批量更新）: {current_seconds:.3f}s，{current_queries} 次查询")
+    print(f"  加速比: {legacy_seconds / current_seconds:.1f}x")
+    if renamed != descendants:
+        print(f"✗ 重命名的后代账户数量不一致: {renamed} != {descendants}")
+        return 1
+    print(f"✓ 已重命名 {renamed} 个后代账户（事务已回滚）")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
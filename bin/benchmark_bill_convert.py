@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+"""
+账单转换性能基准脚本
+对比账单转换的旧路径与新路径耗时（生成的合成账单，不含真实用户数据）
+
+使用方法：
+  # 从项目根目录运行（依赖测试环境中的 PDF 生成器）
+  python bin/benchmark_bill_convert.py pdf --pages 500
+  python bin/benchmark_bill_convert.py excel --rows 200000
+
+  # 在容器中运行
+  docker exec <container_id> python bin/benchmark_bill_convert.py pdf --pages 500 --workers 4
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+# 确保能找到项目根目录
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+
+# 将项目根目录添加到 Python 路径
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+# 切换工作目录到项目根
+os.chdir(project_root)
+
+import django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings.develop')
+django.setup()
+
+import pandas as pd
+import pdfplumber
+import PyPDF2
+from openpyxl import Workbook
+
+from project.apps.translate.views.BOC_Debit import boc_debit_extract_page_tables
+from project.utils.file import convert_df_to_csv_bytes, detect_pdf_bill, extract_text_from_pdf, handle_excel
+from project.utils.pdf import extract_pages
+from project.utils.tests.test_pdf import build_table_pdf
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def benchmark_pdf(args):
+    print(f"生成 {args.pages} 页合成账单（每页 {args.rows} 行）...")
+    pdf_bytes = build_table_pdf(args.pages, rows_per_page=args.rows)
+    print(f"  文件大小: {len(pdf_bytes) / 1024:.1f} KB")
+
+    def legacy():
+        # 旧路径：PyPDF2 提取全部页文本识别账单，再由 pdfplumber 重新打开顺序提取表格
+        reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+        extract_text_from_pdf(reader)
+        content = []
+        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+            for page in pdf.pages:
+                content += page.extract_tables()
+        return content
+
+    def current():
+        # 新路径：只提取首页文本识别账单，按页区间并行提取表格
+        reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+        detect_pdf_bill(reader)
+        content = []
+        for tables in extract_pages(pdf_bytes, None, boc_debit_extract_page_tables,
+                                    page_count=len(reader.pages), workers=args.workers):
+            content += tables
+        return content
+
+    legacy_seconds, legacy_result = timed(legacy)
+    current_seconds, current_result = timed(current)
+
+    print(f"✓ 旧路径（全文识别 + 顺序提取）: {legacy_seconds:.2f}s")
+    print(f"✓ 新路径（首页识别 + {args.workers or '默认'} 进程并行）: {current_seconds:.2f}s")
+    print(f"  加速比: {legacy_seconds / current_seconds:.2f}x")
+    if legacy_result != current_result:
+        print("✗ 两种路径提取结果不一致")
+        return 1
+    print("✓ 提取结果一致")
+    return 0
+
+
+def build_wechat_xlsx(rows):
+    """生成微信账单格式的 XLSX（只写模式，避免生成阶段占用过多内存）"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(['微信支付账单明细'])
+    sheet.append(['微信昵称：[benchmark]'])
+    sheet.append([])
+    sheet.append(['交易时间', '交易类型', '交易对方', '商品', '收/支', '金额(元)', '支付方式', '当前状态', '交易单号', '商户单号', '备注'])
+    for i in range(rows):
+        sheet.append([
+            f'2025-01-{i % 28 + 1:02d} 12:{i % 60:02d}:00', '商户消费', f'商户{i % 500}', f'商品{i}',
+            '支出', f'{(i % 1000) / 10:.2f}', '零钱', '支付成功', f'42000{i:010d}', f'M{i:012d}', '/',
+        ])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    buffer.name = 'benchmark.xlsx'
+    return buffer
+
+
+def benchmark_excel(args):
+    print(f"生成 {args.rows} 行微信账单 XLSX...")
+    file = build_wechat_xlsx(args.rows)
+    print(f"  文件大小: {len(file.getvalue()) / 1024 / 1024:.1f} MB")
+
+    def legacy():
+        # 旧路径：整表读入 DataFrame，iterrows 逐单元格识别建行账单，再转 CSV
+        file.seek(0)
+        df = pd.read_excel(file, header=None, dtype=str)
+        df.fillna('', inplace=True)
+        for _, row in df.iterrows():
+            for item in row:
+                if pd.notnull(item) and '中国建设银行个人活期账户全部交易明细' in str(item):
+                    break
+        return convert_df_to_csv_bytes(df)
+
+    def current():
+        # 新路径：openpyxl 只读流式读取，仅检查表头区域
+        return handle_excel(file)
+
+    legacy_seconds, legacy_result = timed(legacy)
+    current_seconds, current_result = timed(current)
+
+    print(f"✓ 旧路径（DataFrame + iterrows）: {legacy_seconds:.2f}s")
+    print(f"✓ 新路径（只读流式 + 表头识别）: {current_seconds:.2f}s")
+    print(f"  加速比: {legacy_seconds / current_seconds:.2f}x")
+    if legacy_result != current_result:
+        print("✗ 两种路径转换结果不一致")
+        return 1
+    print("✓ 转换结果一致")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='账单转换性能基准')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    pdf_parser = subparsers.add_parser('pdf', help='PDF 账单按页并行提取')
+    pdf_parser.add_argument('--pages', type=int, default=500, help='生成的页数')
+    pdf_parser.add_argument('--rows', type=int, default=20, help='每页明细行数')
+    pdf_parser.add_argument('--workers', type=int, default=None, help='并行进程数，默认取 PDF_CONVERT_WORKERS')
+    pdf_parser.set_defaults(func=benchmark_pdf)
+
+    excel_parser = subparsers.add_parser('excel', help='XLSX 账单流式读取')
+    excel_parser.add_argument('--rows', type=int, default=200000, help='生成的明细行数')
+    excel_parser.set_defaults(func=benchmark_excel)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
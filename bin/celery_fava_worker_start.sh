@@ -0,0 +1,12 @@
+#!/bin/sh
+NAME="beancount-trans-fava-worker" # Name of the application
+DJANGODIR=/code/beancount-trans # Django project directory
+
+echo "Starting $NAME as `whoami`"
+
+cd $DJANGODIR
+
+export PYTHONPATH=$DJANGODIR:$PYTHONPATH
+
+# 只处理 fava 队列（容器启动与回收），与账单解析等任务的 worker 分开
+celery -A project worker -Q fava -n fava@%h --loglevel=info --concurrency=2
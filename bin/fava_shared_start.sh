@@ -0,0 +1,12 @@
+#!/bin/sh
+NAME="beancount-trans-fava" # Name of the application
+DJANGODIR=/code/beancount-trans # Django project directory
+
+echo "Starting $NAME as `whoami`"
+
+cd $DJANGODIR
+
+export PYTHONPATH=$DJANGODIR:$PYTHONPATH
+
+# 运行环境需额外安装 fava
+/root/.local/bin/uwsgi --ini conf/fava_shared_uwsgi.ini
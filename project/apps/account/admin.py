@@ -6,6 +6,7 @@ from django.db import models
 from django.forms import TextInput
 
 from project.apps.account.models import Account, AccountTemplate, AccountTemplateItem
+from project.apps.common.resource_cache import bump_resource_version
 
 
 @admin.register(Account)
@@ -143,7 +144,10 @@ class AccountAdmin(admin.ModelAdmin):
 
     def enable_accounts(self, request, queryset):
         """批量启用账户"""
+        owner_ids = set(queryset.values_list('owner_id', flat=True))
         updated = queryset.update(enable=True)
+        for owner_id in owner_ids:
+            bump_resource_version(owner_id, 'account')
         self.message_user(
             request,
             f'成功启用了 {updated} 个账户。'
@@ -152,7 +156,10 @@ class AccountAdmin(admin.ModelAdmin):
 
     def disable_accounts(self, request, queryset):
         """批量禁用账户"""
+        owner_ids = set(queryset.values_list('owner_id', flat=True))
         updated = queryset.update(enable=False)
+        for owner_id in owner_ids:
+            bump_resource_version(owner_id, 'account')
         self.message_user(
             request,
             f'成功禁用了 {updated} 个账户。'
@@ -160,22 +167,20 @@ class AccountAdmin(admin.ModelAdmin):
     disable_accounts.short_description = "禁用选中的账户"
 
     def close_accounts(self, request, queryset):
-        """批量关闭账户"""
-        closed_count = 0
-        for account in queryset:
-            try:
-                account.close()
-                closed_count += 1
-            except Exception as e:
-                self.message_user(
-                    request,
-                    f'关闭账户 {account.account} 失败: {str(e)}',
-                    level='ERROR'
-                )
+        """批量关闭账户（集合操作，禁用相关映射并取消待办）"""
+        try:
+            result = Account.close_accounts(queryset)
+        except Exception as e:
+            self.message_user(
+                request,
+                f'关闭账户失败: {str(e)}',
+                level='ERROR'
+            )
+            return
 
         self.message_user(
             request,
-            f'成功关闭了 {closed_count} 个账户。'
+            f'成功关闭了 {result["accounts_closed"]} 个账户。'
         )
     close_accounts.short_description = "关闭选中的账户"
 
@@ -7,18 +7,97 @@
     python manage.py apply_templates_to_users --user-ids 1,2,3  # 为指定用户应用
     python manage.py apply_templates_to_users --all-users --dry-run  # 预览模式
     python manage.py apply_templates_to_users --all-users --force  # 强制覆盖现有数据
+    python manage.py apply_templates_to_users --all-users --workers 4 --chunk-size 200  # 4 个工作进程并行处理
+
+用户按 --chunk-size 分批交给工作进程处理，每个工作进程使用独立的数据库连接。
+每批完成后将已完成的用户写入检查点文件（--checkpoint-file），中断后以相同参数重新运行即从检查点继续；
+全部成功后检查点文件会被删除。预览模式不读写检查点。
 """
 
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from itertools import repeat
+
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
-from django.db import transaction
-from project.apps.account.models import Account, AccountTemplate, AccountTemplateItem
-from project.apps.maps.models import Template, TemplateItem, Expense, Assets, Income
+from django.db import connections, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from project.apps.account.models import Account, AccountTemplate
+from project.apps.account.utils import AccountTemplateManager
+from project.apps.maps.models import Template, Expense, Assets, Income
+from project.apps.maps.template_apply import apply_mapping_template
 from project.apps.tags.models import Tag, TagTemplate
 from project.apps.translate.models import FormatConfig
 
 User = get_user_model()
 
+# 默认写入系统临时目录，避免在源码目录（当前工作目录）中留下检查点文件
+DEFAULT_CHECKPOINT_FILE = os.path.join(tempfile.gettempdir(), 'apply_templates_to_users.checkpoint.json')
+
+# 已有数据统计：{注解名: 模型}
+EXISTING_DATA_MODELS = {
+    'existing_accounts': Account,
+    'existing_tags': Tag,
+    'existing_expenses': Expense,
+    'existing_assets': Assets,
+    'existing_incomes': Income,
+}
+
+# 映射模板：(统计键, 官方模板键)
+MAPPING_TEMPLATE_KEYS = (
+    ('expenses', 'expense_template'),
+    ('incomes', 'income_template'),
+    ('assets', 'assets_template'),
+)
+
+
+def _process_chunk(user_ids, options):
+    """工作进程入口：处理一批用户，返回按用户ID排序的处理报告"""
+    return Command().process_chunk(user_ids, options)
+
+
+class RolloutCheckpoint:
+    """模板批量应用检查点
+
+    以 JSON 文件记录已完成的用户ID及本次运行的模板与参数签名，签名不一致时不复用。
+    """
+
+    def __init__(self, path, signature):
+        self.path = path
+        self.signature = signature
+        self.completed = set()
+
+    def load(self):
+        """读取检查点，返回 (已完成用户ID集合, 签名是否不一致)"""
+        if not os.path.exists(self.path):
+            return self.completed, False
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('signature') != self.signature:
+            return self.completed, True
+        self.completed = set(data.get('completed', []))
+        return self.completed, False
+
+    def mark_done(self, user_ids):
+        """记录已完成的用户并原子写入检查点文件"""
+        self.completed.update(user_ids)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'signature': self.signature, 'completed': sorted(self.completed)}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """全部完成后删除检查点文件"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
 
 class Command(BaseCommand):
     help = '批量为用户应用官方账户模板、标签模板和映射模板'
@@ -49,6 +128,29 @@ class Command(BaseCommand):
             action='store_true',
             help='跳过已有账户、标签或映射的用户',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='并行工作进程数，每个进程使用独立的数据库连接（默认: 1，在当前进程内执行）',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            help='每批处理的用户数，每批完成后写入检查点（默认: 100）',
+        )
+        parser.add_argument(
+            '--checkpoint-file',
+            type=str,
+            default=DEFAULT_CHECKPOINT_FILE,
+            help=f'检查点文件路径（默认: {DEFAULT_CHECKPOINT_FILE}）',
+        )
+        parser.add_argument(
+            '--reset-checkpoint',
+            action='store_true',
+            help='忽略已有检查点，从头开始处理',
+        )
 
     def handle(self, *args, **options):
         all_users = options.get('all_users', False)
@@ -56,6 +158,8 @@ class Command(BaseCommand):
         dry_run = options.get('dry_run', False)
         force = options.get('force', False)
         skip_existing = options.get('skip_existing', False)
+        workers = max(1, options.get('workers') or 1)
+        chunk_size = max(1, options.get('chunk_size') or 1)
 
         if dry_run:
             self.stdout.write(self.style.WARNING('🔍 预览模式：不会实际创建数据'))
@@ -66,11 +170,12 @@ class Command(BaseCommand):
 
         # 确定目标用户列表
         target_users = self._get_target_users(all_users, user_ids_str)
-        if not target_users:
+        user_ids = list(target_users.values_list('id', flat=True))
+        if not user_ids:
             self.stdout.write(self.style.ERROR('❌ 没有找到目标用户'))
             return
 
-        self.stdout.write(self.style.SUCCESS(f'\n目标用户数量: {len(target_users)}'))
+        self.stdout.write(self.style.SUCCESS(f'\n目标用户数量: {len(user_ids)}'))
 
         # 获取官方模板
         official_templates = self._get_official_templates()
@@ -80,7 +185,7 @@ class Command(BaseCommand):
 
         # 统计信息
         stats = {
-            'total_users': len(target_users),
+            'total_users': len(user_ids),
             'processed_users': 0,
             'skipped_users': 0,
             'failed_users': 0,
@@ -92,47 +197,140 @@ class Command(BaseCommand):
             'created_configs': 0,
         }
 
-        # 为每个用户应用模板
-        for user in target_users:
-            self.stdout.write(self.style.HTTP_INFO(f'\n处理用户: {user.username} (ID={user.id})'))
+        checkpoint = None
+        if not dry_run:
+            checkpoint = RolloutCheckpoint(options['checkpoint_file'], {
+                'templates': {key: template.id if template else None for key, template in official_templates.items()},
+                'force': force,
+                'skip_existing': skip_existing,
+            })
+            if options.get('reset_checkpoint'):
+                checkpoint.clear()
+            completed, mismatched = checkpoint.load()
+            if mismatched:
+                self.stdout.write(self.style.WARNING('⚠️  检查点的模板或参数与本次运行不一致，已忽略并从头开始'))
+            elif completed:
+                user_ids = [user_id for user_id in user_ids if user_id not in completed]
+                self.stdout.write(self.style.WARNING(
+                    f'⏯️  从检查点恢复：已完成 {stats["total_users"] - len(user_ids)} 个用户，剩余 {len(user_ids)} 个'
+                ))
+
+        chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+        chunk_options = {'dry_run': dry_run, 'force': force, 'skip_existing': skip_existing}
+        started = time.monotonic()
+        done = 0
+
+        # 为每个用户应用模板（按用户ID顺序输出）
+        for chunk, reports in self._run_chunks(chunks, chunk_options, workers):
+            for report in reports:
+                self._write_report(report, stats)
+
+            if checkpoint:
+                checkpoint.mark_done(report['user_id'] for report in reports if report['error'] is None)
+                done += len(chunk)
+                self._write_progress(done, len(user_ids), started)
+
+        if checkpoint:
+            if stats['failed_users']:
+                self.stdout.write(self.style.WARNING(
+                    f'\n⏯️  有 {stats["failed_users"]} 个用户处理失败，检查点已保留在 {checkpoint.path}，重新运行将只处理未完成的用户'
+                ))
+            else:
+                checkpoint.clear()
 
-            try:
-                result = self._apply_templates_to_user(
-                    user, 
-                    official_templates, 
-                    dry_run=dry_run, 
-                    force=force,
-                    skip_existing=skip_existing
-                )
+        # 输出统计信息
+        self._print_summary(stats, dry_run)
+
+    def _run_chunks(self, chunks, options, workers):
+        """按顺序产出 (批次, 处理报告)；workers 大于 1 时由进程池并行处理"""
+        if workers == 1:
+            for chunk in chunks:
+                yield chunk, self.process_chunk(chunk, options)
+            return
 
-                if result['skipped']:
-                    stats['skipped_users'] += 1
-                    self.stdout.write(self.style.WARNING(f'⏭️  跳过用户 {user.username}（{result["reason"]}）'))
-                else:
-                    stats['processed_users'] += 1
-                    stats['created_accounts'] += result['accounts']
-                    stats['created_expenses'] += result['expenses']
-                    stats['created_assets'] += result['assets']
-                    stats['created_incomes'] += result['incomes']
-                    stats['created_tags'] += result['tags']
-                    stats['created_configs'] += result['configs']
-                    self.stdout.write(self.style.SUCCESS(
-                        f'✓ 完成 {user.username}: '
-                        f'账户={result["accounts"]}, '
-                        f'标签={result["tags"]}, '
-                        f'支出={result["expenses"]}, '
-                        f'资产={result["assets"]}, '
-                        f'收入={result["incomes"]}'
-                    ))
+        # fork 前关闭当前进程的连接，工作进程在首次查询时各自建立连接，避免共享套接字
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as executor:
+            yield from zip(chunks, executor.map(_process_chunk, chunks, repeat(options)))
+
+    def process_chunk(self, user_ids, options):
+        """处理一批用户，返回每个用户的处理报告（不直接输出，由主进程按顺序输出）"""
+        from project.apps.account.management.commands.official_templates_loader import (
+            load_official_expense_tag_paths_by_key,
+        )
 
+        official_templates = self._get_official_templates()
+        json_tag_map = None
+        if official_templates['expense_template'] and not options['dry_run']:
+            json_tag_map = load_official_expense_tag_paths_by_key()
+
+        reports = []
+        for user in self._annotate_existing_data(User.objects.filter(id__in=user_ids)).order_by('id'):
+            report = {
+                'user_id': user.id,
+                'username': user.username,
+                'messages': [],
+                'result': None,
+                'error': None,
+            }
+            try:
+                report['result'] = self._apply_templates_to_user(
+                    user,
+                    official_templates,
+                    dry_run=options['dry_run'],
+                    force=options['force'],
+                    skip_existing=options['skip_existing'],
+                    messages=report['messages'],
+                    json_tag_map=json_tag_map,
+                )
             except Exception as e:
-                stats['failed_users'] += 1
-                self.stdout.write(self.style.ERROR(f'❌ 处理用户 {user.username} 失败: {str(e)}'))
-                import traceback
-                self.stdout.write(self.style.ERROR(traceback.format_exc()))
+                report['error'] = str(e)
+                report['traceback'] = traceback.format_exc()
+            reports.append(report)
+        return reports
+
+    def _write_report(self, report, stats):
+        """输出单个用户的处理结果并累计统计"""
+        username = report['username']
+        self.stdout.write(self.style.HTTP_INFO(f'\n处理用户: {username} (ID={report["user_id"]})'))
+        for style, message in report['messages']:
+            self.stdout.write(getattr(self.style, style)(message))
+
+        if report['error'] is not None:
+            stats['failed_users'] += 1
+            self.stdout.write(self.style.ERROR(f'❌ 处理用户 {username} 失败: {report["error"]}'))
+            self.stdout.write(self.style.ERROR(report['traceback']))
+            return
 
-        # 输出统计信息
-        self._print_summary(stats, dry_run)
+        result = report['result']
+        if result['skipped']:
+            stats['skipped_users'] += 1
+            self.stdout.write(self.style.WARNING(f'⏭️  跳过用户 {username}（{result["reason"]}）'))
+        else:
+            stats['processed_users'] += 1
+            stats['created_accounts'] += result['accounts']
+            stats['created_expenses'] += result['expenses']
+            stats['created_assets'] += result['assets']
+            stats['created_incomes'] += result['incomes']
+            stats['created_tags'] += result['tags']
+            stats['created_configs'] += result['configs']
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ 完成 {username}: '
+                f'账户={result["accounts"]}, '
+                f'标签={result["tags"]}, '
+                f'支出={result["expenses"]}, '
+                f'资产={result["assets"]}, '
+                f'收入={result["incomes"]}'
+            ))
+
+    def _write_progress(self, done, total, started):
+        """输出进度、吞吐量与预计剩余时间"""
+        elapsed = time.monotonic() - started
+        rate = done / elapsed if elapsed > 0 else 0
+        eta = timedelta(seconds=int((total - done) / rate)) if rate else '-'
+        self.stdout.write(self.style.HTTP_INFO(
+            f'\n⏱️  进度: {done}/{total} ({done / total:.1%})，吞吐: {rate:.1f} 用户/秒，预计剩余: {eta}'
+        ))
 
     def _get_target_users(self, all_users, user_ids_str):
         """获取目标用户列表"""
@@ -143,7 +341,7 @@ class Command(BaseCommand):
             return User.objects.filter(id__in=user_ids).order_by('id')
         else:
             self.stdout.write(self.style.ERROR('请指定 --all-users 或 --user-ids'))
-            return []
+            return User.objects.none()
 
     def _get_official_templates(self):
         """获取官方模板"""
@@ -161,8 +359,19 @@ class Command(BaseCommand):
             'tag_template': tag_template,
         }
 
-    def _apply_templates_to_user(self, user, official_templates, dry_run=False, force=False, skip_existing=False):
-        """为单个用户应用模板"""
+    def _annotate_existing_data(self, queryset):
+        """一次查询统计每个用户已有的账户、标签和映射数量"""
+        return queryset.annotate(**{
+            name: Coalesce(Subquery(
+                model.objects.filter(owner=OuterRef('pk')).order_by().values('owner')
+                .annotate(count=Count('pk')).values('count')
+            ), 0)
+            for name, model in EXISTING_DATA_MODELS.items()
+        })
+
+    def _apply_templates_to_user(self, user, official_templates, dry_run=False, force=False, skip_existing=False,
+                                 messages=None, json_tag_map=None):
+        """为单个用户应用模板（user 需带有 _annotate_existing_data 的统计注解）"""
         result = {
             'skipped': False,
             'reason': '',
@@ -173,13 +382,14 @@ class Command(BaseCommand):
             'tags': 0,
             'configs': 0,
         }
+        messages = messages if messages is not None else []
 
         # 检查用户是否已有数据
-        existing_accounts = Account.objects.filter(owner=user).count()
-        existing_tags = Tag.objects.filter(owner=user).count()
-        existing_expenses = Expense.objects.filter(owner=user).count()
-        existing_assets = Assets.objects.filter(owner=user).count()
-        existing_incomes = Income.objects.filter(owner=user).count()
+        existing_accounts = user.existing_accounts
+        existing_tags = user.existing_tags
+        existing_expenses = user.existing_expenses
+        existing_assets = user.existing_assets
+        existing_incomes = user.existing_incomes
         has_existing_data = (
             existing_accounts > 0
             or existing_tags > 0
@@ -204,7 +414,7 @@ class Command(BaseCommand):
                     Expense.objects.filter(owner=user).delete()
                     Assets.objects.filter(owner=user).delete()
                     Income.objects.filter(owner=user).delete()
-                    self.stdout.write(self.style.WARNING(f'  🗑️  已删除用户 {user.username} 的现有数据'))
+                    messages.append(('WARNING', f'  🗑️  已删除用户 {user.username} 的现有数据'))
 
         if dry_run:
             # 预览模式：只统计将要创建的数量
@@ -217,11 +427,12 @@ class Command(BaseCommand):
             if official_templates['assets_template']:
                 result['assets'] = official_templates['assets_template'].items.count()
             if official_templates['tag_template']:
-                from project.apps.tags.signals import tag_exists_for_user
+                from project.apps.tags.signals import get_user_tags_by_path
+                tags_by_path = get_user_tags_by_path(user)
                 result['tags'] = sum(
                     1
                     for item in official_templates['tag_template'].items.all()
-                    if not tag_exists_for_user(user, item.tag_path)
+                    if item.tag_path.strip() not in tags_by_path
                 )
             if not FormatConfig.objects.filter(owner=user).exists():
                 result['configs'] = 1
@@ -229,25 +440,28 @@ class Command(BaseCommand):
 
         # 实际创建数据（使用事务）
         with transaction.atomic():
-            # 1. 应用账户模板
+            # 1. 应用账户模板（已存在的账户保留，计入账户数）
             if official_templates['account_template']:
-                created_accounts = self._create_accounts_from_template(user, official_templates['account_template'])
-                result['accounts'] = len(created_accounts)
+                account_result = AccountTemplateManager.apply_template(
+                    official_templates['account_template'], user, 'merge', 'skip'
+                )
+                result['accounts'] = account_result['created'] + account_result['skipped']
 
             # 2. 应用标签模板
             if official_templates['tag_template']:
                 from project.apps.tags.signals import apply_official_tag_templates
                 result['tags'] = apply_official_tag_templates(user)
 
-            # 3. 应用映射模板
-            if official_templates['expense_template']:
-                result['expenses'] = self._create_expense_mappings(user, official_templates['expense_template'])
-
-            if official_templates['income_template']:
-                result['incomes'] = self._create_income_mappings(user, official_templates['income_template'])
-
-            if official_templates['assets_template']:
-                result['assets'] = self._create_assets_mappings(user, official_templates['assets_template'])
+            # 3. 应用映射模板（直接追加，跳过账户不存在的映射）
+            for result_key, template_key in MAPPING_TEMPLATE_KEYS:
+                if official_templates[template_key]:
+                    result[result_key] = apply_mapping_template(
+                        user=user,
+                        template=official_templates[template_key],
+                        action_type='append',
+                        json_tag_map=json_tag_map,
+                        skip_missing_accounts=True,
+                    )['created']
 
             # 4. 创建格式化配置
             if not FormatConfig.objects.filter(owner=user).exists():
@@ -270,134 +484,6 @@ class Command(BaseCommand):
 
         return result
 
-    def _create_accounts_from_template(self, user, account_template):
-        """从账户模板创建账户"""
-        created_accounts = {}
-        template_items = account_template.items.all().order_by('account_path')
-
-        for item in template_items:
-            account_path = item.account_path
-
-            # 跳过已存在的账户
-            if Account.objects.filter(owner=user, account=account_path).exists():
-                existing = Account.objects.get(owner=user, account=account_path)
-                created_accounts[account_path] = existing
-                continue
-
-            # 查找或创建父账户
-            parent_account = None
-            if ':' in account_path:
-                parent_path = ':'.join(account_path.split(':')[:-1])
-                if parent_path in created_accounts:
-                    parent_account = created_accounts[parent_path]
-                else:
-                    parent_account = Account.objects.filter(owner=user, account=parent_path).first()
-
-            # 创建账户
-            account = Account.objects.create(
-                owner=user,
-                account=account_path,
-                parent=parent_account,
-                enable=item.enable,
-                reconciliation_cycle_unit=item.reconciliation_cycle_unit,
-                reconciliation_cycle_interval=item.reconciliation_cycle_interval,
-                description=getattr(item, 'description', '') or ''
-            )
-            created_accounts[account_path] = account
-
-        return created_accounts
-
-    def _create_expense_mappings(self, user, expense_template):
-        """创建支出映射"""
-        from project.apps.account.management.commands.official_templates_loader import (
-            load_official_expense_tag_paths_by_key,
-            resolve_expense_template_item_tag_paths,
-        )
-        from project.apps.tags.signals import apply_tags_to_mapping
-
-        json_tag_map = load_official_expense_tag_paths_by_key()
-        created_count = 0
-        template_items = expense_template.items.all()
-
-        for item in template_items:
-            # 检查账户是否存在
-            # item.account 现在是账户路径字符串，不再是账户对象
-            if item.account:
-                account = Account.objects.filter(owner=user, account=item.account).first()
-                if not account:
-                    continue  # 跳过账户不存在的映射
-            else:
-                account = None
-
-            # 创建映射
-            expense = Expense.objects.create(
-                owner=user,
-                key=item.key,
-                payee=item.payee,
-                expend=account,
-                currency=item.currency,
-                enable=True
-            )
-            tag_paths = resolve_expense_template_item_tag_paths(item, json_tag_map)
-            apply_tags_to_mapping(expense, user, tag_paths)
-            created_count += 1
-
-        return created_count
-
-    def _create_income_mappings(self, user, income_template):
-        """创建收入映射"""
-        created_count = 0
-        template_items = income_template.items.all()
-
-        for item in template_items:
-            # 检查账户是否存在
-            # item.account 现在是账户路径字符串，不再是账户对象
-            if item.account:
-                account = Account.objects.filter(owner=user, account=item.account).first()
-                if not account:
-                    continue
-            else:
-                account = None
-
-            # 创建映射
-            Income.objects.create(
-                owner=user,
-                key=item.key,
-                payer=item.payer,
-                income=account,
-                enable=True
-            )
-            created_count += 1
-
-        return created_count
-
-    def _create_assets_mappings(self, user, assets_template):
-        """创建资产映射"""
-        created_count = 0
-        template_items = assets_template.items.all()
-
-        for item in template_items:
-            # 检查账户是否存在
-            # item.account 现在是账户路径字符串，不再是账户对象
-            if item.account:
-                account = Account.objects.filter(owner=user, account=item.account).first()
-                if not account:
-                    continue
-            else:
-                account = None
-
-            # 创建映射
-            Assets.objects.create(
-                owner=user,
-                key=item.key,
-                full=item.full,
-                assets=account,
-                enable=True
-            )
-            created_count += 1
-
-        return created_count
-
     def _print_summary(self, stats, dry_run):
         """输出统计摘要"""
         self.stdout.write('\n' + '=' * 60)
@@ -1,9 +1,13 @@
 import re
 from django.core.validators import RegexValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Value
+from django.db.models.functions import Concat, Substr
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from project.models import BaseModel
+from project.apps.common.resource_cache import MAPPING_RESOURCES, bump_resource_version
 from project.apps.reconciliation.models import CycleUnit
 
 
@@ -26,6 +30,28 @@ def _is_valid_account_part(part: str) -> bool:
     return bool(re.match(r'^[A-Za-z0-9]+(?:-[A-Za-z0-9]+)*$', part))
 
 
+ACCOUNT_TYPE_MAPPING = {
+    'Assets': '资产账户',
+    'Liabilities': '负债账户',
+    'Equity': '权益账户',
+    'Income': '收入账户',
+    'Expenses': '支出账户'
+}
+
+
+# 指向账户的映射：(统计键, 映射模型名, 外键字段)
+MAPPING_ACCOUNT_FIELDS = (
+    ('expense', 'Expense', 'expend'),
+    ('assets', 'Assets', 'assets'),
+    ('income', 'Income', 'income'),
+)
+
+
+def get_account_type_display(account_path: str) -> str:
+    """根据账户路径的根账户获取账户类型"""
+    return ACCOUNT_TYPE_MAPPING.get(account_path.split(':')[0], '未知类型')
+
+
 class Account(BaseModel):
     account = models.CharField(max_length=128, help_text="账户路径", verbose_name="账户")
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.PROTECT, related_name='children', help_text="父账户", verbose_name="父账户")
@@ -123,15 +149,15 @@ class Account(BaseModel):
 
         super().save(*args, **kwargs)
 
-        # 如果enable状态发生变化，同步更新相关映射和待办任务
+        # 如果enable状态发生变化，同步更新相关映射和待办任务（禁用时取消待办，启用时按需创建）
         if enable_changed:
-            self._sync_mappings_enable_status()
-            # 如果账户被禁用，取消所有相关的待办任务
-            if not self.enable:
-                self._cancel_pending_tasks()
-            # 如果账户被启用，且配置了对账周期，创建待办任务
-            elif self.enable:
-                self._create_reconciliation_task_if_needed()
+            try:
+                Account.sync_enable_status([self.id], self.enable)
+            except Exception as e:
+                # 记录错误但不阻止账户保存
+                import logging
+                logger = logging.getLogger(__name__)
+                logger.error(f"同步映射与待办状态失败: {str(e)}")
         
         # 如果是新创建的账户，且启用且配置了对账周期，创建待办任务
         if is_new_account and self.enable:
@@ -179,50 +205,282 @@ class Account(BaseModel):
             old_account_name: 旧的账户名称
         """
         try:
-            # 获取所有子账户（包括子账户的子账户）
-            children = self.children.all()
-
-            for child in children:
-                # 关键修复：避免更新自己（防止递归更新）
-                if child.pk == self.pk:
-                    continue
-                    
-                old_child_name = child.account
-                # 检查子账户名称是否以旧父账户名称为前缀
-                if old_child_name.startswith(old_account_name + ':'):
-                    # 替换前缀部分
-                    new_child_name = self.account + old_child_name[len(old_account_name):]
-                    child.account = new_child_name
-                    # 递归保存，这会触发子账户的子账户也进行更新
-                    child.save()
-
+            with transaction.atomic():
+                Account.rename_subtree(self.owner_id, old_account_name, self.account)
         except Exception as e:
             # 记录错误但不阻止父账户保存
             import logging
             logger = logging.getLogger(__name__)
             logger.error(f"更新子账户名称失败: {str(e)}")
 
-    def _sync_mappings_enable_status(self):
-        """同步映射的启用状态与账户状态"""
-        # 避免循环导入，使用字符串引用模型
+    @staticmethod
+    def subtree_filter(owner, account_path: str) -> models.Q:
+        """账户路径即物化路径：后代账户的路径均以 "父路径:" 为前缀"""
+        return models.Q(owner=owner, account__startswith=account_path + ':')
+
+    @classmethod
+    def rename_subtree(cls, owner, old_path: str, new_path: str) -> int:
+        """
+        以一条 UPDATE 语句替换整棵子树的路径前缀（不含根账户本身）
+
+        子树内部的父子关系不变，因此无需逐个保存或重新计算父账户。
+
+        Args:
+            owner: 属主（用户对象或ID）
+            old_path: 旧的根账户路径
+            new_path: 新的根账户路径
+
+        Returns:
+            更新的账户数量
+        """
+        updated = cls.objects.filter(cls.subtree_filter(owner, old_path)).update(
+            account=Concat(Value(new_path), Substr('account', len(old_path) + 1), output_field=models.CharField()),
+            modified=timezone.now()
+        )
+        bump_resource_version(getattr(owner, 'pk', owner), 'account')
+        return updated
+
+    def get_descendants(self):
+        """获取所有后代账户（按路径前缀一次查询）"""
+        return Account.objects.filter(Account.subtree_filter(self.owner_id, self.account))
+
+    def set_subtree_enable(self, enable: bool, include_self: bool = True) -> int:
+        """
+        批量启用/禁用整棵子树，并同步映射与对账待办
+
+        Args:
+            enable: 目标启用状态
+            include_self: 是否包含当前账户
+
+        Returns:
+            状态发生变化的账户数量
+        """
+        subtree = Account.subtree_filter(self.owner_id, self.account)
+        if include_self:
+            subtree |= models.Q(pk=self.pk)
+
+        with transaction.atomic():
+            changed_ids = list(
+                Account.objects.filter(subtree).exclude(enable=enable).values_list('id', flat=True)
+            )
+            if not changed_ids:
+                return 0
+            Account.objects.filter(id__in=changed_ids).update(enable=enable, modified=timezone.now())
+            Account.sync_enable_status(changed_ids, enable)
+            bump_resource_version(self.owner_id, 'account')
+
+        if include_self:
+            self.enable = enable
+        return len(changed_ids)
+
+    @classmethod
+    def sync_enable_status(cls, account_ids, enable: bool):
+        """
+        按账户ID集合同步映射启用状态与对账待办（与单个账户保存时的同步逻辑一致）
+
+        Args:
+            account_ids: 启用状态已变化的账户ID列表
+            enable: 新的启用状态
+        """
+        for mappings, _ in cls.get_mapping_querysets(account_ids).values():
+            mappings.update(enable=enable)
+
+        if not enable:
+            cls.cancel_reconciliation_tasks(account_ids)
+            return
+
+        # 启用且配置了对账周期、尚无待执行待办的账户，创建首个待办任务
+        cls.create_reconciliation_tasks(account_ids)
+
+    @staticmethod
+    def get_mapping_querysets(account_ids) -> dict:
+        """
+        获取指向给定账户的各类映射查询集
+
+        Returns:
+            {统计键: (映射查询集, 指向账户的外键字段)}
+        """
         from django.apps import apps
 
-        try:
-            # 获取映射模型
-            Expense = apps.get_model('maps', 'Expense')
-            Assets = apps.get_model('maps', 'Assets')
-            Income = apps.get_model('maps', 'Income')
+        return {
+            key: (apps.get_model('maps', model_name).objects.filter(**{f'{field}_id__in': account_ids}), field)
+            for key, model_name, field in MAPPING_ACCOUNT_FIELDS
+        }
 
-            # 同步所有相关映射的启用状态
-            Expense.objects.filter(expend=self).update(enable=self.enable)
-            Assets.objects.filter(assets=self).update(enable=self.enable)
-            Income.objects.filter(income=self).update(enable=self.enable)
+    @classmethod
+    def cancel_reconciliation_tasks(cls, account_ids) -> int:
+        """
+        批量取消账户的待执行对账待办
 
-        except Exception as e:
-            # 记录错误但不阻止账户保存
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"同步映射状态失败: {str(e)}")
+        Returns:
+            取消的待办数量
+        """
+        from django.contrib.contenttypes.models import ContentType
+        from project.apps.reconciliation.models import ScheduledTask
+
+        return ScheduledTask.objects.filter(
+            task_type='reconciliation',
+            content_type=ContentType.objects.get_for_model(Account),
+            object_id__in=account_ids,
+            status='pending'
+        ).update(status='cancelled')
+
+    @classmethod
+    def _count_mappings(cls, mapping_querysets) -> dict:
+        counts = {key: mappings.count() for key, (mappings, _) in mapping_querysets.items()}
+        counts['total'] = sum(counts.values())
+        return counts
+
+    @classmethod
+    def close_accounts(cls, accounts, migrate_to=None) -> dict:
+        """
+        批量关闭账户：迁移或禁用相关映射、取消待办并禁用账户
+
+        所有写入均为按ID集合的批量语句，并在同一事务中执行，语句数量与账户数量无关。
+
+        Args:
+            accounts: 待关闭的账户列表（如一棵子树）
+            migrate_to: 迁移目标账户，提供时将相关映射迁移到此账户，否则禁用相关映射
+
+        Returns:
+            dict: 包含关闭数量、映射处理方式与各类映射数量的字典
+        """
+        accounts = list(accounts)
+        account_ids = [account.id for account in accounts]
+
+        if migrate_to is not None:
+            # 验证目标账户
+            if not migrate_to.enable:
+                raise ValidationError("目标账户已禁用，无法进行迁移")
+            if migrate_to.id in account_ids:
+                raise ValidationError("不能将映射迁移到被关闭的账户")
+
+        with transaction.atomic():
+            mapping_querysets = cls.get_mapping_querysets(account_ids)
+            mapping_counts = cls._count_mappings(mapping_querysets)
+
+            for mappings, field in mapping_querysets.values():
+                if migrate_to is not None:
+                    mappings.update(**{field: migrate_to})
+                else:
+                    mappings.update(enable=False)
+
+            cls.cancel_reconciliation_tasks(account_ids)
+            closed_count = cls.objects.filter(id__in=account_ids, enable=True).update(
+                enable=False, modified=timezone.now()
+            )
+
+            for owner_id in {account.owner_id for account in accounts}:
+                bump_resource_version(owner_id, 'account', *MAPPING_RESOURCES)
+
+        for account in accounts:
+            account.enable = False
+
+        return {
+            'accounts_closed': closed_count,
+            'mappings_migrated': migrate_to is not None,
+            'mappings_disabled': migrate_to is None,
+            'migrated_to': migrate_to.id if migrate_to is not None else None,
+            'mapping_counts': mapping_counts
+        }
+
+    @classmethod
+    def delete_accounts(cls, accounts, migrate_to=None) -> dict:
+        """
+        批量删除账户，存在映射时先将映射迁移到目标账户
+
+        账户集合须包含其全部子账户（如整棵子树）；所有写入在同一事务中以批量语句完成。
+
+        Args:
+            accounts: 待删除的账户列表
+            migrate_to: 迁移目标账户，存在映射时必须提供
+
+        Returns:
+            dict: 包含映射迁移情况与各类映射数量的字典
+        """
+        accounts = list(accounts)
+        account_ids = [account.id for account in accounts]
+
+        # 检查是否有集合之外的子账户
+        if cls.objects.filter(parent_id__in=account_ids).exclude(id__in=account_ids).exists():
+            raise ValidationError("存在子账户，无法删除。请先处理子账户")
+
+        with transaction.atomic():
+            mapping_querysets = cls.get_mapping_querysets(account_ids)
+            mapping_counts = cls._count_mappings(mapping_querysets)
+
+            # 如果有映射数据，必须提供迁移目标
+            if mapping_counts['total'] > 0:
+                if not migrate_to:
+                    raise ValidationError("账户存在映射数据，删除时必须提供迁移目标账户")
+                # 验证目标账户
+                if not migrate_to.enable:
+                    raise ValidationError("目标账户已禁用，无法进行迁移")
+                if migrate_to.id in account_ids:
+                    raise ValidationError("不能将账户迁移到自身")
+
+                for mappings, field in mapping_querysets.values():
+                    mappings.update(**{field: migrate_to})
+
+            cls.cancel_reconciliation_tasks(account_ids)
+            # 集合外无子账户：先断开集合内的父子关联（parent 为 PROTECT），
+            # 再通过 QuerySet.delete() 删除，保留删除信号与关联对象处理
+            to_delete = cls.objects.filter(id__in=account_ids)
+            to_delete.update(parent=None)
+            to_delete.delete()
+
+            for owner_id in {account.owner_id for account in accounts}:
+                bump_resource_version(owner_id, 'account', *MAPPING_RESOURCES)
+
+        return {
+            'accounts_deleted': len(account_ids),
+            'mappings_migrated': mapping_counts['total'] > 0,
+            'migrated_to': migrate_to.id if mapping_counts['total'] > 0 else None,
+            'mapping_counts': mapping_counts
+        }
+
+    def close_subtree(self, migrate_to=None) -> dict:
+        """关闭账户及其全部后代账户（集合操作）"""
+        return Account.close_accounts([self, *self.get_descendants()], migrate_to=migrate_to)
+
+    def delete_subtree(self, migrate_to=None) -> dict:
+        """删除账户及其全部后代账户，相关映射迁移到目标账户（集合操作）"""
+        return Account.delete_accounts([self, *self.get_descendants()], migrate_to=migrate_to)
+
+    @classmethod
+    def create_reconciliation_tasks(cls, account_ids):
+        """
+        为配置了对账周期且尚无待执行待办的账户批量创建首个对账待办（执行日期为今日）
+
+        Args:
+            account_ids: 已启用的账户ID列表
+        """
+        from datetime import date
+        from django.contrib.contenttypes.models import ContentType
+        from project.apps.reconciliation.models import ScheduledTask
+
+        account_content_type = ContentType.objects.get_for_model(Account)
+        has_pending = set(ScheduledTask.objects.filter(
+            task_type='reconciliation',
+            content_type=account_content_type,
+            object_id__in=account_ids,
+            status='pending'
+        ).values_list('object_id', flat=True))
+        cycle_account_ids = cls.objects.filter(
+            id__in=account_ids,
+            reconciliation_cycle_unit__isnull=False,
+            reconciliation_cycle_interval__isnull=False
+        ).exclude(reconciliation_cycle_unit='').exclude(reconciliation_cycle_interval=0).values_list('id', flat=True)
+        ScheduledTask.objects.bulk_create([
+            ScheduledTask(
+                task_type='reconciliation',
+                content_type=account_content_type,
+                object_id=account_id,
+                scheduled_date=date.today(),
+                status='pending'
+            )
+            for account_id in cycle_account_ids if account_id not in has_pending
+        ])
 
     def _create_reconciliation_task_if_needed(self):
         """如果需要，创建对账待办任务
@@ -274,44 +532,13 @@ class Account(BaseModel):
             # 记录错误但不阻止账户保存
             logger.error(f"创建对账待办任务失败: {str(e)}")
 
-    def _cancel_pending_tasks(self):
-        """取消账户相关的待办任务"""
-        from django.contrib.contenttypes.models import ContentType
-        from project.apps.reconciliation.models import ScheduledTask
-        import logging
-        
-        logger = logging.getLogger(__name__)
-        
-        try:
-            account_content_type = ContentType.objects.get_for_model(Account)
-            cancelled_count = ScheduledTask.objects.filter(
-                task_type='reconciliation',
-                content_type=account_content_type,
-                object_id=self.id,
-                status='pending'
-            ).update(status='cancelled')
-            
-            if cancelled_count > 0:
-                logger.info(f"账户 {self.account} 关闭，已取消 {cancelled_count} 个待办任务")
-        except Exception as e:
-            # 记录错误但不阻止账户保存
-            logger.error(f"取消待办任务失败: {str(e)}")
-
     def has_children(self):
         """检查是否存在子账户"""
         return self.children.exists()
 
     def get_account_type(self):
         """获取账户类型"""
-        root = self.account.split(':')[0]
-        type_mapping = {
-            'Assets': '资产账户',
-            'Liabilities': '负债账户', 
-            'Equity': '权益账户',
-            'Income': '收入账户',
-            'Expenses': '支出账户'
-        }
-        return type_mapping.get(root, '未知类型')
+        return get_account_type_display(self.account)
 
     def close(self, migrate_to=None):
         """
@@ -322,71 +549,20 @@ class Account(BaseModel):
         Returns:
             dict: 包含操作结果的字典
         """
-        # 避免循环导入，使用字符串引用模型
-        from django.apps import apps
+        has_children = self.has_children()
 
-        # 获取映射模型
-        Expense = apps.get_model('maps', 'Expense')
-        Assets = apps.get_model('maps', 'Assets')
-        Income = apps.get_model('maps', 'Income')
+        # 关闭当前账户（不关闭子账户）
+        closed = Account.close_accounts([self], migrate_to=migrate_to)
 
-        result = {
+        return {
             'account_closed': True,
-            'has_children': self.has_children(),
-            'mappings_migrated': False,
-            'mappings_disabled': False,
-            'migrated_to': None,
-            'mapping_counts': {
-                'expense': 0,
-                'assets': 0,
-                'income': 0,
-                'total': 0
-            }
-        }
-
-        # 统计当前映射数量
-        expense_count = Expense.objects.filter(expend=self).count()
-        assets_count = Assets.objects.filter(assets=self).count()
-        income_count = Income.objects.filter(income=self).count()
-        total_mappings = expense_count + assets_count + income_count
-
-        result['mapping_counts'] = {
-            'expense': expense_count,
-            'assets': assets_count,
-            'income': income_count,
-            'total': total_mappings
+            'has_children': has_children,
+            'mappings_migrated': closed['mappings_migrated'],
+            'mappings_disabled': closed['mappings_disabled'],
+            'migrated_to': closed['migrated_to'],
+            'mapping_counts': closed['mapping_counts']
         }
 
-        # 处理映射迁移
-        if migrate_to:
-            # 验证目标账户
-            if not migrate_to.enable:
-                raise ValidationError("目标账户已禁用，无法进行迁移")
-
-            # 迁移所有类型的映射到目标账户
-            Expense.objects.filter(expend=self).update(expend=migrate_to)
-            Assets.objects.filter(assets=self).update(assets=migrate_to)
-            Income.objects.filter(income=self).update(income=migrate_to)
-
-            result['mappings_migrated'] = True
-            result['migrated_to'] = migrate_to.id
-        else:
-            # 禁用所有相关映射
-            Expense.objects.filter(expend=self).update(enable=False)
-            Assets.objects.filter(assets=self).update(enable=False)
-            Income.objects.filter(income=self).update(enable=False)
-
-            result['mappings_disabled'] = True
-
-        # 取消所有相关的待办任务
-        self._cancel_pending_tasks()
-
-        # 关闭当前账户（不关闭子账户）
-        self.enable = False
-        self.save()
-
-        return result
-
     def delete_with_migration(self, migrate_to=None):
         """
         删除账户，并处理所有相关的映射
@@ -396,68 +572,22 @@ class Account(BaseModel):
         Returns:
             dict: 包含操作结果的字典
         """
-        # 检查是否有子账户
-        if self.has_children():
-            raise ValidationError("存在子账户，无法删除。请先处理子账户")
-
-        # 避免循环导入，使用字符串引用模型
-        from django.apps import apps
-
-        # 获取映射模型
-        Expense = apps.get_model('maps', 'Expense')
-        Assets = apps.get_model('maps', 'Assets')
-        Income = apps.get_model('maps', 'Income')
+        account_id = self.id
+        account_name = self.account
 
-        # 统计映射数量
-        expense_count = Expense.objects.filter(expend=self).count()
-        assets_count = Assets.objects.filter(assets=self).count()
-        income_count = Income.objects.filter(income=self).count()
-        total_mappings = expense_count + assets_count + income_count
+        deleted = Account.delete_accounts([self], migrate_to=migrate_to)
 
-        result = {
+        return {
             'account_deleted': True,
-            'mappings_migrated': False,
-            'migrated_to': None,
-            'mapping_counts': {
-                'expense': expense_count,
-                'assets': assets_count,
-                'income': income_count,
-                'total': total_mappings
+            'mappings_migrated': deleted['mappings_migrated'],
+            'migrated_to': deleted['migrated_to'],
+            'mapping_counts': deleted['mapping_counts'],
+            'deleted_account': {
+                'id': account_id,
+                'name': account_name
             }
         }
 
-        # 如果有映射数据，必须提供迁移目标
-        if total_mappings > 0:
-            if not migrate_to:
-                raise ValidationError("账户存在映射数据，删除时必须提供迁移目标账户")
-
-            # 验证目标账户
-            if not migrate_to.enable:
-                raise ValidationError("目标账户已禁用，无法进行迁移")
-
-            if migrate_to == self:
-                raise ValidationError("不能将账户迁移到自身")
-
-            # 迁移所有类型的映射到目标账户
-            Expense.objects.filter(expend=self).update(expend=migrate_to)
-            Assets.objects.filter(assets=self).update(assets=migrate_to)
-            Income.objects.filter(income=self).update(income=migrate_to)
-
-            result['mappings_migrated'] = True
-            result['migrated_to'] = migrate_to.id
-
-        # 删除账户
-        account_id = self.id
-        account_name = self.account
-        self.delete()
-
-        result['deleted_account'] = {
-            'id': account_id,
-            'name': account_name
-        }
-
-        return result
-
     def has_reconciliation_cycle(self) -> bool:
         """检查是否配置了对账周期"""
         return bool(self.reconciliation_cycle_unit and self.reconciliation_cycle_interval)
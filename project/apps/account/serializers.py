@@ -2,6 +2,7 @@ from django.db import IntegrityError
 from rest_framework import serializers
 # from django.contrib.auth.models import User
 from project.apps.account.models import Account, AccountTemplate, AccountTemplateItem
+from project.apps.account.utils import AccountTreeManager
 
 _DUPLICATE_ACCOUNT_MSG = '该账户路径已存在，请勿重复添加'
 
@@ -23,16 +24,22 @@ class AccountTreeSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created', 'modified', 'owner']
 
     def get_children(self, obj):
-        """递归获取子账户"""
-        children = obj.children.all().order_by('account')
-        if children.exists():
-            return AccountTreeSerializer(children, many=True, context=self.context).data
-        return []
+        """递归获取子账户（优先使用 AccountTreeManager.link_account_tree 预先组装的子账户）"""
+        children = getattr(obj, 'tree_children', None)
+        if children is None:
+            children = obj.children.all().order_by('account')
+            if not children.exists():
+                return []
+        return AccountTreeSerializer(children, many=True, context=self.context).data
 
     def get_mapping_count(self, obj):
         """获取与此账户相关的映射数量"""
         from django.apps import apps
 
+        annotated = AccountTreeManager.get_annotated_mapping_count(obj)
+        if annotated is not None:
+            return annotated
+
         try:
             Expense = apps.get_model('maps', 'Expense')
             Assets = apps.get_model('maps', 'Assets')
@@ -74,7 +81,7 @@ class AccountSerializer(serializers.ModelSerializer):
     """账户基础序列化器"""
     parent_account = serializers.CharField(source='parent.account', read_only=True)
     account_type = serializers.CharField(source='get_account_type', read_only=True)
-    has_children = serializers.BooleanField(read_only=True)
+    has_children = serializers.SerializerMethodField()
     mapping_count = serializers.SerializerMethodField()
 
     class Meta:
@@ -87,10 +94,21 @@ class AccountSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created', 'modified', 'owner']
 
+    def get_has_children(self, obj) -> bool:
+        """是否存在子账户（优先使用 annotate_tree_fields 附加的标记）"""
+        children_exist = getattr(obj, 'children_exist', None)
+        if children_exist is not None:
+            return children_exist
+        return obj.has_children()
+
     def get_mapping_count(self, obj):
         """获取与此账户相关的映射数量"""
         from django.apps import apps
 
+        annotated = AccountTreeManager.get_annotated_mapping_count(obj)
+        if annotated is not None:
+            return annotated
+
         try:
             Expense = apps.get_model('maps', 'Expense')
             Assets = apps.get_model('maps', 'Assets')
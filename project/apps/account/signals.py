@@ -1,7 +1,9 @@
 # project/apps/account/signals.py
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from allauth.account.signals import user_signed_up
-from project.apps.account.models import AccountTemplate
+from project.apps.account.models import Account, AccountTemplate
+from project.apps.common.resource_cache import bump_resource_version
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,7 +17,7 @@ def apply_official_account_templates_on_signup(sender, request, user, **kwargs):
 
 def apply_official_account_templates(user):
     """应用官方账户模板到用户"""
-    from project.apps.account.models import Account
+    from project.apps.account.utils import AccountTemplateManager
 
     # 获取所有官方账户模板
     official_templates = AccountTemplate.objects.filter(is_official=True)
@@ -24,22 +26,15 @@ def apply_official_account_templates(user):
 
     for template in official_templates:
         try:
-            # 使用合并方式，跳过冲突
-            for item in template.items.all():
-                # 检查是否已存在相同路径的账户
-                existing = Account.objects.filter(owner=user, account=item.account_path).first()
-
-                if not existing:
-                    # 创建新账户（Account.save() 会自动创建父账户）
-                    Account.objects.create(
-                        owner=user,
-                        account=item.account_path,
-                        enable=item.enable,
-                        reconciliation_cycle_unit=item.reconciliation_cycle_unit,
-                        reconciliation_cycle_interval=item.reconciliation_cycle_interval,
-                        description=item.description or ''
-                    )
-                    logger.debug(f"为用户 {user.username} 创建账户: {item.account_path}")
+            # 使用合并方式，跳过冲突（Account 已存在时不修改）
+            result = AccountTemplateManager.apply_template(template, user, 'merge', 'skip')
+            logger.debug(f"为用户 {user.username} 创建 {result['created']} 个账户")
         except Exception as e:
             logger.error(f"应用账户模板 {template.name} 失败: {str(e)}")
 
+
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+def invalidate_account_cache(sender, instance, **kwargs):
+    """账户新增、修改或删除后使用户账户列表缓存失效（映射列表展示账户信息，同样依赖该版本号）"""
+    bump_resource_version(instance.owner_id, 'account')
@@ -0,0 +1,96 @@
+import os
+import django
+
+# 设置Django环境
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings.test')
+django.setup()
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from project.apps.account.models import Account
+from project.apps.account.utils import AccountStatistics
+from project.apps.account.tests.test_account_subtree import build_subtree
+from project.apps.maps.models import Assets, Expense, Income
+
+
+class AccountStatisticsTest(TestCase):
+    """测试账户统计的聚合查询与版本号缓存"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='statisticsuser', password='testpass123')
+        self.food = build_subtree(self.user, 'Expenses:Food', 3, 4)
+        self.bank = Account.objects.create(account='Assets:Bank', owner=self.user)
+        self.salary = Account.objects.create(account='Income:Salary', owner=self.user, enable=False)
+        leaf = Account.objects.get(owner=self.user, account='Expenses:Food:Branch0:Leaf0')
+        Expense.objects.create(owner=self.user, key='餐厅', expend=leaf)
+        Expense.objects.create(owner=self.user, key='外卖', expend=leaf)
+        Expense.objects.create(owner=self.user, key='咖啡', expend=self.food, enable=False)
+        Expense.objects.create(owner=self.user, key='未知')
+        Assets.objects.create(owner=self.user, key='工行', full='工商银行', assets=self.bank)
+        Income.objects.create(owner=self.user, key='工资', income=self.salary)
+
+        other = User.objects.create_user(username='statisticsother', password='testpass123')
+        build_subtree(other, 'Expenses:Food', 1, 1)
+
+    def test_user_statistics_single_query(self):
+        with self.assertNumQueries(1):
+            stats = AccountStatistics.get_user_account_statistics(self.user)
+
+        # 创建子账户时自动补全根账户
+        self.assertEqual(stats['total_accounts'], 21)
+        self.assertEqual(stats['enabled_accounts'], 20)
+        self.assertEqual(stats['disabled_accounts'], 1)
+        # 仅统计有启用映射的账户
+        self.assertEqual(stats['mapped_accounts'], 3)
+        self.assertEqual(stats['type_statistics']['Expenses'], {'total': 17, 'enabled': 17, 'disabled': 0})
+        self.assertEqual(stats['type_statistics']['Income'], {'total': 2, 'enabled': 1, 'disabled': 1})
+        self.assertEqual(stats['type_statistics']['Equity'], {'total': 0, 'enabled': 0, 'disabled': 0})
+
+    def test_user_statistics_cached_until_write(self):
+        AccountStatistics.get_user_account_statistics(self.user)
+        with self.assertNumQueries(0):
+            AccountStatistics.get_user_account_statistics(self.user)
+
+        Account.objects.create(account='Equity:Opening', owner=self.user)
+        stats = AccountStatistics.get_user_account_statistics(self.user)
+        self.assertEqual(stats['type_statistics']['Equity']['total'], 2)
+
+        Expense.objects.filter(owner=self.user, key='咖啡').get().delete()
+        self.food.set_subtree_enable(False)
+        stats = AccountStatistics.get_user_account_statistics(self.user)
+        self.assertEqual(stats['type_statistics']['Expenses']['disabled'], 16)
+
+    def test_usage_statistics_constant_queries(self):
+        with self.assertNumQueries(1):
+            usage = AccountStatistics.get_account_usage_statistics(self.food)
+
+        self.assertEqual(usage, {
+            'mapping_count': {'expense': 1, 'assets': 0, 'income': 0, 'total': 1},
+            'children_count': 3,
+            'descendants_count': 15,
+            'is_leaf': False,
+            'is_root': False,
+        })
+        with self.assertNumQueries(0):
+            AccountStatistics.get_account_usage_statistics(self.food)
+
+        leaf = Account.objects.get(owner=self.user, account='Expenses:Food:Branch0:Leaf0')
+        usage = AccountStatistics.get_account_usage_statistics(leaf)
+        self.assertEqual(usage['mapping_count']['expense'], 2)
+        self.assertEqual((usage['children_count'], usage['descendants_count'], usage['is_leaf']), (0, 0, True))
+
+    def test_statistics_endpoints(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        response = client.get('/api/account/statistics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_accounts'], 21)
+
+        response = client.get(f'/api/account/{self.food.id}/usage/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['descendants_count'], 15)
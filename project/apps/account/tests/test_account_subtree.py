@@ -0,0 +1,138 @@
+import os
+import django
+
+# 设置Django环境
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings.test')
+django.setup()
+
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+
+from project.apps.account.models import Account
+from project.apps.account.utils import AccountTreeManager
+from project.apps.maps.models import Expense
+from project.apps.reconciliation.models import ScheduledTask
+
+
+def build_subtree(owner, root_path, branches, leaves):
+    """批量创建 root_path 下 branches 个分支、每个分支 leaves 个叶子账户"""
+    root = Account.objects.create(account=root_path, owner=owner)
+    branch_accounts = Account.objects.bulk_create([
+        Account(account=f'{root_path}:Branch{i}', owner=owner, parent=root) for i in range(branches)
+    ])
+    Account.objects.bulk_create([
+        Account(account=f'{branch.account}:Leaf{j}', owner=owner, parent=branch)
+        for branch in branch_accounts for j in range(leaves)
+    ])
+    return root
+
+
+class AccountSubtreeTest(TestCase):
+    """测试基于物化路径的子树操作"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='subtreeuser', password='testpass123')
+        self.other_user = User.objects.create_user(username='otheruser', password='testpass123')
+
+    def test_rename_thousand_descendants_with_constant_queries(self):
+        root = build_subtree(self.user, 'Expenses:Food', 40, 25)
+        build_subtree(self.other_user, 'Expenses:Food', 1, 1)
+        self.assertEqual(root.get_descendants().count(), 1040)
+
+        root.account = 'Expenses:Dining'
+        with self.assertNumQueries(6):
+            root.save()
+
+        self.assertFalse(Account.objects.filter(owner=self.user, account__startswith='Expenses:Food:').exists())
+        leaf = Account.objects.get(owner=self.user, account='Expenses:Dining:Branch39:Leaf24')
+        self.assertEqual(leaf.parent.account, 'Expenses:Dining:Branch39')
+        self.assertEqual(leaf.parent.parent_id, root.id)
+        # 其他用户的同名子树不受影响
+        self.assertTrue(Account.objects.filter(owner=self.other_user, account='Expenses:Food:Branch0:Leaf0').exists())
+
+    def test_rename_does_not_touch_sibling_with_same_prefix(self):
+        root = build_subtree(self.user, 'Assets:Bank', 1, 1)
+        Account.objects.create(account='Assets:BankCard', owner=self.user)
+
+        root.account = 'Assets:Savings'
+        root.save()
+
+        self.assertTrue(Account.objects.filter(owner=self.user, account='Assets:BankCard').exists())
+        self.assertTrue(Account.objects.filter(owner=self.user, account='Assets:Savings:Branch0:Leaf0').exists())
+
+    def test_descendants_single_query(self):
+        root = build_subtree(self.user, 'Income:Salary', 3, 4)
+        with self.assertNumQueries(1):
+            descendants = AccountTreeManager.get_account_descendants(root)
+        self.assertEqual(len(descendants), 15)
+        self.assertNotIn(root, descendants)
+
+    def test_set_subtree_enable_syncs_mappings_and_tasks(self):
+        root = build_subtree(self.user, 'Assets:Bank', 2, 2)
+        leaf = Account.objects.get(owner=self.user, account='Assets:Bank:Branch0:Leaf0')
+        leaf.reconciliation_cycle_unit = 'month'
+        leaf.save()
+        mapping = Expense.objects.create(key='bank', expend=leaf, owner=self.user)
+        content_type = ContentType.objects.get_for_model(Account)
+        tasks = ScheduledTask.objects.filter(task_type='reconciliation', content_type=content_type, object_id=leaf.id)
+        leaf._create_reconciliation_task_if_needed()
+        self.assertEqual(tasks.filter(status='pending').count(), 1)
+
+        self.assertEqual(root.set_subtree_enable(False), 7)
+        self.assertFalse(Account.objects.filter(owner=self.user, account__startswith='Assets:Bank', enable=True).exists())
+        mapping.refresh_from_db()
+        self.assertFalse(mapping.enable)
+        self.assertEqual(tasks.filter(status='pending').count(), 0)
+
+        self.assertEqual(root.set_subtree_enable(True), 7)
+        self.assertEqual(root.set_subtree_enable(True), 0)
+        mapping.refresh_from_db()
+        self.assertTrue(mapping.enable)
+        self.assertEqual(tasks.filter(status='pending').count(), 1)
+
+    def test_close_subtree_with_constant_queries(self):
+        root = build_subtree(self.user, 'Expenses:Food', 20, 24)
+        target = Account.objects.create(account='Expenses:Other', owner=self.user)
+        leaves = list(Account.objects.filter(owner=self.user, account__startswith='Expenses:Food:Branch1:'))
+        Expense.objects.bulk_create([Expense(key=f'key{i}', expend=leaf, owner=self.user) for i, leaf in enumerate(leaves)])
+        leaves[0].reconciliation_cycle_unit = 'month'
+        leaves[0].save()
+        leaves[0]._create_reconciliation_task_if_needed()
+        self.assertEqual(root.get_descendants().count(), 500)
+
+        # 查询后代 + 3 次映射计数 + 3 次映射迁移 + 取消待办 + 禁用账户（另含事务保存点 2 条）
+        with self.assertNumQueries(11):
+            result = root.close_subtree(migrate_to=target)
+
+        self.assertEqual(result['accounts_closed'], 501)
+        self.assertEqual(result['mapping_counts'], {'expense': 24, 'assets': 0, 'income': 0, 'total': 24})
+        self.assertFalse(root.enable)
+        self.assertFalse(Account.objects.filter(owner=self.user, account__startswith='Expenses:Food', enable=True).exists())
+        self.assertEqual(Expense.objects.filter(expend=target, enable=True).count(), 24)
+        content_type = ContentType.objects.get_for_model(Account)
+        self.assertFalse(ScheduledTask.objects.filter(content_type=content_type, status='pending').exists())
+
+    def test_delete_subtree_migrates_mappings_with_constant_queries(self):
+        root = build_subtree(self.user, 'Expenses:Food', 20, 24)
+        target = Account.objects.create(account='Expenses:Other', owner=self.user)
+        leaf = Account.objects.get(owner=self.user, account='Expenses:Food:Branch19:Leaf23')
+        mapping = Expense.objects.create(key='food', expend=leaf, owner=self.user)
+
+        with self.assertRaisesMessage(Exception, '账户存在映射数据'):
+            root.delete_subtree()
+        with self.assertRaisesMessage(Exception, '存在子账户'):
+            Account.delete_accounts([root])
+
+        ContentType.objects.get_for_model(Account)  # 预热 ContentType 缓存，使查询数与执行顺序无关
+        # 查询后代 + 子账户检查 + 3 次映射计数 + 3 次映射迁移 + 取消待办 + 断开父子关联，
+        # 随后 QuerySet.delete()：收集账户与子账户 3 次 + 3 次映射置空 + 按每批 100 个删除 501 个账户 6 次
+        # （另含事务保存点 2 条）
+        with self.assertNumQueries(24):
+            result = root.delete_subtree(migrate_to=target)
+
+        self.assertEqual(result['accounts_deleted'], 501)
+        self.assertEqual(result['migrated_to'], target.id)
+        self.assertFalse(Account.objects.filter(owner=self.user, account__startswith='Expenses:Food').exists())
+        mapping.refresh_from_db()
+        self.assertEqual(mapping.expend_id, target.id)
@@ -0,0 +1,143 @@
+import os
+import django
+
+# 设置Django环境
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings.test')
+django.setup()
+
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from project.apps.account.models import Account, AccountTemplate, AccountTemplateItem
+from project.apps.account.utils import AccountTemplateManager
+from project.apps.maps.models import Expense
+from project.apps.reconciliation.models import ScheduledTask
+
+
+class AccountTemplateApplyTest(TestCase):
+    """测试账户模板批量应用"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='accounttemplateuser', password='testpass123')
+        self.template = AccountTemplate.objects.create(name='测试账户模板', owner=self.user)
+
+    def add_items(self, *items):
+        AccountTemplateItem.objects.bulk_create([
+            AccountTemplateItem(template=self.template, **item) for item in items
+        ])
+
+    def paths(self):
+        return list(Account.objects.filter(owner=self.user).values_list('account', flat=True))
+
+    def test_child_item_before_parent_item(self):
+        """子账户模板项在前时父账户已自动创建，之后的父账户模板项按冲突处理（与逐个创建一致）"""
+        self.add_items(
+            {'account_path': 'Assets:Bank:Card'},
+            {'account_path': 'Assets:Bank', 'enable': False, 'description': '银行'},
+        )
+
+        result = AccountTemplateManager.apply_template(self.template, self.user, 'merge', 'skip')
+        self.assertEqual(result, {'created': 1, 'skipped': 1, 'overwritten': 0})
+        bank = Account.objects.get(owner=self.user, account='Assets:Bank')
+        self.assertTrue(bank.enable)
+        self.assertEqual(bank.description, '')
+
+        other = User.objects.create_user(username='accounttemplateother', password='testpass123')
+        result = AccountTemplateManager.apply_template(self.template, other, 'merge', 'overwrite')
+        self.assertEqual(result, {'created': 2, 'skipped': 0, 'overwritten': 1})
+        bank = Account.objects.get(owner=other, account='Assets:Bank')
+        self.assertFalse(bank.enable)
+        self.assertEqual(bank.description, '银行')
+        self.assertEqual(Account.objects.get(owner=other, account='Assets:Bank:Card').parent, bank)
+
+    def test_creates_missing_parents(self):
+        self.add_items(
+            {'account_path': 'Assets:Bank:Card', 'reconciliation_cycle_unit': 'month',
+             'reconciliation_cycle_interval': 1, 'description': '银行卡'},
+            {'account_path': 'Expenses:Food:Dining', 'enable': False},
+        )
+
+        result = AccountTemplateManager.apply_template(self.template, self.user, 'merge', 'skip')
+
+        self.assertEqual(result, {'created': 2, 'skipped': 0, 'overwritten': 0})
+        self.assertEqual(self.paths(), [
+            'Assets', 'Assets:Bank', 'Assets:Bank:Card', 'Expenses', 'Expenses:Food', 'Expenses:Food:Dining'
+        ])
+        card = Account.objects.get(owner=self.user, account='Assets:Bank:Card')
+        self.assertEqual(card.parent.account, 'Assets:Bank')
+        self.assertEqual(card.parent.parent.account, 'Assets')
+        self.assertEqual(card.description, '银行卡')
+        self.assertTrue(card.parent.enable)
+        self.assertFalse(Account.objects.get(owner=self.user, account='Expenses:Food:Dining').enable)
+
+        tasks = ScheduledTask.objects.filter(
+            task_type='reconciliation', content_type=ContentType.objects.get_for_model(Account), status='pending'
+        )
+        self.assertEqual(list(tasks.values_list('object_id', flat=True)), [card.id])
+
+    def test_merge_skip_and_overwrite(self):
+        bank = Account.objects.create(owner=self.user, account='Assets:Bank', description='旧描述')
+        mapping = Expense.objects.create(owner=self.user, key='bank', expend=bank)
+        self.add_items(
+            {'account_path': 'Assets:Bank', 'description': '新描述'},
+            {'account_path': 'Assets:Cash'},
+        )
+
+        result = AccountTemplateManager.apply_template(self.template, self.user, 'merge', 'skip')
+        self.assertEqual(result, {'created': 1, 'skipped': 1, 'overwritten': 0})
+        self.assertEqual(Account.objects.get(owner=self.user, account='Assets:Bank').description, '旧描述')
+
+        result = AccountTemplateManager.apply_template(self.template, self.user, 'merge', 'overwrite')
+        self.assertEqual(result, {'created': 2, 'skipped': 0, 'overwritten': 2})
+        new_bank = Account.objects.get(owner=self.user, account='Assets:Bank')
+        self.assertNotEqual(new_bank.id, bank.id)
+        self.assertEqual(new_bank.description, '新描述')
+        mapping.refresh_from_db()
+        self.assertIsNone(mapping.expend)
+
+    def test_overwrite_replaces_all_accounts(self):
+        Account.objects.create(owner=self.user, account='Equity')
+        # 子账户先于父账户出现时，父账户使用模板中的配置
+        self.add_items(
+            {'account_path': 'Income:Salary:Bonus'},
+            {'account_path': 'Income:Salary', 'description': '工资'},
+        )
+
+        result = AccountTemplateManager.apply_template(self.template, self.user, 'overwrite', 'skip')
+
+        self.assertEqual(result['created'], 2)
+        self.assertEqual(self.paths(), ['Income', 'Income:Salary', 'Income:Salary:Bonus'])
+        self.assertEqual(Account.objects.get(owner=self.user, account='Income:Salary').description, '工资')
+
+    def test_query_count_bounded_for_large_template(self):
+        Account.objects.create(owner=self.user, account='Expenses:Existing')
+        self.add_items(*[
+            {'account_path': f'Expenses:Branch{i}:Leaf{j}', 'reconciliation_cycle_unit': 'week',
+             'reconciliation_cycle_interval': 2}
+            for i in range(20) for j in range(20)
+        ])
+
+        with CaptureQueriesContext(connection) as context:
+            result = AccountTemplateManager.apply_template(self.template, self.user, 'merge', 'skip')
+
+        # 逐个创建需要上千次查询；批量写入仅随层级数与 bulk_create 分批数增长
+        self.assertLessEqual(len(context.captured_queries), 20)
+
+        self.assertEqual(result['created'], 400)
+        self.assertEqual(Account.objects.filter(owner=self.user).count(), 422)
+        self.assertEqual(ScheduledTask.objects.filter(task_type='reconciliation').count(), 400)
+
+    def test_apply_view(self):
+        self.add_items({'account_path': 'Assets:Bank:Card'})
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        response = client.post(f'/api/account-templates/{self.template.id}/apply/', {'action': 'merge'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['result'], {'created': 1, 'skipped': 0, 'overwritten': 0})
+        self.assertIn('Assets:Bank:Card', self.paths())
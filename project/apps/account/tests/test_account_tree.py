@@ -0,0 +1,106 @@
+import os
+import django
+
+# 设置Django环境
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings.test')
+django.setup()
+
+from types import SimpleNamespace
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from project.apps.account.models import Account
+from project.apps.account.serializers import AccountTreeSerializer
+from project.apps.account.utils import AccountTreeManager
+from project.apps.maps.models import Expense, Assets, Income
+
+
+class AccountTreeQueryTest(TestCase):
+    """测试账户树一次查询组装"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='treeuser', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_chart(self, branches, leaves, prefix='Branch'):
+        """创建 branches 个分支、每个分支 leaves 个叶子账户，并为部分叶子账户创建映射"""
+        for i in range(branches):
+            for j in range(leaves):
+                account = Account.objects.create(account=f'Expenses:{prefix}{i}:Leaf{j}', owner=self.user)
+                if j % 2 == 0:
+                    Expense.objects.create(key=f'e{i}-{j}', expend=account, owner=self.user)
+                    Expense.objects.create(key=f'f{i}-{j}', expend=account, owner=self.user)
+                if j % 3 == 0:
+                    Income.objects.create(key=f'i{i}-{j}', income=account, owner=self.user)
+        bank = Account.objects.create(account=f'Assets:{prefix}:Card', owner=self.user)
+        Assets.objects.create(key='card', full='银行卡', assets=bank, owner=self.user)
+
+    def legacy_tree(self):
+        """逐节点查询的原有序列化结果"""
+        roots = Account.objects.filter(owner=self.user, parent__isnull=True)
+        request = SimpleNamespace(user=self.user)
+        return AccountTreeSerializer(roots, many=True, context={'request': request}).data
+
+    def tree_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/account/tree/')
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_tree_matches_legacy_serializer(self):
+        self.create_chart(3, 4)
+        response, _ = self.tree_queries()
+        self.assertEqual(response.json(), self.legacy_tree())
+
+        leaf = response.json()[1]['children'][0]['children'][0]
+        self.assertEqual(leaf['account'], 'Expenses:Branch0:Leaf0')
+        self.assertEqual(leaf['mapping_count'], {'expense': 2, 'assets': 0, 'income': 1, 'total': 3})
+
+    def test_tree_query_count_independent_of_size(self):
+        self.create_chart(2, 3)
+        _, small_queries = self.tree_queries()
+
+        self.create_chart(20, 30, prefix='Large')
+        self.assertGreater(Account.objects.filter(owner=self.user).count(), 600)
+        _, large_queries = self.tree_queries()
+
+        self.assertEqual(small_queries, large_queries)
+        self.assertLessEqual(large_queries, 3)
+
+    def test_tree_keeps_filtered_roots(self):
+        self.create_chart(2, 2)
+        response = self.client.get('/api/account/tree/', {'account_type': 'Assets'})
+        self.assertEqual([node['account'] for node in response.json()], ['Assets'])
+        self.assertEqual(response.json()[0]['children'][0]['children'][0]['account'], 'Assets:Branch:Card')
+
+    def test_manager_tree_single_query(self):
+        self.create_chart(3, 3)
+        with self.assertNumQueries(1):
+            tree = AccountTreeManager.get_account_tree(self.user, 'Expenses')
+
+        self.assertEqual([node['account'] for node in tree], ['Expenses'])
+        branch = tree[0]['children'][0]
+        self.assertTrue(branch['has_children'])
+        self.assertEqual([node['account'] for node in branch['children']],
+                         ['Expenses:Branch0:Leaf0', 'Expenses:Branch0:Leaf1', 'Expenses:Branch0:Leaf2'])
+        self.assertEqual(branch['children'][0]['mapping_count'],
+                         AccountTreeManager.get_mapping_count(Account.objects.get(account='Expenses:Branch0:Leaf0')))
+
+    def test_list_uses_annotated_counts(self):
+        self.create_chart(2, 2)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/account/')
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(context.captured_queries), 3)
+
+        results = response.json()
+        results = results['results'] if isinstance(results, dict) else results
+        leaf = next(item for item in results if item['account'] == 'Expenses:Branch0:Leaf0')
+        self.assertTrue(next(item for item in results if item['account'] == 'Expenses')['has_children'])
+        self.assertFalse(leaf['has_children'])
+        self.assertEqual(leaf['mapping_count']['total'], 3)
@@ -0,0 +1,125 @@
+"""
+apply_templates_to_users 管理命令测试
+
+测试分批处理、检查点恢复、失败重试以及预览模式输出
+"""
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+import django
+from django.test import TestCase
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+
+# 设置Django环境
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings.test')
+django.setup()
+
+from project.apps.account.models import Account, AccountTemplate, AccountTemplateItem
+from project.apps.account.utils import AccountTemplateManager
+from project.apps.maps.models import Template, TemplateItem, Expense
+from project.apps.tags.models import Tag, TagTemplate, TagTemplateItem
+
+User = get_user_model()
+
+
+class TestApplyTemplatesToUsers(TestCase):
+    """测试批量应用官方模板命令"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='template-admin')
+        account_template = AccountTemplate.objects.create(name='官方账户', is_official=True, owner=self.admin)
+        AccountTemplateItem.objects.bulk_create([
+            AccountTemplateItem(template=account_template, account_path='Expenses:Food:Dining'),
+            AccountTemplateItem(template=account_template, account_path='Assets:Bank'),
+        ])
+        expense_template = Template.objects.create(name='官方支出', type='expense', is_official=True, owner=self.admin)
+        TemplateItem.objects.bulk_create([
+            TemplateItem(template=expense_template, key='餐厅', account='Expenses:Food:Dining', tag_paths=['Life']),
+            TemplateItem(template=expense_template, key='缺失', account='Expenses:Missing'),
+        ])
+        tag_template = TagTemplate.objects.create(name='官方标签', is_official=True, owner=self.admin)
+        TagTemplateItem.objects.create(template=tag_template, tag_path='Life')
+
+        self.users = [User.objects.create_user(username=f'rollout{i}') for i in range(5)]
+        self.user_ids = ','.join(str(user.id) for user in self.users)
+        self.checkpoint_file = os.path.join(tempfile.mkdtemp(), 'checkpoint.json')
+
+    def run_command(self, **options):
+        out = StringIO()
+        call_command(
+            'apply_templates_to_users',
+            user_ids=self.user_ids,
+            chunk_size=2,
+            checkpoint_file=self.checkpoint_file,
+            stdout=out,
+            no_color=True,
+            **options
+        )
+        return out.getvalue()
+
+    def test_applies_templates_and_clears_checkpoint(self):
+        output = self.run_command()
+
+        self.assertIn('进度: 2/5 (40.0%)', output)
+        self.assertIn('进度: 5/5 (100.0%)', output)
+        self.assertIn('✓ 完成 rollout4: 账户=2, 标签=1, 支出=1, 资产=0, 收入=0', output)
+        self.assertFalse(os.path.exists(self.checkpoint_file))
+
+        user = self.users[0]
+        self.assertEqual(
+            list(Account.objects.filter(owner=user).values_list('account', flat=True)),
+            ['Assets', 'Assets:Bank', 'Expenses', 'Expenses:Food', 'Expenses:Food:Dining']
+        )
+        expense = Expense.objects.get(owner=user)
+        self.assertEqual((expense.key, expense.expend.account), ('餐厅', 'Expenses:Food:Dining'))
+        self.assertEqual(list(expense.tags.values_list('name', flat=True)), ['Life'])
+
+    def test_failed_users_kept_for_resume(self):
+        failing_user = self.users[3]
+        apply_template = AccountTemplateManager.apply_template
+
+        def fail_for_one_user(template, user, *args):
+            if user.id == failing_user.id:
+                raise RuntimeError('模拟失败')
+            return apply_template(template, user, *args)
+
+        with patch.object(AccountTemplateManager, 'apply_template', side_effect=fail_for_one_user):
+            output = self.run_command()
+
+        self.assertIn(f'❌ 处理用户 {failing_user.username} 失败: 模拟失败', output)
+        with open(self.checkpoint_file, encoding='utf-8') as f:
+            completed = json.load(f)['completed']
+        self.assertEqual(completed, sorted(user.id for user in self.users if user != failing_user))
+
+        output = self.run_command()
+
+        self.assertIn('从检查点恢复：已完成 4 个用户，剩余 1 个', output)
+        self.assertIn(f'处理用户: {failing_user.username}', output)
+        self.assertNotIn('处理用户: rollout0', output)
+        self.assertEqual(Expense.objects.filter(owner__in=self.users).count(), 5)
+        self.assertFalse(os.path.exists(self.checkpoint_file))
+
+    def test_checkpoint_with_different_options_ignored(self):
+        self.run_command(skip_existing=True)
+        with open(self.checkpoint_file, 'w', encoding='utf-8') as f:
+            json.dump({'signature': {'templates': {}}, 'completed': [self.users[0].id]}, f)
+
+        output = self.run_command(skip_existing=True)
+
+        self.assertIn('检查点的模板或参数与本次运行不一致', output)
+        self.assertIn('⏭️  跳过用户 rollout0（已有数据（账户=5, 标签=1, 映射=1））', output)
+
+    def test_dry_run_does_not_touch_checkpoint(self):
+        Tag.objects.create(name='Life', owner=self.users[0])
+
+        output = self.run_command(dry_run=True)
+
+        self.assertNotIn('进度', output)
+        self.assertFalse(os.path.exists(self.checkpoint_file))
+        self.assertIn('✓ 完成 rollout0: 账户=2, 标签=0, 支出=2, 资产=0, 收入=0', output)
+        self.assertIn('✓ 完成 rollout1: 账户=2, 标签=1, 支出=2, 资产=0, 收入=0', output)
+        self.assertFalse(Account.objects.filter(owner__in=self.users).exists())
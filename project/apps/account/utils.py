@@ -1,8 +1,19 @@
 from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.apps import apps
 from typing import List, Dict, Optional, Tuple
-from project.apps.account.models import Account
+from project.apps.account.models import Account, get_account_type_display
+from project.apps.common.resource_cache import MAPPING_RESOURCES, bump_resource_version, cache_by_versions
+
+# 映射数量统计来源：{统计键: (映射模型名, 指向账户的外键字段)}
+MAPPING_COUNT_SOURCES = {
+    'expense': ('Expense', 'expend'),
+    'assets': ('Assets', 'assets'),
+    'income': ('Income', 'income'),
+}
+MAPPING_COUNT_ANNOTATIONS = {key: f'{key}_mapping_count' for key in MAPPING_COUNT_SOURCES}
 
 
 class AccountTreeManager:
@@ -13,6 +24,8 @@ class AccountTreeManager:
         """
         获取用户的账户树结构
 
+        一次查询取出全部账户及映射数量，在内存中按 parent_id 组装树。
+
         Args:
             user: 用户对象
             account_type: 账户类型过滤（可选）
@@ -25,31 +38,99 @@ class AccountTreeManager:
         if account_type:
             queryset = queryset.filter(account__startswith=account_type)
 
-        # 获取根账户
-        root_accounts = queryset.filter(parent__isnull=True).order_by('account')
+        rows = AccountTreeManager.annotate_tree_fields(queryset, owner_scoped=False).order_by('account').values(
+            'id', 'account', 'parent_id', 'children_exist', *MAPPING_COUNT_ANNOTATIONS.values()
+        )
+
+        nodes = {}
+        root_nodes = []
+        for row in rows:
+            node = {
+                'id': row['id'],
+                'account': row['account'],
+                'account_type': get_account_type_display(row['account']),
+                'has_children': row['children_exist'],
+                'mapping_count': AccountTreeManager._mapping_count_from(row.__getitem__),
+                'children': []
+            }
+            nodes[row['id']] = node
+            if row['parent_id'] is None:
+                root_nodes.append(node)
+
+        # 按账户路径排序遍历，父账户总在子账户之前出现
+        for row in rows:
+            parent = nodes.get(row['parent_id'])
+            if parent is not None:
+                parent['children'].append(nodes[row['id']])
 
-        def build_tree(accounts):
-            result = []
-            for account in accounts:
-                account_data = {
-                    'id': account.id,
-                    'account': account.account,
-                    'account_type': account.get_account_type(),
-                    'has_children': account.has_children(),
-                    'mapping_count': AccountTreeManager.get_mapping_count(account),
-                    'children': []
-                }
+        return root_nodes
 
-                # 递归获取子账户
-                children = queryset.filter(parent=account).order_by('account')
-                if children.exists():
-                    account_data['children'] = build_tree(children)
+    @staticmethod
+    def annotate_tree_fields(queryset, owner_scoped: bool = True):
+        """
+        为账户查询集附加子账户标记与各类映射数量
 
-                result.append(account_data)
+        使用按账户分组的子查询统计映射数量，查询次数不随账户数量增加。
 
-            return result
+        Args:
+            queryset: 账户查询集
+            owner_scoped: 是否只统计与账户属主相同的映射
+
+        Returns:
+            附加 children_exist 与 *_mapping_count 字段的查询集
+        """
+        annotations = {'children_exist': Exists(Account.objects.filter(parent=OuterRef('pk')))}
+        for key, (model_name, field) in MAPPING_COUNT_SOURCES.items():
+            mappings = apps.get_model('maps', model_name).objects.filter(**{field: OuterRef('pk')})
+            if owner_scoped:
+                mappings = mappings.filter(owner=OuterRef('owner'))
+            counts = mappings.order_by().values(field).annotate(count=Count('pk')).values('count')
+            annotations[MAPPING_COUNT_ANNOTATIONS[key]] = Coalesce(Subquery(counts), 0)
+        return queryset.annotate(**annotations)
+
+    @staticmethod
+    def get_annotated_mapping_count(account: Account) -> Optional[Dict[str, int]]:
+        """
+        读取 annotate_tree_fields 附加的映射数量
+
+        Returns:
+            包含各类映射数量的字典，未附加时返回 None
+        """
+        if not hasattr(account, MAPPING_COUNT_ANNOTATIONS['expense']):
+            return None
+        return AccountTreeManager._mapping_count_from(lambda name: getattr(account, name))
+
+    @staticmethod
+    def _mapping_count_from(getter) -> Dict[str, int]:
+        counts = {key: getter(name) for key, name in MAPPING_COUNT_ANNOTATIONS.items()}
+        counts['total'] = sum(counts.values())
+        return counts
+
+    @staticmethod
+    def link_account_tree(accounts: List[Account]) -> List[Account]:
+        """
+        在内存中组装账户树（O(n)）
+
+        子账户按传入顺序写入 tree_children，并回填 parent 缓存，序列化时不再查询数据库。
+
+        Args:
+            accounts: 同一属主的账户列表（按账户路径排序）
 
-        return build_tree(root_accounts)
+        Returns:
+            根账户列表
+        """
+        by_id = {account.id: account for account in accounts}
+        roots = []
+        for account in accounts:
+            account.tree_children = []
+        for account in accounts:
+            parent = by_id.get(account.parent_id)
+            if parent is None:
+                roots.append(account)
+            else:
+                account.parent = parent
+                parent.tree_children.append(account)
+        return roots
 
     @staticmethod
     def get_mapping_count(account: Account) -> Dict[str, int]:
@@ -124,16 +205,7 @@ class AccountTreeManager:
         Returns:
             后代账户列表
         """
-        descendants = []
-
-        def collect_descendants(acc):
-            children = Account.objects.filter(parent=acc)
-            for child in children:
-                descendants.append(child)
-                collect_descendants(child)
-
-        collect_descendants(account)
-        return descendants
+        return list(account.get_descendants())
 
 
 class AccountMigrationManager:
@@ -206,6 +278,7 @@ class AccountMigrationManager:
             expense_count = Expense.objects.filter(expend=source_account).update(expend=target_account)
             assets_count = Assets.objects.filter(assets=source_account).update(assets=target_account)
             income_count = Income.objects.filter(income=source_account).update(income=target_account)
+            bump_resource_version(source_account.owner_id, *MAPPING_RESOURCES)
 
             return expense_count + assets_count + income_count
         except Exception as e:
@@ -320,53 +393,64 @@ class AccountValidator:
 class AccountStatistics:
     """账户统计工具"""
 
+    # 统计结果依赖的资源（任一资源版本号变化即重新计算）
+    CACHE_RESOURCES = ('account',) + MAPPING_RESOURCES
+
     @staticmethod
     def get_user_account_statistics(user: User) -> Dict:
         """
         获取用户的账户统计信息
 
+        按类型与启用状态的计数、有映射的账户数量均由一条条件聚合查询得出，
+        结果按账户与映射的版本号缓存。
+
         Args:
             user: 用户对象
 
         Returns:
             统计信息字典
         """
-        accounts = Account.objects.filter(owner=user)
+        return cache_by_versions(
+            'account_statistics', user.id, AccountStatistics.CACHE_RESOURCES,
+            lambda: AccountStatistics._compute_user_account_statistics(user)
+        )
+
+    @staticmethod
+    def _compute_user_account_statistics(user: User) -> Dict:
+        has_mapping = None
+        for model_name, field in MAPPING_COUNT_SOURCES.values():
+            exists = Exists(apps.get_model('maps', model_name).objects.filter(
+                owner=user, enable=True, **{field: OuterRef('pk')}
+            ))
+            has_mapping = exists if has_mapping is None else has_mapping | exists
+
+        aggregates = {
+            'total': Count('pk'),
+            'enabled': Count('pk', filter=Q(enable=True)),
+            'mapped': Count('pk', filter=has_mapping),
+        }
+        for account_type in AccountValidator.VALID_ROOT_ACCOUNTS:
+            type_filter = Q(account__startswith=account_type)
+            aggregates[f'{account_type}_total'] = Count('pk', filter=type_filter)
+            aggregates[f'{account_type}_enabled'] = Count('pk', filter=type_filter & Q(enable=True))
+        counts = Account.objects.filter(owner=user).aggregate(**aggregates)
 
         # 按类型统计
         type_stats = {}
         for account_type in AccountValidator.VALID_ROOT_ACCOUNTS:
-            type_accounts = accounts.filter(account__startswith=account_type)
+            total = counts[f'{account_type}_total']
+            enabled = counts[f'{account_type}_enabled']
             type_stats[account_type] = {
-                'total': type_accounts.count(),
-                'enabled': type_accounts.filter(enable=True).count(),
-                'disabled': type_accounts.filter(enable=False).count()
+                'total': total,
+                'enabled': enabled,
+                'disabled': total - enabled
             }
 
-        # 总体统计
-        total_accounts = accounts.count()
-        enabled_accounts = accounts.filter(enable=True).count()
-        disabled_accounts = total_accounts - enabled_accounts
-
-        # 有映射的账户数量
-        try:
-            Expense = apps.get_model('maps', 'Expense')
-            Assets = apps.get_model('maps', 'Assets')
-            Income = apps.get_model('maps', 'Income')
-
-            expense_accounts = set(Expense.objects.filter(owner=user, enable=True).values_list('expend_id', flat=True))
-            assets_accounts = set(Assets.objects.filter(owner=user, enable=True).values_list('assets_id', flat=True))
-            income_accounts = set(Income.objects.filter(owner=user, enable=True).values_list('income_id', flat=True))
-
-            mapped_accounts = len(expense_accounts | assets_accounts | income_accounts)
-        except:
-            mapped_accounts = 0
-
         return {
-            'total_accounts': total_accounts,
-            'enabled_accounts': enabled_accounts,
-            'disabled_accounts': disabled_accounts,
-            'mapped_accounts': mapped_accounts,
+            'total_accounts': counts['total'],
+            'enabled_accounts': counts['enabled'],
+            'disabled_accounts': counts['total'] - counts['enabled'],
+            'mapped_accounts': counts['mapped'],
             'type_statistics': type_stats
         }
 
@@ -375,25 +459,153 @@ class AccountStatistics:
         """
         获取账户使用统计
 
+        映射数量、子账户数量与后代账户数量（按路径前缀统计）由一条查询得出，
+        结果按账户与映射的版本号缓存。
+
         Args:
             account: 账户对象
 
         Returns:
             使用统计字典
         """
-        mapping_count = AccountTreeManager.get_mapping_count(account)
-
-        # 获取子账户数量
-        children_count = account.children.count()
+        return cache_by_versions(
+            f'account_usage_{account.id}', account.owner_id, AccountStatistics.CACHE_RESOURCES,
+            lambda: AccountStatistics._compute_account_usage_statistics(account)
+        )
 
-        # 获取后代账户数量
-        descendants = AccountTreeManager.get_account_descendants(account)
-        descendants_count = len(descendants)
+    @staticmethod
+    def _compute_account_usage_statistics(account: Account) -> Dict:
+        def count_of(queryset):
+            return Coalesce(Subquery(
+                queryset.order_by().values('owner').annotate(count=Count('pk')).values('count')
+            ), 0)
+
+        row = AccountTreeManager.annotate_tree_fields(
+            Account.objects.filter(pk=account.pk), owner_scoped=False
+        ).annotate(
+            children_count=count_of(Account.objects.filter(parent=OuterRef('pk'))),
+            descendants_count=count_of(Account.objects.filter(
+                Account.subtree_filter(account.owner_id, account.account)
+            )),
+        ).values('children_count', 'descendants_count', *MAPPING_COUNT_ANNOTATIONS.values()).get()
 
         return {
-            'mapping_count': mapping_count,
-            'children_count': children_count,
-            'descendants_count': descendants_count,
-            'is_leaf': children_count == 0,
-            'is_root': account.parent is None
+            'mapping_count': AccountTreeManager._mapping_count_from(row.__getitem__),
+            'children_count': row['children_count'],
+            'descendants_count': row['descendants_count'],
+            'is_leaf': row['children_count'] == 0,
+            'is_root': account.parent_id is None
         }
+
+
+class AccountTemplateManager:
+    """账户模板管理器"""
+
+    @staticmethod
+    def apply_template(
+        template,
+        user: User,
+        action_type: str,
+        conflict_resolution: str = 'skip'
+    ) -> Dict:
+        """
+        批量应用账户模板到用户
+
+        预先加载用户全部账户路径，在内存中计算需要创建的账户（含缺失的父账户）后按层级批量写入，
+        语义与逐个 Account.objects.create() 一致：
+        - overwrite：删除用户全部账户后创建所有模板账户
+        - merge：路径已存在时按 conflict_resolution 跳过（skip）或删除后重建（overwrite）
+        - 模板项按模板中的顺序处理，缺失的父账户自动创建且默认启用；
+          子账户先于父账户出现时，之后的父账户模板项视为已存在（merge 下按 conflict_resolution 处理，
+          overwrite 下以模板项为准）
+        - 启用且配置了对账周期的新账户创建首个对账待办
+
+        Args:
+            template: 账户模板
+            user: 目标用户
+            action_type: merge 或 overwrite
+            conflict_resolution: skip 或 overwrite（仅 merge 模式有效）
+
+        Returns:
+            包含 created、skipped、overwritten 的结果字典
+        """
+        result = {
+            'created': 0,
+            'skipped': 0,
+            'overwritten': 0
+        }
+
+        with transaction.atomic():
+            accounts = Account.objects.filter(owner=user)
+            if action_type == 'overwrite':
+                # 删除用户现有的所有账户
+                accounts.delete()
+                existing_ids = {}
+            else:
+                existing_ids = dict(accounts.values_list('account', 'id'))
+
+            # 待创建账户：路径 -> 未保存的 Account
+            pending = {}
+            # 为子账户自动创建的父账户路径（尚未被模板项覆盖）
+            auto_created = set()
+            to_delete = []
+
+            def ensure_parents(account_path):
+                parent_path = account_path.rpartition(':')[0]
+                while parent_path and parent_path not in existing_ids and parent_path not in pending:
+                    pending[parent_path] = Account(owner=user, account=parent_path, enable=True)
+                    auto_created.add(parent_path)
+                    parent_path = parent_path.rpartition(':')[0]
+
+            for item in template.items.all():
+                account_path = item.account_path
+                if account_path in existing_ids:
+                    if conflict_resolution == 'skip':
+                        result['skipped'] += 1
+                        continue
+                    elif conflict_resolution == 'overwrite':
+                        to_delete.append(existing_ids.pop(account_path))
+                        result['overwritten'] += 1
+                elif account_path in auto_created:
+                    # 前面的模板项已自动创建该父账户，与逐个创建时一样视为已存在
+                    auto_created.discard(account_path)
+                    if action_type != 'overwrite':
+                        if conflict_resolution == 'skip':
+                            result['skipped'] += 1
+                            continue
+                        elif conflict_resolution == 'overwrite':
+                            result['overwritten'] += 1
+
+                pending[account_path] = Account(
+                    owner=user,
+                    account=account_path,
+                    enable=item.enable,
+                    reconciliation_cycle_unit=item.reconciliation_cycle_unit,
+                    reconciliation_cycle_interval=item.reconciliation_cycle_interval,
+                    description=item.description or ''
+                )
+                ensure_parents(account_path)
+                result['created'] += 1
+
+            if to_delete:
+                Account.objects.filter(id__in=to_delete).delete()
+
+            # 按层级写入，保证父账户先获得主键
+            levels = {}
+            for account_path, account in pending.items():
+                levels.setdefault(account_path.count(':'), []).append(account)
+            for depth in sorted(levels):
+                for account in levels[depth]:
+                    parent_path = account.account.rpartition(':')[0]
+                    if parent_path:
+                        account.parent_id = existing_ids.get(parent_path) or pending[parent_path].id
+                Account.objects.bulk_create(levels[depth])
+
+            Account.create_reconciliation_tasks([
+                account.id for account in pending.values() if account.enable
+            ])
+
+            # bulk_create 不触发 post_save，需显式使账户列表缓存失效
+            bump_resource_version(user.id, 'account')
+
+        return result
@@ -5,6 +5,7 @@ from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.db import transaction
+from django.db.models import Exists, OuterRef
 from django.contrib.auth import get_user_model
 # from django.shortcuts import get_object_or_404
 from django.apps import apps
@@ -17,12 +18,14 @@ from project.apps.account.serializers import (
     AccountTemplateDetailSerializer, AccountTemplateApplySerializer
 )
 from project.apps.account.filters import AccountTypeFilter
+from project.apps.account.utils import AccountStatistics, AccountTemplateManager, AccountTreeManager
 from django_filters.rest_framework import DjangoFilterBackend
 from project.apps.common.permissions import IsOwnerOrAdminReadWriteOnly, AnonymousReadOnlyPermission, TemplatePermission
 from project.apps.common.filters import CurrentUserFilterBackend, AnonymousUserFilterBackend
+from project.apps.common.views import VersionedListMixin
 
 
-class AccountViewSet(ModelViewSet):
+class AccountViewSet(VersionedListMixin, ModelViewSet):
     """
     账户管理视图集
 
@@ -43,6 +46,8 @@ class AccountViewSet(ModelViewSet):
     search_fields = ['account']
     ordering_fields = ['account', 'created', 'modified']
     ordering = ['account']
+    cursor_ordering = 'account'
+    cache_resources = ('account', 'expense', 'assets', 'income')
 
     def get_serializer_class(self):
         """根据操作类型返回不同的序列化器"""
@@ -80,7 +85,10 @@ class AccountViewSet(ModelViewSet):
         if enable is not None:
             queryset = queryset.filter(enable=enable.lower() == 'true')
 
-        return queryset.select_related('parent', 'owner')
+        queryset = queryset.select_related('parent', 'owner')
+        if self.action in ('list', 'retrieve'):
+            queryset = AccountTreeManager.annotate_tree_fields(queryset)
+        return queryset
 
     def perform_create(self, serializer):
         """创建账户时设置属主"""
@@ -134,11 +142,42 @@ class AccountViewSet(ModelViewSet):
         """获取账户树形结构"""
         # 应用 filter_backends 确保只返回当前用户的数据
         queryset = self.filter_queryset(self.get_queryset())
-        root_accounts = queryset.filter(parent__isnull=True)
+
+        # 一次查询取出属主的全部账户（含映射数量），并标记过滤后的根账户，在内存中组装树
+        accounts = AccountTreeManager.annotate_tree_fields(
+            Account.objects.filter(owner__in=queryset.values('owner'))
+        ).annotate(
+            is_tree_root=Exists(queryset.filter(parent__isnull=True, pk=OuterRef('pk')))
+        ).order_by('account')
+        root_accounts = [
+            account for account in AccountTreeManager.link_account_tree(list(accounts))
+            if account.is_tree_root
+        ]
 
         serializer = self.get_serializer(root_accounts, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def statistics(self, request):
+        """获取账户统计（按类型与启用状态计数、有映射的账户数量）"""
+        if request.user.is_authenticated:
+            user = request.user
+        else:
+            # 匿名用户使用id=1用户的数据
+            user = get_user_model().objects.filter(id=1).first()
+            if user is None:
+                return Response(
+                    {'error': '默认用户（ID=1）不存在'},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+        return Response(AccountStatistics.get_user_account_statistics(user))
+
+    @action(detail=True, methods=['get'])
+    def usage(self, request, pk=None):
+        """获取账户使用统计（映射数量、子账户与后代账户数量）"""
+        account = self.get_object()
+        return Response(AccountStatistics.get_account_usage_statistics(account))
+
     @action(detail=True, methods=['get'])
     def mappings(self, request, pk=None):
         """获取账户相关的映射"""
@@ -268,16 +307,8 @@ class AccountViewSet(ModelViewSet):
         """获取可用的迁移目标账户列表"""
         account = self.get_object()
 
-        # 获取当前账户及其所有子账户的ID，用于排除
-        def get_descendant_ids(acc):
-            """递归获取账户的所有后代账户ID"""
-            descendant_ids = [acc.id]
-            for child in acc.children.all():
-                descendant_ids.extend(get_descendant_ids(child))
-            return descendant_ids
-
-        # 排除当前账户及其所有子账户
-        excluded_ids = get_descendant_ids(account)
+        # 排除当前账户及其所有子账户（按路径前缀一次查询）
+        excluded_ids = [account.id, *account.get_descendants().values_list('id', flat=True)]
 
         # 获取启用的账户作为迁移候选，排除当前账户及其子账户
         User = get_user_model()
@@ -293,12 +324,12 @@ class AccountViewSet(ModelViewSet):
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
                 )
 
-        candidates = Account.objects.filter(
+        candidates = AccountTreeManager.annotate_tree_fields(Account.objects.filter(
             owner=user,
             enable=True
         ).exclude(
             id__in=excluded_ids
-        ).order_by('account')
+        ).select_related('parent')).order_by('account')
 
         serializer = AccountSerializer(candidates, many=True, context={'request': request})
         return Response({
@@ -379,48 +410,4 @@ class AccountTemplateViewSet(ModelViewSet):
 
     def _apply_account_template(self, template, user, action_type, conflict_resolution):
         """应用账户模板到用户"""
-        result = {
-            'created': 0,
-            'skipped': 0,
-            'overwritten': 0
-        }
-
-        if action_type == 'overwrite':
-            # 删除用户现有的所有账户
-            Account.objects.filter(owner=user).delete()
-            # 直接创建所有模板账户，无需检查冲突
-            for item in template.items.all():
-                Account.objects.create(
-                    owner=user,
-                    account=item.account_path,
-                    enable=item.enable,
-                    reconciliation_cycle_unit=item.reconciliation_cycle_unit,
-                    reconciliation_cycle_interval=item.reconciliation_cycle_interval,
-                    description=item.description or ''
-                )
-                result['created'] += 1
-        else:  # merge 模式
-            for item in template.items.all():
-                # 检查是否已存在相同路径的账户
-                existing = Account.objects.filter(owner=user, account=item.account_path).first()
-
-                if existing:
-                    if conflict_resolution == 'skip':
-                        result['skipped'] += 1
-                        continue
-                    elif conflict_resolution == 'overwrite':
-                        existing.delete()
-                        result['overwritten'] += 1
-
-                # 创建新账户（Account.save() 会自动创建父账户）
-                Account.objects.create(
-                    owner=user,
-                    account=item.account_path,
-                    enable=item.enable,
-                    reconciliation_cycle_unit=item.reconciliation_cycle_unit,
-                    reconciliation_cycle_interval=item.reconciliation_cycle_interval,
-                    description=item.description or ''
-                )
-                result['created'] += 1
-
-        return result
+        return AccountTemplateManager.apply_template(template, user, action_type, conflict_resolution)
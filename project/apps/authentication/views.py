@@ -880,24 +880,12 @@ class UserProfileViewSet(viewsets.GenericViewSet):
                 from project.utils.storage_factory import get_storage_client
                 storage_client = get_storage_client()
                 
-                # 获取用户的所有文件
-                user_files = File.objects.filter(owner=user)
-                deleted_storage_files = 0
-                
-                for file_obj in user_files:
-                    storage_name = file_obj.storage_name
-                    # 检查是否有其他文件引用相同的存储文件
-                    other_references = File.objects.filter(
-                        storage_name=storage_name
-                    ).exclude(id=file_obj.id).exists()
-                    
-                    if not other_references:
-                        try:
-                            if storage_client.delete_file(storage_name):
-                                deleted_storage_files += 1
-                        except Exception as e:
-                            logger.warning(f"删除存储文件失败 {storage_name}: {str(e)}")
-                
+                # 批量删除用户所有文件中不再被其他用户引用的存储文件
+                from project.apps.file_manager.utils import delete_unreferenced_storage_files
+                deleted_storage_files = delete_unreferenced_storage_files(
+                    storage_client, File.objects.filter(owner=user)
+                )
+
                 logger.info(f"已删除 {deleted_storage_files} 个存储文件")
             except Exception as e:
                 logger.warning(f"删除 OSS/MinIO 文件时出错: {str(e)}")
@@ -0,0 +1,93 @@
+"""
+资源版本号与列表响应缓存
+
+每个用户的每类资源（映射、账户、标签）维护一个版本号，写入时递增。
+列表接口以依赖资源的版本号计算 ETag，数据未变化时只需一次缓存读取。
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+# 资源版本号缓存键（跨进程共享，写入时递增）
+RESOURCE_VERSION_KEY = 'resource_version:{resource}:{owner_id}'
+# 列表序列化结果缓存键（ETag 已包含版本号，版本变化后旧结果自然失效）
+RESOURCE_RESPONSE_KEY = 'resource_response:{etag}'
+RESOURCE_RESPONSE_TIMEOUT = 24 * 3600
+# 按版本号缓存的计算结果（统计等），键中包含依赖资源的版本号
+RESOURCE_RESULT_KEY = 'resource_result:{name}:{owner_id}:{versions}'
+
+MAPPING_RESOURCES = ('expense', 'assets', 'income')
+
+
+def get_resource_versions(owner_id, resources) -> dict:
+    """
+    批量获取用户资源版本号（一次缓存读取）；缺失时以当前时间初始化，保证不会复用旧缓存
+
+    Args:
+        owner_id: 用户ID
+        resources: 资源名称序列，如 ('expense', 'account')
+
+    Returns:
+        dict: {资源名称: 版本号}
+    """
+    keys = {RESOURCE_VERSION_KEY.format(resource=resource, owner_id=owner_id): resource for resource in resources}
+    versions = cache.get_many(list(keys))
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, time.time_ns(), timeout=None)
+        versions.update(cache.get_many(missing))
+    return {resource: versions.get(key) for key, resource in keys.items()}
+
+
+def get_resource_version(resource, owner_id):
+    """获取单个资源的版本号"""
+    return get_resource_versions(owner_id, [resource])[resource]
+
+
+def bump_resource_version(owner_id, *resources):
+    """
+    使用户资源缓存失效（立即递增，并在事务提交后再次递增以覆盖并发读到的未提交快照）
+
+    Args:
+        owner_id: 用户ID
+        *resources: 资源名称
+    """
+    def bump():
+        for resource in resources:
+            key = RESOURCE_VERSION_KEY.format(resource=resource, owner_id=owner_id)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, time.time_ns(), timeout=None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def cache_by_versions(name, owner_id, resources, compute, timeout=RESOURCE_RESPONSE_TIMEOUT):
+    """
+    按资源版本号缓存计算结果，依赖资源未变化时直接返回缓存
+
+    Args:
+        name: 结果名称（需包含区分参数，如账户ID）
+        owner_id: 用户ID
+        resources: 结果依赖的资源名称序列
+        compute: 缓存未命中时调用的无参函数
+        timeout: 缓存时间（秒）
+
+    Returns:
+        compute 的返回值
+    """
+    versions = get_resource_versions(owner_id, resources)
+    key = RESOURCE_RESULT_KEY.format(
+        name=name,
+        owner_id=owner_id,
+        versions='-'.join(str(versions[resource]) for resource in resources),
+    )
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, timeout)
+    return result
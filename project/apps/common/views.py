@@ -1,12 +1,67 @@
+import hashlib
+
+from django.core.cache import cache
+from django.utils.http import parse_etags
+from rest_framework import status
 from rest_framework.exceptions import ValidationError, PermissionDenied
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from project.apps.common.permissions import IsOwnerOrAdminReadWriteOnly, AnonymousReadOnlyPermission
 from project.apps.common.filters import CurrentUserFilterBackend, AnonymousUserFilterBackend
+from project.apps.common.pagination import OptInCursorPagination
+from project.apps.common.resource_cache import (
+    RESOURCE_RESPONSE_KEY, RESOURCE_RESPONSE_TIMEOUT, get_resource_versions
+)
+
+
+class VersionedListMixin:
+    """
+    列表接口条件缓存
+
+    ETag 由当前用户各依赖资源的版本号与请求地址计算：
+    - 请求头 If-None-Match 与 ETag 一致时直接返回 304
+    - 否则优先返回服务端缓存的序列化结果，未命中时查询并写入缓存
+
+    子类通过 cache_resources 声明列表内容依赖的资源（见 resource_cache 模块）。
+    未登录用户不走缓存。
+    """
+    cache_resources = ()
+    pagination_class = OptInCursorPagination
+
+    def list(self, request, *args, **kwargs):
+        if not self.cache_resources or not request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+
+        versions = get_resource_versions(request.user.id, self.cache_resources)
+        etag = self.get_list_etag(request, versions)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cache_key = RESOURCE_RESPONSE_KEY.format(etag=etag.strip('"'))
+            data = cache.get(cache_key)
+            if data is None:
+                response = super().list(request, *args, **kwargs)
+                cache.set(cache_key, response.data, RESOURCE_RESPONSE_TIMEOUT)
+            else:
+                response = Response(data)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def get_list_etag(self, request, versions) -> str:
+        """根据视图、用户、资源版本号、响应格式与完整请求地址计算 ETag"""
+        raw = '|'.join([
+            type(self).__name__,
+            str(request.user.id),
+            request.accepted_renderer.format,
+            ','.join(f'{resource}={versions[resource]}' for resource in sorted(versions)),
+            request.build_absolute_uri(),
+        ])
+        return '"%s"' % hashlib.md5(raw.encode()).hexdigest()
 
 
-class BaseMappingViewSet(ModelViewSet):
+class BaseMappingViewSet(VersionedListMixin, ModelViewSet):
     """
     映射视图集基类，提供通用的映射管理功能
     支持匿名用户访问id=1用户的数据（只读）
@@ -0,0 +1,101 @@
+# Beancount-Trans-Backend/project/apps/fava_instances/services/ledger_scope.py
+"""
+账本路径范围检查
+
+共享 Fava 工作进程可以访问整个账本根目录，用户账本中任何指向其他目录的路径都会越权：
+- include "../其他用户/main.bean" 读取其他用户的账本
+- document 指令与 option "documents" 让 Fava 提供其他目录下的文件
+- Fava 的 import-dirs 选项让导入功能读取、移动其他目录下的文件
+
+加载账本前按 beancount 的 include 语义（相对包含文件所在目录、支持通配符、递归解析）找出全部账本文件，
+并检查其中的上述路径；相对路径同时按所在文件目录与入口文件目录解析，任一解析结果在用户目录之外即视为越权。
+Fava 的 import-config 选项会执行其指向的 Python 文件，共享工作进程中一律拒绝。
+"""
+import glob
+import os
+import re
+
+_STRING = r'"((?:[^"\\\n]|\\.)*)"'
+_DATE = r'\d{4}[-/]\d{1,2}[-/]\d{1,2}'
+
+# 行首的 include 指令（注释行以 ; 开头，不会匹配）
+INCLUDE_PATTERN = re.compile(rf'^[ \t]*include[ \t]+{_STRING}', re.MULTILINE)
+DOCUMENTS_OPTION_PATTERN = re.compile(rf'^[ \t]*option[ \t]+"documents"[ \t]+{_STRING}', re.MULTILINE)
+DOCUMENT_PATTERN = re.compile(rf'^{_DATE}[ \t]+document[ \t]+[^\s"]+[ \t]+{_STRING}', re.MULTILINE)
+FAVA_OPTION_PATTERN = re.compile(
+    rf'^{_DATE}[ \t]+custom[ \t]+"fava-option"[ \t]+{_STRING}(?:[ \t]+{_STRING})?', re.MULTILINE
+)
+
+# 值为路径的 Fava 选项
+FAVA_PATH_OPTIONS = ('import-dirs',)
+# 共享工作进程中禁止的 Fava 选项（会执行账本目录中的代码）
+FAVA_FORBIDDEN_OPTIONS = ('import-config',)
+
+
+def _is_within(path, root):
+    return os.path.commonpath([path, root]) == root
+
+
+def _escaping_paths(path, base_dirs, root):
+    """按各基准目录解析路径（含符号链接），返回落在 root 之外的结果"""
+    escaping = []
+    for base_dir in sorted(base_dirs):
+        target = os.path.normpath(os.path.join(base_dir, path))
+        for resolved in (target, os.path.realpath(target)):
+            if not _is_within(resolved, root) and resolved not in escaping:
+                escaping.append(resolved)
+    return escaping
+
+
+def scan_ledger_paths(ledger_file, root_dir):
+    """
+    递归解析账本的 include，并检查各账本文件中的文档与导入路径
+
+    Args:
+        ledger_file: 账本入口文件路径
+        root_dir: 允许访问的目录（用户账本目录）
+
+    Returns:
+        tuple: (目录内已解析的账本文件列表, 越权的路径或选项列表)
+    """
+    root = os.path.realpath(root_dir)
+    main_dir = os.path.dirname(os.path.realpath(ledger_file))
+    files = []
+    outside = []
+    pending = [os.path.realpath(ledger_file)]
+    seen = set()
+    while pending:
+        path = pending.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        if not _is_within(path, root):
+            # 通配符匹配到的符号链接等指向目录之外
+            outside.append(path)
+            continue
+        try:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                content = f.read()
+        except OSError:
+            # 文件不存在时由 beancount 报错，不涉及越权
+            continue
+        files.append(path)
+
+        base_dir = os.path.dirname(path)
+        for include in INCLUDE_PATTERN.findall(content):
+            # 未匹配到文件的通配符同样按字面路径检查，避免之后创建的文件被包含
+            target = os.path.normpath(os.path.join(base_dir, include))
+            if not _is_within(target, root):
+                outside.append(target)
+                continue
+            pending.extend(os.path.realpath(match) for match in glob.glob(target))
+
+        base_dirs = {base_dir, main_dir}
+        for document_path in DOCUMENTS_OPTION_PATTERN.findall(content) + DOCUMENT_PATTERN.findall(content):
+            outside.extend(_escaping_paths(document_path, base_dirs, root))
+        for option, value in FAVA_OPTION_PATTERN.findall(content):
+            if option in FAVA_FORBIDDEN_OPTIONS:
+                outside.append(f'fava-option {option}')
+            elif option in FAVA_PATH_OPTIONS and value:
+                outside.extend(_escaping_paths(value, base_dirs, root))
+    return files, outside
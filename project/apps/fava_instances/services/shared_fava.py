@@ -0,0 +1,167 @@
+# Beancount-Trans-Backend/project/apps/fava_instances/services/shared_fava.py
+"""
+共享 Fava 工作进程（FAVA_DEPLOY_MODE=shared）
+
+一个 WSGI 进程为多个用户提供 Fava：
+- 按路径首段（FavaInstance.uuid）路由到对应用户的 main.bean
+- 每个账本对应一个 Fava 应用，按最近使用淘汰（每进程最多 FAVA_SHARED_MAX_LEDGERS 个），限制常驻内存的账本数量
+- 只有经 JWT 认证的 /api/fava/ 签发且处于 running 状态的 uuid 可以访问，实例停止或过期后立即不可访问
+- 工作进程可以读取整个账本目录：账本的 include、document 指令、documents 选项或 Fava 导入目录
+  指向用户目录之外时拒绝加载（404，见 ledger_scope），已加载的账本文件被修改（如通过 Fava 编辑器）后重新检查
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def create_fava_app(ledger_file):
+    """为单个账本创建 Fava WSGI 应用（fava 仅需安装在共享工作进程的环境中）"""
+    from fava.application import create_app
+
+    return create_app([ledger_file])
+
+
+def resolve_ledger_file(instance_uuid):
+    """
+    根据实例 uuid 解析账本入口文件
+
+    Args:
+        instance_uuid: FavaInstance.uuid 字符串
+
+    Returns:
+        str | None: 用户 main.bean 的路径；uuid 无效或实例未运行时返回 None
+    """
+    from django.core.exceptions import ValidationError
+    from project.apps.fava_instances.models import FavaInstance
+    from project.utils.file import BeanFileManager
+
+    try:
+        instance = FavaInstance.objects.select_related('owner').filter(
+            uuid=instance_uuid,
+            status='running'
+        ).first()
+    except ValidationError:
+        return None
+    if instance is None:
+        return None
+    return os.path.join(BeanFileManager.get_user_assets_path(instance.owner), 'main.bean')
+
+
+def _stat_files(files):
+    """账本文件的修改时间快照，用于判断是否需要重新检查账本路径"""
+    mtimes = {}
+    for path in files:
+        try:
+            mtimes[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            mtimes[path] = None
+    return mtimes
+
+
+def check_ledger_scope(ledger_file):
+    """
+    检查账本只引用用户目录内的文件（include、文档与导入路径）
+
+    Args:
+        ledger_file: 用户 main.bean 路径（所在目录即用户目录）
+
+    Returns:
+        dict | None: 账本文件的修改时间快照；存在越权路径时返回 None
+    """
+    from project.apps.fava_instances.services.ledger_scope import scan_ledger_paths
+
+    files, outside = scan_ledger_paths(ledger_file, os.path.dirname(ledger_file))
+    if outside:
+        logger.warning(f"共享 Fava 拒绝加载账本 {ledger_file}：引用了用户目录之外的路径 {outside}")
+        return None
+    return _stat_files(files)
+
+
+class SharedFavaApplication:
+    """
+    按 uuid 分发请求的 WSGI 应用
+
+    Args:
+        app_factory: 根据账本文件路径创建 WSGI 应用，默认 create_fava_app
+        max_ledgers: 最多同时加载的账本数量，默认 FAVA_SHARED_MAX_LEDGERS
+    """
+
+    def __init__(self, app_factory=None, max_ledgers=None):
+        self.app_factory = app_factory or create_fava_app
+        self.max_ledgers = max_ledgers or settings.FAVA_SHARED_MAX_LEDGERS
+        # uuid -> (账本文件路径, WSGI 应用, 账本文件修改时间快照)
+        self._apps = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, instance_uuid):
+        with self._lock:
+            self._apps.pop(instance_uuid, None)
+
+    def _get_app(self, instance_uuid):
+        ledger_file = resolve_ledger_file(instance_uuid)
+        if ledger_file is None:
+            # 实例已停止：释放已加载的账本
+            self._evict(instance_uuid)
+            return None
+
+        with self._lock:
+            cached = self._apps.get(instance_uuid)
+            if cached is not None and cached[0] != ledger_file:
+                cached = None
+            if cached is not None:
+                self._apps.move_to_end(instance_uuid)
+
+        if cached is not None:
+            _, app, mtimes = cached
+            if _stat_files(mtimes) == mtimes:
+                return app
+            # 账本文件已修改，Fava 重新加载前再次检查账本路径
+            mtimes = check_ledger_scope(ledger_file)
+            if mtimes is None:
+                self._evict(instance_uuid)
+                return None
+            with self._lock:
+                if instance_uuid in self._apps:
+                    self._apps[instance_uuid] = (ledger_file, app, mtimes)
+            return app
+
+        # 先检查账本路径，越权的账本不加载、不缓存
+        mtimes = check_ledger_scope(ledger_file)
+        if mtimes is None:
+            return None
+
+        # 加载账本耗时较长，不持有锁，避免阻塞其他用户的请求
+        app = self.app_factory(ledger_file)
+
+        with self._lock:
+            cached = self._apps.get(instance_uuid)
+            if cached is not None and cached[0] == ledger_file:
+                # 并发请求已加载同一账本
+                app = cached[1]
+            else:
+                self._apps[instance_uuid] = (ledger_file, app, mtimes)
+            self._apps.move_to_end(instance_uuid)
+            while len(self._apps) > self.max_ledgers:
+                evicted, _ = self._apps.popitem(last=False)
+                logger.info(f"共享 Fava 淘汰账本 {evicted}")
+        return app
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        instance_uuid, _, rest = path.lstrip('/').partition('/')
+
+        app = self._get_app(instance_uuid) if instance_uuid else None
+        if app is None:
+            start_response('404 Not Found', [('Content-Type', 'text/plain; charset=utf-8')])
+            return [b'Not Found']
+
+        # 以 /{uuid} 作为应用挂载点，Fava 生成的链接自动带上该前缀
+        environ = dict(environ)
+        environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + f'/{instance_uuid}'
+        environ['PATH_INFO'] = f'/{rest}'
+        return app(environ, start_response)
@@ -1,10 +1,20 @@
 # Beancount-Trans-Backend/project/apps/fava_instances/tasks.py
+import datetime
+import logging
+import os
+
 from celery import shared_task
 from django.utils import timezone
 from project.apps.fava_instances.models import FavaInstance
 from project.apps.fava_instances.services.fava_manager import FavaContainerManager
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
+# starting 状态超过该时长视为启动任务已丢失，可重新启动
+FAVA_START_TIMEOUT = datetime.timedelta(seconds=120)
+
+
 @shared_task(name="fava_instances.tasks.cleanup_fava_containers")
 def cleanup_fava_containers():
     expiry = timezone.now() - settings.FAVA_CONTAINER_LIFETIME
@@ -13,6 +23,11 @@ def cleanup_fava_containers():
         status__in=['running', 'starting']
     )
 
+    if settings.FAVA_DEPLOY_MODE == 'shared':
+        # 共享模式没有专属容器，过期实例的 uuid 不再可访问，共享工作进程随之释放账本
+        instances.update(status='stopped')
+        return
+
     manager = FavaContainerManager()
     for instance in instances:
         instance.status = 'stopping'
@@ -26,3 +41,52 @@ def cleanup_fava_containers():
             instance.status = 'error'
 
         instance.save()
+
+
+@shared_task(name="fava_instances.tasks.start_fava_instance")
+def start_fava_instance(instance_id):
+    """
+    为 starting 状态的实例启动专属 Fava 容器（路由到 fava 队列，见 CELERY_TASK_ROUTES）
+
+    Args:
+        instance_id: FavaInstance ID
+
+    Returns:
+        str: 实例最终状态
+    """
+    try:
+        instance = FavaInstance.objects.select_related('owner').get(id=instance_id, status='starting')
+    except FavaInstance.DoesNotExist:
+        # 实例已被停止或清理
+        return 'skipped'
+
+    user = instance.owner
+
+    # 准备bean文件路径
+    from project.utils.file import BeanFileManager
+    user_assets_path = BeanFileManager.get_user_assets_path(user)
+    bean_file = os.path.join(settings.ASSETS_HOST_PATH, os.path.basename(user_assets_path))
+
+    manager = FavaContainerManager()
+    try:
+        container_id, container_name = manager.start_container(user, bean_file, instance)
+    except Exception as e:
+        logger.error(f"用户 {user.username} 的实例 {instance.uuid} 容器启动失败: {str(e)}")
+        instance.container_id = ''
+        instance.container_name = ''
+        instance.status = 'error'
+        instance.save()
+        return instance.status
+
+    updated = FavaInstance.objects.filter(id=instance.id, status='starting').update(
+        container_id=container_id,
+        container_name=container_name,
+        status='running',
+        last_accessed=timezone.now(),
+    )
+    if not updated:
+        # 启动期间实例已被停止（如用户退出登录），不保留新容器
+        manager.stop_container(container_id)
+        return 'stopped'
+    logger.info(f"用户 {user.username} 的实例 {instance.uuid} 容器启动成功")
+    return 'running'
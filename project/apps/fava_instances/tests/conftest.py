@@ -4,10 +4,11 @@ Fava 实例测试 fixtures
 提供可复用的测试数据和工具函数。
 注意：pytest 会自动继承根目录的 conftest.py 中的 fixtures（如清理功能）。
 """
+import uuid
+
 import pytest
 from unittest.mock import Mock, MagicMock
 from django.contrib.auth import get_user_model
-from project.apps.fava_instances.models import FavaInstance
 
 User = get_user_model()
 
@@ -51,3 +52,63 @@ def mock_container():
     container.remove = MagicMock()
     return container
 
+
+
+class FakeContainer:
+    """内存中的 Docker 容器"""
+
+    def __init__(self, client, name):
+        self.client = client
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.status = 'running'
+
+    def reload(self):
+        pass
+
+    def stop(self, timeout=None):
+        self.status = 'exited'
+
+    def remove(self):
+        self.client.containers.removed.append(self.id)
+        self.client.running.pop(self.id, None)
+
+
+class FakeContainers:
+    def __init__(self, client):
+        self.client = client
+        self.removed = []
+
+    def run(self, image, name, **kwargs):
+        container = FakeContainer(self.client, name)
+        self.client.created.append((container, kwargs))
+        self.client.running[container.id] = container
+        return container
+
+    def get(self, container_id):
+        import docker.errors
+        try:
+            return self.client.running[container_id]
+        except KeyError:
+            raise docker.errors.NotFound(f'No such container: {container_id}')
+
+
+class FakeDockerClient:
+    """docker.from_env() 的替身：run/get 操作内存中的容器"""
+
+    def __init__(self):
+        self.created = []
+        self.running = {}
+        self.containers = FakeContainers(self)
+
+
+@pytest.fixture
+def fake_docker():
+    """以 FakeDockerClient 替换 Docker 客户端，容器立即就绪"""
+    from unittest.mock import patch
+    client = FakeDockerClient()
+    with patch('project.apps.fava_instances.services.fava_manager.docker.from_env', return_value=client), \
+         patch('project.apps.fava_instances.services.fava_manager.time.sleep'), \
+         patch('project.apps.fava_instances.services.fava_manager.FavaContainerManager._is_container_ready',
+               return_value=True):
+        yield client
@@ -0,0 +1,87 @@
+"""
+Fava 容器异步启动测试（使用 FakeDockerClient）
+"""
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from project.apps.fava_instances.models import FavaInstance
+from project.apps.fava_instances.tasks import cleanup_fava_containers, start_fava_instance
+
+
+def _client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    return client
+
+
+@pytest.mark.django_db
+def test_cold_start_runs_in_task_with_status_endpoint(fake_docker, user):
+    client = _client(user)
+
+    with patch('project.apps.fava_instances.views.start_fava_instance.delay') as delay:
+        response = client.get('/api/fava/')
+        assert response.status_code == 202
+        assert response.data['status'] == 'starting'
+        # 启动进行中再次访问不重复创建实例
+        assert client.get('/api/fava/').status_code == 202
+    instance = FavaInstance.objects.get(owner=user)
+    delay.assert_called_once_with(instance.id)
+    assert client.get(response.data['status_url']).data == {
+        'status': 'starting', 'instance': str(instance.uuid), 'url': None,
+    }
+
+    assert start_fava_instance(instance.id) == 'running'
+    status = client.get(response.data['status_url']).data
+    assert status['status'] == 'running'
+    assert status['url'] == f'/{instance.uuid}/'
+    run_kwargs = fake_docker.created[0][1]
+    assert run_kwargs['environment']['FAVA_PREFIX'] == f'/{instance.uuid}'
+    # 容器只挂载该用户自己的账本目录
+    assert list(run_kwargs['volumes']) == [f'{settings.ASSETS_HOST_PATH}/{user.username}']
+
+
+@pytest.mark.django_db
+def test_start_task_discards_container_when_instance_stopped(fake_docker, user):
+    instance = FavaInstance.objects.create(owner=user, status='starting')
+
+    def stopped_while_starting(*args):
+        # 启动期间用户退出登录
+        FavaInstance.objects.filter(id=instance.id).update(status='stopped')
+        return True
+
+    with patch('project.apps.fava_instances.services.fava_manager.FavaContainerManager._is_container_ready',
+               side_effect=stopped_while_starting):
+        assert start_fava_instance(instance.id) == 'stopped'
+
+    assert fake_docker.created[0][0].id in fake_docker.containers.removed
+
+
+@pytest.mark.django_db
+def test_cleanup_reclaims_expired_instances(fake_docker, user):
+    instance = FavaInstance.objects.create(owner=user, status='starting')
+    start_fava_instance(instance.id)
+    instance.refresh_from_db()
+    container_id = instance.container_id
+    FavaInstance.objects.filter(id=instance.id).update(last_accessed=timezone.now() - timedelta(hours=2))
+
+    cleanup_fava_containers()
+
+    instance.refresh_from_db()
+    assert instance.status == 'stopped'
+    assert container_id in fake_docker.containers.removed
+
+
+def test_fava_tasks_routed_to_dedicated_queue():
+    from project.celery import app
+
+    # 冷启动不与账单解析等任务共用默认队列的 worker
+    for task in (start_fava_instance, cleanup_fava_containers):
+        assert app.amqp.router.route({}, task.name)['queue'].name == settings.CELERY_FAVA_QUEUE
+    assert app.amqp.router.route({}, 'project.apps.translate.tasks.auto_confirm_expired_parse_reviews')[
+        'queue'].name != settings.CELERY_FAVA_QUEUE
@@ -2,7 +2,9 @@
 FavaRedirectView 视图测试
 """
 import pytest
+from datetime import timedelta
 from unittest.mock import patch, MagicMock
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
 from project.apps.fava_instances.models import FavaInstance
@@ -16,6 +18,13 @@ class TestFavaRedirectView:
         """设置测试环境"""
         self.client = APIClient()
 
+    @pytest.fixture(autouse=True)
+    def _patch_task_manager(self):
+        """冷启动在 Celery 任务中执行（测试环境同步执行）"""
+        with patch('project.apps.fava_instances.tasks.FavaContainerManager') as task_manager_class:
+            self.task_manager_class = task_manager_class
+            yield
+
     def _get_auth_headers(self, user):
         """获取认证头"""
         refresh = RefreshToken.for_user(user)
@@ -61,6 +70,7 @@ class TestFavaRedirectView:
         # Mock manager
         mock_manager = MagicMock()
         mock_manager_class.return_value = mock_manager
+        self.task_manager_class.return_value = mock_manager
         mock_manager.verify_and_cleanup_instance.return_value = False  # 容器不存在
         mock_manager.cleanup_user_containers.return_value = 1
         mock_manager.start_container.return_value = ('new-container-id', 'new-container-name')
@@ -91,6 +101,7 @@ class TestFavaRedirectView:
         # Mock manager
         mock_manager = MagicMock()
         mock_manager_class.return_value = mock_manager
+        self.task_manager_class.return_value = mock_manager
         mock_manager.cleanup_user_containers.return_value = 0
         mock_manager.start_container.side_effect = Exception('Container start failed')
         
@@ -118,12 +129,14 @@ class TestFavaRedirectView:
     def test_get_cleanup_old_instances(self, mock_manager_class, user):
         """测试获取实例 - 清理多个旧实例"""
         # 创建多个旧实例（不同状态）
-        FavaInstance.objects.create(
+        stale = FavaInstance.objects.create(
             owner=user,
             status='starting',
             container_id='container-1',
             container_name='name-1'
         )
+        # 超过启动超时的 starting 实例视为启动任务已丢失
+        FavaInstance.objects.filter(id=stale.id).update(last_accessed=timezone.now() - timedelta(hours=1))
         FavaInstance.objects.create(
             owner=user,
             status='error',
@@ -134,6 +147,7 @@ class TestFavaRedirectView:
         # Mock manager
         mock_manager = MagicMock()
         mock_manager_class.return_value = mock_manager
+        self.task_manager_class.return_value = mock_manager
         mock_manager.cleanup_user_containers.return_value = 2
         mock_manager.start_container.return_value = ('new-container-id', 'new-container-name')
         
@@ -157,6 +171,7 @@ class TestFavaRedirectView:
         # Mock manager
         mock_manager = MagicMock()
         mock_manager_class.return_value = mock_manager
+        self.task_manager_class.return_value = mock_manager
         mock_manager.cleanup_user_containers.return_value = 0
         mock_manager.start_container.return_value = ('new-container-id', 'new-container-name')
         
@@ -194,6 +209,7 @@ class TestFavaRedirectView:
         # Mock manager
         mock_manager = MagicMock()
         mock_manager_class.return_value = mock_manager
+        self.task_manager_class.return_value = mock_manager
         mock_manager.cleanup_user_containers.return_value = 1
         mock_manager.start_container.return_value = ('new-container-id', 'new-container-name')
         
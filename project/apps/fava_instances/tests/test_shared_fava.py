@@ -0,0 +1,155 @@
+"""
+共享 Fava 部署模式测试（FAVA_DEPLOY_MODE=shared）
+"""
+import os
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from project.apps.fava_instances.models import FavaInstance
+from project.apps.fava_instances.services.shared_fava import SharedFavaApplication
+from project.apps.fava_instances.tasks import cleanup_fava_containers
+
+User = get_user_model()
+
+
+class FakeFavaFactory:
+    """记录加载的账本，返回回显挂载点与路径的 WSGI 应用"""
+
+    def __init__(self):
+        self.loaded = []
+
+    def __call__(self, ledger_file):
+        self.loaded.append(ledger_file)
+
+        def app(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [f"{ledger_file}|{environ['SCRIPT_NAME']}|{environ['PATH_INFO']}".encode()]
+
+        return app
+
+
+def _request(app, path):
+    result = {}
+
+    def start_response(status, headers):
+        result['status'] = status
+
+    body = b''.join(app({'PATH_INFO': path, 'SCRIPT_NAME': ''}, start_response))
+    return result['status'], body.decode()
+
+
+@pytest.mark.django_db
+def test_routes_by_uuid_with_lru_eviction(settings, user, other_user):
+    factory = FakeFavaFactory()
+    app = SharedFavaApplication(app_factory=factory, max_ledgers=1)
+    mine = FavaInstance.objects.create(owner=user, status='running')
+    theirs = FavaInstance.objects.create(owner=other_user, status='running')
+
+    status, body = _request(app, f'/{mine.uuid}/income_statement/')
+    assert status == '200 OK'
+    ledger, script_name, path = body.split('|')
+    assert ledger == str(settings.ASSETS_BASE_PATH / 'testuser' / 'main.bean')
+    assert (script_name, path) == (f'/{mine.uuid}', '/income_statement/')
+
+    _request(app, f'/{mine.uuid}/api/ledger_data')
+    assert len(factory.loaded) == 1
+
+    # 超出账本上限时淘汰最久未使用的账本
+    assert _request(app, f'/{theirs.uuid}/')[1].startswith(str(settings.ASSETS_BASE_PATH / 'otheruser'))
+    _request(app, f'/{mine.uuid}/')
+    assert len(factory.loaded) == 3
+
+    # 未签发、已停止或格式错误的 uuid 均不可访问
+    theirs.status = 'stopped'
+    theirs.save()
+    for path in (f'/{theirs.uuid}/', '/not-a-uuid/', '/'):
+        assert _request(app, path)[0] == '404 Not Found'
+
+
+@pytest.mark.django_db
+@override_settings(FAVA_DEPLOY_MODE='shared', FAVA_SHARED_URL='https://fava.example.com')
+def test_shared_mode_issues_uuid_without_container(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+    first = client.get('/api/fava/')
+    second = client.get('/api/fava/')
+
+    instance = FavaInstance.objects.get(owner=user)
+    assert first.status_code == second.status_code == 302
+    assert first['Location'] == second['Location'] == f'https://fava.example.com/{instance.uuid}/'
+    assert client.get('/api/fava/status/').data['url'] == first['Location']
+
+    assert client.post('/api/fava/stop/').data['stopped_count'] == 1
+    instance.refresh_from_db()
+    assert instance.status == 'stopped'
+
+    # 过期清理不依赖 Docker
+    client.get('/api/fava/')
+    FavaInstance.objects.filter(owner=user).update(last_accessed='2000-01-01T00:00:00Z')
+    cleanup_fava_containers()
+    assert not FavaInstance.objects.filter(owner=user, status='running').exists()
+
+
+@pytest.mark.django_db
+def test_rejects_ledger_including_other_user_dir(settings, tmp_path, user, other_user):
+    settings.ASSETS_BASE_PATH = tmp_path
+    (tmp_path / 'otheruser').mkdir()
+    (tmp_path / 'otheruser' / 'main.bean').write_text('1970-01-01 open Assets:Secret\n')
+    (tmp_path / 'testuser').mkdir()
+    main = tmp_path / 'testuser' / 'main.bean'
+    main.write_text('include "../otheruser/main.bean"\n')
+    factory = FakeFavaFactory()
+    app = SharedFavaApplication(app_factory=factory)
+    instance = FavaInstance.objects.create(owner=user, status='running')
+
+    # 越权账本不加载、不缓存
+    assert _request(app, f'/{instance.uuid}/')[0] == '404 Not Found'
+    assert factory.loaded == []
+
+    main.write_text('include "account.bean"\n')
+    (tmp_path / 'testuser' / 'account.bean').write_text('1970-01-01 open Assets:Cash\n')
+    assert _request(app, f'/{instance.uuid}/')[0] == '200 OK'
+
+    # 加载后修改账本（如通过 Fava 编辑器）引用其他用户目录，随即不可访问
+    (tmp_path / 'testuser' / 'account.bean').write_text('include "../otheruser/*.bean"\n')
+    os.utime(tmp_path / 'testuser' / 'account.bean', ns=(0, 0))
+    assert _request(app, f'/{instance.uuid}/')[0] == '404 Not Found'
+    assert len(factory.loaded) == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('ledger', [
+    '2020-01-01 document Assets:Cash "../otheruser/main.bean"\n',
+    'option "documents" "../otheruser"\n',
+    '2020-01-01 custom "fava-option" "import-dirs" "../otheruser"\n',
+    # import-config 会执行账本目录中的 Python 文件
+    '2020-01-01 custom "fava-option" "import-config" "importers.py"\n',
+])
+def test_rejects_document_and_import_paths_outside_user_dir(settings, tmp_path, user, ledger):
+    settings.ASSETS_BASE_PATH = tmp_path
+    (tmp_path / 'otheruser').mkdir()
+    (tmp_path / 'otheruser' / 'main.bean').write_text('1970-01-01 open Assets:Secret\n')
+    (tmp_path / 'testuser' / 'documents').mkdir(parents=True)
+    main = tmp_path / 'testuser' / 'main.bean'
+    main.write_text(
+        'option "documents" "documents"\n'
+        '2020-01-01 document Assets:Cash "documents/receipt.pdf"\n'
+        '2020-01-01 custom "fava-option" "import-dirs" "documents"\n'
+    )
+    factory = FakeFavaFactory()
+    app = SharedFavaApplication(app_factory=factory)
+    instance = FavaInstance.objects.create(owner=user, status='running')
+    assert _request(app, f'/{instance.uuid}/')[0] == '200 OK'
+
+    # 加载后在被包含的文件中加入越权路径
+    main.write_text(main.read_text() + 'include "extra.bean"\n')
+    (tmp_path / 'testuser' / 'extra.bean').write_text(ledger)
+    os.utime(main, ns=(0, 0))
+    assert _request(app, f'/{instance.uuid}/')[0] == '404 Not Found'
+    assert _request(app, f'/{instance.uuid}/')[0] == '404 Not Found'
+    assert len(factory.loaded) == 1
@@ -1,9 +1,10 @@
 # Beancount-Trans-Backend/project/apps/fava_instances/urls.py
 from django.urls import path
-from project.apps.fava_instances.views import FavaRedirectView, FavaStopView
+from project.apps.fava_instances.views import FavaRedirectView, FavaStatusView, FavaStopView
 
 
 urlpatterns = [
     path('',FavaRedirectView.as_view(), name='fava-redirect'),
+    path('status/', FavaStatusView.as_view(), name='fava-status'),
     path('stop/', FavaStopView.as_view(), name='fava-stop'),
 ]
@@ -4,11 +4,13 @@ from rest_framework.response import Response
 from rest_framework import status
 from project.apps.fava_instances.models import FavaInstance
 from project.apps.fava_instances.services.fava_manager import FavaContainerManager
+from project.apps.fava_instances.tasks import FAVA_START_TIMEOUT, start_fava_instance
 from project.utils.fava_static import resolve_static_fava_url
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.authentication import JWTAuthentication
-import os
 from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone
 import logging
 
 
@@ -19,7 +21,9 @@ class FavaRedirectView(APIView):
     触发启动fava容器并重定向
 
     该视图的URL可能是`/api/fava/`（不带uuid）
-    它检查当前用户的`FavaInstance`，如果不存在或者状态不是运行中，则启动一个新的容器（同步启动，等待容器启动完成，然后更新`FavaInstance`的状态为`running`）
+    共享模式（FAVA_DEPLOY_MODE=shared）下只签发实例 uuid，由共享 Fava 工作进程按 uuid 加载账本
+    动态模式下它检查当前用户的`FavaInstance`，如果不存在或者状态不是运行中，
+    在 Celery 任务中启动只挂载该用户账本目录的新容器，返回 202 及状态查询地址（FavaStatusView），容器就绪后实例状态为`running`
     然后可以直接访问fava容器的页面
     """
     authentication_classes = [JWTAuthentication]
@@ -45,6 +49,17 @@ class FavaRedirectView(APIView):
                 data={'url': url, 'deploy_mode': 'static'},
             )
 
+        if settings.FAVA_DEPLOY_MODE == 'shared':
+            # 共享工作进程按实例 uuid 加载用户账本，无需启动容器
+            instance = FavaInstance.objects.filter(owner=user, status='running').first()
+            if instance is None:
+                instance = FavaInstance(owner=user, status='running')
+            instance.save()
+            return Response(
+                status=status.HTTP_302_FOUND,
+                headers={'Location': _instance_url(instance)}
+            )
+
         manager = FavaContainerManager()
         
         # 检查现有运行实例
@@ -67,51 +82,76 @@ class FavaRedirectView(APIView):
                 # 容器不存在，已清理数据库记录，继续创建新实例
                 logger.info(f"用户 {user.username} 的实例 {running_instance.uuid} 容器不存在，已清理数据库记录")
 
+        # 启动任务进行中，返回启动状态
+        starting_instance = FavaInstance.objects.filter(
+            owner=user,
+            status='starting',
+            last_accessed__gte=timezone.now() - FAVA_START_TIMEOUT
+        ).first()
+        if starting_instance:
+            return _starting_response(starting_instance)
+
         # 清理用户的所有旧实例（包括 starting、error 等状态）
         logger.info(f"清理用户 {user.username} 的所有旧实例")
         manager.cleanup_user_containers(user)
 
-        # 创建新实例
+        # 创建新实例，在后台任务中启动容器
         instance = FavaInstance(owner=user, status='starting')
         instance.save()
         logger.info(f"为用户 {user.username} 创建新实例 {instance.uuid}")
+        start_fava_instance.delay(instance.id)
 
-        # 准备bean文件路径
-        from project.utils.file import BeanFileManager
-        user_assets_path = BeanFileManager.get_user_assets_path(user)
-        bean_file = os.path.join(settings.ASSETS_HOST_PATH, os.path.basename(user_assets_path))
-
-        # 启动容器
-        try:
-            container_id, container_name = manager.start_container(user, bean_file, instance)
-
-            instance.container_id = container_id
-            instance.container_name = container_name
-            instance.status = 'running'
-            instance.save()
-            logger.info(f"用户 {user.username} 的实例 {instance.uuid} 容器启动成功")
-
+        # 任务同步执行（CELERY_TASK_ALWAYS_EAGER）或已完成时直接返回结果
+        instance.refresh_from_db()
+        if instance.status == 'running':
             return Response(
                 status=status.HTTP_302_FOUND,
                 headers={'Location': f'/{instance.uuid}/'}
             )
-
-        except Exception as e:
-            logger.error(f"用户 {user.username} 的实例 {instance.uuid} 容器启动失败: {str(e)}")
-            # 启动失败，清理新实例记录
-            try:
-                instance.container_id = ''
-                instance.container_name = ''
-                instance.status = 'error'
-                instance.save()
-                logger.info(f"已清理启动失败的实例 {instance.uuid} 的记录")
-            except Exception as cleanup_error:
-                logger.error(f"清理失败实例 {instance.uuid} 时出错: {str(cleanup_error)}")
-            
+        if instance.status == 'error':
             return Response(
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                data={'error': str(e)}
+                data={'error': 'Fava 容器启动失败'}
             )
+        return _starting_response(instance)
+
+
+def _instance_url(instance):
+    """实例的访问地址；共享模式下以 FAVA_SHARED_URL 为前缀"""
+    if settings.FAVA_DEPLOY_MODE == 'shared':
+        return f'{settings.FAVA_SHARED_URL}/{instance.uuid}/'
+    return f'/{instance.uuid}/'
+
+
+def _starting_response(instance):
+    return Response(
+        status=status.HTTP_202_ACCEPTED,
+        data={
+            'status': instance.status,
+            'instance': str(instance.uuid),
+            'status_url': reverse('fava-status'),
+        }
+    )
+
+
+class FavaStatusView(APIView):
+    """
+    查询用户最近一个 Fava 实例的启动状态
+
+    FavaRedirectView 返回 202 后轮询该接口，状态为 running 时按 url 访问
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        instance = FavaInstance.objects.filter(owner=request.user).order_by('-last_accessed').first()
+        if instance is None:
+            return Response({'status': 'stopped', 'url': None})
+        return Response({
+            'status': instance.status,
+            'instance': str(instance.uuid),
+            'url': _instance_url(instance) if instance.status == 'running' else None,
+        })
 
 
 class FavaStopView(APIView):
@@ -134,6 +174,20 @@ class FavaStopView(APIView):
                 data={'message': '静态 Fava 模式无需停止实例', 'stopped_count': 0},
             )
 
+        if settings.FAVA_DEPLOY_MODE == 'shared':
+            # 共享模式没有专属容器，停止后实例 uuid 立即不可访问
+            stopped_count = FavaInstance.objects.filter(
+                owner=user,
+                status__in=['running', 'starting']
+            ).update(status='stopped')
+            return Response(
+                status=status.HTTP_200_OK,
+                data={
+                    'message': f'Successfully stopped {stopped_count} Fava instance(s).',
+                    'stopped_count': stopped_count
+                }
+            )
+
         # 查找用户的所有运行中的Fava实例
         running_instances = FavaInstance.objects.filter(
             owner=user,
@@ -0,0 +1,124 @@
+"""
+目录树测试
+
+验证目录树渲染、批量移动校验与递归删除的查询次数与目录规模无关
+"""
+import os
+from unittest.mock import MagicMock, patch
+
+import django
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+# 设置Django环境
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings.test')
+django.setup()
+
+from project.apps.file_manager.models import Directory, File
+from project.apps.file_manager.utils import DirectoryTree, get_subtree_directory_ids
+
+
+class DirectoryTreeTest(TestCase):
+    """测试一次加载目录树"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='treeuser', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.root = Directory.objects.get(owner=self.user, parent__isnull=True)
+
+    def build_archive(self, years=3, months=12, banks=('招商银行', '微信')):
+        """按 年/月/来源 构造归档目录"""
+        year_dirs = Directory.objects.bulk_create([
+            Directory(name=str(2020 + i), parent=self.root, owner=self.user) for i in range(years)
+        ])
+        month_dirs = Directory.objects.bulk_create([
+            Directory(name=f'{month + 1:02d}', parent=year, owner=self.user)
+            for year in year_dirs for month in range(months)
+        ])
+        bank_dirs = Directory.objects.bulk_create([
+            Directory(name=bank, parent=month, owner=self.user) for month in month_dirs for bank in banks
+        ])
+        return year_dirs, month_dirs, bank_dirs
+
+    def test_tree_with_constant_queries(self):
+        self.build_archive()
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/directories/tree/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], self.root.id)
+        self.assertEqual([child['name'] for child in response.data['children']], ['2020', '2021', '2022'])
+        months = response.data['children'][2]['children']
+        self.assertEqual(len(months), 12)
+        self.assertEqual([child['name'] for child in months[11]['children']], ['微信', '招商银行'])
+
+    def test_descendant_ids_match_cte(self):
+        year_dirs, month_dirs, bank_dirs = self.build_archive(years=2, months=2)
+        other_user = User.objects.create_user(username='othertreeuser', password='testpass123')
+
+        with self.assertNumQueries(1):
+            tree = DirectoryTree.for_owner(self.user)
+        expected = {year_dirs[0].id, *[d.id for d in month_dirs[:2]], *[d.id for d in bank_dirs[:4]]}
+        self.assertEqual(tree.get_descendant_ids(year_dirs[0].id), expected)
+        self.assertNotIn(Directory.objects.get(owner=other_user).id, tree)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_subtree_directory_ids([year_dirs[0].id]), expected)
+        self.assertEqual(len(get_subtree_directory_ids([self.root.id])), 1 + 2 + 4 + 8)
+
+    def test_batch_move_rejects_descendant_target(self):
+        year_dirs, month_dirs, bank_dirs = self.build_archive()
+
+        with self.assertNumQueries(3):
+            response = self.client.post('/api/directories/batch_move/', {
+                'directory_ids': [year_dirs[0].id],
+                'target_directory_id': bank_dirs[0].id,
+            }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/api/directories/batch_move/', {
+            'directory_ids': [d.id for d in month_dirs[:12]],
+            'target_directory_id': year_dirs[1].id,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data['details']), 12)
+
+        response = self.client.post('/api/directories/batch_move/', {
+            'directory_ids': [bank_dirs[0].id, bank_dirs[2].id],
+            'target_directory_id': year_dirs[2].id,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['moved'], [bank_dirs[0].id])
+        self.assertEqual(response.data['errors'][0]['reason'], '目标目录下已存在同名目录')
+        self.assertEqual(Directory.objects.get(id=bank_dirs[0].id).parent_id, year_dirs[2].id)
+
+    @patch('project.apps.file_manager.views.BeanFileManager')
+    @patch('project.apps.file_manager.views.get_storage_client')
+    def test_destroy_subtree_with_constant_queries(self, mock_get_storage_client, mock_bean_manager):
+        storage_client = MagicMock()
+        storage_client.delete_many.return_value = []
+        mock_get_storage_client.return_value = storage_client
+        year_dirs, month_dirs, bank_dirs = self.build_archive()
+        File.objects.bulk_create([
+            File(name=f'{directory.id}.csv', directory=directory, storage_name='shared.csv' if i == 0 else f'{i}.csv',
+                 size=1, owner=self.user, content_type='text/csv')
+            for i, directory in enumerate(bank_dirs[:24])
+        ])
+        # 子树外仍引用 shared.csv，不应删除该存储文件
+        File.objects.create(name='keep.csv', directory=self.root, storage_name='shared.csv', size=1,
+                            owner=self.user, content_type='text/csv')
+
+        with self.assertNumQueries(11):
+            response = self.client.delete(f'/api/directories/{year_dirs[0].id}/')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Directory.objects.filter(id__in=[d.id for d in month_dirs[:12]]).exists())
+        self.assertEqual(File.objects.filter(owner=self.user).count(), 1)
+        storage_client.delete_many.assert_called_once()
+        deleted = storage_client.delete_many.call_args.args[0]
+        self.assertEqual(len(deleted), 23)
+        self.assertNotIn('shared.csv', deleted)
+        self.assertEqual(mock_bean_manager.delete_bean_file.call_count, 24)
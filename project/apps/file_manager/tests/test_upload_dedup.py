@@ -0,0 +1,69 @@
+"""
+内容寻址上传测试
+
+验证上传时同步计算哈希（不再重复读取文件），相同内容已存储时跳过上传
+"""
+import hashlib
+import os
+import uuid
+from unittest.mock import patch
+
+import django
+from django.contrib.auth.models import User
+from django.core.files.base import File as DjangoFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+# 设置Django环境
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings.test')
+django.setup()
+
+from project.apps.file_manager.models import Directory, File
+from project.utils.storage_factory import get_storage_client
+
+
+@patch('project.apps.file_manager.views.BeanFileManager')
+class UploadDedupTest(TestCase):
+    """测试内容寻址上传去重"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='dedupuser', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.root = Directory.objects.get(owner=self.user, parent__isnull=True)
+        self.storage_client = get_storage_client()
+
+    def upload(self, name, content):
+        return self.client.post('/api/files/', {
+            'directory': self.root.id,
+            'file': SimpleUploadedFile(name, content, content_type='text/csv'),
+        }, format='multipart')
+
+    def assert_uploaded_once_and_deduplicated(self, content):
+        # 本地存储目录在并行测试间共享，内容中加入随机标识避免与其他测试的存储对象重合
+        content = f'# {uuid.uuid4().hex}\n'.encode('utf-8') + content
+        storage_name = f'{hashlib.sha256(content).hexdigest()}.csv'
+        self.addCleanup(self.storage_client.delete_file, storage_name)
+
+        with patch.object(DjangoFile, 'chunks', side_effect=AssertionError('文件被重复读取')), \
+                patch.object(self.storage_client, 'upload_file', wraps=self.storage_client.upload_file) as upload_file:
+            first = self.upload('dedup_first.csv', content)
+            second = self.upload('dedup_second.csv', content)
+
+        self.assertEqual(first.status_code, 201, first.data)
+        self.assertEqual(second.status_code, 201, second.data)
+        self.assertEqual(upload_file.call_count, 1)
+        self.assertEqual(
+            set(File.objects.filter(owner=self.user).values_list('storage_name', flat=True)),
+            {storage_name}
+        )
+        with self.storage_client.download_file(storage_name) as stored:
+            self.assertEqual(stored.read(), content)
+
+    def test_small_file_hashed_in_memory(self, mock_bean_manager):
+        self.assert_uploaded_once_and_deduplicated('日期,金额\n2025-01-01,10.00\n'.encode('utf-8'))
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024)
+    def test_large_file_hashed_while_streaming_to_disk(self, mock_bean_manager):
+        self.assert_uploaded_once_and_deduplicated(b'2025-01-01,10.00\n' * 4096)
@@ -0,0 +1,135 @@
+# project/apps/file_manager/utils.py
+import logging
+
+from django.db import connection
+
+from project.apps.file_manager.models import Directory, File
+
+logger = logging.getLogger(__name__)
+
+
+class DirectoryTree:
+    """用户目录树快照，一次查询加载全部目录，树的组装与后代查询均在内存中完成"""
+
+    def __init__(self, rows):
+        """
+        Args:
+            rows: (id, name, parent_id) 三元组序列
+        """
+        self.names = {}
+        self.parents = {}
+        self.children = {}
+        # 子目录按名称排序
+        for directory_id, name, parent_id in sorted(rows, key=lambda row: row[1]):
+            self.names[directory_id] = name
+            self.parents[directory_id] = parent_id
+            self.children.setdefault(parent_id, []).append(directory_id)
+
+    @classmethod
+    def for_owner(cls, owner) -> 'DirectoryTree':
+        """加载用户的全部目录（一次查询）"""
+        return cls(Directory.objects.filter(owner=owner).values_list('id', 'name', 'parent_id'))
+
+    def __contains__(self, directory_id):
+        return directory_id in self.names
+
+    def get_descendant_ids(self, directory_id) -> set:
+        """
+        获取目录及其所有后代目录的ID集合（含自身）
+
+        Args:
+            directory_id: 目录ID
+
+        Returns:
+            set: 目录ID集合
+        """
+        ids = set()
+        stack = [directory_id]
+        while stack:
+            current = stack.pop()
+            if current in ids:
+                continue
+            ids.add(current)
+            stack.extend(self.children.get(current, []))
+        return ids
+
+    def to_dict(self, directory_id) -> dict:
+        """
+        组装目录树（供前端目录选择器使用）
+
+        Args:
+            directory_id: 起始目录ID
+
+        Returns:
+            dict: {'id', 'name', 'children'} 嵌套结构，子目录按名称排序
+        """
+        root = {'id': directory_id, 'name': self.names[directory_id], 'children': []}
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            for child_id in self.children.get(node['id'], []):
+                child = {'id': child_id, 'name': self.names[child_id], 'children': []}
+                node['children'].append(child)
+                stack.append(child)
+        return root
+
+
+def get_subtree_directory_ids(directory_ids) -> set:
+    """
+    使用递归 CTE 一次查询获取目录及其所有后代目录的ID集合（含自身）
+
+    WITH RECURSIVE 语法在 PostgreSQL 与 SQLite 中通用；使用 UNION 去重，数据异常出现环时也能终止。
+
+    Args:
+        directory_ids: 起始目录ID序列
+
+    Returns:
+        set: 目录ID集合
+    """
+    directory_ids = list(directory_ids)
+    if not directory_ids:
+        return set()
+
+    table = connection.ops.quote_name(Directory._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(directory_ids))
+    sql = (
+        f'WITH RECURSIVE subtree(id) AS ('
+        f'SELECT id FROM {table} WHERE id IN ({placeholders}) '
+        f'UNION '
+        f'SELECT d.id FROM {table} d INNER JOIN subtree s ON d.parent_id = s.id'
+        f') SELECT id FROM subtree'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, directory_ids)
+        return {row[0] for row in cursor.fetchall()}
+
+
+def delete_unreferenced_storage_files(storage_client, files) -> int:
+    """
+    删除文件对应的存储对象（仍被给定文件以外的记录引用的存储对象保留）
+
+    引用检查为一次分组查询，删除通过存储后端的 delete_many 批量完成。
+
+    Args:
+        storage_client: 存储后端
+        files: 即将删除的文件记录
+
+    Returns:
+        int: 删除的存储对象数量
+    """
+    files = list(files)
+    storage_names = {file.storage_name for file in files}
+    if not storage_names:
+        return 0
+
+    referenced = set(
+        File.objects.filter(storage_name__in=storage_names)
+        .exclude(id__in=[file.id for file in files])
+        .values_list('storage_name', flat=True)
+    )
+    unreferenced = sorted(storage_names - referenced)
+    failed = storage_client.delete_many(unreferenced)
+    if failed:
+        # 记录错误但不中断删除流程
+        logger.error(f"存储删除错误: {len(failed)} 个对象删除失败: {', '.join(failed[:10])}")
+    return len(unreferenced) - len(failed)
@@ -11,6 +11,11 @@ from rest_framework_simplejwt.authentication import JWTAuthentication
 from project.apps.file_manager.models import Directory, File
 from project.apps.translate.models import ParseFile
 from project.apps.file_manager.serializers import DirectorySerializer, FileSerializer
+from project.apps.file_manager.utils import (
+    DirectoryTree,
+    delete_unreferenced_storage_files,
+    get_subtree_directory_ids,
+)
 from project.apps.reconciliation.models import ScheduledTask
 from django.contrib.contenttypes.models import ContentType
 from project.apps.common.filters import CurrentUserFilterBackend
@@ -61,15 +66,8 @@ class DirectoryViewSet(ModelViewSet):
         except Directory.MultipleObjectsReturned:
             root_dir = Directory.objects.filter(owner=request.user, parent__isnull=True).first()
 
-        def build_tree(directory):
-            children = Directory.objects.filter(parent=directory, owner=request.user).order_by('name')
-            return {
-                'id': directory.id,
-                'name': directory.name,
-                'children': [build_tree(child) for child in children],
-            }
-
-        tree_data = build_tree(root_dir)
+        # 一次查询加载用户全部目录，在内存中组装目录树
+        tree_data = DirectoryTree.for_owner(request.user).to_dict(root_dir.id)
         return Response(tree_data)
 
     @action(detail=False, methods=['get'])
@@ -100,44 +98,24 @@ class DirectoryViewSet(ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         directory = self.get_object()
 
-        # 递归删除所有.bean文件并更新main.bean
-        self._delete_bean_files_for_directory(request.user, directory)
+        # 递归 CTE 一次取得整棵子树的目录ID，再一次查询取得子树下全部文件
+        directory_ids = get_subtree_directory_ids([directory.id])
+        files = list(File.objects.filter(directory_id__in=directory_ids))
+
+        # 删除所有.bean文件并更新main.bean
+        self._delete_bean_files(request.user, files)
 
-        # 递归删除所有MinIO文件
-        self._delete_directory_files(directory)
+        # 批量删除不再被引用的存储文件
+        delete_unreferenced_storage_files(get_storage_client(), files)
 
-        # 级联删除数据库记录（自动处理子目录和文件）
-        directory.delete()
+        # 按ID集合删除数据库记录（级联处理文件及解析记录）
+        Directory.objects.filter(id__in=directory_ids).delete()
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    def _delete_directory_files(self, directory):
-        """递归删除目录下所有文件"""
-        storage_client = get_storage_client()
-        for file in directory.files.all():
-            storage_name = file.storage_name
-            # 检查是否有其他文件引用相同的存储文件
-            other_references = File.objects.filter(
-                storage_name=storage_name
-            ).exclude(id=file.id).exists()
-
-            if not other_references:
-                try:
-                    storage_client.delete_file(storage_name)
-                except Exception as e:
-                    # 记录错误但继续删除
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.error(f"存储删除错误: {str(e)}")
-
-        # 递归处理子目录
-        for child in directory.children.all():
-            self._delete_directory_files(child)
-
-    def _delete_bean_files_for_directory(self, user, directory):
-        """递归删除目录下所有文件对应的.bean文件并更新trans/main.bean"""
-        # 处理当前目录下的文件
-        for file in directory.files.all():
+    def _delete_bean_files(self, user, files):
+        """删除文件对应的.bean文件并更新trans/main.bean"""
+        for file in files:
             base_name = os.path.splitext(file.name)[0]
             bean_filename = f"{base_name}.bean"
 
@@ -150,17 +128,6 @@ class DirectoryViewSet(ModelViewSet):
             # 删除.bean文件（从trans目录）
             BeanFileManager.delete_bean_file(user, bean_filename)
 
-        # 递归处理子目录
-        for child in directory.children.all():
-            self._delete_bean_files_for_directory(user, child)
-
-    def _get_descendant_ids(self, directory):
-        """返回某目录及其所有后代目录的 id 集合（含自身），用于检测循环引用。"""
-        ids = {directory.id}
-        for child in directory.children.all():
-            ids |= self._get_descendant_ids(child)
-        return ids
-
     @action(detail=False, methods=['post'])
     def batch_move(self, request):
         """批量将目录移动到指定目录（目标为同一用户下的另一目录，可为 null 表示根下）。"""
@@ -170,40 +137,44 @@ class DirectoryViewSet(ModelViewSet):
         if not directory_ids:
             return Response({'error': '请提供 directory_ids'}, status=status.HTTP_400_BAD_REQUEST)
 
+        dirs = list(Directory.objects.filter(id__in=directory_ids, owner=request.user))
+
         if target_directory_id is not None:
             target_directory = get_object_or_404(Directory, id=target_directory_id)
             if target_directory.owner_id != request.user.id:
                 return Response({'error': '目标目录不存在或无权访问'}, status=status.HTTP_403_FORBIDDEN)
+            # 一次查询加载用户目录树，后代检查在内存中完成
+            directory_tree = DirectoryTree.for_owner(request.user)
             forbidden_ids = set()
-            for d in Directory.objects.filter(id__in=directory_ids, owner=request.user):
-                forbidden_ids |= self._get_descendant_ids(d)
-            if target_directory_id in forbidden_ids:
+            for dir_obj in dirs:
+                forbidden_ids |= directory_tree.get_descendant_ids(dir_obj.id)
+            if target_directory.id in forbidden_ids:
                 return Response({'error': '不能将目录移动到自身或其子目录下'}, status=status.HTTP_400_BAD_REQUEST)
         else:
             target_directory = None
 
-        dirs = Directory.objects.filter(id__in=directory_ids, owner=request.user)
-        if dirs.count() != len(directory_ids):
+        if len(dirs) != len(directory_ids):
             return Response({'error': '部分目录不存在或无权操作'}, status=status.HTTP_404_NOT_FOUND)
 
+        # 目标目录下已有的子目录（一次查询）
+        existing_names = dict(
+            Directory.objects.filter(parent=target_directory).values_list('name', 'id')
+        )
+
         errors = []
         moved = []
         for dir_obj in dirs:
-            if (dir_obj.parent_id if dir_obj.parent_id is not None else None) == target_directory_id:
-                continue
-            if target_directory_id is not None and dir_obj.id == target_directory_id:
-                errors.append({'directory_id': dir_obj.id, 'name': dir_obj.name, 'reason': '不能移动到自身'})
-                continue
-            if target_directory_id is not None and target_directory_id in self._get_descendant_ids(dir_obj):
-                errors.append({'directory_id': dir_obj.id, 'name': dir_obj.name, 'reason': '不能移动到自身或子目录下'})
+            if dir_obj.parent_id == (target_directory.id if target_directory else None):
                 continue
-            if Directory.objects.filter(parent=target_directory, name=dir_obj.name).exclude(id=dir_obj.id).exists():
+            if existing_names.get(dir_obj.name, dir_obj.id) != dir_obj.id:
                 errors.append({'directory_id': dir_obj.id, 'name': dir_obj.name, 'reason': '目标目录下已存在同名目录'})
                 continue
-            dir_obj.parent = target_directory
-            dir_obj.save()
+            existing_names[dir_obj.name] = dir_obj.id
             moved.append(dir_obj.id)
 
+        if moved:
+            Directory.objects.filter(id__in=moved).update(parent=target_directory)
+
         if errors and not moved:
             return Response({
                 'error': '无法移动：存在冲突',
@@ -254,15 +225,16 @@ class FileViewSet(ModelViewSet):
         storage_name = f"{file_hash}{file_extension}"
 
         try:
-            # 上传到存储
-            success = storage_client.upload_file(
-                storage_name,
-                uploaded_file,
-                content_type=uploaded_file.content_type
-            )
+            # 存储名称即内容哈希，相同内容已存在时跳过上传
+            if not storage_client.file_exists(storage_name):
+                success = storage_client.upload_file(
+                    storage_name,
+                    uploaded_file,
+                    content_type=uploaded_file.content_type
+                )
 
-            if not success:
-                return Response({"error": "文件上传失败"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                if not success:
+                    return Response({"error": "文件上传失败"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
             # 保存到数据库
             file_obj = File.objects.create(
@@ -403,7 +375,6 @@ class FileViewSet(ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         storage_client = get_storage_client()
         file_obj = self.get_object()
-        storage_name = file_obj.storage_name
 
         # ParseFile.objects.filter(file=file_obj).delete()
 
@@ -422,20 +393,8 @@ class FileViewSet(ModelViewSet):
             bean_filename
         )
 
-        # 检查是否有其他文件引用相同的存储文件
-        other_references = File.objects.filter(
-            storage_name=storage_name
-        ).exclude(id=file_obj.id).exists()
-
-        # 只有当没有其他引用时才删除存储文件
-        if not other_references:
-            try:
-                storage_client.delete_file(storage_name)
-            except Exception as e:
-                # 记录错误但不中断删除流程
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.error(f"存储文件删除失败: {str(e)}")
+        # 只有当没有其他文件引用相同的存储文件时才删除存储文件
+        delete_unreferenced_storage_files(storage_client, [file_obj])
 
         # 删除数据库记录
         file_obj.delete()
@@ -91,6 +91,11 @@ class SyncStatusSerializer(serializers.Serializer):
         allow_blank=True,
         help_text="错误信息"
     )
+    progress = serializers.DictField(
+        allow_null=True,
+        required=False,
+        help_text="异步同步进度：state（queued/running/success/failed）、stage、queued、merged_events、task_id"
+    )
 
 
 class SyncResponseSerializer(serializers.Serializer):
@@ -108,6 +113,14 @@ class SyncResponseSerializer(serializers.Serializer):
     )
 
 
+class SyncQueueResponseSerializer(serializers.Serializer):
+    """同步入队响应序列化器"""
+
+    status = serializers.CharField(help_text="queued=已加入队列，merged=合并到排队中的同步")
+    message = serializers.CharField(help_text="结果消息")
+    task_id = serializers.CharField(help_text="排队中的同步任务ID")
+
+
 class WebhookPayloadSerializer(serializers.Serializer):
     """GitHub / 平台托管 Gitea push Webhook 载荷（宽松校验，具体分支在视图中比对）。"""
 
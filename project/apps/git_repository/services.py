@@ -4,9 +4,8 @@ import shutil
 import tempfile
 import logging
 import subprocess
-import zipfile
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Iterator, List, Optional
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.utils import timezone
@@ -16,6 +15,8 @@ from cryptography.hazmat.primitives.asymmetric import rsa
 from .models import GitRepository
 from .clients import GiteaAPIClient, GiteaAPIException
 from .git_remote import guess_external_full_name_from_ssh
+from project.utils.ledger_events import publish_ledger_change
+from project.utils.zip_stream import iter_zip_stream
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -29,9 +30,18 @@ class GitServiceException(Exception):
 class PlatformGitService:
     """Git 同步服务：平台托管 Gitea 与关联外部远程（MVP：用户手动建库 + SSH Deploy Key）。"""
 
-    def __init__(self):
+    def __init__(self, progress_callback: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            progress_callback: 同步进度回调，参数为当前阶段（backup/clone/fetch/restore/reconcile）
+        """
         self._gitea_client: Optional[GiteaAPIClient] = None
         self.assets_base_path = Path(settings.BASE_DIR) / 'Assets'
+        self.progress_callback = progress_callback
+
+    def _report_progress(self, stage: str):
+        if self.progress_callback is not None:
+            self.progress_callback(stage)
 
     def _get_gitea_client(self) -> GiteaAPIClient:
         if self._gitea_client is None:
@@ -282,14 +292,14 @@ class PlatformGitService:
         """从远程仓库同步到本地
 
         核心处理逻辑：
-        1. 备份 trans/ 目录下所有解析文件
-        2. 执行 git fetch + git reset --hard origin/main（以远程为准）
-        3. 恢复备份的解析文件到 trans/ 目录
+        1. 将 trans/ 目录重命名移开（trans/ 已被 .gitignore 忽略时 reset --hard 不会触碰，原地保留）
+        2. 执行浅克隆，或 git fetch --depth + git reset --hard origin/<branch>（以远程为准）
+        3. 将 trans/ 目录移回
 
         冲突处理：始终以远程仓库为准，平台本地修改会被覆盖
 
         Returns:
-            同步结果信息
+            同步结果信息；changed_paths 为本次更新变更的文件路径列表（首次克隆或无法比较时为 None，表示全部失效）
         """
         try:
             git_repo = user.git_repo
@@ -304,65 +314,74 @@ class PlatformGitService:
         user_assets_path = self.assets_base_path / git_repo.repo_name
 
         try:
-            # 1. 备份 trans/ 目录
-            trans_backup = None
+            # 1. 移开 trans/ 目录：同一文件系统内重命名，不复制文件
             trans_path = user_assets_path / 'trans'
-            had_local_trans = trans_path.exists()
-            if had_local_trans:
-                trans_backup = self._backup_trans_directory(trans_path)
-                logger.info(f"Backed up trans/ directory for user {user.username}")
-
-            # 2. 检查是否为初次克隆
             git_path = user_assets_path / '.git'
-            if not git_path.exists():
-                # 先克隆到临时目录，成功后再替换用户目录。切勿在 clone 成功前 rmtree 用户路径，
-                # 否则 ls-remote/clone 失败（如未配置 Deploy Key）会导致本地账本被删。
-                self.assets_base_path.mkdir(parents=True, exist_ok=True)
-                tmp_clone = Path(
-                    tempfile.mkdtemp(
-                        prefix=f"clone-{git_repo.repo_name}-",
-                        dir=str(self.assets_base_path),
-                    )
-                )
-                try:
-                    self._clone_repository(git_repo, tmp_clone)
-                except Exception:
-                    shutil.rmtree(tmp_clone, ignore_errors=True)
-                    raise
-
-                if (tmp_clone / '.git').exists():
-                    backup_path: Optional[Path] = None
-                    if user_assets_path.exists():
-                        backup_path = user_assets_path.parent / (
-                            f"{user_assets_path.name}.presync-{secrets.token_hex(6)}"
+            trans_stash: Optional[Path] = None
+            if trans_path.exists() and not (git_path.exists() and self._is_untracked_ignored(user_assets_path, 'trans')):
+                self._report_progress('backup')
+                trans_stash = self._stash_trans_directory(trans_path)
+                logger.info(f"Moved trans/ directory aside for user {user.username}")
+
+            changed_paths: Optional[List[str]] = None
+            try:
+                # 2. 检查是否为初次克隆
+                if not git_path.exists():
+                    # 先克隆到临时目录，成功后再替换用户目录。切勿在 clone 成功前 rmtree 用户路径，
+                    # 否则 ls-remote/clone 失败（如未配置 Deploy Key）会导致本地账本被删。
+                    self._report_progress('clone')
+                    self.assets_base_path.mkdir(parents=True, exist_ok=True)
+                    tmp_clone = Path(
+                        tempfile.mkdtemp(
+                            prefix=f"clone-{git_repo.repo_name}-",
+                            dir=str(self.assets_base_path),
                         )
-                        user_assets_path.rename(backup_path)
+                    )
                     try:
-                        tmp_clone.rename(user_assets_path)
+                        self._clone_repository(git_repo, tmp_clone)
                     except Exception:
-                        if backup_path is not None and backup_path.exists():
-                            backup_path.rename(user_assets_path)
                         shutil.rmtree(tmp_clone, ignore_errors=True)
                         raise
-                    if backup_path is not None and backup_path.exists():
-                        shutil.rmtree(backup_path, ignore_errors=True)
-                else:
-                    # 远程空仓库：不替换本地，仅清理临时目录
-                    shutil.rmtree(tmp_clone, ignore_errors=True)
-            else:
-                # 更新现有仓库 - 确保目录存在
-                # user_assets_path.mkdir(parents=True, exist_ok=True)
 
-                # 更新现有仓库
-                self._pull_repository(git_repo, user_assets_path)
+                    if (tmp_clone / '.git').exists():
+                        backup_path: Optional[Path] = None
+                        if user_assets_path.exists():
+                            backup_path = user_assets_path.parent / (
+                                f"{user_assets_path.name}.presync-{secrets.token_hex(6)}"
+                            )
+                            user_assets_path.rename(backup_path)
+                        try:
+                            tmp_clone.rename(user_assets_path)
+                        except Exception:
+                            if backup_path is not None and backup_path.exists():
+                                backup_path.rename(user_assets_path)
+                            shutil.rmtree(tmp_clone, ignore_errors=True)
+                            raise
+                        if backup_path is not None and backup_path.exists():
+                            shutil.rmtree(backup_path, ignore_errors=True)
+                    else:
+                        # 远程空仓库：不替换本地，仅清理临时目录
+                        shutil.rmtree(tmp_clone, ignore_errors=True)
+                else:
+                    # 更新现有仓库
+                    self._report_progress('fetch')
+                    old_head = self._rev_parse_head(user_assets_path)
+                    self._pull_repository(git_repo, user_assets_path)
+                    changed_paths = self._diff_changed_paths(user_assets_path, old_head)
+            finally:
+                # 3. 移回 trans/ 目录（同步失败时同样移回）
+                if trans_stash is not None:
+                    self._report_progress('restore')
+                    self._restore_stashed_trans(trans_stash, trans_path)
+                    logger.info(f"Restored trans/ directory for user {user.username}")
 
-            # 3. 恢复 trans/ 目录
-            if trans_backup:
-                self._restore_trans_directory(trans_backup, user_assets_path / 'trans')
-                logger.info(f"Restored trans/ directory for user {user.username}")
+            # 通知依赖账本内容的缓存（首次克隆 changed_paths 为 None，全部失效）
+            if changed_paths is None or changed_paths:
+                publish_ledger_change(user, changed_paths)
 
             # 4. 检测并注释重复的对账条目
             reconciliation_comment_result = None
+            self._report_progress('reconcile')
             try:
                 from project.apps.reconciliation.services import ReconciliationCommentService
                 reconciliation_comment_result = ReconciliationCommentService.detect_and_comment_duplicates(user)
@@ -385,6 +404,7 @@ class PlatformGitService:
                 'status': 'success',
                 'message': '同步成功',
                 'synced_at': git_repo.last_sync_at,
+                'changed_paths': changed_paths,
                 'reconciliation_comment_result': reconciliation_comment_result
             }
 
@@ -397,6 +417,9 @@ class PlatformGitService:
             git_repo.sync_error = error_msg
             git_repo.save()
 
+            # 同步中途失败时工作区可能已部分更新
+            publish_ledger_change(user)
+
             return {
                 'status': 'failed',
                 'message': f'同步失败: {error_msg}',
@@ -463,11 +486,17 @@ class PlatformGitService:
             logger.error(f"Failed to regenerate deploy key for user {user.username}: {e}")
             raise GitServiceException(f"重新生成 Deploy Key 失败: {e}")
 
-    def create_trans_download_archive(self, user: User) -> str:
-        """创建 trans/ 目录的 ZIP 压缩包供用户下载
+    def stream_trans_download_archive(self, user: User, compress: bool = True) -> Iterator[bytes]:
+        """流式生成 trans/ 目录的 ZIP 压缩包供用户下载
+
+        目录检查在调用时立即完成；返回的生成器在发送响应时才逐个读取并压缩文件，不生成临时文件。
+
+        Args:
+            user: 用户
+            compress: 是否 DEFLATE 压缩（False 时按 STORED 写入，适合追求首字节速度的场景）
 
         Returns:
-            ZIP 文件的路径
+            ZIP 文件内容块的迭代器
         """
         try:
             git_repo = user.git_repo
@@ -480,24 +509,12 @@ class PlatformGitService:
         if not trans_path.exists():
             raise GitServiceException("trans/ 目录不存在")
 
-        # 创建临时 ZIP 文件
-        temp_dir = tempfile.mkdtemp()
-        zip_path = os.path.join(temp_dir, f"{user.username}_trans.zip")
-
-        try:
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for file_path in trans_path.rglob('*.bean'):
-                    arcname = os.path.join('trans', str(file_path.relative_to(trans_path)))
-                    zipf.write(file_path, arcname)
-
-            logger.info(f"Created trans/ archive for user {user.username}: {zip_path}")
-            return zip_path
+        def entries():
+            for file_path in sorted(trans_path.rglob('*.bean')):
+                yield file_path, os.path.join('trans', str(file_path.relative_to(trans_path)))
 
-        except Exception as e:
-            # 清理临时文件
-            if os.path.exists(zip_path):
-                os.remove(zip_path)
-            raise GitServiceException(f"创建压缩包失败: {e}")
+        logger.info(f"Streaming trans/ archive for user {user.username}")
+        return iter_zip_stream(entries(), compress=compress)
 
     def _generate_ssh_key_pair(self) -> tuple[str, str]:
         """生成 SSH 密钥对
@@ -550,6 +567,7 @@ class PlatformGitService:
 
                 # 3. 在用户目录中初始化 git 仓库、提交并推送
                 self._init_and_push_template_in_user_directory(git_repo, template_dir)
+                publish_ledger_change(git_repo.owner)
 
                 logger.info(f"成功为仓库 {git_repo.repo_name} 初始化模板内容")
 
@@ -602,9 +620,9 @@ class PlatformGitService:
                 logger.info(f"Repository {git_repo.repo_name} is empty, skipping clone")
                 return
 
-            # 仓库不为空，进行克隆
+            # 仓库不为空，进行克隆（浅克隆/部分克隆由配置决定）
             clone_result = subprocess.run(
-                ['git', 'clone', clone_url, str(target_path)],
+                ['git', 'clone', *self._clone_depth_args(), clone_url, str(target_path)],
                 env=env,
                 capture_output=True,
                 text=True,
@@ -619,7 +637,7 @@ class PlatformGitService:
                 os.remove(ssh_key_file)
 
     def _pull_repository(self, git_repo: GitRepository, repo_path: Path):
-        """更新现有仓库"""
+        """更新现有仓库：仅 fetch 默认分支（按配置限制深度）后 reset --hard"""
         ssh_key_file = self._prepare_ssh_key(git_repo)
 
         try:
@@ -627,26 +645,33 @@ class PlatformGitService:
             env = os.environ.copy()
             env['GIT_SSH_COMMAND'] = f'ssh -i {ssh_key_file} -o StrictHostKeyChecking=no'
 
-            # 切换到仓库目录
-            original_cwd = os.getcwd()
-            os.chdir(repo_path)
+            branch = (git_repo.default_branch or 'main').strip() or 'main'
+            fetch_args = ['git', 'fetch']
+            if settings.GIT_SYNC_CLONE_DEPTH > 0:
+                fetch_args += ['--depth', str(settings.GIT_SYNC_CLONE_DEPTH)]
+            # 显式 refspec：浅克隆为单分支，默认分支变更后也能取到 origin/<branch>
+            fetch_args += ['origin', f'+refs/heads/{branch}:refs/remotes/origin/{branch}']
+            subprocess.run(fetch_args, cwd=repo_path, env=env, check=True)
 
-            try:
-                # fetch 最新内容
-                subprocess.run(['git', 'fetch', 'origin'], env=env, check=True)
+            # 部分克隆时 reset 会按需拉取缺失的 blob，同样需要 SSH 环境
+            subprocess.run(['git', 'reset', '--hard', f'origin/{branch}'], cwd=repo_path, env=env, check=True)
 
-                branch = (git_repo.default_branch or 'main').strip() or 'main'
-                subprocess.run(['git', 'reset', '--hard', f'origin/{branch}'], check=True)
-
-                logger.info(f"Updated repository {git_repo.repo_name}")
-
-            finally:
-                os.chdir(original_cwd)
+            logger.info(f"Updated repository {git_repo.repo_name}")
 
         finally:
             if os.path.exists(ssh_key_file):
                 os.remove(ssh_key_file)
 
+    @staticmethod
+    def _clone_depth_args() -> List[str]:
+        """浅克隆/部分克隆参数：GIT_SYNC_CLONE_DEPTH>0 时限制历史深度，GIT_SYNC_PARTIAL_CLONE 时不预先下载 blob"""
+        args = []
+        if settings.GIT_SYNC_CLONE_DEPTH > 0:
+            args += ['--depth', str(settings.GIT_SYNC_CLONE_DEPTH)]
+        if settings.GIT_SYNC_PARTIAL_CLONE:
+            args.append('--filter=blob:none')
+        return args
+
     def _prepare_ssh_key(self, git_repo: GitRepository) -> str:
         """准备临时 SSH 密钥文件"""
         # 创建临时文件
@@ -686,6 +711,69 @@ class PlatformGitService:
         # 清理备份
         shutil.rmtree(backup_dir)
 
+    def _stash_trans_directory(self, trans_path: Path) -> Path:
+        """将 trans/ 目录重命名到仓库目录之外（同一文件系统，不复制文件）"""
+        stash_path = self.assets_base_path / f".{trans_path.parent.name}.trans-{secrets.token_hex(6)}"
+        trans_path.rename(stash_path)
+        return stash_path
+
+    def _restore_stashed_trans(self, stash_path: Path, trans_path: Path):
+        """将移开的 trans/ 目录移回，远程仓库中的 trans/ 内容以平台为准被替换"""
+        if trans_path.exists():
+            shutil.rmtree(trans_path)
+        trans_path.parent.mkdir(parents=True, exist_ok=True)
+        stash_path.rename(trans_path)
+
+    @staticmethod
+    def _is_untracked_ignored(repo_path: Path, relative_path: str) -> bool:
+        """路径被 .gitignore 忽略且不含已跟踪文件时，reset --hard 不会触碰该路径"""
+        ignored = subprocess.run(
+            ['git', 'check-ignore', '-q', f'{relative_path}/'],
+            cwd=repo_path, capture_output=True, text=True,
+        )
+        if ignored.returncode != 0:
+            return False
+        tracked = subprocess.run(
+            ['git', 'ls-files', '--', relative_path],
+            cwd=repo_path, capture_output=True, text=True,
+        )
+        return tracked.returncode == 0 and not tracked.stdout.strip()
+
+    @staticmethod
+    def _rev_parse_head(repo_path: Path) -> Optional[str]:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--verify', '-q', 'HEAD'],
+            cwd=repo_path, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            return None
+        return result.stdout.strip() or None
+
+    def _diff_changed_paths(self, repo_path: Path, old_head: Optional[str]) -> Optional[List[str]]:
+        """
+        获取 old_head 到当前 HEAD 之间变更的文件路径
+
+        只比较树对象，部分克隆无需下载 blob。
+
+        Returns:
+            变更路径列表；缺少旧提交或比较失败时返回 None（调用方应视为全部变更）
+        """
+        if old_head is None:
+            return None
+        new_head = self._rev_parse_head(repo_path)
+        if new_head is None:
+            return None
+        if new_head == old_head:
+            return []
+        result = subprocess.run(
+            ['git', 'diff', '--name-only', '--no-renames', old_head, new_head],
+            cwd=repo_path, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            logger.warning(f"git diff failed for {repo_path}: {(result.stderr or '').strip()[:500]}")
+            return None
+        return [line for line in result.stdout.splitlines() if line]
+
     # def _rebuild_trans_main_bean(self, user_assets_path: Path):
     #     """重建 trans/main.bean 的 include 关系"""
     #     trans_path = user_assets_path / 'trans'
@@ -820,6 +908,7 @@ class PlatformGitService:
             # 2. 重建标准的 main.bean 文件
             self._rebuild_standard_main_bean(user)
             cleaned_files.append('重建标准 main.bean')
+            publish_ledger_change(user)
 
             return cleaned_files
 
@@ -0,0 +1,179 @@
+# project/apps/git_repository/tasks.py
+"""
+Git 仓库异步同步
+
+同步（fetch、reset --hard 等）在 Celery 中执行，HTTP 请求只负责入队：
+- 每个仓库同一时刻只有一个同步在执行（缓存锁，每个阶段续期，只释放本任务持有的锁）
+- 每个仓库最多排队一个同步任务，排队期间到达的 Webhook / 手动触发合并到该任务
+- 同步进度写入缓存，供同步状态接口查询
+"""
+import logging
+import uuid
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import GitRepository
+from .services import PlatformGitService
+
+logger = logging.getLogger(__name__)
+
+# 锁被占用时重新检查的间隔（秒）
+SYNC_RETRY_COUNTDOWN = 5
+
+
+def _lock_key(repository_id) -> str:
+    return f'git_sync:lock:{repository_id}'
+
+
+# 仅当锁仍由本任务持有时才续期 / 释放（Redis 上以 Lua 脚本原子比较锁值）
+_EXTEND_LOCK_SCRIPT = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('expire', KEYS[1], ARGV[2]) end return 0"
+)
+_RELEASE_LOCK_SCRIPT = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+)
+
+
+def _new_lock_token() -> int:
+    # 锁值使用整数：Django 的 Redis 缓存按原样存储整数（不经 pickle），Lua 脚本可直接比较
+    return uuid.uuid4().int
+
+
+def _redis_client():
+    """默认缓存为 Redis 时返回其客户端，其他缓存后端（如测试中的本地内存缓存）返回 None"""
+    get_client = getattr(getattr(cache, '_cache', None), 'get_client', None)
+    return get_client(write=True) if get_client else None
+
+
+def _extend_lock(lock_key, token) -> bool:
+    """锁仍由 token 持有时续期 GIT_SYNC_LOCK_TIMEOUT，返回是否仍持有锁"""
+    client = _redis_client()
+    if client is not None:
+        key = cache.make_and_validate_key(lock_key)
+        return bool(client.eval(_EXTEND_LOCK_SCRIPT, 1, key, token, settings.GIT_SYNC_LOCK_TIMEOUT))
+    return cache.get(lock_key) == token and cache.touch(lock_key, settings.GIT_SYNC_LOCK_TIMEOUT)
+
+
+def _release_lock(lock_key, token) -> bool:
+    """锁仍由 token 持有时释放；锁已过期并被其他任务取得时保留，返回是否已释放"""
+    client = _redis_client()
+    if client is not None:
+        key = cache.make_and_validate_key(lock_key)
+        return bool(client.eval(_RELEASE_LOCK_SCRIPT, 1, key, token))
+    if cache.get(lock_key) != token:
+        return False
+    cache.delete(lock_key)
+    return True
+
+
+def _queued_key(repository_id) -> str:
+    return f'git_sync:queued:{repository_id}'
+
+
+def _progress_key(repository_id) -> str:
+    return f'git_sync:progress:{repository_id}'
+
+
+def _update_progress(repository_id, **fields):
+    progress = cache.get(_progress_key(repository_id)) or {}
+    progress.update(fields, updated_at=timezone.now().isoformat())
+    cache.set(_progress_key(repository_id), progress, timeout=24*3600)
+
+
+def get_sync_progress(repository_id):
+    """
+    获取仓库的同步进度
+
+    Args:
+        repository_id: 仓库ID
+
+    Returns:
+        dict | None: {'state', 'stage', 'queued', 'merged_events', 'task_id', 'updated_at'}，
+            从未通过队列同步时返回 None
+    """
+    progress = cache.get(_progress_key(repository_id))
+    if progress is None:
+        return None
+    progress['queued'] = cache.get(_queued_key(repository_id)) is not None
+    return progress
+
+
+def enqueue_repository_sync(git_repo: GitRepository, source: str = 'manual') -> dict:
+    """
+    将仓库同步加入队列；已有排队中的同步时合并到该任务
+
+    正在执行的同步不会吸收新事件（fetch 可能已完成），此时会排队一个新任务，
+    待当前同步释放锁后执行。
+
+    Args:
+        git_repo: Git 仓库
+        source: 触发来源（manual/webhook），仅用于日志
+
+    Returns:
+        dict: {'status': 'queued' | 'merged', 'task_id': 排队任务ID}
+    """
+    task_id = str(uuid.uuid4())
+    queued_key = _queued_key(git_repo.id)
+
+    if not cache.add(queued_key, task_id, timeout=settings.GIT_SYNC_LOCK_TIMEOUT):
+        queued_task_id = cache.get(queued_key)
+        progress = cache.get(_progress_key(git_repo.id)) or {}
+        _update_progress(git_repo.id, merged_events=progress.get('merged_events', 0) + 1)
+        logger.info(f"Merged {source} sync request for {git_repo.repo_name} into queued task {queued_task_id}")
+        return {'status': 'merged', 'task_id': queued_task_id}
+
+    if cache.get(_lock_key(git_repo.id)) is None:
+        _update_progress(git_repo.id, state='queued', stage=None, merged_events=0, task_id=task_id)
+    logger.info(f"Queued {source} sync for {git_repo.repo_name}: {task_id}")
+    sync_repository_task.apply_async(args=[git_repo.id], task_id=task_id)
+    return {'status': 'queued', 'task_id': task_id}
+
+
+@shared_task(bind=True, max_retries=None)
+def sync_repository_task(self, repository_id):
+    """执行仓库同步；同一仓库已有同步在执行时稍后重试"""
+    task_id = self.request.id
+    lock_key = _lock_key(repository_id)
+    lock_token = _new_lock_token()
+
+    if not cache.add(lock_key, lock_token, timeout=settings.GIT_SYNC_LOCK_TIMEOUT):
+        raise self.retry(countdown=SYNC_RETRY_COUNTDOWN)
+
+    try:
+        # 取得锁后才移除排队标记：此前到达的事件都会被本次 fetch 覆盖
+        cache.delete(_queued_key(repository_id))
+
+        try:
+            git_repo = GitRepository.objects.select_related('owner').get(id=repository_id)
+        except GitRepository.DoesNotExist:
+            cache.delete(_progress_key(repository_id))
+            return {'status': 'skipped', 'repository_id': repository_id}
+
+        _update_progress(repository_id, state='running', stage='start', merged_events=0, task_id=task_id)
+
+        def on_stage(stage):
+            _update_progress(repository_id, stage=stage)
+            # 每个阶段开始时续期，长时间同步不会因锁过期而与后续任务重叠
+            if not _extend_lock(lock_key, lock_token):
+                logger.warning(f"Git sync lock for {git_repo.repo_name} expired before stage {stage}")
+
+        service = PlatformGitService(progress_callback=on_stage)
+        try:
+            result = service.sync_repository(git_repo.owner)
+        except Exception as e:
+            logger.error(f"Git sync task failed for {git_repo.repo_name}: {e}", exc_info=True)
+            _update_progress(repository_id, state='failed', stage='done')
+            raise
+
+        _update_progress(repository_id, state=result.get('status'), stage='done')
+        return {
+            'status': result.get('status'),
+            'repository_id': repository_id,
+            'changed_paths': result.get('changed_paths'),
+        }
+
+    finally:
+        _release_lock(lock_key, lock_token)
@@ -1,15 +1,22 @@
 """
 Git 仓库模板服务
 负责从 GitHub 获取模板仓库内容并进行用户定制
+
+模板内容缓存在本地：文件内容按 blob SHA 存储（内容寻址，跨模板版本复用），
+树结构按树 SHA 存储，分支引用记录 ETag。缓存命中时只发起一次条件请求获取树结构（304 不消耗配额），
+缺失的文件以有限并发下载。
 """
 
 import os
 import re
 import json
 import base64
+import hashlib
+import shutil
 import tempfile
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Any, Optional
 from urllib.parse import urlparse
@@ -38,6 +45,8 @@ class GitHubTemplateService:
     def __init__(self):
         self.template_url = self.TEMPLATE_REPOSITORY_URL
         self.template_branch = self.TEMPLATE_REPOSITORY_BRANCH
+        self.api_url = settings.GITHUB_API_URL
+        self.cache_path = Path(settings.GIT_TEMPLATE_CACHE_PATH)
 
         # 解析仓库信息
         self.owner, self.repo = self._parse_repository_url(self.template_url)
@@ -100,6 +109,9 @@ class GitHubTemplateService:
     def fetch_template_content(self) -> Path:
         """从 GitHub 获取模板仓库内容
 
+        模板目录中的文件可能是缓存的硬链接，修改时须写入新文件后替换（见 customize_template_for_user），
+        不能原地写入。
+
         Returns:
             临时目录路径，包含模板仓库内容
         """
@@ -117,14 +129,14 @@ class GitHubTemplateService:
                     wait_seconds = max(0, reset_time - current_time)
                     logger.warning(f"GitHub API 限制即将用尽，将在 {wait_seconds} 秒后重置")
 
-            # 创建临时目录
-            temp_dir = Path(tempfile.mkdtemp(prefix='template_'))
-
-            # 获取仓库树结构
+            # 获取仓库树结构（缓存命中时为条件请求）
             tree_data = self._get_repository_tree()
 
-            # 下载所有文件
-            self._download_files(tree_data, temp_dir)
+            # 下载缓存中缺失的文件
+            self._download_files(tree_data)
+
+            # 从缓存生成模板目录（与缓存同一文件系统时使用硬链接）
+            temp_dir = self._materialize_tree(tree_data)
 
             logger.info(f"成功获取模板仓库内容到: {temp_dir}")
             return temp_dir
@@ -134,16 +146,25 @@ class GitHubTemplateService:
             raise TemplateServiceException(f"获取模板仓库内容失败: {e}")
 
     def _get_repository_tree(self) -> Dict[str, Any]:
-        """获取仓库树结构"""
-        api_url = f"https://api.github.com/repos/{self.owner}/{self.repo}/git/trees/{self.template_branch}"
+        """获取仓库树结构（携带上次的 ETag，未变化时直接使用缓存的树结构）"""
+        api_url = f"{self.api_url}/repos/{self.owner}/{self.repo}/git/trees/{self.template_branch}"
 
         # 递归获取所有文件
         params = {'recursive': '1'}
 
+        ref = self._read_cached_ref()
+        cached_tree = self._read_cached_tree(ref['sha']) if ref else None
+        headers = dict(self.headers)
+        if cached_tree is not None and ref.get('etag'):
+            headers['If-None-Match'] = ref['etag']
+
         try:
-            response = self.session.get(api_url, headers=self.headers, params=params)
+            response = self.session.get(api_url, headers=headers, params=params)
 
-            if response.status_code == 404:
+            if response.status_code == 304 and cached_tree is not None:
+                logger.info(f"模板仓库树结构未变化，使用缓存: {ref['sha']}")
+                return cached_tree
+            elif response.status_code == 404:
                 raise TemplateServiceException(f"模板仓库不存在或无权访问: {self.owner}/{self.repo}")
             elif response.status_code == 403:
                 # 检查是否是限流
@@ -163,7 +184,10 @@ class GitHubTemplateService:
             elif response.status_code != 200:
                 raise TemplateServiceException(f"GitHub API 请求失败: {response.status_code}")
 
-            return response.json()
+            tree_data = response.json()
+            etag = response.headers.get('ETag')
+            self._write_cached_tree(tree_data, etag if isinstance(etag, str) else None)
+            return tree_data
 
         except requests.exceptions.SSLError as e:
             logger.error(f"GitHub API SSL 连接错误: {e}")
@@ -178,31 +202,106 @@ class GitHubTemplateService:
             logger.error(f"GitHub API 请求异常: {e}")
             raise TemplateServiceException(f"GitHub API 请求失败: {e}")
 
-    def _download_files(self, tree_data: Dict[str, Any], temp_dir: Path):
-        """下载所有文件到临时目录"""
-        total_files = len([item for item in tree_data.get('tree', []) if item['type'] == 'blob'])
-        downloaded_files = 0
-
+    def _download_files(self, tree_data: Dict[str, Any]):
+        """以有限并发下载缓存中缺失的文件，按 blob SHA 存入缓存"""
+        missing = {}
         for item in tree_data.get('tree', []):
-            if item['type'] == 'blob':  # 只处理文件，不处理目录
-                file_path = item['path']
-                file_url = item['url']
-
-                # 下载文件内容（带重试机制）
-                file_content = self._download_file_content_with_retry(file_url, file_path)
-
-                # 创建文件路径
-                full_path = temp_dir / file_path
+            if item['type'] == 'blob' and not self._blob_path(item['sha']).exists():  # 只处理文件，不处理目录
+                missing.setdefault(item['sha'], item)
+        if not missing:
+            logger.info("模板文件全部命中缓存")
+            return
+
+        def download(item):
+            # 下载文件内容（带重试机制）
+            file_content = self._download_file_content_with_retry(item['url'], item['path'])
+            if isinstance(file_content, str):
+                file_content = file_content.encode('utf-8')
+            self._write_blob(item['sha'], file_content)
+            logger.debug(f"下载文件: {item['path']}")
+
+        workers = max(1, min(settings.GIT_TEMPLATE_DOWNLOAD_WORKERS, len(missing)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # list() 使任一下载失败时抛出异常
+            list(executor.map(download, missing.values()))
+        logger.info(f"下载模板文件 {len(missing)} 个（并发 {workers}）")
+
+    def _materialize_tree(self, tree_data: Dict[str, Any]) -> Path:
+        """从缓存生成模板目录：优先硬链接，跨文件系统等无法链接时复制"""
+        tmp_root = self.cache_path / 'tmp'
+        tmp_root.mkdir(parents=True, exist_ok=True)
+        temp_dir = Path(tempfile.mkdtemp(prefix='template_', dir=str(tmp_root)))
+        try:
+            for item in tree_data.get('tree', []):
+                if item['type'] != 'blob':
+                    continue
+                full_path = temp_dir / item['path']
                 full_path.parent.mkdir(parents=True, exist_ok=True)
+                blob_path = self._blob_path(item['sha'])
+                try:
+                    os.link(blob_path, full_path)
+                except OSError:
+                    shutil.copyfile(blob_path, full_path)
+        except Exception:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+        return temp_dir
+
+    def _blob_path(self, sha: str) -> Path:
+        return self.cache_path / 'blobs' / sha[:2] / sha
+
+    def _write_blob(self, sha: str, content: bytes):
+        """校验 git blob SHA 后原子写入缓存，避免并发创建仓库时读到不完整的文件"""
+        digest = hashlib.sha1(b'blob %d\0' % len(content) + content).hexdigest()
+        if digest != sha:
+            raise TemplateServiceException(f"模板文件校验失败: {sha}")
+        self._write_atomic(self._blob_path(sha), content)
+
+    @staticmethod
+    def _write_atomic(path: Path, content: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _ref_path(self) -> Path:
+        return self.cache_path / 'refs' / self.owner / self.repo / f'{self.template_branch}.json'
+
+    def _read_cached_ref(self) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self._ref_path().read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
 
-                # 写入文件
-                if isinstance(file_content, bytes):
-                    full_path.write_bytes(file_content)
-                else:
-                    full_path.write_text(file_content, encoding='utf-8')
-
-                downloaded_files += 1
-                logger.debug(f"下载文件 ({downloaded_files}/{total_files}): {file_path}")
+    def _read_cached_tree(self, tree_sha: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads((self.cache_path / 'trees' / f'{tree_sha}.json').read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+
+    def _write_cached_tree(self, tree_data: Dict[str, Any], etag: Optional[str]):
+        """按树 SHA 缓存树结构，并记录分支引用的 ETag"""
+        tree_sha = tree_data.get('sha')
+        if not isinstance(tree_sha, str) or not tree_sha:
+            return
+        try:
+            self._write_atomic(
+                self.cache_path / 'trees' / f'{tree_sha}.json',
+                json.dumps(tree_data).encode('utf-8'),
+            )
+            self._write_atomic(
+                self._ref_path(),
+                json.dumps({'sha': tree_sha, 'etag': etag}).encode('utf-8'),
+            )
+        except OSError as e:
+            # 缓存写入失败不影响本次获取
+            logger.warning(f"写入模板缓存失败: {e}")
 
     def _download_file_content(self, file_url: str) -> bytes | str:
         """下载单个文件内容"""
@@ -305,8 +404,8 @@ class GitHubTemplateService:
             else:
                 logger.warning(f"模板中未找到标题配置，跳过用户名替换")
 
-            # 写回文件
-            main_bean_path.write_text(content, encoding='utf-8')
+            # 写回文件：模板文件可能是缓存的硬链接，写入新文件后替换，不修改缓存内容
+            self._write_atomic(main_bean_path, content.encode('utf-8'))
 
             logger.info(f"成功为用户 {user.username} 定制模板内容")
 
@@ -338,7 +437,7 @@ class GitHubTemplateService:
             包含限制信息的字典
         """
         try:
-            response = self.session.get('https://api.github.com/rate_limit', headers=self.headers)
+            response = self.session.get(f'{self.api_url}/rate_limit', headers=self.headers)
 
             if response.status_code == 200:
                 data = response.json()
@@ -0,0 +1,115 @@
+"""异步同步队列：排队期间的事件合并、同仓库互斥与进度查询（同步逻辑 mock）。"""
+
+from unittest.mock import patch
+
+import pytest
+from celery.exceptions import Retry
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..models import GitRepository
+from ..services import PlatformGitService
+from ..tasks import enqueue_repository_sync, get_sync_progress, sync_repository_task
+
+User = get_user_model()
+
+
+@pytest.fixture
+def git_repo():
+    user = User.objects.create_user(username="sync_queue_user", password="x")
+    repo = GitRepository.objects.create(
+        owner=user,
+        repo_name="syncq-assets",
+        deploy_key_private="priv",
+        deploy_key_public="pub",
+    )
+    yield repo
+    for key in ('lock', 'queued', 'progress'):
+        cache.delete(f'git_sync:{key}:{repo.id}')
+
+
+@pytest.mark.django_db
+@patch.object(sync_repository_task, "apply_async")
+def test_events_merged_while_sync_queued(mock_apply_async, git_repo):
+    results = [enqueue_repository_sync(git_repo, source='webhook') for _ in range(3)]
+
+    assert [r['status'] for r in results] == ['queued', 'merged', 'merged']
+    assert len({r['task_id'] for r in results}) == 1
+    mock_apply_async.assert_called_once_with(args=[git_repo.id], task_id=results[0]['task_id'])
+
+    progress = get_sync_progress(git_repo.id)
+    assert progress['state'] == 'queued'
+    assert progress['queued'] is True
+    assert progress['merged_events'] == 2
+
+
+@pytest.mark.django_db
+@patch.object(PlatformGitService, "sync_repository", autospec=True)
+def test_sync_task_reports_progress_and_releases_lock(mock_sync, git_repo):
+    seen = []
+
+    def fake_sync(service, user):
+        service._report_progress('fetch')
+        seen.append(get_sync_progress(git_repo.id))
+        return {'status': 'success'}
+
+    mock_sync.side_effect = fake_sync
+    client = APIClient()
+    client.force_authenticate(user=git_repo.owner)
+
+    response = client.post(reverse("git-sync"))
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert response.data['status'] == 'queued'
+    assert seen[0]['state'] == 'running'
+    assert seen[0]['stage'] == 'fetch'
+    # 取得锁后排队标记即被移除，执行期间到达的事件会排队新的同步
+    assert seen[0]['queued'] is False
+    assert cache.get(f'git_sync:lock:{git_repo.id}') is None
+
+    response = client.get(reverse("git-sync-status"))
+    progress = response.data['progress']
+    assert progress['state'] == 'success'
+    assert progress['stage'] == 'done'
+    assert progress['task_id'] == seen[0]['task_id']
+
+
+@pytest.mark.django_db
+@patch.object(PlatformGitService, "sync_repository")
+def test_sync_task_retries_while_repository_locked(mock_sync, git_repo):
+    cache.set(f'git_sync:lock:{git_repo.id}', 'running-task')
+
+    with patch.object(sync_repository_task, "retry", side_effect=Retry()) as mock_retry, \
+            pytest.raises(Retry):
+        sync_repository_task.apply(args=[git_repo.id])
+
+    mock_retry.assert_called_once()
+    mock_sync.assert_not_called()
+    assert cache.get(f'git_sync:lock:{git_repo.id}') == 'running-task'
+
+
+@pytest.mark.django_db
+@patch.object(PlatformGitService, "sync_repository", autospec=True)
+def test_sync_task_keeps_lock_taken_over_by_another_task(mock_sync, git_repo):
+    lock_key = f'git_sync:lock:{git_repo.id}'
+
+    def fake_sync(service, user):
+        service._report_progress('fetch')
+        # 锁过期后被下一个同步任务取得
+        cache.set(lock_key, 'next-task')
+        service._report_progress('reset')
+        return {'status': 'success'}
+
+    mock_sync.side_effect = fake_sync
+    with override_settings(GIT_SYNC_LOCK_TIMEOUT=60), \
+            patch.object(cache, 'touch', wraps=cache.touch) as mock_touch:
+        sync_repository_task.apply(args=[git_repo.id])
+
+    # 只在仍持有锁的阶段续期
+    mock_touch.assert_called_once_with(lock_key, 60)
+    # 本任务结束时不删除其他任务持有的锁
+    assert cache.get(lock_key) == 'next-task'
@@ -0,0 +1,103 @@
+"""sync_repository：浅克隆 + 增量 fetch，trans/ 移开而非复制，返回变更路径（使用本地 file:// 远程仓库）。"""
+
+import shutil
+import subprocess
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+
+from ..models import GitRepository
+from ..services import PlatformGitService
+
+User = get_user_model()
+
+
+def _git(cwd, *args):
+    return subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+def _commit(work, files, message):
+    for name, content in files.items():
+        path = work / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding='utf-8')
+    _git(work, 'add', '-A')
+    _git(work, '-c', 'user.name=t', '-c', 'user.email=t@t', 'commit', '-q', '-m', message)
+    _git(work, 'push', '-q', 'origin', 'main')
+
+
+@pytest.fixture
+def remote(tmp_path):
+    """本地裸仓库作为远程，work 为推送用的工作副本"""
+    bare = tmp_path / 'remote.git'
+    _git(tmp_path, 'init', '-q', '--bare', '-b', 'main', str(bare))
+    _git(bare, 'config', 'uploadpack.allowFilter', 'true')
+    work = tmp_path / 'work'
+    _git(tmp_path, 'clone', '-q', str(bare), str(work))
+    _git(work, 'checkout', '-q', '-b', 'main')
+    return bare, work
+
+
+def _sync_service(tmp_path, bare, username, stages):
+    user = User.objects.create_user(username=username, password='x')
+    GitRepository.objects.create(
+        owner=user,
+        repo_name=f'{username}-assets',
+        remote_ssh_url=bare.as_uri(),
+        deploy_key_private='priv',
+        deploy_key_public='pub',
+        setup_mode='link',
+        provider='github',
+    )
+    svc = PlatformGitService(progress_callback=stages.append)
+    svc.assets_base_path = tmp_path / 'Assets'
+    return user, svc, svc.assets_base_path / f'{username}-assets'
+
+
+@pytest.mark.django_db
+@override_settings(GIT_SYNC_CLONE_DEPTH=1, GIT_SYNC_PARTIAL_CLONE=True)
+@pytest.mark.parametrize('gitignore_trans', [True, False])
+def test_shallow_sync_preserves_trans_without_copy(remote, tmp_path, gitignore_trans):
+    bare, work = remote
+    files = {'main.bean': 'include "account.bean"\n', 'account.bean': ';\n', 'income.bean': ';\n'}
+    if gitignore_trans:
+        files['.gitignore'] = 'trans/\n'
+    else:
+        # 远程也含 trans/ 内容时，以平台本地 trans/ 为准
+        files['trans/main.bean'] = '; remote\n'
+    _commit(work, files, 'init')
+    _commit(work, {'account.bean': '; v2\n'}, 'second')
+
+    stages = []
+    user, svc, repo_path = _sync_service(tmp_path, bare, f'shallow{int(gitignore_trans)}', stages)
+
+    with patch('project.apps.git_repository.services.shutil.copytree', side_effect=AssertionError('trans/ 被复制')):
+        first = svc.sync_repository(user)
+        assert first['status'] == 'success', first
+        assert first['changed_paths'] is None
+        assert (repo_path / '.git' / 'shallow').exists()
+        assert _git(repo_path, 'rev-list', '--count', 'HEAD').strip() == '1'
+
+        trans = repo_path / 'trans'
+        shutil.rmtree(trans, ignore_errors=True)
+        trans.mkdir()
+        (trans / 'main.bean').write_text('; platform\n', encoding='utf-8')
+        (trans / '2025.bean').write_text('2025-01-01 * "x"\n', encoding='utf-8')
+
+        _commit(work, {'income.bean': '; v2\n', 'expenses.bean': ';\n'}, 'third')
+        stages.clear()
+        second = svc.sync_repository(user)
+
+    assert second['status'] == 'success', second
+    # trans/ 被忽略时 reset --hard 不会触碰，无需移开
+    assert ('backup' in stages) is not gitignore_trans
+    assert sorted(second['changed_paths']) == ['expenses.bean', 'income.bean']
+    assert (repo_path / 'expenses.bean').exists()
+    assert (trans / 'main.bean').read_text(encoding='utf-8') == '; platform\n'
+    assert (trans / '2025.bean').exists()
+    # 移开的 trans/ 不残留在 Assets 目录中
+    assert sorted(p.name for p in svc.assets_base_path.iterdir()) == [repo_path.name]
+
+    assert svc.sync_repository(user)['changed_paths'] == []
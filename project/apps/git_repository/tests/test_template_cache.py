@@ -0,0 +1,125 @@
+"""模板本地缓存：树结构 ETag 条件请求、按 blob SHA 并发下载（使用本地 HTTP 服务模拟 GitHub API）。"""
+
+import base64
+import hashlib
+import json
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+
+from ..template_service import GitHubTemplateService
+
+User = get_user_model()
+
+
+def _blob_sha(content: bytes) -> str:
+    return hashlib.sha1(b'blob %d\0' % len(content) + content).hexdigest()
+
+
+class FakeGitHub:
+    """最小的 GitHub trees/blobs API，记录收到的请求路径"""
+
+    def __init__(self, files):
+        self.requests = []
+        self.set_files(files)
+        handler = self._handler()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def set_files(self, files):
+        self.blobs = {_blob_sha(content): content for content in files.values()}
+        self.paths = {path: _blob_sha(content) for path, content in files.items()}
+        self.tree_sha = hashlib.sha1(json.dumps(self.paths, sort_keys=True).encode()).hexdigest()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status, data=None, headers=None):
+                body = json.dumps(data).encode() if data is not None else b''
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                fake.requests.append(path)
+                etag = f'"{fake.tree_sha}"'
+                if '/git/trees/' in path:
+                    if self.headers.get('If-None-Match') == etag:
+                        return self._json(304, headers={'ETag': etag})
+                    tree = [{'path': 'account', 'type': 'tree', 'sha': 'd' * 40}]
+                    tree += [
+                        {'path': p, 'type': 'blob', 'sha': sha, 'url': f'{fake.url}/blobs/{sha}'}
+                        for p, sha in fake.paths.items()
+                    ]
+                    return self._json(200, {'sha': fake.tree_sha, 'tree': tree}, {'ETag': etag})
+                if path.startswith('/blobs/'):
+                    content = fake.blobs[path.rsplit('/', 1)[1]]
+                    return self._json(200, {'encoding': 'base64', 'content': base64.b64encode(content).decode()})
+                self._json(404, {})
+
+        return Handler
+
+    def blob_requests(self):
+        return [p for p in self.requests if p.startswith('/blobs/')]
+
+
+@pytest.fixture
+def github():
+    fake = FakeGitHub({
+        'main.bean': 'option "title" "模板账本"\n'.encode(),
+        'account/assets.bean': b'1970-01-01 open Assets:Cash\n',
+        'account/equity.bean': b'1970-01-01 open Equity:Opening\n',
+    })
+    fake.thread.start()
+    yield fake
+    fake.server.shutdown()
+    fake.server.server_close()
+
+
+@pytest.mark.django_db
+def test_warm_cache_fetches_only_tree(github, tmp_path):
+    user = User.objects.create_user(username='template_cache_user', password='x')
+
+    with override_settings(GITHUB_API_URL=github.url, GIT_TEMPLATE_CACHE_PATH=str(tmp_path / 'cache'),
+                           GIT_TEMPLATE_DOWNLOAD_WORKERS=2):
+        service = GitHubTemplateService()
+        service.check_api_rate_limit = lambda: {}
+
+        first = service.fetch_template_content()
+        assert len(github.blob_requests()) == 3
+        assert (first / 'account' / 'assets.bean').read_bytes() == b'1970-01-01 open Assets:Cash\n'
+
+        # 定制不能改写缓存中（硬链接）的文件内容
+        service.customize_template_for_user(first, user)
+        shutil.rmtree(first)
+
+        github.requests.clear()
+        second = service.fetch_template_content()
+        assert github.requests == [f'/repos/{service.owner}/{service.repo}/git/trees/{service.template_branch}']
+        assert (second / 'main.bean').read_text(encoding='utf-8') == 'option "title" "模板账本"\n'
+        shutil.rmtree(second)
+
+        # 模板更新后只下载新增内容
+        github.set_files({
+            'main.bean': 'option "title" "模板账本"\n'.encode(),
+            'account/assets.bean': b'1970-01-01 open Assets:Bank\n',
+            'account/equity.bean': b'1970-01-01 open Equity:Opening\n',
+        })
+        github.requests.clear()
+        third = service.fetch_template_content()
+        assert len(github.blob_requests()) == 1
+        assert (third / 'account' / 'assets.bean').read_bytes() == b'1970-01-01 open Assets:Bank\n'
+        shutil.rmtree(third)
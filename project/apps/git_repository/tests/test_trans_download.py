@@ -0,0 +1,72 @@
+"""trans/ 目录下载：流式返回 ZIP，不生成临时文件。"""
+
+import io
+import zipfile
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..models import GitRepository
+from ..services import PlatformGitService
+
+User = get_user_model()
+
+
+@pytest.fixture
+def client_with_repo(db, tmp_path):
+    user = User.objects.create_user(username="download_user", password="x")
+    GitRepository.objects.create(
+        owner=user,
+        repo_name="download-assets",
+        deploy_key_private="private",
+        deploy_key_public="public",
+    )
+    trans_path = tmp_path / "download-assets" / "trans"
+    (trans_path / "2025").mkdir(parents=True)
+    (trans_path / "main.bean").write_text('include "2025/01.bean"\n', encoding="utf-8")
+    (trans_path / "2025" / "01.bean").write_text("2025-01-01 open Assets:Cash\n", encoding="utf-8")
+    (trans_path / "notes.txt").write_text("ignored", encoding="utf-8")
+
+    service = PlatformGitService()
+    service.assets_base_path = tmp_path
+    client = APIClient()
+    client.force_authenticate(user=user)
+    with patch("project.apps.git_repository.views.GitTransDownloadView.get_git_service", return_value=service):
+        yield client, user
+
+
+def test_trans_download_streams_zip(client_with_repo):
+    client, user = client_with_repo
+
+    response = client.get(reverse("git-trans-download"))
+
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Disposition"] == 'attachment; filename="download_user_trans.zip"'
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+    assert archive.namelist() == ["trans/2025/01.bean", "trans/main.bean"]
+    assert archive.read("trans/2025/01.bean") == "2025-01-01 open Assets:Cash\n".encode("utf-8")
+
+
+def test_trans_download_uncompressed(client_with_repo):
+    client, user = client_with_repo
+
+    response = client.get(reverse("git-trans-download"), {"compress": "0"})
+
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+    assert {info.compress_type for info in archive.infolist()} == {zipfile.ZIP_STORED}
+
+
+@pytest.mark.django_db
+def test_trans_download_without_git_repository():
+    user = User.objects.create_user(username="nogit_user", password="x")
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.get(reverse("git-trans-download"))
+
+    assert response.status_code == 404
+    assert response.data["error"] == "用户未启用 Git 功能"
@@ -1,10 +1,9 @@
-import os
 import json
 import hashlib
 import hmac
 import logging
 from django.conf import settings
-from django.http import HttpResponse, FileResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.request import Request
@@ -16,11 +15,12 @@ from drf_spectacular.utils import extend_schema, OpenApiResponse
 from .models import GitRepository
 from .serializers import (
     GitRepositorySerializer, CreateRepositorySerializer, LinkRepositorySerializer,
-    SyncStatusSerializer, SyncResponseSerializer,
+    SyncStatusSerializer, SyncQueueResponseSerializer,
     WebhookPayloadSerializer, DeployKeyResponseSerializer,
     DeleteRepositoryResponseSerializer,
 )
 from .services import PlatformGitService, GitServiceException
+from .tasks import enqueue_repository_sync, get_sync_progress
 
 logger = logging.getLogger(__name__)
 
@@ -221,31 +221,29 @@ class GitSyncView(APIView):
 
     permission_classes = [permissions.IsAuthenticated]
 
-    def get_git_service(self):
-        return PlatformGitService()
-
     @extend_schema(
         summary="手动触发同步",
         responses={
-            200: SyncResponseSerializer,
+            202: SyncQueueResponseSerializer,
             404: OpenApiResponse(description="用户未启用 Git 功能")
         }
     )
     def post(self, request: Request) -> Response:
-        """手动触发从远程仓库同步"""
+        """将从远程仓库同步加入队列，进度通过同步状态接口查询"""
         try:
-            git_service = self.get_git_service()
-            result = git_service.sync_repository(request.user)
-
-            serializer = SyncResponseSerializer(result)
-            return Response(serializer.data)
-
-        except GitServiceException as e:
+            git_repo = request.user.git_repo
+        except GitRepository.DoesNotExist:
             return Response(
-                {'error': str(e)}, 
+                {'error': '用户未启用 Git 功能'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        result = enqueue_repository_sync(git_repo, source='manual')
+        result['message'] = '同步已加入队列' if result['status'] == 'queued' else '已合并到排队中的同步'
+
+        serializer = SyncQueueResponseSerializer(result)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
 
 class GitSyncStatusView(APIView):
     """Git 同步状态视图"""
@@ -267,7 +265,8 @@ class GitSyncStatusView(APIView):
             data = {
                 'status': git_repo.sync_status,
                 'last_sync_at': git_repo.last_sync_at,
-                'error': git_repo.sync_error
+                'error': git_repo.sync_error,
+                'progress': get_sync_progress(git_repo.id),
             }
 
             serializer = SyncStatusSerializer(data)
@@ -299,9 +298,6 @@ class GitWebhookView(APIView):
 
     permission_classes = []
 
-    def get_git_service(self):
-        return PlatformGitService()
-
     @extend_schema(
         summary="处理 Git push Webhook",
         request=WebhookPayloadSerializer,
@@ -406,12 +402,12 @@ class GitWebhookView(APIView):
 
     def _sync_and_respond(self, git_repo: GitRepository, label: str) -> Response:
         try:
-            git_service = self.get_git_service()
-            result = git_service.sync_repository(git_repo.owner)
-            logger.info('Webhook triggered sync for %s: %s', label, result.get('status'))
+            result = enqueue_repository_sync(git_repo, source='webhook')
+            logger.info('Webhook %s sync for %s: %s', result['status'], label, result['task_id'])
             return Response({
-                'message': 'Sync triggered successfully',
-                'status': result.get('status'),
+                'message': 'Sync queued',
+                'status': result['status'],
+                'task_id': result['task_id'],
             })
         except Exception as e:
             logger.error('Webhook processing error: %s', e, exc_info=True)
@@ -434,30 +430,16 @@ class GitTransDownloadView(APIView):
         }
     )
     def get(self, request: Request) -> Response:
-        """下载 trans/ 目录的 ZIP 压缩包"""
+        """下载 trans/ 目录的 ZIP 压缩包（边压缩边发送）"""
         try:
             git_service = self.get_git_service()
-            zip_path = git_service.create_trans_download_archive(request.user)
+            # compress=0 时按 STORED 写入，不做压缩
+            compress = request.query_params.get('compress', '1') not in ('0', 'false')
+            chunks = git_service.stream_trans_download_archive(request.user, compress=compress)
 
-            # 创建文件响应
             filename = f"{request.user.username}_trans.zip"
-
-            response = FileResponse(
-                open(zip_path, 'rb'),
-                content_type='application/zip'
-            )
+            response = StreamingHttpResponse(chunks, content_type='application/zip')
             response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-            # 清理临时文件（在响应发送后）
-            def cleanup():
-                try:
-                    os.remove(zip_path)
-                except:
-                    pass
-
-            # 注册清理函数（Django 会在响应发送后调用）
-            response._cleanup_func = cleanup
-
             return response
 
         except GitServiceException as e:
@@ -1,6 +1,7 @@
 from django.contrib.auth.models import User
 
 from project.apps.account.models import Account
+from project.apps.common.resource_cache import bump_resource_version
 
 
 class BatchUpdateMappingError(Exception):
@@ -31,4 +32,6 @@ def batch_update_mapping_accounts(
     except Account.DoesNotExist:
         raise BatchUpdateMappingError("指定的账户不存在或无权限访问")
 
-    return mappings.update(**{account_fk_name: account_id})
+    updated = mappings.update(**{account_fk_name: account_id})
+    bump_resource_version(user.id, model._meta.model_name)
+    return updated
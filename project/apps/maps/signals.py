@@ -1,7 +1,11 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from allauth.account.signals import user_signed_up
-from .models import Template
-from .views import TemplateViewSet
+from project.apps.common.resource_cache import bump_resource_version
+from .models import Assets, Expense, Income, Template
+from .template_apply import apply_mapping_template
+
+MAPPING_RESOURCE_NAMES = {Expense: 'expense', Assets: 'assets', Income: 'income'}
 
 @receiver(user_signed_up)
 def apply_official_templates_on_signup(sender, request, user, **kwargs):
@@ -13,15 +17,33 @@ def apply_official_templates(user):
     # 获取所有官方模板
     official_templates = Template.objects.filter(is_official=True)
 
-    # 创建一个模拟的视图实例来处理模板应用
-    view = TemplateViewSet()
-    view.request = type('Request', (), {'user': user})()  # 模拟请求对象
-
     for template in official_templates:
         # 使用合并方式，跳过冲突
-        if template.type == 'expense':
-            view._apply_expense_template(template, 'merge', 'skip')
-        elif template.type == 'income':
-            view._apply_income_template(template, 'merge', 'skip')
-        elif template.type == 'assets':
-            view._apply_assets_template(template, 'merge', 'skip')
+        apply_mapping_template(
+            user=user,
+            template=template,
+            action_type='merge',
+            conflict_resolution='skip',
+        )
+
+
+@receiver(post_save, sender=Expense)
+@receiver(post_save, sender=Assets)
+@receiver(post_save, sender=Income)
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=Assets)
+@receiver(post_delete, sender=Income)
+def invalidate_mapping_cache(sender, instance, **kwargs):
+    """映射新增、修改或删除后使用户映射列表缓存失效"""
+    bump_resource_version(instance.owner_id, MAPPING_RESOURCE_NAMES[sender])
+
+
+@receiver(m2m_changed, sender=Expense.tags.through)
+@receiver(m2m_changed, sender=Assets.tags.through)
+@receiver(m2m_changed, sender=Income.tags.through)
+def invalidate_mapping_tags_cache(sender, instance, action, model, **kwargs):
+    """映射标签关联变化后使用户映射列表缓存失效（正向与反向关联均以标签或映射的属主计）"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    mapping_model = type(instance) if type(instance) in MAPPING_RESOURCE_NAMES else model
+    bump_resource_version(instance.owner_id, MAPPING_RESOURCE_NAMES[mapping_model])
@@ -0,0 +1,133 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from project.apps.account.models import Account
+from project.apps.common.resource_cache import bump_resource_version
+from project.apps.maps.models import Assets, Expense, Income
+
+
+# 模板类型 -> (映射模型, 指向账户的外键字段, 从模板项复制的字段)
+MAPPING_TEMPLATE_FIELDS = {
+    'expense': (Expense, 'expend', ('payee', 'currency')),
+    'income': (Income, 'income', ('payer',)),
+    'assets': (Assets, 'assets', ('full',)),
+}
+
+
+def apply_mapping_template(
+    *,
+    user: User,
+    template,
+    action_type: str,
+    conflict_resolution: str = 'skip',
+    json_tag_map: dict = None,
+    skip_missing_accounts: bool = False,
+) -> dict:
+    """批量应用映射模板到用户。
+
+    预先加载用户账户、现有映射与标签，在内存中计算差异后批量写入，语义与逐项应用一致：
+    - overwrite：删除用户该类型的全部映射后创建所有模板项
+    - merge：关键字已存在时按 conflict_resolution 跳过（skip）或删除后重建（overwrite）
+    - append：不检查关键字冲突，直接追加所有模板项
+    - 模板账户在用户账户中不存在时，映射账户置空并记录到 missing_accounts
+      （skip_missing_accounts 为真时不创建该映射）
+    - 支出映射按模板项标签路径关联用户标签
+
+    Args:
+        user: 目标用户
+        template: 映射模板
+        action_type: merge、overwrite 或 append
+        conflict_resolution: skip 或 overwrite（仅 merge 模式有效）
+        json_tag_map: 官方支出标签路径（key -> 标签路径列表），为空时按需从 JSON 加载
+        skip_missing_accounts: 是否跳过账户不存在的模板项
+
+    Returns:
+        包含 created、skipped、overwritten、missing_accounts 的结果字典
+    """
+    model, account_field, item_fields = MAPPING_TEMPLATE_FIELDS[template.type]
+    result = {
+        'created': 0,
+        'skipped': 0,
+        'overwritten': 0,
+        'missing_accounts': []
+    }
+
+    with transaction.atomic():
+        mappings = model.objects.filter(owner=user)
+        existing_ids = {}
+        if action_type == 'overwrite':
+            # 删除用户现有的所有该类型映射
+            mappings.delete()
+        elif action_type == 'merge':
+            # 与 .first() 一致：同一关键字取主键最小的映射
+            for mapping_id, key in mappings.order_by('-pk').values_list('id', 'key'):
+                existing_ids[key] = mapping_id
+
+        account_ids = dict(Account.objects.filter(owner=user).values_list('account', 'id'))
+
+        to_delete = []
+        to_create = []
+        for item in template.items.all():
+            if item.key in existing_ids:
+                if conflict_resolution == 'skip':
+                    result['skipped'] += 1
+                    continue
+                elif conflict_resolution == 'overwrite':
+                    to_delete.append(existing_ids[item.key])
+                    result['overwritten'] += 1
+
+            # 根据账户路径在目标用户账户中查找
+            account_id = None
+            if item.account:
+                account_id = account_ids.get(item.account)
+                if account_id is None:
+                    result['missing_accounts'].append({
+                        'key': item.key,
+                        'account': item.account
+                    })
+                    if skip_missing_accounts:
+                        continue
+
+            mapping = model(
+                owner=user,
+                key=item.key,
+                **{f'{account_field}_id': account_id},
+                **{field: getattr(item, field) for field in item_fields}
+            )
+            to_create.append((item, mapping))
+            result['created'] += 1
+
+        if to_delete:
+            model.objects.filter(id__in=to_delete).delete()
+        model.objects.bulk_create([mapping for _, mapping in to_create])
+
+        if template.type == 'expense':
+            _bulk_apply_expense_tags(user, to_create, json_tag_map)
+
+        # bulk_create 不触发 post_save，需显式使映射列表缓存失效
+        bump_resource_version(user.id, template.type)
+
+    return result
+
+
+def _bulk_apply_expense_tags(user, created, json_tag_map=None):
+    """按模板项标签路径为新建的支出映射批量写入标签关联。"""
+    from project.apps.account.management.commands.official_templates_loader import (
+        load_official_expense_tag_paths_by_key,
+        resolve_expense_template_item_tag_paths,
+    )
+    from project.apps.tags.signals import get_user_tags_by_path, resolve_user_tags_by_paths
+
+    if not created:
+        return
+    if json_tag_map is None:
+        json_tag_map = load_official_expense_tag_paths_by_key()
+
+    tags_by_path = get_user_tags_by_path(user)
+    through = Expense.tags.through
+    links = []
+    for item, expense in created:
+        tag_paths = resolve_expense_template_item_tag_paths(item, json_tag_map)
+        tag_ids = dict.fromkeys(tag.id for tag in resolve_user_tags_by_paths(user, tag_paths, tags_by_path))
+        links.extend(through(expense_id=expense.id, tag_id=tag_id) for tag_id in tag_ids)
+    through.objects.bulk_create(links)
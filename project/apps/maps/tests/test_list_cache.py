@@ -0,0 +1,123 @@
+"""映射、账户与标签列表的版本号条件缓存测试。"""
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from project.apps.account.models import Account
+from project.apps.maps.models import Expense, Template, TemplateItem
+from project.apps.maps.template_apply import apply_mapping_template
+from project.apps.tags.models import Tag
+
+User = get_user_model()
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(username='listcacheuser', password='testpass123')
+
+
+@pytest.fixture
+def client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.fixture
+def food(user):
+    account = Account.objects.create(owner=user, account='Expenses:Food')
+    Expense.objects.create(owner=user, key='餐厅', expend=account)
+    return account
+
+
+@pytest.mark.django_db
+class TestVersionedListCache:
+    def test_unchanged_list_served_without_queries(self, client, food, django_assert_num_queries):
+        response = client.get('/api/expense/')
+        etag = response['ETag']
+        assert response.status_code == 200
+        assert [item['key'] for item in response.data] == ['餐厅']
+
+        with django_assert_num_queries(0):
+            not_modified = client.get('/api/expense/', HTTP_IF_NONE_MATCH=etag)
+            cached = client.get('/api/expense/')
+
+        assert not_modified.status_code == 304
+        assert not_modified['ETag'] == etag
+        assert cached.status_code == 200
+        assert cached.data == response.data
+
+    def test_etag_depends_on_query_string(self, client, food):
+        etag = client.get('/api/expense/')['ETag']
+        assert client.get('/api/expense/?key=餐厅', HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_writes_invalidate_dependent_lists(self, client, user, food):
+        expense_etag = client.get('/api/expense/')['ETag']
+        account_etag = client.get('/api/account/')['ETag']
+        tag_etag = client.get('/api/tags/')['ETag']
+
+        # 账户改名：映射列表展示账户路径，需失效
+        food.account = 'Expenses:Dining'
+        food.save()
+        response = client.get('/api/expense/', HTTP_IF_NONE_MATCH=expense_etag)
+        assert response.status_code == 200
+        assert response.data[0]['expend']['account'] == 'Expenses:Dining'
+        expense_etag = response['ETag']
+
+        # 映射关联标签：标签列表的映射数量与映射列表的标签均变化
+        tag = Tag.objects.create(owner=user, name='Life')
+        Expense.objects.get(owner=user).tags.add(tag)
+        response = client.get('/api/tags/', HTTP_IF_NONE_MATCH=tag_etag)
+        assert response.status_code == 200
+        assert response.data[0]['mapping_count']['expense'] == 1
+        response = client.get('/api/expense/', HTTP_IF_NONE_MATCH=expense_etag)
+        assert [item['full_path'] for item in response.data[0]['tags']] == ['Life']
+
+        # 通过接口新增映射：账户列表的映射数量变化
+        client.post('/api/expense/', {'key': '外卖', 'expend_id': food.id}, format='json')
+        response = client.get('/api/account/', HTTP_IF_NONE_MATCH=account_etag)
+        assert response.status_code == 200
+        counts = {item['account']: item['mapping_count']['expense'] for item in response.data}
+        assert counts['Expenses:Dining'] == 2
+
+    def test_bulk_writes_invalidate_lists(self, client, user, food):
+        etag = client.get('/api/expense/')['ETag']
+        template = Template.objects.create(name='支出模板', type='expense', owner=user)
+        TemplateItem.objects.create(template=template, key='咖啡', account='Expenses:Food')
+
+        apply_mapping_template(user=user, template=template, action_type='merge')
+
+        response = client.get('/api/expense/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert sorted(item['key'] for item in response.data) == ['咖啡', '餐厅']
+
+    def test_lists_cached_per_user(self, client, food):
+        other = User.objects.create_user(username='listcacheother', password='testpass123')
+        other_client = APIClient()
+        other_client.force_authenticate(user=other)
+
+        etag = client.get('/api/expense/')['ETag']
+        response = other_client.get('/api/expense/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 200
+        assert response.data == []
+
+
+@pytest.mark.django_db
+class TestOptInCursorPagination:
+    def test_unpaginated_without_params(self, client, user):
+        Account.objects.create(owner=user, account='Assets:Bank')
+        response = client.get('/api/account/')
+        assert isinstance(response.data, list)
+
+    def test_cursor_pages(self, client, user):
+        for name in ('Assets:Bank', 'Assets:Cash', 'Expenses:Food', 'Income:Salary'):
+            Account.objects.create(owner=user, account=name)
+
+        first = client.get('/api/account/?page_size=3')
+        assert [item['account'] for item in first.data['results']] == [
+            'Assets', 'Assets:Bank', 'Assets:Cash'
+        ]
+        second = client.get(first.data['next'])
+        assert [item['account'] for item in second.data['results']] == ['Expenses', 'Expenses:Food', 'Income']
+        assert second.data['previous']
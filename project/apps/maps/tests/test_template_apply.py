@@ -0,0 +1,121 @@
+"""映射模板批量应用测试。"""
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from project.apps.account.models import Account
+from project.apps.maps.models import Assets, Expense, Income, Template, TemplateItem
+from project.apps.maps.template_apply import apply_mapping_template
+from project.apps.tags.models import Tag
+
+User = get_user_model()
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(username='templateapplyuser', password='testpass123')
+
+
+def create_template(owner, template_type, items):
+    template = Template.objects.create(name=f'{template_type} 模板', type=template_type, owner=owner)
+    TemplateItem.objects.bulk_create([TemplateItem(template=template, **item) for item in items])
+    return template
+
+
+@pytest.fixture
+def expense_template(user):
+    return create_template(user, 'expense', [
+        {'key': '餐厅', 'account': 'Expenses:Food', 'payee': '饭店', 'currency': 'CNY', 'tag_paths': ['Life/Food']},
+        {'key': '地铁', 'account': 'Expenses:Transport', 'tag_paths': ['Life', 'Life/Food', 'Missing']},
+        {'key': '未知', 'account': 'Expenses:Unknown', 'tag_paths': []},
+    ])
+
+
+@pytest.fixture
+def chart(user):
+    Account.objects.create(owner=user, account='Expenses:Food')
+    Account.objects.create(owner=user, account='Expenses:Transport')
+    life = Tag.objects.create(name='Life', owner=user)
+    Tag.objects.create(name='Food', parent=life, owner=user)
+
+
+@pytest.mark.django_db
+class TestApplyMappingTemplate:
+    def test_merge_skip_keeps_existing(self, user, chart, expense_template):
+        existing = Expense.objects.create(owner=user, key='餐厅', payee='旧收款方')
+
+        result = apply_mapping_template(user=user, template=expense_template, action_type='merge')
+
+        assert result == {
+            'created': 2,
+            'skipped': 1,
+            'overwritten': 0,
+            'missing_accounts': [{'key': '未知', 'account': 'Expenses:Unknown'}],
+        }
+        assert list(Expense.objects.filter(owner=user, key='餐厅')) == [existing]
+        subway = Expense.objects.get(owner=user, key='地铁')
+        assert subway.expend.account == 'Expenses:Transport'
+        assert sorted(subway.tags.values_list('name', flat=True)) == ['Food', 'Life']
+        assert Expense.objects.get(owner=user, key='未知').expend is None
+
+    def test_merge_overwrite_replaces_first_existing(self, user, chart, expense_template):
+        first = Expense.objects.create(owner=user, key='餐厅', payee='旧收款方')
+        second = Expense.objects.create(owner=user, key='餐厅', payee='重复关键字')
+
+        result = apply_mapping_template(
+            user=user, template=expense_template, action_type='merge', conflict_resolution='overwrite'
+        )
+
+        assert (result['created'], result['skipped'], result['overwritten']) == (3, 0, 1)
+        assert not Expense.objects.filter(pk=first.pk).exists()
+        assert Expense.objects.filter(pk=second.pk).exists()
+        restaurant = Expense.objects.exclude(pk=second.pk).get(owner=user, key='餐厅')
+        assert (restaurant.payee, restaurant.currency) == ('饭店', 'CNY')
+        assert list(restaurant.tags.values_list('name', flat=True)) == ['Food']
+
+    def test_overwrite_action_replaces_all(self, user, chart):
+        Income.objects.create(owner=user, key='旧收入')
+        Account.objects.create(owner=user, account='Income:Salary')
+        template = create_template(user, 'income', [{'key': '工资', 'account': 'Income:Salary', 'payer': '公司'}])
+
+        result = apply_mapping_template(user=user, template=template, action_type='overwrite')
+
+        assert result['created'] == 1
+        assert list(Income.objects.filter(owner=user).values_list('key', 'payer', 'income__account')) == [
+            ('工资', '公司', 'Income:Salary')
+        ]
+
+    def test_query_count_independent_of_template_size(self, user, chart, django_assert_max_num_queries):
+        Account.objects.create(owner=user, account='Assets:Bank')
+        template = create_template(user, 'assets', [
+            {'key': f'卡{i}', 'account': 'Assets:Bank', 'full': f'银行卡{i}'} for i in range(300)
+        ])
+        Assets.objects.create(owner=user, key='卡0', full='已有')
+
+        with django_assert_max_num_queries(12):
+            result = apply_mapping_template(
+                user=user, template=template, action_type='merge', conflict_resolution='overwrite'
+            )
+
+        assert (result['created'], result['overwritten']) == (300, 1)
+        assert Assets.objects.filter(owner=user, assets__account='Assets:Bank').count() == 300
+
+    def test_expense_tags_bulk_inserted(self, user, chart, django_assert_max_num_queries):
+        template = create_template(user, 'expense', [
+            {'key': f'k{i}', 'account': 'Expenses:Food', 'tag_paths': ['Life', 'Life/Food']} for i in range(200)
+        ])
+
+        with django_assert_max_num_queries(12):
+            apply_mapping_template(user=user, template=template, action_type='merge')
+
+        assert Expense.tags.through.objects.filter(expense__owner=user).count() == 400
+
+    def test_apply_view_response(self, user, chart, expense_template):
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        response = client.post(f'/api/templates/{expense_template.id}/apply/', {'action': 'merge'}, format='json')
+
+        assert response.status_code == 200
+        assert response.data['result']['created'] == 3
+        assert '有 1 个映射的账户不存在' in response.data['message']
@@ -5,10 +5,10 @@ from rest_framework import status
 from rest_framework.exceptions import PermissionDenied
 from django.contrib.auth import get_user_model
 from project.apps.maps.models import Expense, Assets, Income, Template, TemplateItem
-from project.apps.account.models import Account
 from project.apps.common.permissions import TemplatePermission, IsOwnerOrAdminReadWriteOnly
 from project.apps.common.views import BaseMappingViewSet
 from project.apps.maps.batch_update import BatchUpdateMappingError, batch_update_mapping_accounts
+from project.apps.maps.template_apply import apply_mapping_template
 from project.apps.maps.serializers import (
     AssetsSerializer, ExpenseSerializer, IncomeSerializer,
     TemplateItemSerializer, TemplateListSerializer, TemplateDetailSerializer,
@@ -24,6 +24,7 @@ class ExpenseViewSet(BaseMappingViewSet):
     serializer_class = ExpenseSerializer
     search_fields = ['key', 'payee']
     ordering_fields = ['id', 'key']
+    cache_resources = ('expense', 'account', 'tag')
 
     def get_queryset(self):
         """优化查询，预加载标签"""
@@ -150,6 +151,8 @@ class AssetsViewSet(BaseMappingViewSet):
     search_fields = ['full']
     ordering_fields = ['id', 'full']
 
+    cache_resources = ('assets', 'account', 'tag')
+
     def get_queryset(self):
         """优化查询，预加载标签"""
         return super().get_queryset().prefetch_related('tags')
@@ -265,6 +268,7 @@ class IncomeViewSet(BaseMappingViewSet):
     serializer_class = IncomeSerializer
     search_fields = ['key']
     ordering_fields = ['id', 'key']
+    cache_resources = ('income', 'account', 'tag')
 
     def get_queryset(self):
         """优化查询，预加载标签"""
@@ -460,229 +464,30 @@ class TemplateViewSet(ModelViewSet):
 
     def _apply_expense_template(self, template, action_type, conflict_resolution):
         """应用支出模板"""
-        from project.apps.account.management.commands.official_templates_loader import (
-            load_official_expense_tag_paths_by_key,
-            resolve_expense_template_item_tag_paths,
+        return apply_mapping_template(
+            user=self.request.user,
+            template=template,
+            action_type=action_type,
+            conflict_resolution=conflict_resolution,
         )
-        from project.apps.tags.signals import apply_tags_to_mapping
-
-        json_tag_map = load_official_expense_tag_paths_by_key()
-        result = {
-            'created': 0,
-            'skipped': 0,
-            'overwritten': 0,
-            'missing_accounts': []
-        }
-
-        if action_type == 'overwrite':
-            # 删除用户现有的所有支出映射
-            Expense.objects.filter(owner=self.request.user).delete()
-            # 直接创建所有模板映射，无需检查冲突
-            for item in template.items.all():
-                # 根据账户路径在目标用户账户中查找
-                target_account = None
-                if item.account:  # item.account 现在是账户路径字符串
-                    target_account = Account.objects.filter(
-                        account=item.account,
-                        owner=self.request.user
-                    ).first()
-                    if not target_account:
-                        result['missing_accounts'].append({
-                            'key': item.key,
-                            'account': item.account
-                        })
-
-                expense = Expense.objects.create(
-                    owner=self.request.user,
-                    key=item.key,
-                    payee=item.payee,
-                    expend=target_account,
-                    currency=item.currency
-                )
-                tag_paths = resolve_expense_template_item_tag_paths(item, json_tag_map)
-                apply_tags_to_mapping(expense, self.request.user, tag_paths)
-                result['created'] += 1
-        else:  # merge 模式
-            for item in template.items.all():
-                # 检查是否已存在相同关键字的映射
-                existing = Expense.objects.filter(owner=self.request.user, key=item.key).first()
-
-                if existing:
-                    if conflict_resolution == 'skip':
-                        result['skipped'] += 1
-                        continue
-                    elif conflict_resolution == 'overwrite':
-                        existing.delete()
-                        result['overwritten'] += 1
-
-                # 根据账户路径在目标用户账户中查找
-                target_account = None
-                if item.account:  # item.account 现在是账户路径字符串
-                    target_account = Account.objects.filter(
-                        account=item.account,
-                        owner=self.request.user
-                    ).first()
-                    if not target_account:
-                        result['missing_accounts'].append({
-                            'key': item.key,
-                            'account': item.account
-                        })
-
-                # 创建新的映射
-                expense = Expense.objects.create(
-                    owner=self.request.user,
-                    key=item.key,
-                    payee=item.payee,
-                    expend=target_account,
-                    currency=item.currency
-                )
-                tag_paths = resolve_expense_template_item_tag_paths(item, json_tag_map)
-                apply_tags_to_mapping(expense, self.request.user, tag_paths)
-                result['created'] += 1
-
-        return result
 
     def _apply_income_template(self, template, action_type, conflict_resolution):
         """应用收入模板"""
-        result = {
-            'created': 0,
-            'skipped': 0,
-            'overwritten': 0,
-            'missing_accounts': []
-        }
-
-        if action_type == 'overwrite':
-            # 删除用户现有的所有收入映射
-            Income.objects.filter(owner=self.request.user).delete()
-            # 直接创建所有模板映射，无需检查冲突
-            for item in template.items.all():
-                # 根据账户路径在目标用户账户中查找
-                target_account = None
-                if item.account:  # item.account 现在是账户路径字符串
-                    target_account = Account.objects.filter(
-                        account=item.account,
-                        owner=self.request.user
-                    ).first()
-                    if not target_account:
-                        result['missing_accounts'].append({
-                            'key': item.key,
-                            'account': item.account
-                        })
-
-                Income.objects.create(
-                    owner=self.request.user,
-                    key=item.key,
-                    payer=item.payer,
-                    income=target_account
-                )
-                result['created'] += 1
-        else:  # merge 模式
-            for item in template.items.all():
-                # 检查是否已存在相同关键字的映射
-                existing = Income.objects.filter(owner=self.request.user, key=item.key).first()
-
-                if existing:
-                    if conflict_resolution == 'skip':
-                        result['skipped'] += 1
-                        continue
-                    elif conflict_resolution == 'overwrite':
-                        existing.delete()
-                        result['overwritten'] += 1
-
-                # 根据账户路径在目标用户账户中查找
-                target_account = None
-                if item.account:  # item.account 现在是账户路径字符串
-                    target_account = Account.objects.filter(
-                        account=item.account,
-                        owner=self.request.user
-                    ).first()
-                    if not target_account:
-                        result['missing_accounts'].append({
-                            'key': item.key,
-                            'account': item.account
-                        })
-
-                # 创建新的映射
-                Income.objects.create(
-                    owner=self.request.user,
-                    key=item.key,
-                    payer=item.payer,
-                    income=target_account
-                )
-                result['created'] += 1
-
-        return result
+        return apply_mapping_template(
+            user=self.request.user,
+            template=template,
+            action_type=action_type,
+            conflict_resolution=conflict_resolution,
+        )
 
     def _apply_assets_template(self, template, action_type, conflict_resolution):
         """应用资产模板"""
-        result = {
-            'created': 0,
-            'skipped': 0,
-            'overwritten': 0,
-            'missing_accounts': []
-        }
-
-        if action_type == 'overwrite':
-            # 删除用户现有的所有资产映射
-            Assets.objects.filter(owner=self.request.user).delete()
-            # 直接创建所有模板映射，无需检查冲突
-            for item in template.items.all():
-                # 根据账户路径在目标用户账户中查找
-                target_account = None
-                if item.account:  # item.account 现在是账户路径字符串
-                    target_account = Account.objects.filter(
-                        account=item.account,
-                        owner=self.request.user
-                    ).first()
-                    if not target_account:
-                        result['missing_accounts'].append({
-                            'key': item.key,
-                            'account': item.account
-                        })
-
-                Assets.objects.create(
-                    owner=self.request.user,
-                    key=item.key,
-                    full=item.full,
-                    assets=target_account
-                )
-                result['created'] += 1
-        else:  # merge 模式
-            for item in template.items.all():
-                # 检查是否已存在相同关键字的映射
-                existing = Assets.objects.filter(owner=self.request.user, key=item.key).first()
-
-                if existing:
-                    if conflict_resolution == 'skip':
-                        result['skipped'] += 1
-                        continue
-                    elif conflict_resolution == 'overwrite':
-                        existing.delete()
-                        result['overwritten'] += 1
-
-                # 根据账户路径在目标用户账户中查找
-                target_account = None
-                if item.account:  # item.account 现在是账户路径字符串
-                    target_account = Account.objects.filter(
-                        account=item.account,
-                        owner=self.request.user
-                    ).first()
-                    if not target_account:
-                        result['missing_accounts'].append({
-                            'key': item.key,
-                            'account': item.account
-                        })
-
-                # 创建新的映射
-                Assets.objects.create(
-                    owner=self.request.user,
-                    key=item.key,
-                    full=item.full,
-                    assets=target_account
-                )
-                result['created'] += 1
-
-        return result
+        return apply_mapping_template(
+            user=self.request.user,
+            template=template,
+            action_type=action_type,
+            conflict_resolution=conflict_resolution,
+        )
 
 class TemplateItemViewSet(ModelViewSet):
     """模板项管理视图集"""
@@ -13,6 +13,7 @@ from beancount import loader
 from beancount.core.data import Transaction, Pad, Balance
 
 from project.utils.file import BeanFileManager
+from project.utils.ledger_events import publish_ledger_change
 from .entry_matcher import EntryMatcher
 
 logger = logging.getLogger(__name__)
@@ -558,6 +559,8 @@ class ReconciliationCommentService:
         commented_count = ReconciliationCommentService._comment_lines_in_file(
             reconciliation_path, unique_line_numbers
         )
+        if commented_count:
+            publish_ledger_change(user, [reconciliation_path])
         
         return {
             'commented_count': commented_count,
@@ -576,5 +579,8 @@ class ReconciliationCommentService:
             取消注释的行数
         """
         reconciliation_path = BeanFileManager.get_reconciliation_bean_path(user)
-        return ReconciliationCommentService._uncomment_lines_in_file(reconciliation_path)
+        uncommented_count = ReconciliationCommentService._uncomment_lines_in_file(reconciliation_path)
+        if uncommented_count:
+            publish_ledger_change(user, [reconciliation_path])
+        return uncommented_count
 
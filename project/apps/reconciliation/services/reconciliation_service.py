@@ -15,6 +15,7 @@ from beancount import loader
 from beancount.core.data import Transaction, Pad, Balance
 
 from project.utils.file import BeanFileManager
+from project.utils.ledger_events import publish_ledger_change
 from .balance_calculation_service import BalanceCalculationService
 from .cycle_calculator import CycleCalculator
 from .account_currency_service import AccountCurrencyService
@@ -222,6 +223,7 @@ class ReconciliationService:
             if file_info:
                 try:
                     ReconciliationService._rollback_file_write(file_info)
+                    publish_ledger_change(task.content_object.owner, [file_info['file_path']])
                 except Exception as rollback_error:
                     logger.error(f"回滚文件写入失败: {rollback_error}", exc_info=True)
             
@@ -587,6 +589,7 @@ class ReconciliationService:
                     f.write(directive)
                     f.write('\n')
                 f.write('\n')
+            publish_ledger_change(user, [reconciliation_path])
             
             # 如果是新文件，确保 trans/main.bean 包含它
             if is_new_file:
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from project.models import BaseModel
+from project.apps.tags.utils import get_tag_tree
 
 
 class Tag(BaseModel):
@@ -85,9 +86,16 @@ class Tag(BaseModel):
         """
         获取标签的完整路径（包含父标签）
 
+        父标签路径取自用户标签树缓存，不再逐级查询；当前标签名使用内存中的值。
+
         Returns:
             str: 标签完整路径，如 "Category/EDUCATION" 或 "Irregular"
         """
+        if self.parent_id and self.owner_id:
+            tree = get_tag_tree(self.owner_id)
+            if self.parent_id in tree:
+                return f'{tree.get_full_path(self.parent_id)}/{self.name}'
+
         path_parts = []
         current = self
 
@@ -101,11 +109,15 @@ class Tag(BaseModel):
 
     def get_all_children(self):
         """
-        递归获取所有子标签ID
+        获取所有子标签ID（基于用户标签树缓存，不逐层查询）
 
         Returns:
             list: 所有子标签的ID列表（包括子标签的子标签）
         """
+        tree = get_tag_tree(self.owner_id)
+        if self.id in tree:
+            return tree.get_descendant_ids(self.id)
+
         child_ids = []
         for child in self.children.all():
             child_ids.append(child.id)
@@ -1,9 +1,11 @@
 import logging
 
 from allauth.account.signals import user_signed_up
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from project.apps.tags.models import Tag, TagTemplate
+from project.apps.tags.utils import bump_tag_tree_version
 
 logger = logging.getLogger(__name__)
 
@@ -39,8 +41,25 @@ def tag_exists_for_user(user, tag_path: str) -> bool:
     return get_tag_by_path_for_user(user, tag_path) is not None
 
 
-def resolve_user_tags_by_paths(user, tag_paths) -> list:
-    """将标签路径列表解析为用户 Tag 实例，跳过不存在的路径。"""
+def get_user_tags_by_path(user) -> dict:
+    """一次查询加载用户全部标签，返回 完整路径 -> Tag 的字典。"""
+    tags = {tag.id: tag for tag in Tag.objects.filter(owner=user)}
+    paths = {}
+
+    def path_of(tag):
+        if tag.id not in paths:
+            parent = tags.get(tag.parent_id)
+            paths[tag.id] = f'{path_of(parent)}/{tag.name}' if parent else tag.name
+        return paths[tag.id]
+
+    return {path_of(tag): tag for tag in tags.values()}
+
+
+def resolve_user_tags_by_paths(user, tag_paths, tags_by_path=None) -> list:
+    """将标签路径列表解析为用户 Tag 实例，跳过不存在的路径。
+
+    传入 tags_by_path（get_user_tags_by_path 的结果）时直接在内存中解析，不再逐级查询。
+    """
     if not tag_paths:
         return []
 
@@ -51,7 +70,10 @@ def resolve_user_tags_by_paths(user, tag_paths) -> list:
         tag_path = tag_path.strip()
         if not tag_path:
             continue
-        tag = get_tag_by_path_for_user(user, tag_path)
+        if tags_by_path is not None:
+            tag = tags_by_path.get(tag_path)
+        else:
+            tag = get_tag_by_path_for_user(user, tag_path)
         if tag is None:
             logger.warning("用户 %s 缺少标签 %s，映射关联已跳过", user.username, tag_path)
             continue
@@ -101,3 +123,10 @@ def apply_official_tag_templates(user):
 def apply_official_tag_templates_on_signup(sender, request, user, **kwargs):
     """用户注册时自动应用官方标签模板。"""
     apply_official_tag_templates(user)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_tree_cache(sender, instance, **kwargs):
+    """标签新增、改名、移动或删除后使用户标签树及标签列表缓存失效。"""
+    bump_tag_tree_version(instance.owner_id)
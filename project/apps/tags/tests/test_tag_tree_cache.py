@@ -0,0 +1,75 @@
+"""用户标签树缓存测试。"""
+import pytest
+from django.contrib.auth import get_user_model
+
+from project.apps.assistant.services.metadata_catalog import load_tag_catalog
+from project.apps.tags.models import Tag
+from project.apps.translate.services.tag_merger import merge_tags_with_details
+
+User = get_user_model()
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(username='tagtreeuser', password='testpass123')
+
+
+@pytest.fixture
+def deep_tag(user):
+    tag = Tag(name='A/B/C/D', owner=user)
+    tag.save()
+    Tag(name='A/B/X', owner=user).save()
+    return Tag.objects.get(pk=tag.pk)
+
+
+class TestTagTreeCache:
+    def test_full_path_without_queries_after_warmup(self, user, deep_tag, django_assert_num_queries):
+        assert deep_tag.get_full_path() == 'A/B/C/D'
+
+        tags = list(Tag.objects.filter(owner=user))
+        with django_assert_num_queries(0):
+            paths = sorted(tag.get_full_path() for tag in tags)
+        assert paths == ['A', 'A/B', 'A/B/C', 'A/B/C/D', 'A/B/X']
+
+    def test_descendants_without_queries(self, user, deep_tag, django_assert_num_queries):
+        root = Tag.objects.get(owner=user, name='A')
+        deep_tag.get_full_path()  # 预热标签树
+
+        with django_assert_num_queries(0):
+            descendant_ids = root.get_all_children()
+
+        assert [Tag.objects.get(pk=pk).name for pk in descendant_ids] == ['B', 'C', 'D', 'X']
+
+    def test_rename_and_move_invalidate_cache(self, user, deep_tag):
+        assert deep_tag.get_full_path() == 'A/B/C/D'
+
+        middle = Tag.objects.get(owner=user, name='B')
+        middle.name = 'Renamed'
+        middle.save()
+        assert Tag.objects.get(pk=deep_tag.pk).get_full_path() == 'A/Renamed/C/D'
+
+        c_tag = Tag.objects.get(owner=user, name='C')
+        c_tag.parent = None
+        c_tag.save()
+        assert Tag.objects.get(pk=deep_tag.pk).get_full_path() == 'C/D'
+        assert Tag.objects.get(owner=user, name='A').get_all_children() == [middle.pk, Tag.objects.get(name='X').pk]
+
+        c_tag.delete()
+        assert not Tag.objects.filter(owner=user, name='D').exists()
+        assert Tag.objects.get(owner=user, name='A').get_all_children() == [
+            middle.pk, Tag.objects.get(name='X').pk
+        ]
+
+    def test_merge_and_catalog_use_cached_paths(self, user, deep_tag, django_assert_num_queries):
+        load_tag_catalog(user)
+        sources = [{'tag': tag, 'source': {'type': 'mapping'}} for tag in Tag.objects.filter(owner=user)]
+
+        with django_assert_num_queries(0):
+            formatted, details = merge_tags_with_details(None, sources)
+
+        assert [detail['path'] for detail in details] == ['A', 'A/B', 'A/B/C', 'A/B/C/D', 'A/B/X']
+        assert formatted == '#A #A/B #A/B/C #A/B/C/D #A/B/X'
+
+        with django_assert_num_queries(1):
+            catalog = load_tag_catalog(user)
+        assert [entry.full_path for entry in catalog] == ['A', 'A/B', 'A/B/C', 'A/B/C/D', 'A/B/X']
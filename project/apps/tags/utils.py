@@ -0,0 +1,146 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from project.apps.common.resource_cache import bump_resource_version, get_resource_version
+
+# 标签树使用标签资源的版本号（跨进程共享，标签保存/删除时递增）
+TAG_RESOURCE = 'tag'
+# 进程内最多缓存的用户标签树数量
+TAG_TREE_CACHE_SIZE = 256
+
+# 进程内标签树缓存：{owner_id: (版本号, TagTree)}
+_tag_trees = OrderedDict()
+_tag_trees_lock = threading.Lock()
+
+# 标签树作用域内已解析的标签树：{owner_id: TagTree}，作用域外为 None
+_tag_tree_scope: ContextVar = ContextVar('tag_tree_scope', default=None)
+
+
+class TagTree:
+    """用户标签树快照，完整路径与后代查询均在内存中完成"""
+
+    def __init__(self, rows):
+        """
+        Args:
+            rows: (id, name, parent_id) 三元组序列
+        """
+        self.names = {}
+        self.parents = {}
+        self.children = {}
+        self._paths = {}
+        # 与 Tag.Meta.ordering 一致，子标签按名称排序
+        for tag_id, name, parent_id in sorted(rows, key=lambda row: row[1]):
+            self.names[tag_id] = name
+            self.parents[tag_id] = parent_id
+            self.children.setdefault(parent_id, []).append(tag_id)
+
+    def __contains__(self, tag_id):
+        return tag_id in self.names
+
+    def get_full_path(self, tag_id) -> str:
+        """
+        获取标签完整路径
+
+        Args:
+            tag_id: 标签ID
+
+        Returns:
+            str: 标签完整路径，如 "Category/EDUCATION"
+        """
+        if tag_id not in self._paths:
+            chain = []
+            current = tag_id
+            while current is not None and current not in self._paths:
+                chain.append(current)
+                current = self.parents[current]
+            prefix = self._paths[current] if current is not None else None
+            for node in reversed(chain):
+                prefix = f'{prefix}/{self.names[node]}' if prefix else self.names[node]
+                self._paths[node] = prefix
+        return self._paths[tag_id]
+
+    def get_descendant_ids(self, tag_id) -> list:
+        """
+        获取所有后代标签ID（前序遍历，顺序与逐层查询 children 一致）
+
+        Args:
+            tag_id: 标签ID
+
+        Returns:
+            list: 后代标签ID列表
+        """
+        descendants = []
+        stack = list(reversed(self.children.get(tag_id, [])))
+        while stack:
+            current = stack.pop()
+            descendants.append(current)
+            stack.extend(reversed(self.children.get(current, [])))
+        return descendants
+
+
+def get_tag_tree_version(owner_id):
+    """获取用户标签树版本号"""
+    return get_resource_version(TAG_RESOURCE, owner_id)
+
+
+def bump_tag_tree_version(owner_id):
+    """使用户标签树及标签列表缓存失效"""
+    bump_resource_version(owner_id, TAG_RESOURCE)
+
+
+@contextmanager
+def tag_tree_scope():
+    """
+    标签树作用域：作用域内每个用户的标签树只解析一次，
+    后续 get_tag_tree 不再读取缓存中的版本号（适用于批量解析等短时批处理）。
+    """
+    if _tag_tree_scope.get() is not None:
+        yield
+        return
+    token = _tag_tree_scope.set({})
+    try:
+        yield
+    finally:
+        _tag_tree_scope.reset(token)
+
+
+def get_tag_tree(owner_id) -> TagTree:
+    """
+    获取用户标签树（版本号未变化时直接使用进程内快照，不查询数据库；
+    处于 tag_tree_scope 内时复用作用域内已解析的标签树）
+
+    Args:
+        owner_id: 用户ID
+
+    Returns:
+        TagTree: 用户标签树
+    """
+    scoped = _tag_tree_scope.get()
+    if scoped is not None and owner_id in scoped:
+        return scoped[owner_id]
+    tree = _get_versioned_tag_tree(owner_id)
+    if scoped is not None:
+        scoped[owner_id] = tree
+    return tree
+
+
+def _get_versioned_tag_tree(owner_id) -> TagTree:
+    """按版本号读取进程内标签树快照，版本变化时重新查询数据库"""
+    from project.apps.tags.models import Tag
+
+    version = get_tag_tree_version(owner_id)
+    with _tag_trees_lock:
+        cached = _tag_trees.get(owner_id)
+        if cached and cached[0] == version:
+            _tag_trees.move_to_end(owner_id)
+            return cached[1]
+
+    tree = TagTree(Tag.objects.filter(owner_id=owner_id).values_list('id', 'name', 'parent_id'))
+    with _tag_trees_lock:
+        _tag_trees[owner_id] = (version, tree)
+        _tag_trees.move_to_end(owner_id)
+        while len(_tag_trees) > TAG_TREE_CACHE_SIZE:
+            _tag_trees.popitem(last=False)
+    return tree
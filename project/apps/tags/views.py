@@ -19,9 +19,10 @@ from project.apps.tags.serializers import (
 from project.apps.tags.filters import TagFilter
 from project.apps.common.permissions import IsOwnerOrAdminReadWriteOnly, AnonymousReadOnlyPermission
 from project.apps.common.filters import CurrentUserFilterBackend, AnonymousUserFilterBackend
+from project.apps.common.views import VersionedListMixin
 
 
-class TagViewSet(ModelViewSet):
+class TagViewSet(VersionedListMixin, ModelViewSet):
     """
     标签管理视图集
 
@@ -41,6 +42,7 @@ class TagViewSet(ModelViewSet):
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'created', 'modified']
     ordering = ['name']
+    cache_resources = ('tag', 'expense', 'assets', 'income')
 
     def get_serializer_class(self):
         """根据操作类型返回不同的序列化器"""
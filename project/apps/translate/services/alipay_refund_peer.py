@@ -56,7 +56,7 @@ def resolve_alipay_refund_peer(
 
 
 def build_ledger_index_for_user(user) -> Dict[str, RefundPeerSnapshot]:
-    return LedgerUuidIndexService.build_for_user(user)
+    return LedgerUuidIndexService.get_for_user(user)
 
 
 def resolve_refund_peer_for_row(
@@ -12,7 +12,7 @@ from project.apps.translate.views.CMB_Credit import *
 from project.apps.translate.views.ICBC_Debit import *
 from project.apps.translate.views.CCB_Debit import *
 from project.apps.translate.services.similarity import BertSimilarity, SpacySimilarity, DeepSeekSimilarity
-from project.apps.translate.services.mapping_provider import get_mapping_provider
+from project.apps.translate.services.mapping_provider import get_enabled_mapping_tags, get_mapping_provider
 import logging
 
 logger = logging.getLogger(__name__)
@@ -75,7 +75,7 @@ class AccountHandler:
             asset_instance = next((m for m in self._asset_mappings if m.key == asset_key), None)
             if asset_instance:
                 self.selected_asset_instance = asset_instance
-                self.asset_tags = list(asset_instance.tags.filter(enable=True))
+                self.asset_tags = get_enabled_mapping_tags(asset_instance)
                 self.asset_tag_sources = [
                     {
                         'tag': tag,
@@ -375,7 +375,7 @@ class ExpenseHandler:
     def _load_mapping_tags(self, mapping_instance):
         """加载映射关联的标签"""
         try:
-            self.mapping_tags = list(mapping_instance.tags.filter(enable=True))
+            self.mapping_tags = get_enabled_mapping_tags(mapping_instance)
         except Exception as e:
             logger.error(f"加载映射标签失败: {str(e)}")
             self.mapping_tags = []
@@ -390,7 +390,7 @@ class ExpenseHandler:
             else:
                 mapping_type = 'expense'
             for _, instance in conflict_candidates:
-                tags = list(instance.tags.filter(enable=True))
+                tags = get_enabled_mapping_tags(instance)
                 all_tags.extend(tags)
                 for tag in tags:
                     candidate_tag_sources.append({
@@ -48,6 +48,44 @@ class InitFactory:
                 return strategy()
         raise ValueError("当前账单不支持")
 
+    @classmethod
+    def sniff(cls, file, password=None):
+        """不做完整转换，根据文件开头识别账单类型
+
+        读取量受 project.utils.file 中 SNIFF_* 上限约束（CSV 开头 4KB、Excel 表头区域、PDF 首页）。
+        读取范围内无法确定时抛出 BillSniffInconclusiveError，而不是判定为不支持。
+
+        Returns:
+            匹配的策略类，不支持时返回 None
+
+        Raises:
+            UnsupportedFileTypeError: 文件类型不支持
+            DecryptionError: 加密文件未提供密码或密码错误
+            BillSniffInconclusiveError: 读取范围内无法确定账单类型
+        """
+        from project.utils.file import sniff_bill_head
+
+        first_line, source_text = sniff_bill_head(file, password)
+        for strategy in cls._strategies:
+            if strategy.sniff(first_line, source_text):
+                return strategy
+        return None
+
+    @classmethod
+    def encoding_hint(cls, head: bytes):
+        """根据原始内容首行匹配策略，返回其声明的源编码（无匹配时返回 None）"""
+        first_line = head.split(b'\n', 1)[0]
+        for strategy in cls._strategies:
+            if not strategy.SOURCE_ENCODING:
+                continue
+            try:
+                decoded = first_line.decode(strategy.SOURCE_ENCODING).strip()
+            except (UnicodeDecodeError, LookupError):
+                continue
+            if strategy.identifier(decoded):
+                return strategy.SOURCE_ENCODING
+        return None
+
     # @classmethod
     # def registered_strategies(cls) -> list:
     #     """返回已注册的策略类名称列表"""
@@ -12,6 +12,7 @@ class AlipayInitStrategy(InitStrategy):
 
     HEADER_MARKER = "-" * 84
     SKIP_ROWS = 24
+    SOURCE_ENCODING = "gb18030"
 
     def init(self, bill: Any, **kwargs) -> List[Dict[str, Any]]:
         csv_reader = csv.reader(bill)
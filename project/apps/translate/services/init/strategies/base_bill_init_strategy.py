@@ -3,6 +3,9 @@ from abc import ABC, abstractmethod
 from typing import List, Dict, Any
 
 class InitStrategy(ABC):
+    # 账单原始 CSV 的编码提示，None 表示未知（由 convert_to_utf8 严格校验后采用）
+    SOURCE_ENCODING = None
+
     @abstractmethod
     def init(self, bill: Any, **kwargs) -> List[Dict[str, Any]]:
         """初始化账单数据"""
@@ -14,6 +17,19 @@ class InitStrategy(ABC):
         """判断是否为当前策略的账单类型"""
         pass
 
+    @classmethod
+    def sniff(cls, first_line: str, source_text: str = '') -> bool:
+        """不做完整转换，根据源文件开头判断是否为当前策略的账单类型
+
+        Args:
+            first_line: 源文件首行（CSV 首行 / Excel 首行按 CSV 拼接）
+            source_text: 源文件表头区域文本（Excel 表头行 / PDF 首页文本）
+        """
+        if cls.identifier(first_line):
+            return True
+        source_identifier = getattr(cls, 'SOURCE_FILE_IDENTIFIER', None)
+        return bool(source_identifier) and source_identifier in source_text
+
     # @classmethod
     # def identifier(cls, first_line: str) -> bool:
     #     """判断是否为当前策略的账单类型"""
@@ -12,6 +12,7 @@ from beancount import loader
 from beancount.core.data import Transaction
 
 from project.utils.file import BeanFileManager
+from project.utils.ledger_events import LedgerDerivedCache
 
 logger = logging.getLogger(__name__)
 
@@ -48,37 +49,132 @@ def extract_expense_account_from_postings(postings) -> Optional[str]:
     return candidates[0][2]
 
 
+def _index_entries_by_file(entries) -> Dict[str, Dict[str, RefundPeerSnapshot]]:
+    """按来源文件分组构建 uuid -> 原单费用科目索引。"""
+    files: Dict[str, Dict[str, RefundPeerSnapshot]] = {}
+    for entry in entries:
+        if not isinstance(entry, Transaction):
+            continue
+        meta = getattr(entry, "meta", None) or {}
+        entry_uuid = meta.get("uuid")
+        if not entry_uuid:
+            continue
+        expense_account = extract_expense_account_from_postings(entry.postings)
+        if not expense_account:
+            continue
+        files.setdefault(meta.get("filename"), {})[str(entry_uuid)] = RefundPeerSnapshot(
+            expense_account=expense_account
+        )
+    return files
+
+
+def _file_stat(file_path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@dataclass
+class LedgerUuidIndex:
+    """账本 uuid 索引：files 为账本包含的每个文件（绝对路径）的索引，merged 为合并结果。
+
+    stats 记录构建时各文件（含 main.bean）的修改时间与大小，用于发现平台之外（如 Fava）的写入。
+    """
+    files: Dict[str, Dict[str, RefundPeerSnapshot]]
+    merged: Dict[str, RefundPeerSnapshot]
+    stats: Dict[str, Optional[Tuple[int, int]]]
+
+    @classmethod
+    def from_files(cls, files, stats) -> "LedgerUuidIndex":
+        merged: Dict[str, RefundPeerSnapshot] = {}
+        for file_index in files.values():
+            merged.update(file_index)
+        return cls(files=files, merged=merged, stats=stats)
+
+
 class LedgerUuidIndexService:
     @staticmethod
     def build_for_user(user) -> Dict[str, RefundPeerSnapshot]:
         """加载 main.bean，构建 uuid -> 原单费用科目索引。"""
-        main_bean_path = BeanFileManager.get_main_bean_path(user)
-        if not os.path.exists(main_bean_path):
-            return {}
+        return LedgerUuidIndexService.build_index(user).merged
+
+    @staticmethod
+    def get_for_user(user) -> Dict[str, RefundPeerSnapshot]:
+        """获取 uuid 索引（按账本代数缓存，账本变更后只重新加载变更的文件）。"""
+        return _ledger_uuid_index_cache.get(user).merged
+
+    @staticmethod
+    def build_index(user) -> LedgerUuidIndex:
+        main_bean_path = os.path.normpath(BeanFileManager.get_main_bean_path(user))
+        stats = {main_bean_path: _file_stat(main_bean_path)}
+        if stats[main_bean_path] is None:
+            return LedgerUuidIndex.from_files({}, stats)
 
         try:
-            entries, errors, _options = loader.load_file(main_bean_path)
+            entries, errors, options = loader.load_file(main_bean_path)
         except Exception as e:
             logger.error("加载账本失败 %s: %s", main_bean_path, e)
-            return {}
+            return LedgerUuidIndex.from_files({}, stats)
 
         if errors:
             logger.warning("账本加载有 %s 个警告/错误", len(errors))
 
-        index: Dict[str, RefundPeerSnapshot] = {}
-        for entry in entries:
-            if not isinstance(entry, Transaction):
-                continue
-            meta = getattr(entry, "meta", None) or {}
-            entry_uuid = meta.get("uuid")
-            if not entry_uuid:
-                continue
-            expense_account = extract_expense_account_from_postings(entry.postings)
-            if not expense_account:
+        # 记录账本包含的全部文件（含无 uuid 交易的文件），用于判断变更是否影响索引
+        files = {os.path.normpath(filename): {} for filename in options.get("include", [])}
+        files.update(_index_entries_by_file(entries))
+        stats.update((file_path, _file_stat(file_path)) for file_path in files)
+        return LedgerUuidIndex.from_files(files, stats)
+
+    @staticmethod
+    def update_index(user, index: LedgerUuidIndex, paths) -> Optional[LedgerUuidIndex]:
+        """
+        按变更路径只重新加载受影响的文件。
+
+        main.bean 变更、新增 .bean 文件（可能被 include 通配匹配）、文件被删除或变更文件自身包含 include 时
+        返回 None，由调用方完整重建。
+        """
+        assets_path = BeanFileManager.get_user_assets_path(user)
+        main_bean_path = os.path.normpath(BeanFileManager.get_main_bean_path(user))
+        files = dict(index.files)
+        stats = dict(index.stats)
+        # 事件路径相对账本目录，磁盘检测得到的是绝对路径，统一后去重
+        changed_files = {os.path.normpath(os.path.join(assets_path, path)) for path in paths}
+        for file_path in sorted(changed_files):
+            if file_path == main_bean_path:
+                return None
+            if file_path not in files:
+                if file_path.endswith(".bean"):
+                    return None
                 continue
-            index[str(entry_uuid)] = RefundPeerSnapshot(expense_account=expense_account)
+            stats[file_path] = _file_stat(file_path)
+            if stats[file_path] is None:
+                return None
+            try:
+                entries, _errors, options = loader.load_file(file_path)
+            except Exception as e:
+                logger.warning("增量加载账本文件失败 %s: %s", file_path, e)
+                return None
+            if len(options.get("include", [])) > 1:
+                return None
+            files[file_path] = _index_entries_by_file(entries).get(file_path, {})
+        return LedgerUuidIndex.from_files(files, stats)
 
-        return index
+    @staticmethod
+    def changed_on_disk(user, index: LedgerUuidIndex) -> frozenset:
+        """索引依赖的文件中修改时间或大小已变化的路径。"""
+        return frozenset(
+            file_path for file_path, stat in index.stats.items()
+            if _file_stat(file_path) != stat
+        )
+
+
+_ledger_uuid_index_cache = LedgerDerivedCache(
+    build=LedgerUuidIndexService.build_index,
+    update=LedgerUuidIndexService.update_index,
+    changed_on_disk=LedgerUuidIndexService.changed_on_disk,
+)
 
 
 def snapshot_from_parsed_entry(parsed: Dict) -> RefundPeerSnapshot:
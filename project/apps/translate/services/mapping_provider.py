@@ -5,16 +5,24 @@
 - 已登录用户：使用自己的实例数据
 - 匿名/新用户：使用官方模板数据
 """
+from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import List, Optional, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
 from project.apps.maps.models import Expense, Assets, Income, Template, TemplateItem
 from project.apps.account.models import Account, AccountTemplate, AccountTemplateItem
+from project.apps.tags.models import Tag
+from project.apps.tags.utils import get_tag_tree, tag_tree_scope
 import logging
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+# 解析作用域内复用的提供者：{user_id: MappingDataProvider}，作用域外为 None
+_provider_scope: ContextVar = ContextVar('mapping_provider_scope', default=None)
+
 
 @dataclass
 class MockAccountObject:
@@ -40,6 +48,7 @@ class TemplateExpenseMapping:
     currency: Optional[str]
     enable: bool = True
     tags: EmptyTagsManager = None
+    enabled_tags: List = field(default_factory=list)
 
     def __post_init__(self):
         if self.tags is None:
@@ -54,6 +63,7 @@ class TemplateAssetsMapping:
     assets: Optional[MockAccountObject]
     enable: bool = True
     tags: EmptyTagsManager = None
+    enabled_tags: List = field(default_factory=list)
 
     def __post_init__(self):
         if self.tags is None:
@@ -68,6 +78,7 @@ class TemplateIncomeMapping:
     income: Optional[MockAccountObject]
     enable: bool = True
     tags: EmptyTagsManager = None
+    enabled_tags: List = field(default_factory=list)
 
     def __post_init__(self):
         if self.tags is None:
@@ -81,6 +92,7 @@ class MappingDataProvider:
         self.user_id = user_id
         self.user = None
         self.use_templates = False
+        self._mappings = {}
 
         # 判断是否使用模板数据
         if user_id:
@@ -102,24 +114,23 @@ class MappingDataProvider:
 
     def get_expense_mappings(self, enable_only: bool = True) -> List:
         """获取支出映射数据"""
-        if self.use_templates:
-            return self._get_expense_from_template(enable_only)
-        else:
-            return self._get_expense_from_user(enable_only)
+        return self._get_mappings('expense', enable_only)
 
     def get_asset_mappings(self, enable_only: bool = True) -> List:
         """获取资产映射数据"""
-        if self.use_templates:
-            return self._get_assets_from_template(enable_only)
-        else:
-            return self._get_assets_from_user(enable_only)
+        return self._get_mappings('assets', enable_only)
 
     def get_income_mappings(self, enable_only: bool = True) -> List:
         """获取收入映射数据"""
-        if self.use_templates:
-            return self._get_income_from_template(enable_only)
-        else:
-            return self._get_income_from_user(enable_only)
+        return self._get_mappings('income', enable_only)
+
+    def _get_mappings(self, mapping_type: str, enable_only: bool) -> List:
+        """按类型读取映射，同一提供者内只查询一次"""
+        cache_key = (mapping_type, enable_only)
+        if cache_key not in self._mappings:
+            source = 'template' if self.use_templates else 'user'
+            self._mappings[cache_key] = getattr(self, f'_get_{mapping_type}_from_{source}')(enable_only)
+        return list(self._mappings[cache_key])
 
     def get_account_by_path(self, account_path: str) -> Optional[str]:
         """根据账户路径获取账户对象"""
@@ -204,29 +215,79 @@ class MappingDataProvider:
 
     def _get_expense_from_user(self, enable_only: bool) -> List:
         """从用户实例获取支出映射"""
-        queryset = Expense.objects.filter(owner=self.user)
-        if enable_only:
-            queryset = queryset.filter(enable=True)
-        return list(queryset)
+        return self._load_user_mappings(Expense, 'expend', enable_only)
 
     def _get_assets_from_user(self, enable_only: bool) -> List:
         """从用户实例获取资产映射"""
-        queryset = Assets.objects.filter(owner=self.user)
-        if enable_only:
-            queryset = queryset.filter(enable=True)
-        return list(queryset)
+        return self._load_user_mappings(Assets, 'assets', enable_only)
 
     def _get_income_from_user(self, enable_only: bool) -> List:
         """从用户实例获取收入映射"""
-        queryset = Income.objects.filter(owner=self.user)
+        return self._load_user_mappings(Income, 'income', enable_only)
+
+    def _load_user_mappings(self, model, account_field: str, enable_only: bool) -> List:
+        """
+        读取用户映射，并一次性预取启用的标签（存放于 enabled_tags）
+
+        预取后同时加载用户标签树，逐行收集标签及其完整路径时不再访问数据库。
+        """
+        queryset = model.objects.filter(owner=self.user).select_related(account_field).prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.filter(enable=True), to_attr='enabled_tags')
+        )
         if enable_only:
             queryset = queryset.filter(enable=True)
-        return list(queryset)
+        mappings = list(queryset)
+        if any(mapping.enabled_tags for mapping in mappings):
+            get_tag_tree(self.user.id)
+        return mappings
 
 
 def get_mapping_provider(user_id: int) -> MappingDataProvider:
-    """工厂函数：获取映射数据提供者"""
-    return MappingDataProvider(user_id)
+    """工厂函数：获取映射数据提供者（处于 mapping_provider_scope 内时复用同一实例）"""
+    providers = _provider_scope.get()
+    if providers is None:
+        return MappingDataProvider(user_id)
+    if user_id not in providers:
+        providers[user_id] = MappingDataProvider(user_id)
+    return providers[user_id]
+
+
+@contextmanager
+def mapping_provider_scope():
+    """
+    批量解析作用域：作用域内每个用户只构建一次映射数据提供者，
+    映射及其标签在整次解析中只查询一次；标签树（及其版本号）同样只解析一次。
+
+    用法：
+        with mapping_provider_scope():
+            for row in bill_data:
+                single_parse_transaction(row, owner_id, config, None)
+    """
+    if _provider_scope.get() is not None:
+        yield
+        return
+    token = _provider_scope.set({})
+    try:
+        with tag_tree_scope():
+            yield
+    finally:
+        _provider_scope.reset(token)
+
+
+def get_enabled_mapping_tags(mapping_instance) -> List:
+    """
+    获取映射关联的启用标签，优先使用预取结果
+
+    Args:
+        mapping_instance: Expense/Assets/Income 映射实例或模板映射对象
+
+    Returns:
+        List[Tag]: 标签对象列表
+    """
+    enabled_tags = getattr(mapping_instance, 'enabled_tags', None)
+    if isinstance(enabled_tags, list):
+        return list(enabled_tags)
+    return list(mapping_instance.tags.filter(enable=True))
 
 
 def extract_account_string(account_obj) -> str:
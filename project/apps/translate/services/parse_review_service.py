@@ -176,10 +176,13 @@ class ParseReviewService:
         user=None,
     ) -> bool:
         """为缓存中缺失 tag_details 的条目批量回填。"""
+        from project.apps.translate.services.mapping_provider import mapping_provider_scope
+
         changed = False
-        for entry in cached_data.get('formatted_data') or []:
-            if cls.ensure_entry_tag_details(entry, owner_id, config, user=user):
-                changed = True
+        with mapping_provider_scope():
+            for entry in cached_data.get('formatted_data') or []:
+                if cls.ensure_entry_tag_details(entry, owner_id, config, user=user):
+                    changed = True
         return changed
 
     @classmethod
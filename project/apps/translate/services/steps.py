@@ -1,11 +1,13 @@
 # project/apps/translate/services/steps.py
 from typing import Dict
-from project.utils.file import BeanFileManager, convert_to_csv_bytes,convert_to_utf8, create_text_stream
+from project.utils.file import BeanFileManager, convert_to_csv, convert_to_utf8, create_text_stream
+from project.utils.ledger_events import publish_ledger_change
 from project.utils.exceptions import UnsupportedFileTypeError, DecryptionError
 from project.apps.translate.services.pipeline import Step
 from project.apps.translate.services.init.bill_init_factory import InitFactory
 from project.apps.translate.services.parse.filters import TransactionFilter
 from project.apps.translate.services.parse.transaction_parser import single_parse_transaction
+from project.apps.translate.services.mapping_provider import mapping_provider_scope
 from project.apps.translate.services.alipay_refund_peer import (
     build_ledger_index_for_user,
     build_raw_payment_index,
@@ -33,12 +35,13 @@ class ConvertToCSVStep(Step):
 
         try:
             # 转换为CSV字节内容
-            csv_bytes = convert_to_csv_bytes(uploaded_file, password)
+            csv_bytes, declared_encoding = convert_to_csv(uploaded_file, password)
             if csv_bytes is None:
                 return self._error(context, "文件转换结果为空，当前账单类型可能不支持")
 
-            # 检测编码并转换为UTF-8
-            utf8_csv_bytes = convert_to_utf8(csv_bytes)
+            # 检测编码并转换为UTF-8（转换器声明编码 → 账单策略编码提示 → 采样探测）
+            encoding_hint = None if declared_encoding else InitFactory.encoding_hint(csv_bytes[:1024])
+            utf8_csv_bytes = convert_to_utf8(csv_bytes, declared_encoding=declared_encoding, encoding_hint=encoding_hint)
 
             # 创建内存文件对象
             # csv_file_object = create_in_memory_file(uploaded_file.name, utf8_csv_bytes)
@@ -126,43 +129,45 @@ class ParseStep(Step):
             def _lazy_parse_payment(payment_row: Dict) -> Dict:
                 return single_parse_transaction(payment_row, owner_id, config, None)
 
-            for row in bill_data:
-                refund_peer = None
-                if alipay_is_refund_row(row):
-                    refund_peer = resolve_alipay_refund_peer(
-                        alipay_parent_uuid(row),
-                        parse_cache,
-                        raw_payment_index,
-                        ledger_index,
-                        _lazy_parse_payment,
-                    )
-
-                payment_uuid = (row.get('uuid') or '').strip()
-                if (
-                    payment_uuid
-                    and payment_uuid in parse_cache
-                    and not alipay_is_refund_row(row)
-                ):
-                    parsed_entry = dict(parse_cache[payment_uuid])
-                    parsed_entry['_original_row'] = row
-                    parsed_entry['cache_key'] = payment_uuid
-                else:
-                    parsed_entry = single_parse_transaction(
-                        row, owner_id, config, None, refund_peer=refund_peer
-                    )
-                    parsed_entry['_original_row'] = row
-                    if parsed_entry.get('uuid'):
-                        cache_key = parsed_entry['uuid']
+            # 整次解析共用映射数据提供者，映射与标签只查询一次
+            with mapping_provider_scope():
+                for row in bill_data:
+                    refund_peer = None
+                    if alipay_is_refund_row(row):
+                        refund_peer = resolve_alipay_refund_peer(
+                            alipay_parent_uuid(row),
+                            parse_cache,
+                            raw_payment_index,
+                            ledger_index,
+                            _lazy_parse_payment,
+                        )
+
+                    payment_uuid = (row.get('uuid') or '').strip()
+                    if (
+                        payment_uuid
+                        and payment_uuid in parse_cache
+                        and not alipay_is_refund_row(row)
+                    ):
+                        parsed_entry = dict(parse_cache[payment_uuid])
+                        parsed_entry['_original_row'] = row
+                        parsed_entry['cache_key'] = payment_uuid
                     else:
-                        row_str = str(row)
-                        cache_key = hashlib.md5(row_str.encode()).hexdigest()
-                    parsed_entry['cache_key'] = cache_key
-                    if payment_uuid and not alipay_is_refund_row(row):
-                        parse_cache[payment_uuid] = parsed_entry
-
-                if 'parsed_data' not in context:
-                    context['parsed_data'] = []
-                context['parsed_data'].append(parsed_entry)
+                        parsed_entry = single_parse_transaction(
+                            row, owner_id, config, None, refund_peer=refund_peer
+                        )
+                        parsed_entry['_original_row'] = row
+                        if parsed_entry.get('uuid'):
+                            cache_key = parsed_entry['uuid']
+                        else:
+                            row_str = str(row)
+                            cache_key = hashlib.md5(row_str.encode()).hexdigest()
+                        parsed_entry['cache_key'] = cache_key
+                        if payment_uuid and not alipay_is_refund_row(row):
+                            parse_cache[payment_uuid] = parsed_entry
+
+                    if 'parsed_data' not in context:
+                        context['parsed_data'] = []
+                    context['parsed_data'].append(parsed_entry)
         except Exception as e:
             import traceback
             logger.error(f"解析步骤详细错误: {traceback.format_exc()}")
@@ -264,6 +269,7 @@ class FileWritingStep(Step):
             # 写入文件到trans目录
             with open(bean_file_path, 'w', encoding='utf-8') as f:
                 f.write(formatted_data)
+            publish_ledger_change(user, [bean_file_path])
 
             # 注意：include语句的添加已在上传文件时完成，解析功能仅处理文件内容的写入
 
@@ -13,6 +13,7 @@ from project.utils.tools import get_user_config
 from project.apps.reconciliation.models import ScheduledTask
 from django.contrib.contenttypes.models import ContentType
 import logging
+import os
 import time
 # import json
 
@@ -52,26 +53,6 @@ def parse_single_file_task(self, file_id, user_id, args):
         file_obj = parse_file.file
         storage_client = get_storage_client()
 
-        # 从存储获取文件内容
-        file_data = storage_client.download_file(file_obj.storage_name)
-        if file_data is None:
-            raise Exception(f"文件不存在: {file_obj.storage_name}")
-
-        file_content = file_data.read()
-
-        # 创建模拟文件对象
-        from io import BytesIO
-        from django.core.files.uploadedfile import InMemoryUploadedFile
-        file_stream = BytesIO(file_content)
-        uploaded_file = InMemoryUploadedFile(
-            file_stream,
-            None,  # field_name
-            file_obj.name,
-            file_obj.content_type,
-            len(file_content),
-            None  # charset
-        )
-
         # 解析文件
         from django.contrib.auth import get_user_model
         User = get_user_model()
@@ -80,7 +61,22 @@ def parse_single_file_task(self, file_id, user_id, args):
         # args['write'] 的值由 MultiBillAnalyzeView 根据用户偏好设置
 
         service = AnalyzeService(user=user, config=config)
-        result_context = service.analyze_single_file(uploaded_file, args)
+
+        # 按本地路径打开文件交给解析管线（本地存储直接使用原文件，远程存储流式下载到临时文件），
+        # 不再将整个文件读入内存
+        with storage_client.local_path(file_obj.storage_name) as file_path:
+            if file_path is None:
+                raise Exception(f"文件不存在: {file_obj.storage_name}")
+
+            from django.core.files.uploadedfile import UploadedFile
+            with open(file_path, 'rb') as file_stream:
+                uploaded_file = UploadedFile(
+                    file_stream,
+                    name=file_obj.name,
+                    content_type=file_obj.content_type,
+                    size=os.path.getsize(file_path)
+                )
+                result_context = service.analyze_single_file(uploaded_file, args)
 
         status = result_context.get('status', '')
         errors = result_context.get('errors', [])
@@ -263,6 +259,7 @@ def auto_confirm_expired_parse_reviews():
     from project.apps.translate.services.parse_review_service import ParseReviewService
     from project.apps.translate.utils.beancount_validator import BeancountValidator
     from project.utils.file import BeanFileManager
+    from project.utils.ledger_events import publish_ledger_change
     
     logger.info("开始执行到期自动确认写入任务")
     
@@ -302,17 +299,16 @@ def auto_confirm_expired_parse_reviews():
                 continue
             
             # 合并所有条目
-            formatted_text = '\n\n'.join([
-                entry['formatted'].rstrip() for entry in final_entries
-            ])
+            entries_list = [entry['formatted'].rstrip() for entry in final_entries]
+            formatted_text = '\n\n'.join(entries_list)
             
-            # 进行 Beancount 语法校验
-            is_valid, error_message, _ = BeancountValidator.validate_entries(formatted_text)
+            # 进行 Beancount 语法校验（单次解析，按行号定位错误条目）
+            is_valid, error_message, error_entries_indices = BeancountValidator.validate_multiple_entries(
+                entries_list, separator='\n\n'
+            )
             
             if not is_valid:
-                # 逐条校验以定位具体错误条目并记录日志
-                entries_list = [e['formatted'].rstrip() for e in final_entries]
-                _, _, error_entries_indices = BeancountValidator.validate_multiple_entries(entries_list)
+                # 记录具体错误条目日志
                 error_details = [
                     f"index={idx} uuid={final_entries[idx].get('uuid', '?')}: {msg}"
                     for idx, msg in error_entries_indices
@@ -333,6 +329,7 @@ def auto_confirm_expired_parse_reviews():
             
             with open(bean_file_path, 'w', encoding='utf-8') as f:
                 f.write(formatted_text)
+            publish_ledger_change(user, [bean_file_path])
             
             # 更新状态
             parse_file.status = 'parsed'
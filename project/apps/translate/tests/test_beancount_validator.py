@@ -0,0 +1,83 @@
+"""
+BeancountValidator 测试
+
+验证多条目校验单次解析即可定位错误条目，且结果与逐条校验一致。
+"""
+from unittest.mock import patch
+
+from beancount.parser import parser
+
+from project.apps.translate.utils.beancount_validator import BeancountValidator
+
+
+VALID_ENTRY = '2025-01-20 * "Test" "OK"\n    Expenses:Test  100.00 CNY\n    Assets:Test  -100.00 CNY'
+INVALID_TOKEN_ENTRY = '2025-01-21 * "Test" Bad\n    Expenses:Test  10.00 CNY\n    Assets:Test  -10.00 CNY'
+INVALID_POSTING_ENTRY = '2025-01-22 * "Test" "Bad"\n    Expenses:Test  10.00 CNY CNY\n    Assets:Test  -10.00 CNY'
+
+
+def _per_entry_errors(entries_list):
+    """逐条校验（原有实现）作为对照"""
+    result = []
+    for idx, entry in enumerate(entries_list):
+        is_valid, error = BeancountValidator.validate_single_entry(entry)
+        if not is_valid:
+            result.append((idx, error))
+    return result
+
+
+class TestValidateMultipleEntries:
+    """validate_multiple_entries 单次解析定位错误"""
+
+    def test_empty_list(self):
+        assert BeancountValidator.validate_multiple_entries([]) == (True, None, [])
+
+    def test_all_valid_single_parse(self):
+        entries = [VALID_ENTRY] * 5
+        with patch.object(parser, 'parse_string', wraps=parser.parse_string) as mock_parse:
+            is_valid, error_message, error_entries = BeancountValidator.validate_multiple_entries(
+                entries, separator='\n\n'
+            )
+        assert is_valid is True
+        assert error_message is None
+        assert error_entries == []
+        assert mock_parse.call_count == 1
+
+    def test_errors_mapped_to_entries_with_single_parse(self):
+        entries = [VALID_ENTRY, INVALID_TOKEN_ENTRY, VALID_ENTRY, INVALID_POSTING_ENTRY, 'invalid beancount syntax']
+        expected = _per_entry_errors(entries)
+
+        with patch.object(parser, 'parse_string', wraps=parser.parse_string) as mock_parse:
+            is_valid, error_message, error_entries = BeancountValidator.validate_multiple_entries(
+                entries, separator='\n\n'
+            )
+
+        assert mock_parse.call_count == 1
+        assert is_valid is False
+        assert error_message
+        assert error_entries == expected
+        assert [idx for idx, _ in error_entries] == [1, 3, 4]
+
+    def test_default_separator_matches_per_entry(self):
+        entries = [INVALID_POSTING_ENTRY, VALID_ENTRY, INVALID_TOKEN_ENTRY]
+        _, _, error_entries = BeancountValidator.validate_multiple_entries(entries)
+        assert error_entries == _per_entry_errors(entries)
+
+    def test_error_message_matches_combined_validation(self):
+        entries = [INVALID_TOKEN_ENTRY, INVALID_POSTING_ENTRY]
+        _, combined_message, _ = BeancountValidator.validate_entries('\n\n'.join(entries))
+        _, error_message, _ = BeancountValidator.validate_multiple_entries(entries, separator='\n\n')
+        assert error_message == combined_message
+
+    def test_fallback_when_lineno_missing(self):
+        """错误缺少行号时回退为逐条校验"""
+        entries = [VALID_ENTRY, 'invalid beancount syntax']
+        _, errors, _ = parser.parse_string(entries[1])
+        for error in errors:
+            error.source['lineno'] = None
+
+        real_parse = parser.parse_string
+        with patch.object(parser, 'parse_string', side_effect=[([], errors, {}), real_parse(entries[0]), real_parse(entries[1])]):
+            is_valid, _, error_entries = BeancountValidator.validate_multiple_entries(entries)
+
+        assert is_valid is False
+        assert [idx for idx, _ in error_entries] == [1]
@@ -0,0 +1,230 @@
+"""
+账单类型嗅探测试
+
+验证各格式只在声明的读取上限内（CSV 开头 4KB、Excel 表头区域、PDF 首页）识别账单类型，
+以及 MultiBillAnalyzeView 在入队前拒绝不支持的文件。
+"""
+import io
+import uuid
+import zipfile
+from pathlib import Path
+from unittest.mock import patch
+
+import PyPDF2
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from project.apps.file_manager.models import File
+from project.apps.translate.models import ParseFile
+from project.apps.translate.services.init.bill_init_factory import InitFactory
+from project.apps.translate.services.init.strategies.alipay_init_strategy import AlipayInitStrategy
+from project.apps.translate.services.init.strategies.boc_debit_init_strategy import BOCDebitInitStrategy
+from project.apps.translate.services.init.strategies.ccb_debit_init_strategy import CCBDebitInitStrategy
+from project.apps.translate.services.init.strategies.wechat_init_strategy import WeChatPayInitStrategy
+from project.apps.translate.views.views import MultiBillAnalyzeView
+from project.utils import excel
+from project.utils.exceptions import BillSniffInconclusiveError, DecryptionError, UnsupportedFileTypeError
+from project.utils.file import (
+    SNIFF_CSV_BYTES,
+    SNIFF_EXCEL_ROWS,
+    SNIFF_MAX_BYTES,
+    SNIFF_PDF_PAGES,
+    SNIFF_ZIP_MEMBER_BYTES,
+    detect_pdf_bill,
+)
+from project.utils.storage_factory import get_storage_client
+from project.utils.tests.test_excel import CCB_ROWS, WECHAT_ROWS, build_xlsx
+from project.utils.tests.test_pdf import build_table_pdf
+
+
+SAMPLE_DIR = Path(__file__).resolve().parents[3] / 'fixtures' / 'sample_files'
+
+
+class CountingBytesIO(io.BytesIO):
+    """记录读取字节数的文件对象"""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def sample_file(file_name):
+    return CountingBytesIO((SAMPLE_DIR / file_name).read_bytes(), file_name)
+
+
+@pytest.mark.parametrize('file_name, expected', [
+    ('完整测试_微信.csv', WeChatPayInitStrategy),
+    ('完整测试_支付宝.csv', AlipayInitStrategy),
+])
+def test_sniff_csv_fixtures_within_bound(file_name, expected):
+    file = sample_file(file_name)
+    assert len(file.getvalue()) > SNIFF_CSV_BYTES
+
+    assert InitFactory.sniff(file) is expected
+    assert file.bytes_read <= SNIFF_CSV_BYTES
+
+
+def test_sniff_gb18030_alipay_csv():
+    text = (SAMPLE_DIR / '完整测试_支付宝.csv').read_text(encoding='utf-8')
+    file = CountingBytesIO(text.encode('gb18030'), 'alipay.csv')
+    assert InitFactory.sniff(file) is AlipayInitStrategy
+
+
+def test_sniff_xlsx_reads_header_rows_only():
+    rows = WECHAT_ROWS + [WECHAT_ROWS[-1]] * 500
+    with patch.object(excel, '_cell_to_str', wraps=excel._cell_to_str) as cell_to_str:
+        assert InitFactory.sniff(build_xlsx(rows)) is WeChatPayInitStrategy
+    assert cell_to_str.call_count <= SNIFF_EXCEL_ROWS * len(WECHAT_ROWS[3])
+
+    assert InitFactory.sniff(build_xlsx(CCB_ROWS)) is CCBDebitInitStrategy
+
+
+def test_sniff_pdf_extracts_first_page_only():
+    file = io.BytesIO(build_table_pdf(6))
+    file.name = 'boc.pdf'
+    with patch.object(PyPDF2.PageObject, 'extract_text', autospec=True,
+                      return_value=BOCDebitInitStrategy.SOURCE_FILE_IDENTIFIER) as extract_text:
+        assert InitFactory.sniff(file) is BOCDebitInitStrategy
+    assert extract_text.call_count == SNIFF_PDF_PAGES
+
+    # 首页未识别：单页 PDF 判定为不支持，多页 PDF 交由解析任务逐页识别
+    file.seek(0)
+    with pytest.raises(BillSniffInconclusiveError):
+        InitFactory.sniff(file)
+
+    single = io.BytesIO(build_table_pdf(1))
+    single.name = 'single.pdf'
+    assert InitFactory.sniff(single) is None
+
+
+@pytest.fixture
+def pdf_identifier_on_page_2():
+    """第 2 页才出现账单标识的 BOC PDF（标识文本通过 extract_text 注入）"""
+    original = PyPDF2.PageObject.extract_text
+
+    def extract_text(page, *args, **kwargs):
+        text = original(page, *args, **kwargs)
+        if 'P1R0' in text:
+            return BOCDebitInitStrategy.SOURCE_FILE_IDENTIFIER + text
+        return text
+
+    with patch.object(PyPDF2.PageObject, 'extract_text', autospec=True, side_effect=extract_text):
+        yield build_table_pdf(3)
+
+
+def test_sniff_pdf_identifier_on_later_page_is_inconclusive(pdf_identifier_on_page_2):
+    file = io.BytesIO(pdf_identifier_on_page_2)
+    file.name = 'boc.pdf'
+    with pytest.raises(BillSniffInconclusiveError):
+        InitFactory.sniff(file)
+
+    identifier, _, scanned_pages = detect_pdf_bill(PyPDF2.PdfReader(io.BytesIO(pdf_identifier_on_page_2)))
+    assert (identifier, scanned_pages) == (BOCDebitInitStrategy.SOURCE_FILE_IDENTIFIER, 2)
+
+
+def test_sniff_zip_uses_inner_bill():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        zf.writestr('readme.txt', 'ignored')
+        zf.writestr('账单/微信.csv', (SAMPLE_DIR / '完整测试_微信.csv').read_bytes())
+    buffer.seek(0)
+    buffer.name = 'bills.zip'
+    assert InitFactory.sniff(buffer) is WeChatPayInitStrategy
+
+    # 非 CSV 成员超过上限时不解压
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('账单.pdf', b'%PDF' + b'0' * SNIFF_ZIP_MEMBER_BYTES)
+    buffer.seek(0)
+    buffer.name = 'large.zip'
+    with pytest.raises(BillSniffInconclusiveError):
+        InitFactory.sniff(buffer)
+
+
+def test_sniff_unsupported_and_encrypted():
+    text = io.BytesIO(b'hello')
+    text.name = 'notes.txt'
+    with pytest.raises(UnsupportedFileTypeError):
+        InitFactory.sniff(text)
+
+    unknown = io.BytesIO('日期,金额\n2025-01-01,1.00\n'.encode('utf-8'))
+    unknown.name = 'unknown.csv'
+    assert InitFactory.sniff(unknown) is None
+
+    writer = PyPDF2.PdfWriter()
+    writer.add_blank_page(width=100, height=100)
+    writer.encrypt('secret')
+    encrypted = io.BytesIO()
+    writer.write(encrypted)
+    encrypted.name = 'encrypted.pdf'
+    with pytest.raises(DecryptionError):
+        InitFactory.sniff(encrypted)
+
+
+@pytest.mark.django_db
+def test_multi_bill_analyze_rejects_unsupported_before_queueing(user, directory):
+    storage_name = f'sniff-test/{uuid.uuid4()}.csv'
+    get_storage_client().upload_file(storage_name, io.BytesIO('日期,金额\n'.encode('utf-8')))
+    file_obj = File.objects.create(
+        name='unknown.csv',
+        directory=directory,
+        storage_name=storage_name,
+        size=16,
+        owner=user,
+        content_type='text/csv'
+    )
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    with patch('project.apps.translate.views.views.parse_single_file_task') as task:
+        response = client.post('/api/translate/multi', {'file_ids': [file_obj.id]}, format='json')
+
+    get_storage_client().delete_file(storage_name)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data['unsupported_files'] == [file_obj.id]
+    task.s.assert_not_called()
+    parse_file = ParseFile.objects.get(file_id=file_obj.id)
+    assert parse_file.status == 'failed'
+    assert parse_file.error_message == '当前账单不支持'
+
+
+def _stored_file(user, directory, name, content):
+    storage_name = f'sniff-test/{uuid.uuid4()}{Path(name).suffix}'
+    get_storage_client().upload_file(storage_name, io.BytesIO(content))
+    return File.objects.create(
+        name=name,
+        directory=directory,
+        storage_name=storage_name,
+        size=len(content),
+        owner=user,
+    )
+
+
+@pytest.mark.django_db
+def test_sniff_unsupported_files_reads_bounded_ranges(user, directory, pdf_identifier_on_page_2):
+    csv_content = (SAMPLE_DIR / '完整测试_微信.csv').read_bytes()
+    csv_content += csv_content.splitlines(keepends=True)[-1] * (SNIFF_MAX_BYTES // 100)
+    csv_file = _stored_file(user, directory, '微信.csv', csv_content)
+    pdf_file = _stored_file(user, directory, 'boc.pdf', pdf_identifier_on_page_2)
+    storage = get_storage_client()
+    backend = type(storage)
+
+    with patch.object(backend, 'read_range', autospec=True, side_effect=backend.read_range) as read_range, \
+            patch.object(backend, 'download_file') as download_file:
+        unsupported = MultiBillAnalyzeView.sniff_unsupported_files([csv_file.id, pdf_file.id], None, {})
+
+    for file_obj in (csv_file, pdf_file):
+        storage.delete_file(file_obj.storage_name)
+    # 标识在第 2 页的 PDF 不会被判定为不支持
+    assert unsupported == []
+    download_file.assert_not_called()
+    csv_lengths = [call.args[3] for call in read_range.call_args_list if call.args[1] == csv_file.storage_name]
+    assert len(csv_content) > SNIFF_MAX_BYTES
+    assert sum(csv_lengths) <= SNIFF_CSV_BYTES * 16
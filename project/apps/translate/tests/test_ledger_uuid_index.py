@@ -0,0 +1,86 @@
+"""账本 uuid 索引缓存：按账本变更事件只重新加载变更文件。"""
+import os
+from unittest.mock import patch
+
+import pytest
+from beancount import loader
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+
+from project.apps.translate.services import ledger_uuid_index
+from project.apps.translate.services.ledger_uuid_index import LedgerUuidIndexService
+from project.utils.ledger_events import publish_ledger_change
+
+User = get_user_model()
+
+
+def _transaction(uuid, expense):
+    return (
+        f'2025-01-01 * "Shop" "Item"\n'
+        f'  uuid: "{uuid}"\n'
+        f'  {expense}  10.00 CNY\n'
+        f'  Assets:Cash\n\n'
+    )
+
+
+def _write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+    # 保证修改时间变化可被检测（部分文件系统时间精度较低）
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    with override_settings(ASSETS_BASE_PATH=tmp_path):
+        user = User.objects.create_user(username="uuid_index_user", password="x")
+        root = tmp_path / user.username
+        _write(root / "main.bean", (
+            'plugin "beancount.plugins.auto_accounts"\n'
+            'include "trans/main.bean"\n'
+        ))
+        _write(root / "trans" / "main.bean", 'include "a.bean"\ninclude "b.bean"\n')
+        _write(root / "trans" / "a.bean", _transaction("uuid-a", "Expenses:Food"))
+        _write(root / "trans" / "b.bean", _transaction("uuid-b", "Expenses:Shopping"))
+        ledger_uuid_index._ledger_uuid_index_cache.clear()
+        yield user, root
+        ledger_uuid_index._ledger_uuid_index_cache.clear()
+
+
+@pytest.mark.django_db
+def test_index_reloads_only_changed_file(ledger):
+    user, root = ledger
+
+    with patch.object(loader, "load_file", wraps=loader.load_file) as load_file:
+        index = LedgerUuidIndexService.get_for_user(user)
+        assert index["uuid-a"].expense_account == "Expenses:Food"
+        assert LedgerUuidIndexService.get_for_user(user) is index
+        assert load_file.call_count == 1
+
+        _write(root / "trans" / "a.bean", _transaction("uuid-a2", "Expenses:Transport"))
+        publish_ledger_change(user, [root / "trans" / "a.bean"])
+        index = LedgerUuidIndexService.get_for_user(user)
+
+    assert load_file.call_count == 2
+    assert load_file.call_args[0][0] == str(root / "trans" / "a.bean")
+    assert "uuid-a" not in index
+    assert index["uuid-a2"].expense_account == "Expenses:Transport"
+    assert index["uuid-b"].expense_account == "Expenses:Shopping"
+    assert index == LedgerUuidIndexService.build_for_user(user)
+
+
+@pytest.mark.django_db
+def test_index_rebuilds_for_new_files_and_unpublished_writes(ledger):
+    user, root = ledger
+    LedgerUuidIndexService.get_for_user(user)
+
+    # 新文件可能改变账本包含的文件集合，完整重建
+    _write(root / "trans" / "c.bean", _transaction("uuid-c", "Expenses:Travel"))
+    _write(root / "trans" / "main.bean", 'include "a.bean"\ninclude "b.bean"\ninclude "c.bean"\n')
+    publish_ledger_change(user, [root / "trans" / "c.bean", root / "trans" / "main.bean"])
+    assert LedgerUuidIndexService.get_for_user(user)["uuid-c"].expense_account == "Expenses:Travel"
+
+    # 未发布事件的写入（如 Fava 编辑）通过文件状态发现
+    _write(root / "trans" / "b.bean", _transaction("uuid-b", "Expenses:Gifts"))
+    assert LedgerUuidIndexService.get_for_user(user)["uuid-b"].expense_account == "Expenses:Gifts"
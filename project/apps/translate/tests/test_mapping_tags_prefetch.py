@@ -0,0 +1,133 @@
+"""解析时映射标签批量预取测试。"""
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from project.apps.account.models import Account
+from project.apps.maps.models import Assets, Expense, Income
+from project.apps.tags import utils as tag_utils
+from project.apps.tags.models import Tag
+from project.apps.translate.services.mapping_provider import (
+    get_enabled_mapping_tags,
+    get_mapping_provider,
+    mapping_provider_scope,
+)
+from project.apps.translate.services.steps import ParseStep
+from project.apps.translate.utils import BILL_ALI
+
+
+def _parse_config():
+    return SimpleNamespace(
+        ai_model="None",
+        deepseek_apikey=None,
+        flag="*",
+        reconciliation_fallback_account=None,
+    )
+
+
+def _row(index):
+    # 交替生成支出、收入与不计收支，覆盖三类映射的标签加载
+    transaction_type, counterparty = [
+        ("支出", "美团外卖-餐厅"),
+        ("收入", "某公司"),
+        ("不计收支", "余额宝"),
+    ][index % 3]
+    return {
+        "transaction_time": "2024-02-25 20:01:48",
+        "transaction_category": "其他",
+        "counterparty": counterparty,
+        "commodity": f"订单{index}",
+        "transaction_type": transaction_type,
+        "amount": 10 + index,
+        "payment_method": "余额宝",
+        "transaction_status": "交易成功",
+        "notes": "/",
+        "bill_identifier": BILL_ALI,
+        "uuid": f"prefetch-{index}",
+        "discount": False,
+    }
+
+
+@pytest.fixture
+def mappings(user):
+    life = Tag.objects.create(name="Life", owner=user)
+    food = Tag.objects.create(name="Food", parent=life, owner=user)
+    disabled = Tag.objects.create(name="Disabled", owner=user, enable=False)
+    salary = Tag.objects.create(name="Salary", owner=user)
+
+    expend = Account.objects.create(account="Expenses:Food:Delivery", owner=user)
+    income = Account.objects.create(account="Income:Salary", owner=user)
+    fund = Account.objects.create(account="Assets:Fund:Alipay", owner=user)
+
+    # 两个支出映射同时命中，触发候选标签合并
+    for key in ("美团", "餐厅"):
+        expense = Expense.objects.create(key=key, expend=expend, owner=user)
+        expense.tags.add(food, disabled)
+    Income.objects.create(key="某公司", income=income, owner=user).tags.add(salary)
+    Assets.objects.create(key="余额宝", full="余额宝", assets=fund, owner=user).tags.add(life)
+
+
+def _parse(user, rows):
+    context = {"owner_id": user.id, "user": user, "config": _parse_config(), "prefilter_bill": rows}
+    with CaptureQueriesContext(connection) as queries:
+        context = ParseStep().execute(context)
+    assert "error" not in context
+    return context["parsed_data"], len(queries.captured_queries)
+
+
+@pytest.mark.django_db
+class TestMappingTagsPrefetch:
+    def test_prefetched_tags_exclude_disabled(self, user, mappings, django_assert_num_queries):
+        provider = get_mapping_provider(user.id)
+        expenses = provider.get_expense_mappings()
+
+        with django_assert_num_queries(0):
+            tag_paths = [
+                [tag.get_full_path() for tag in get_enabled_mapping_tags(mapping)] for mapping in expenses
+            ]
+            accounts = [mapping.expend.account for mapping in expenses]
+
+        assert tag_paths == [["Life/Food"], ["Life/Food"]]
+        assert accounts == ["Expenses:Food:Delivery", "Expenses:Food:Delivery"]
+
+    def test_provider_reused_within_scope(self, user, mappings, django_assert_num_queries):
+        with mapping_provider_scope():
+            provider = get_mapping_provider(user.id)
+            provider.get_expense_mappings()
+            with django_assert_num_queries(0):
+                assert get_mapping_provider(user.id) is provider
+                assert len(get_mapping_provider(user.id).get_expense_mappings()) == 2
+
+        assert get_mapping_provider(user.id) is not provider
+
+    def test_tag_collection_per_row_needs_no_queries(self, user, mappings):
+        _parse(user, [_row(0)])  # 预热进程内标签树
+        small, small_queries = _parse(user, [_row(i) for i in range(3)])
+        parsed, queries = _parse(user, [_row(i) for i in range(1000)])
+
+        # 行数增加不应带来额外查询：映射、标签与标签路径均在解析开始时一次性加载
+        assert queries == small_queries
+        assert len(parsed) == 1000
+
+        expense, income, transfer = parsed[:3]
+        assert [detail["path"] for detail in expense["tag_details"]] == ["Life/Food", "Life"]
+        assert [detail["path"] for detail in income["tag_details"]] == ["Salary", "Life"]
+        assert [detail["path"] for detail in transfer["tag_details"]] == ["Life"]
+        assert [entry["tag_details"] for entry in parsed[3:6]] == [
+            entry["tag_details"] for entry in small
+        ]
+
+    def test_tag_tree_version_read_once_per_parse(self, user, mappings):
+        _parse(user, [_row(0)])  # 预热进程内标签树
+
+        with patch(
+            "project.apps.tags.utils.get_tag_tree_version", wraps=tag_utils.get_tag_tree_version
+        ) as get_version:
+            parsed, _ = _parse(user, [_row(i) for i in range(30)])
+
+        # 逐行合并标签复用作用域内的标签树，整次解析只读取一次版本号
+        assert get_version.call_count == 1
+        assert [detail["path"] for detail in parsed[0]["tag_details"]] == ["Life/Food", "Life"]
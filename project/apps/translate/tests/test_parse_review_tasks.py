@@ -3,6 +3,7 @@
 """
 import pytest
 import time
+from contextlib import contextmanager
 from unittest.mock import patch, MagicMock, Mock
 from io import BytesIO
 
@@ -15,6 +16,18 @@ from project.apps.reconciliation.models import ScheduledTask
 from project.apps.translate.tasks import parse_single_file_task, auto_confirm_expired_parse_reviews
 
 
+def mock_local_path(tmp_path, content):
+    """模拟存储的 local_path：返回写入给定内容的本地文件路径"""
+    file_path = tmp_path / 'bill.csv'
+    file_path.write_bytes(content)
+
+    @contextmanager
+    def local_path(object_name):
+        yield str(file_path)
+
+    return local_path
+
+
 @pytest.mark.django_db
 class TestParseSingleFileTask:
     """parse_single_file_task 任务测试"""
@@ -26,13 +39,11 @@ class TestParseSingleFileTask:
     @patch('project.apps.translate.tasks.get_storage_client')
     @patch('project.apps.translate.tasks.AnalyzeService')
     @patch('project.utils.tools.get_user_config')
-    def test_parse_task_review_mode(self, mock_get_config, mock_analyze_service, mock_storage_client, user, parse_file):
+    def test_parse_task_review_mode(self, mock_get_config, mock_analyze_service, mock_storage_client, user, parse_file, tmp_path):
         """测试审核模式下不写入文件，缓存数据保存，状态更新"""
         # Mock 存储客户端
         mock_storage = MagicMock()
-        mock_file_data = Mock()
-        mock_file_data.read.return_value = b'test,file,content'
-        mock_storage.download_file.return_value = mock_file_data
+        mock_storage.local_path.side_effect = mock_local_path(tmp_path, b'test,file,content')
         mock_storage_client.return_value = mock_storage
         
         # Mock 配置 - 使用 get_or_create 避免唯一约束冲突
@@ -131,13 +142,11 @@ class TestParseSingleFileTask:
     @patch('project.apps.translate.tasks.get_storage_client')
     @patch('project.apps.translate.tasks.AnalyzeService')
     @patch('project.utils.tools.get_user_config')
-    def test_parse_task_direct_write_mode(self, mock_get_config, mock_analyze_service, mock_storage_client, user, parse_file):
+    def test_parse_task_direct_write_mode(self, mock_get_config, mock_analyze_service, mock_storage_client, user, parse_file, tmp_path):
         """测试直接写入模式下立即写入文件，状态更新"""
         # Mock 存储客户端
         mock_storage = MagicMock()
-        mock_file_data = Mock()
-        mock_file_data.read.return_value = b'test,file,content'
-        mock_storage.download_file.return_value = mock_file_data
+        mock_storage.local_path.side_effect = mock_local_path(tmp_path, b'test,file,content')
         mock_storage_client.return_value = mock_storage
         
         # Mock 配置 - 使用 get_or_create 避免唯一约束冲突
@@ -209,7 +218,7 @@ class TestAutoConfirmExpiredParseReviews:
         """设置测试环境"""
         pass
     
-    @patch('project.apps.translate.utils.beancount_validator.BeancountValidator.validate_entries')
+    @patch('project.apps.translate.utils.beancount_validator.BeancountValidator.validate_multiple_entries')
     @patch('project.utils.file.BeanFileManager.get_bean_file_path')
     def test_auto_confirm_expired_tasks(self, mock_get_bean_path, mock_validate, user, parse_review_task, parse_file, tmp_path):
         """测试自动确认过期任务（基于 review_expires_at）"""
@@ -250,7 +259,7 @@ class TestAutoConfirmExpiredParseReviews:
         # 验证文件已写入
         assert bean_file.read_text(encoding='utf-8') != ''
     
-    @patch('project.apps.translate.utils.beancount_validator.BeancountValidator.validate_entries')
+    @patch('project.apps.translate.utils.beancount_validator.BeancountValidator.validate_multiple_entries')
     @patch('project.utils.file.BeanFileManager.get_bean_file_path')
     def test_auto_confirm_expired_tasks_validation_error(self, mock_get_bean_path, mock_validate, user, parse_review_task, parse_file, tmp_path, caplog):
         """测试自动确认过期任务时 Beancount 语法错误，日志记录具体错误条目"""
@@ -270,7 +279,7 @@ class TestAutoConfirmExpiredParseReviews:
         ParseReviewService.save_parse_result(parse_file.file_id, expired_data)
         
         # Mock Beancount 校验返回错误
-        mock_validate.return_value = (False, 'Syntax error', ['Error message'])
+        mock_validate.return_value = (False, 'Syntax error', [(0, 'Error message')])
         
         # Mock bean 文件路径（避免实际写入文件）
         bean_file = tmp_path / 'test_file.bean'
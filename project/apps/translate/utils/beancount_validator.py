@@ -4,6 +4,7 @@ Beancount 语法校验工具
 
 使用 beancount 库验证 Beancount 条目的语法正确性
 """
+import bisect
 import logging
 from typing import Tuple, List, Optional
 from beancount import loader
@@ -37,19 +38,8 @@ class BeancountValidator:
             entries, errors, options_map = parser.parse_string(entries_text)
             
             if errors:
-                # 提取错误信息
-                error_messages = []
-                for error in errors:
-                    if hasattr(error, 'message'):
-                        error_messages.append(str(error.message))
-                    else:
-                        error_messages.append(str(error))
-                
-                error_summary = '; '.join(error_messages[:3])  # 最多显示前3个错误
-                if len(error_messages) > 3:
-                    error_summary += f' ... (共 {len(error_messages)} 个错误)'
-                
-                return False, error_summary, error_messages
+                error_messages = BeancountValidator._error_messages(errors)
+                return False, BeancountValidator._summarize(error_messages), error_messages
             
             return True, None, []
             
@@ -58,6 +48,25 @@ class BeancountValidator:
             logger.error(error_msg, exc_info=True)
             return False, error_msg, [error_msg]
     
+    @staticmethod
+    def _error_messages(errors) -> List[str]:
+        """提取解析错误的文本信息"""
+        error_messages = []
+        for error in errors:
+            if hasattr(error, 'message'):
+                error_messages.append(str(error.message))
+            else:
+                error_messages.append(str(error))
+        return error_messages
+    
+    @staticmethod
+    def _summarize(error_messages: List[str]) -> str:
+        """生成错误摘要（最多显示前3个错误）"""
+        error_summary = '; '.join(error_messages[:3])
+        if len(error_messages) > 3:
+            error_summary += f' ... (共 {len(error_messages)} 个错误)'
+        return error_summary
+    
     @staticmethod
     def validate_single_entry(entry_text: str) -> Tuple[bool, Optional[str]]:
         """验证单个 Beancount 条目
@@ -72,11 +81,19 @@ class BeancountValidator:
         return is_valid, error_message
     
     @staticmethod
-    def validate_multiple_entries(entries_list: List[str]) -> Tuple[bool, Optional[str], List[Tuple[int, str]]]:
+    def validate_multiple_entries(
+        entries_list: List[str],
+        separator: str = '\n',
+    ) -> Tuple[bool, Optional[str], List[Tuple[int, str]]]:
         """验证多个 Beancount 条目
         
+        合并文本只解析一次：拼接时记录每个条目的起始行号，再根据解析器返回的
+        ``error.source['lineno']`` 二分查找错误所属条目。若存在无法定位行号的错误，
+        回退为逐条解析，保证结果与逐条校验一致。
+        
         Args:
             entries_list: Beancount 条目列表
+            separator: 条目之间的分隔符（写入文件时使用的拼接方式）
             
         Returns:
             (is_valid, error_message, error_entries):
@@ -87,16 +104,53 @@ class BeancountValidator:
         if not entries_list:
             return True, None, []
         
-        # 合并所有条目进行验证
-        combined_text = '\n'.join(entries_list)
-        is_valid, error_message, errors = BeancountValidator.validate_entries(combined_text)
+        # 合并所有条目，同时记录每个条目的起始行号（从 1 开始）
+        combined_text = separator.join(entries_list)
+        if not combined_text.strip():
+            return True, None, []
         
-        # 如果整体验证失败，尝试逐个验证以定位具体错误条目
-        error_entries = []
-        if not is_valid:
-            for idx, entry in enumerate(entries_list):
-                entry_valid, entry_error = BeancountValidator.validate_single_entry(entry)
-                if not entry_valid:
-                    error_entries.append((idx, entry_error))
+        line_starts = []
+        lineno = 1
+        separator_lines = separator.count('\n')
+        for entry in entries_list:
+            line_starts.append(lineno)
+            lineno += entry.count('\n') + separator_lines
         
-        return is_valid, error_message, error_entries
+        try:
+            _, errors, _ = parser.parse_string(combined_text)
+        except Exception as e:
+            error_msg = f"Beancount 语法校验异常: {str(e)}"
+            logger.error(error_msg, exc_info=True)
+            return False, error_msg, BeancountValidator._validate_each(entries_list)
+        
+        if not errors:
+            return True, None, []
+        
+        error_message = BeancountValidator._summarize(BeancountValidator._error_messages(errors))
+        
+        # 按行号将错误归属到条目
+        entry_errors = {}
+        for error in errors:
+            source = getattr(error, 'source', None) or {}
+            error_lineno = source.get('lineno')
+            if not isinstance(error_lineno, int) or error_lineno < 1:
+                logger.debug("解析错误缺少行号，回退为逐条校验: %s", error)
+                return False, error_message, BeancountValidator._validate_each(entries_list)
+            idx = bisect.bisect_right(line_starts, error_lineno) - 1
+            entry_errors.setdefault(idx, []).append(error)
+        
+        error_entries = [
+            (idx, BeancountValidator._summarize(BeancountValidator._error_messages(entry_errors[idx])))
+            for idx in sorted(entry_errors)
+        ]
+        return False, error_message, error_entries
+    
+    @staticmethod
+    def _validate_each(entries_list: List[str]) -> List[Tuple[int, str]]:
+        """逐条校验，定位有错误的条目"""
+        error_entries = []
+        for idx, entry in enumerate(entries_list):
+            entry_valid, entry_error = BeancountValidator.validate_single_entry(entry)
+            if not entry_valid:
+                error_entries.append((idx, entry_error))
+        return error_entries
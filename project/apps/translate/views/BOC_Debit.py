@@ -3,12 +3,11 @@ import logging
 import re
 from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
-import pdfplumber
-
 from project.utils.exceptions import DecryptionError
+from project.utils.pdf import extract_pages, read_pdf_bytes
 from project.apps.translate.services.init.strategies.boc_debit_init_strategy import BOCDebitInitStrategy
 from project.apps.translate.utils import ASSETS_OTHER
-from project.apps.translate.services.mapping_provider import extract_account_string
+from project.apps.translate.services.mapping_provider import extract_account_string, get_enabled_mapping_tags
 # from project.apps.translate.utils import InitStrategy, IgnoreData, BILL_BOC_DEBIT
 
 logger = logging.getLogger(__name__)
@@ -55,23 +54,28 @@ logger = logging.getLogger(__name__)
 #         return boc_debit_ignore == "true"
 
 
-def boc_debit_pdf_convert_to_string(file, password):
+def boc_debit_extract_page_tables(page):
+    """提取单页表格（供按页并行提取使用）"""
+    tables = page.extract_tables()
+    if tables is None:
+        raise DecryptionError("PDF解密失败：无法提取内容，请提供密码后重试")
+    return tables
+
+
+def boc_debit_pdf_convert_to_string(file, password, page_count=None):
     """接收PDF文件，返回字符串
 
     Args:
         file(_type_): PDF文件
         password (str): PDF文件的密码，如果文件受保护
+        page_count (int): 总页数（已知时传入，避免重复打开文档）
 
     Returns:
         string: 以List形式返回
     """
-    with pdfplumber.open(file, password=password) as pdf:
-        content = []
-        for page in pdf.pages:
-            tables = page.extract_tables()
-            if tables is None:
-                raise DecryptionError("PDF解密失败：无法提取内容，请提供密码后重试")
-            content += tables
+    content = []
+    for tables in extract_pages(read_pdf_bytes(file), password, boc_debit_extract_page_tables, page_count):
+        content += tables
     return content
 
 
@@ -198,7 +202,7 @@ def boc_debit_try_income_peer_asset(
         expense_candidates_with_score = [{"key": m.key, "score": 1.0} for m in winners]
 
     try:
-        mapping_tags = list(best.tags.filter(enable=True))
+        mapping_tags = get_enabled_mapping_tags(best)
     except Exception as e:
         logger.error(f"加载资产映射标签失败: {str(e)}")
         mapping_tags = []
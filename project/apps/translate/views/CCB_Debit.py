@@ -70,40 +70,43 @@ def ccb_debit_string_convert_to_csv(df):
     Returns:
         csv: _description_
     """
-    import pandas as pd
+    return ccb_debit_rows_convert_to_csv(df.fillna('').values.tolist())
 
 
-    data_list = df.fillna('').values.tolist()
+def ccb_debit_rows_convert_to_csv(data_list):
+    """接收Excel行数据（字符串列表），返回CSV格式文件
 
+    Args:
+        data_list (list): 账单全部行，空单元格为 ''
+
+    Returns:
+        csv: utf-8-sig 编码的 CSV 字节
+    """
     # 提取标题和账号信息
     title = data_list[0][4].replace('个人活期账户全部交易明细', '储蓄卡账单明细')
     card_number = data_list[1][1].split(':')[1]
 
     # 构造输出字符串
-    output = f"{title} 卡号: {card_number}\n"
+    output = [f"{title} 卡号: {card_number}\n"]
 
     # 添加列名
     columns = data_list[2]
-    output += f"{columns[1]},{columns[2]},{columns[3]},{columns[4]},{columns[5]},{columns[6]},{columns[7].split('/')[0]},对方账号,户名\n"
+    output.append(f"{columns[1]},{columns[2]},{columns[3]},{columns[4]},{columns[5]},{columns[6]},{columns[7].split('/')[0]},对方账号,户名\n")
 
     # 添加数据行
     for row in data_list[3:]:
-        cleaned_row = [str(item).replace(',', '') if not pd.isna(item) else '（空）' for item in row]
+        cleaned_row = [str(item).replace(',', '') for item in row]
         # 处理交易金额，为正数添加'+'
         transaction_amount = cleaned_row[5]
-        if transaction_amount.startswith('-'):
-            transaction_amount = transaction_amount.replace('-', '-')
-        else:
+        if not transaction_amount.startswith('-'):
             transaction_amount = '+' + transaction_amount
 
-        cleaned_row[5] = transaction_amount  # 更新交易金额的格式
-
         account, name = (cleaned_row[8].split('/') + ['（空）', '（空）'])[:2]  # 处理对方账号与户名字段
 
-        output += f"{cleaned_row[1]},{cleaned_row[2]},{cleaned_row[3]},{cleaned_row[4]},{transaction_amount},{cleaned_row[6]},{cleaned_row[7]},{account},{name}\n"
+        output.append(f"{cleaned_row[1]},{cleaned_row[2]},{cleaned_row[3]},{cleaned_row[4]},{transaction_amount},{cleaned_row[6]},{cleaned_row[7]},{account},{name}\n")
 
     # 输出结果
-    return output.encode('utf-8-sig')
+    return ''.join(output).encode('utf-8-sig')
 
 
 def ccb_debit_get_status(data):
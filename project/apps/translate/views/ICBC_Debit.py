@@ -1,8 +1,8 @@
 import re
-import pdfplumber
 # import logging
 
 from project.utils.exceptions import DecryptionError
+from project.utils.pdf import extract_pages, read_pdf_bytes
 from project.apps.maps.models import Assets
 from project.apps.translate.services.init.strategies.icbc_debit_init_strategy import ICBCDebitInitStrategy
 from project.apps.translate.services.mapping_provider import extract_account_string
@@ -53,53 +53,58 @@ def text_with_specific_font(page, fontname, max_fontsize, min_fontsize):
     return text
 
 
-def icbc_debit_pdf_convert_to_csv(file, card_number, password):
+# 工行明细行的正则表达式
+ICBC_DEBIT_ROW_PATTERN = re.compile(
+    r'(\d{4}-\d{2}-\d{2})'    # 日期 yyyy-mm-dd
+    r'(\d{2}:\d{2}:\d{2})'    # 时间 hh:mm:ss
+    r'(\d+)'                   # 账号
+    r'活期'                    # 储种 (固定为活期)
+    r'(\d+)'                   # 序号
+    r'人民币钞'                # 币种+钞汇 (固定为人民币钞)
+    r'(.*?)'                   # 摘要 (任意字符，非贪婪)
+    r'(\d{4})'                 # 地区 (4个数字)
+    r'([-+]\d+,?\d*\.\d{2}|\d+\.\d+[+\-]\d+\.\d{2}|\d+\.\d{2})' # 收入/支出金额(考虑正负和逗号)
+    r'(\d+,?\d*\.\d{2})'         # 余额 (考虑逗号)
+    r'(（空）|[^0-9]+)'         # 对方户名 (非数字序列或（空）)
+    # r'(（空）|\d+)'            # 对方账号 (数字或（空）)
+    r'(（空）|\d+\*\*\*\*\d+|\d+)'            # 对方账号 (数字或（空）)
+    r'([^0-9]+(?=本页支出)|[^0-9]+)' # 渠道 (非数字序列)
+)
+
+
+def icbc_debit_extract_page_rows(page):
+    """提取单页明细，返回 CSV 行列表（供按页并行提取使用）"""
+    specific_text = text_with_specific_font(page, "GSSDFL+SimHei", 7.0,0.900000000000034)  # 假设的字体和大小
+    rows = []
+    for match in re.finditer(ICBC_DEBIT_ROW_PATTERN, specific_text):
+        groups = match.groups()
+        # 解构赋值，同时替换余额和金额中的逗号
+        date, time, account, serial, summary, area, amount, balance, name, opponent_account, channel = groups
+        amount = amount.replace(',', '')  # 去除金额中的逗号
+        balance = balance.replace(',', '')  # 去除余额中的逗号
+        # 拼接字符串
+        rows.append(f"{date} {time},{account},活期,{serial},人民币,钞,{summary},{area},{amount},{balance},{name},{opponent_account},{channel}")
+    return rows
+
+
+def icbc_debit_pdf_convert_to_csv(file, card_number, password, page_count=None):
     """接收字符串，返回CSV格式文件
 
     Args:
         data (string): _description_
         card_number (string): 储蓄卡/信用卡 完整的卡号
+        page_count (int): 总页数（已知时传入，避免重复打开文档）
 
     Returns:
         csv: _description_
     """
-    with pdfplumber.open(file, password=password) as pdf:
-        num_pages = len(pdf.pages)
-        header = ["交易日期,账号,储种,序号,币种,钞汇,摘要,地区,收入/支出金额,余额,对方户名,对方账号,渠道"]
-        # output_lines = [icbc_debit_csvfile_identifier + " 卡号: " + card_number]
-        output_lines = [ICBCDebitInitStrategy.HEADER_MARKER + " 卡号: " + card_number]
-        output_lines.append(",".join(header))
-        for page_num in range(num_pages):
-            page = pdf.pages[page_num]
-            specific_text = text_with_specific_font(page, "GSSDFL+SimHei", 7.0,0.900000000000034)  # 假设的字体和大小
-            # 定义正则表达式
-            pattern = re.compile(
-                r'(\d{4}-\d{2}-\d{2})'    # 日期 yyyy-mm-dd
-                r'(\d{2}:\d{2}:\d{2})'    # 时间 hh:mm:ss
-                r'(\d+)'                   # 账号
-                r'活期'                    # 储种 (固定为活期)
-                r'(\d+)'                   # 序号
-                r'人民币钞'                # 币种+钞汇 (固定为人民币钞)
-                r'(.*?)'                   # 摘要 (任意字符，非贪婪)
-                r'(\d{4})'                 # 地区 (4个数字)
-                r'([-+]\d+,?\d*\.\d{2}|\d+\.\d+[+\-]\d+\.\d{2}|\d+\.\d{2})' # 收入/支出金额(考虑正负和逗号)
-                r'(\d+,?\d*\.\d{2})'         # 余额 (考虑逗号)
-                r'(（空）|[^0-9]+)'         # 对方户名 (非数字序列或（空）)
-                # r'(（空）|\d+)'            # 对方账号 (数字或（空）)
-                r'(（空）|\d+\*\*\*\*\d+|\d+)'            # 对方账号 (数字或（空）)
-                r'([^0-9]+(?=本页支出)|[^0-9]+)' # 渠道 (非数字序列)
-            )
-
-            for match in re.finditer(pattern, specific_text):
-                groups = match.groups()
-                # 解构赋值，同时替换余额和金额中的逗号
-                date, time, account, serial, summary, area, amount, balance, name, opponent_account, channel = groups
-                amount = amount.replace(',', '')  # 去除金额中的逗号
-                balance = balance.replace(',', '')  # 去除余额中的逗号
-                # 拼接字符串
-                csv_row = f"{date} {time},{account},活期,{serial},人民币,钞,{summary},{area},{amount},{balance},{name},{opponent_account},{channel}"
-                output_lines.append(csv_row)
-            final_output = "\n".join(output_lines)
+    header = ["交易日期,账号,储种,序号,币种,钞汇,摘要,地区,收入/支出金额,余额,对方户名,对方账号,渠道"]
+    # output_lines = [icbc_debit_csvfile_identifier + " 卡号: " + card_number]
+    output_lines = [ICBCDebitInitStrategy.HEADER_MARKER + " 卡号: " + card_number]
+    output_lines.append(",".join(header))
+    for rows in extract_pages(read_pdf_bytes(file), password, icbc_debit_extract_page_rows, page_count):
+        output_lines.extend(rows)
+    final_output = "\n".join(output_lines)
     return final_output
 
 
@@ -267,6 +267,22 @@ class MultiBillAnalyzeView(APIView):
                 'pending_files': pending_files
             }, status=status.HTTP_400_BAD_REQUEST)
 
+        # 入队前嗅探账单类型，不支持的文件直接标记失败，不再进入完整转换
+        passwords = request.data.get('passwords', {})
+        unsupported_files = self.sniff_unsupported_files(file_ids, request.data.get('password') or None, passwords)
+        for file_id in unsupported_files:
+            parse_file, _ = ParseFile.objects.get_or_create(file_id=file_id)
+            parse_file.status = 'failed'
+            parse_file.error_message = '当前账单不支持'
+            parse_file.save()
+        file_ids = [file_id for file_id in file_ids if file_id not in unsupported_files]
+
+        if unsupported_files and not file_ids:
+            return Response({
+                'error': '当前账单不支持',
+                'unsupported_files': unsupported_files
+            }, status=status.HTTP_400_BAD_REQUEST)
+
         # 获取用户的解析模式偏好
         config = FormatConfig.get_user_config(request.user)
         parsing_mode = config.parsing_mode_preference if hasattr(config, 'parsing_mode_preference') else 'review'
@@ -293,7 +309,6 @@ class MultiBillAnalyzeView(APIView):
 
         for file_id in file_ids:
             # 如果提供了 passwords 字典，为每个文件分配对应的密码
-            passwords = request.data.get('passwords', {})
             file_args = args.copy()
             if str(file_id) in passwords:
                 file_args['password'] = passwords[str(file_id)]
@@ -332,6 +347,8 @@ class MultiBillAnalyzeView(APIView):
             'task_group_id': task_group_id,
             'status': 'pending'
         }
+        if unsupported_files:
+            response_data['unsupported_files'] = unsupported_files
         
         if parsing_mode == 'review':
             # 获取解析待办ID列表
@@ -347,6 +364,42 @@ class MultiBillAnalyzeView(APIView):
 
         return Response(response_data, status=status.HTTP_202_ACCEPTED)
 
+    @staticmethod
+    def sniff_unsupported_files(file_ids, password, passwords):
+        """嗅探账单类型，返回确定不支持的文件 ID 列表
+
+        按区间从存储读取（累计不超过 SNIFF_MAX_BYTES），不下载整个文件。
+        文件不存在、加密未提供密码、读取范围内无法确定等情况交由解析任务处理。
+        """
+        from project.apps.file_manager.models import File
+        from project.apps.translate.services.init.bill_init_factory import InitFactory
+        from project.utils.exceptions import BillSniffInconclusiveError
+        from project.utils.file import SNIFF_MAX_BYTES
+        from project.utils.storage_factory import get_storage_client
+
+        storage_client = get_storage_client()
+        unsupported_ids = set()
+        for file_obj in File.objects.filter(id__in=file_ids):
+            file_stream = storage_client.open_range_reader(
+                file_obj.storage_name, file_obj.size, max_bytes=SNIFF_MAX_BYTES, name=file_obj.name
+            )
+            try:
+                strategy = InitFactory.sniff(file_stream, passwords.get(str(file_obj.id), password))
+            except (DecryptionError, BillSniffInconclusiveError):
+                continue
+            except UnsupportedFileTypeError:
+                strategy = None
+            except Exception as e:
+                logger.warning(f"账单类型嗅探失败: file_id={file_obj.id}, 错误: {str(e)}")
+                continue
+            finally:
+                file_stream.close()
+
+            # 解析库可能吞掉读取超限的异常，超限时的结果不可信
+            if strategy is None and not file_stream.raw.limit_exceeded:
+                unsupported_ids.add(str(file_obj.id))
+        return [file_id for file_id in file_ids if str(file_id) in unsupported_ids]
+
 
 class TaskGroupStatusView(APIView):
     """任务组状态查询接口
@@ -863,6 +916,7 @@ class ParseReviewConfirmView(ParseReviewViewSet):
         from project.apps.translate.services.parse_review_service import ParseReviewService
         from project.apps.translate.utils.beancount_validator import BeancountValidator
         from project.utils.file import BeanFileManager
+        from project.utils.ledger_events import publish_ledger_change
         
         final_entries = ParseReviewService.get_final_result(parse_file.file_id)
         
@@ -873,17 +927,16 @@ class ParseReviewConfirmView(ParseReviewViewSet):
             )
         
         # 合并所有条目
-        formatted_text = '\n\n'.join([
-            entry['formatted'].rstrip() for entry in final_entries
-        ])
+        entries_list = [entry['formatted'].rstrip() for entry in final_entries]
+        formatted_text = '\n\n'.join(entries_list)
         
-        # 进行 Beancount 语法校验
-        is_valid, error_message, _ = BeancountValidator.validate_entries(formatted_text)
+        # 进行 Beancount 语法校验（单次解析，按行号定位错误条目）
+        is_valid, error_message, error_entries_indices = BeancountValidator.validate_multiple_entries(
+            entries_list, separator='\n\n'
+        )
         
         if not is_valid:
-            # 逐条校验以定位错误条目，返回结构化错误信息
-            entries_list = [entry['formatted'].rstrip() for entry in final_entries]
-            _, _, error_entries_indices = BeancountValidator.validate_multiple_entries(entries_list)
+            # 返回结构化错误信息
             error_entries = [
                 {
                     'uuid': final_entries[idx]['uuid'],
@@ -907,6 +960,7 @@ class ParseReviewConfirmView(ParseReviewViewSet):
             
             with open(bean_file_path, 'w', encoding='utf-8') as f:
                 f.write(formatted_text)
+            publish_ledger_change(request.user, [bean_file_path])
             
             # 更新状态
             parse_file.status = 'parsed'
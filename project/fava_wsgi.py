@@ -0,0 +1,16 @@
+"""
+共享 Fava 工作进程的 WSGI 入口（FAVA_DEPLOY_MODE=shared）
+
+通过 conf/fava_shared_uwsgi.ini 启动，按路径中的实例 uuid 为多个用户提供 Fava。
+"""
+
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings.settings')  # 统一配置
+django.setup()
+
+from project.apps.fava_instances.services.shared_fava import SharedFavaApplication  # noqa: E402
+
+application = SharedFavaApplication()
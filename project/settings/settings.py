@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.0/ref/settings/
 import datetime
 import os
 import sys
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -485,6 +486,12 @@ LOGGING = {
     }
 }
 
+# 上传处理器：解析请求体时同步计算文件 SHA-256（用于内容寻址存储）
+FILE_UPLOAD_HANDLERS = [
+    'project.utils.upload_handlers.HashingMemoryFileUploadHandler',
+    'project.utils.upload_handlers.HashingTemporaryFileUploadHandler',
+]
+
 # 存储类型配置 (minio, oss, s3)
 STORAGE_TYPE = os.environ.get('STORAGE_TYPE', 'minio')
 
@@ -519,6 +526,13 @@ S3_CONFIG = {
 
 # Gitea 配置
 GITHUB_TOKEN = os.environ.get('GITHUB_TOKEN', '')  # GitHub Personal Access Token，用于模板仓库访问防止限流
+GITHUB_API_URL = os.environ.get('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+# 模板仓库本地缓存（按 blob SHA 存储文件内容，树结构按 ETag 条件请求）；默认位于临时目录，不写入源码目录
+GIT_TEMPLATE_CACHE_PATH = os.environ.get(
+    'GIT_TEMPLATE_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'beancount-trans', 'git_templates')
+)
+# 模板文件并发下载数
+GIT_TEMPLATE_DOWNLOAD_WORKERS = int(os.environ.get('GIT_TEMPLATE_DOWNLOAD_WORKERS', '8'))
 GITEA_BASE_URL = os.environ.get('GITEA_BASE_URL', '')
 GITEA_ADMIN_TOKEN = os.environ.get('GITEA_ADMIN_TOKEN', '')  # 必填
 GITEA_ORG_NAME = os.environ.get('GITEA_ORG_NAME', 'beancount-trans')
@@ -538,14 +552,27 @@ GIT_SSH_LS_REMOTE_TIMEOUT = int(os.environ.get('GIT_SSH_LS_REMOTE_TIMEOUT', '120
 GIT_SSH_CLONE_TIMEOUT = int(os.environ.get('GIT_SSH_CLONE_TIMEOUT', '600'))
 GIT_SSH_FETCH_TIMEOUT = int(os.environ.get('GIT_SSH_FETCH_TIMEOUT', '600'))
 
+# 同步克隆/拉取的历史深度（0 为完整历史）；部分克隆（--filter=blob:none）按需下载文件内容
+GIT_SYNC_CLONE_DEPTH = int(os.environ.get('GIT_SYNC_CLONE_DEPTH', '1'))
+GIT_SYNC_PARTIAL_CLONE = env_to_bool('GIT_SYNC_PARTIAL_CLONE', True)
+
+# 异步同步的仓库锁与排队标记过期时间（秒），需大于一次同步的最长耗时，防止任务丢失后仓库永久无法同步
+GIT_SYNC_LOCK_TIMEOUT = int(os.environ.get('GIT_SYNC_LOCK_TIMEOUT', '1800'))
+
 # Traefik 配置
 TRAEFIK_NETWORK = os.environ.get('TRAEFIK_NETWORK', 'shared-network')
 FAVA_IMAGE = os.environ.get('FAVA_IMAGE', 'dhr2333/beancount-trans-assets:latest').strip()
 CERTRESOLVER = os.environ.get('CERTRESOLVER', 'alicloud-dns')
 
 # Fava 部署模式：dynamic（默认，Docker+Traefik 动态容器）| static（自托管多固定容器 + 用户 URL 映射）
+# | shared（少量共享工作进程按实例 uuid 服务多个用户账本，见 bin/fava_shared_start.sh）
 _fava_mode = os.environ.get('FAVA_DEPLOY_MODE', 'dynamic').strip().lower()
-FAVA_DEPLOY_MODE = _fava_mode if _fava_mode in ('dynamic', 'static') else 'dynamic'
+FAVA_DEPLOY_MODE = _fava_mode if _fava_mode in ('dynamic', 'static', 'shared') else 'dynamic'
+
+# 共享模式：每个工作进程最多同时加载的账本数量（按最近使用淘汰）
+FAVA_SHARED_MAX_LEDGERS = int(os.environ.get('FAVA_SHARED_MAX_LEDGERS', '16'))
+# 共享模式：浏览器访问共享工作进程的地址前缀（为空时重定向到当前站点的 /{uuid}/）
+FAVA_SHARED_URL = os.environ.get('FAVA_SHARED_URL', '').rstrip('/')
 
 from project.utils.fava_static import parse_fava_static_user_map
 
@@ -570,6 +597,17 @@ CELERY_BEAT_SCHEDULE = {
 
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
+# Fava 容器的启动与回收走独立队列，由 bin/celery_fava_worker_start.sh 启动的 worker 处理，
+# 避免冷启动排在账单解析、Git 同步等长任务之后（默认 worker 并发为 1）
+CELERY_FAVA_QUEUE = 'fava'
+CELERY_TASK_ROUTES = {
+    'fava_instances.tasks.start_fava_instance': {'queue': CELERY_FAVA_QUEUE},
+    'fava_instances.tasks.cleanup_fava_containers': {'queue': CELERY_FAVA_QUEUE},
+}
+
+# PDF 账单按页并行提取的进程数（<=1 时在当前进程内顺序提取）
+PDF_CONVERT_WORKERS = int(os.environ.get('PDF_CONVERT_WORKERS', str(min(4, os.cpu_count() or 1))))
+
 # Bean文件相关配置
 ASSETS_BASE_PATH = BASE_DIR / 'Assets'
 ASSETS_HOST_PATH = os.environ.get('ASSETS_HOST_PATH', str(ASSETS_BASE_PATH))
@@ -5,6 +5,9 @@
 - 禁用Celery任务
 - 简化日志输出
 """
+import os
+import tempfile
+
 from .settings import *
 
 # 测试模式标记
@@ -81,3 +84,6 @@ STORAGE_TYPE = 'local'
 
 # 测试报告输出目录
 TEST_REPORTS_DIR = BASE_DIR / 'reports'
+
+# 模板缓存写入临时目录，不污染项目目录
+GIT_TEMPLATE_CACHE_PATH = os.path.join(tempfile.gettempdir(), 'beancount_trans_test_template_cache')
@@ -0,0 +1,84 @@
+# project/utils/excel.py
+"""
+XLSX 账单流式读取
+
+以 openpyxl 只读模式逐行读取工作表，直接生成字符串行与 CSV 字节，不构建 DataFrame。
+单元格的字符串化、空行与行宽处理与 ``pd.read_excel(header=None, dtype=str).fillna('')``
+保持一致，便于与原有转换结果对齐。
+"""
+import csv
+import io
+from typing import Iterable, List, Optional
+
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+
+# XLSX（OOXML）文件为 ZIP 容器
+XLSX_MAGIC = b'PK\x03\x04'
+
+
+def is_xlsx(file) -> bool:
+    """根据文件头判断是否为 XLSX（旧版 .xls 为 OLE2 格式，不适用流式读取）"""
+    file.seek(0)
+    head = file.read(len(XLSX_MAGIC))
+    file.seek(0)
+    return head == XLSX_MAGIC
+
+
+def _cell_to_str(cell) -> str:
+    value = cell.value
+    if value is None or cell.data_type == TYPE_ERROR:
+        return ''
+    if cell.data_type == TYPE_NUMERIC and not isinstance(value, bool):
+        if int(value) == value:
+            return str(int(value))
+        return str(float(value))
+    return str(value)
+
+
+def read_xlsx_rows(file, max_rows: Optional[int] = None) -> List[List[str]]:
+    """读取首个工作表的全部行（字符串）
+
+    - 去除每行末尾的空单元格，再按最大行宽补齐
+    - 保留中间空行，去除末尾空行（与 pandas 读取结果一致）
+    - 指定 max_rows 时只读取前 max_rows 行（用于识别表头区域）
+    """
+    file.seek(0)
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        # 部分导出文件的 dimension 不准确，重置后按实际单元格读取
+        sheet.reset_dimensions()
+        rows = []
+        max_width = 0
+        last_row_with_data = -1
+        for row in sheet.iter_rows(max_row=max_rows):
+            values = [_cell_to_str(cell) for cell in row]
+            while values and values[-1] == '':
+                values.pop()
+            if values:
+                max_width = max(max_width, len(values))
+                last_row_with_data = len(rows)
+            rows.append(values)
+    finally:
+        workbook.close()
+
+    del rows[last_row_with_data + 1:]
+
+    for values in rows:
+        if len(values) < max_width:
+            values.extend([''] * (max_width - len(values)))
+    return rows
+
+
+def rows_contain(rows: Iterable[List[str]], keyword: str) -> bool:
+    """判断行中是否有单元格包含关键字"""
+    return any(keyword in item for row in rows for item in row)
+
+
+def rows_to_csv_bytes(rows: Iterable[List[str]]) -> bytes:
+    """将字符串行写为 CSV 字节（utf-8-sig，与 DataFrame.to_csv 输出一致）"""
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator='\n')
+    writer.writerows(rows)
+    return output.getvalue().encode('utf-8-sig')
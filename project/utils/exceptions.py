@@ -30,3 +30,7 @@ class DecryptionError(Exception):
     def __init__(self, message, error_code = status.HTTP_400_BAD_REQUEST):
         super().__init__(message)
         self.error_code = error_code
+
+
+class BillSniffInconclusiveError(Exception):
+    """嗅探读取范围内无法确定账单类型（如标识不在 PDF 首页），交由解析任务完整识别"""
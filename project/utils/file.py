@@ -1,16 +1,20 @@
 # project/utils/file.py
+import codecs
 import io
 import os
 import re
 import tempfile
 import zipfile
+from contextlib import contextmanager
 import PyPDF2
 import chardet
 import pandas as pd
 import hashlib
 import logging
 
-from project.utils.exceptions import UnsupportedFileTypeError, DecryptionError
+from project.utils.exceptions import BillSniffInconclusiveError, UnsupportedFileTypeError, DecryptionError
+from project.utils.excel import is_xlsx, read_xlsx_rows, rows_contain, rows_to_csv_bytes
+from project.utils.ledger_events import publish_ledger_change
 from project.apps.translate.utils import get_card_number
 from project.apps.translate.services.init.strategies.boc_debit_init_strategy import BOCDebitInitStrategy
 from project.apps.translate.views.BOC_Debit import boc_debit_pdf_convert_to_string, boc_debit_string_convert_to_csv
@@ -19,7 +23,7 @@ from project.apps.translate.views.ICBC_Debit import icbc_debit_pdf_convert_to_cs
 from project.apps.translate.services.init.strategies.cmb_credit_init_strategy import CMBCreditInitStrategy
 from project.apps.translate.views.CMB_Credit import cmb_credit_pdf_convert_to_csv
 from project.apps.translate.services.init.strategies.ccb_debit_init_strategy import CCBDebitInitStrategy
-from project.apps.translate.views.CCB_Debit import ccb_debit_string_convert_to_csv
+from project.apps.translate.views.CCB_Debit import ccb_debit_string_convert_to_csv, ccb_debit_rows_convert_to_csv
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
@@ -27,6 +31,20 @@ logger = logging.getLogger(__name__)
 
 SUPPORTED_EXTENSIONS = ['.csv', '.xls', '.xlsx', '.pdf', '.zip']
 
+UTF_8 = 'utf-8'
+
+# 编码探测（chardet）的采样上限，避免对整个文件运行纯 Python 检测
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+# UTF-32 的 BOM 以 UTF-16 的 BOM 开头，需优先匹配
+BOM_ENCODINGS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
 def create_temporary_file(file_name):
     """Create a temporary file and return its path."""
     try:
@@ -53,6 +71,19 @@ def convert_to_csv_bytes(file, password=None) -> bytes:
     Returns:
         转换后的文件内容（bytes）。
     """
+    csv_bytes, _ = convert_to_csv(file, password)
+    return csv_bytes
+
+def convert_to_csv(file, password=None):
+    """
+    转换为CSV格式，并返回转换结果的声明编码。
+
+    Excel/PDF 由本项目转换器生成 UTF-8 内容，声明编码为 UTF_8；
+    原始 CSV 的编码未知，声明编码为 None，由 convert_to_utf8 识别。
+
+    Returns:
+        (csv_bytes, declared_encoding)
+    """
     _, file_extension = os.path.splitext(file.name)
     file_extension = file_extension.lower()
 
@@ -61,13 +92,13 @@ def convert_to_csv_bytes(file, password=None) -> bytes:
         raise UnsupportedFileTypeError(f"Unsupported file extension: {file_extension}")
 
     if file_extension == '.csv':
-        return file.read()
+        return file.read(), None
 
     elif file_extension in ['.xls', '.xlsx']:
-        return handle_excel(file)
+        return handle_excel(file), UTF_8
 
     elif file_extension == '.pdf':
-        return handle_pdf(file, password)
+        return handle_pdf(file, password), UTF_8
 
     elif file_extension == '.zip':
         return handle_zip(file, password)
@@ -77,15 +108,21 @@ def convert_df_to_csv_bytes(df):
     csv_content = df.to_csv(index=False, header=False, encoding='utf-8-sig')
     return csv_content.encode('utf-8-sig')
 
+# Excel 账单标识所在的表头区域行数
+EXCEL_HEADER_ROWS = 10
+
+
 def is_ccb_bill(df):
     """检查是否为建行账单"""
-    for _, row in df.iterrows():
-        for item in row:
-            if pd.notnull(item) and CCBDebitInitStrategy.SOURCE_FILE_IDENTIFIER in str(item):
-                return True
+    for column in df.columns:
+        if df[column].astype(str).str.contains(CCBDebitInitStrategy.SOURCE_FILE_IDENTIFIER, regex=False).any():
+            return True
     return False
 
 def handle_excel(file):
+    if is_xlsx(file):
+        return handle_xlsx(file)
+
     df = pd.read_excel(file, header=None, dtype=str)
 
     df.fillna('', inplace=True)  # 替换NaN为''，避免后续处理中的错误
@@ -96,6 +133,120 @@ def handle_excel(file):
     else:
         return convert_df_to_csv_bytes(df)
 
+def handle_xlsx(file):
+    """以只读模式流式读取 XLSX，仅在表头区域识别账单类型"""
+    rows = read_xlsx_rows(file)
+    if rows_contain(rows[:EXCEL_HEADER_ROWS], CCBDebitInitStrategy.SOURCE_FILE_IDENTIFIER):
+        return ccb_debit_rows_convert_to_csv(rows)
+    return rows_to_csv_bytes(rows)
+
+# 账单类型嗅探的读取上限（按源文件格式声明，均不做完整转换）
+# - CSV：只读取开头 SNIFF_CSV_BYTES 字节
+# - XLS/XLSX：只读取前 SNIFF_EXCEL_ROWS 行（表头区域）
+# - PDF：只提取前 SNIFF_PDF_PAGES 页文本；未识别且还有后续页时无法确定，交由解析任务逐页识别
+# - ZIP：只解压首个支持的账单文件，CSV 仅解压开头部分；其他格式超过 SNIFF_ZIP_MEMBER_BYTES 时无法确定
+# - 从存储读取源文件时累计不超过 SNIFF_MAX_BYTES 字节（见 StorageBackend.open_range_reader）
+SNIFF_CSV_BYTES = 4 * 1024
+SNIFF_EXCEL_ROWS = EXCEL_HEADER_ROWS
+SNIFF_PDF_PAGES = 1
+SNIFF_ZIP_MEMBER_BYTES = 512 * 1024
+SNIFF_MAX_BYTES = 512 * 1024
+
+
+def sniff_bill_head(file, password=None):
+    """读取账单开头内容用于识别账单类型（读取量受 SNIFF_* 上限约束）
+
+    Args:
+        file: 上传的文件对象（需有 name 属性）
+        password (str): PDF/ZIP 文件的解密密码
+
+    Returns:
+        (first_line, source_text): 转换后 CSV 的首行（CSV/Excel），
+        以及源文件表头区域文本（Excel 表头行 / PDF 首页文本）
+
+    Raises:
+        UnsupportedFileTypeError: 文件类型不支持
+        DecryptionError: 加密文件未提供密码或密码错误
+        BillSniffInconclusiveError: 读取范围内无法确定账单类型
+    """
+    _, file_extension = os.path.splitext(file.name)
+    file_extension = file_extension.lower()
+
+    if file_extension not in SUPPORTED_EXTENSIONS:
+        raise UnsupportedFileTypeError(f"Unsupported file extension: {file_extension}")
+
+    file.seek(0)
+    if file_extension == '.csv':
+        head = file.read(SNIFF_CSV_BYTES)
+        first_line = convert_to_utf8(head.split(b'\n', 1)[0])
+        return first_line.decode('utf-8', errors='ignore').strip(), ''
+
+    if file_extension in ['.xls', '.xlsx']:
+        if is_xlsx(file):
+            rows = read_xlsx_rows(file, max_rows=SNIFF_EXCEL_ROWS)
+        else:
+            df = pd.read_excel(file, header=None, dtype=str, nrows=SNIFF_EXCEL_ROWS)
+            rows = df.fillna('').values.tolist()
+        header_lines = [rows_to_csv_bytes([row]).decode('utf-8-sig').rstrip('\n') for row in rows]
+        first_line = header_lines[0] if header_lines else ''
+        return first_line.strip(), '\n'.join(header_lines)
+
+    if file_extension == '.pdf':
+        pdf = PyPDF2.PdfReader(file)
+        if pdf.is_encrypted:
+            if password is None or (isinstance(password, str) and not password.strip()):
+                raise DecryptionError("PDF 文件已加密，请提供解密密码", 401)
+            if not pdf.decrypt(password):
+                raise DecryptionError("PDF 解密失败：口令错误或文件已损坏", 401)
+        pages = pdf.pages[:SNIFF_PDF_PAGES]
+        text = ''.join(page.extract_text() or '' for page in pages)
+        if len(pdf.pages) > SNIFF_PDF_PAGES and not any(identifier in text for identifier in PDF_BILL_IDENTIFIERS):
+            # 账单标识可能在后续页（detect_pdf_bill 逐页识别），不能据此判定为不支持
+            raise BillSniffInconclusiveError("PDF 首页未找到账单标识")
+        return '', text
+
+    # ZIP：按首个支持的账单文件嗅探
+    with open_zip_bill(file, password) as (zf, info, pwd):
+        inner_name = os.path.basename(info.filename)
+        with zf.open(info, pwd=pwd) as member:
+            if inner_name.lower().endswith('.csv'):
+                inner_bytes = member.read(SNIFF_CSV_BYTES)
+            elif info.file_size > SNIFF_ZIP_MEMBER_BYTES:
+                raise BillSniffInconclusiveError(f"ZIP 内账单文件过大，无法在嗅探上限内识别: {inner_name}")
+            else:
+                inner_bytes = member.read()
+        inner_file = io.BytesIO(inner_bytes)
+        inner_file.name = inner_name
+        return sniff_bill_head(inner_file, password)
+
+# PDF 账单识别标识（按识别优先级排列）
+PDF_BILL_IDENTIFIERS = [
+    CMBCreditInitStrategy.SOURCE_FILE_IDENTIFIER,
+    BOCDebitInitStrategy.SOURCE_FILE_IDENTIFIER,
+    ICBCDebitInitStrategy.SOURCE_FILE_IDENTIFIER,
+]
+
+
+def detect_pdf_bill(pdf):
+    """从首页开始逐页识别 PDF 账单类型，识别成功即停止
+
+    账单标识通常位于首页，因此一般只需提取一页文本。
+
+    Returns:
+        (identifier, scanned_text, scanned_pages): 识别到的账单标识（未识别为 None）、
+        已提取的文本及页数
+    """
+    scanned_text = ""
+    scanned_pages = 0
+    for page in pdf.pages:
+        scanned_text += page.extract_text() or ""
+        scanned_pages += 1
+        for identifier in PDF_BILL_IDENTIFIERS:
+            if identifier in scanned_text:
+                return identifier, scanned_text, scanned_pages
+    return None, scanned_text, scanned_pages
+
+
 def handle_pdf(file, password):
     pdf = PyPDF2.PdfReader(file)
     if pdf.is_encrypted:
@@ -104,21 +255,34 @@ def handle_pdf(file, password):
         if not pdf.decrypt(password):
             raise DecryptionError("PDF 解密失败：口令错误或文件已损坏", 401)
 
-    content = extract_text_from_pdf(pdf)
+    identifier, content, scanned_pages = detect_pdf_bill(pdf)
+    page_count = len(pdf.pages)
+
+    def full_text():
+        # 补齐未扫描页的文本，与逐页拼接全文结果一致
+        return content + extract_text_from_pdf(pdf, start=scanned_pages)
 
     # 根据内容处理PDF
-    if CMBCreditInitStrategy.SOURCE_FILE_IDENTIFIER in content:
-        return cmb_credit_pdf_convert_to_csv(content).encode()
-    elif BOCDebitInitStrategy.SOURCE_FILE_IDENTIFIER in content:
-        card_number = get_card_number(content, BOCDebitInitStrategy.SOURCE_FILE_IDENTIFIER)
-        string_content = boc_debit_pdf_convert_to_string(file, password)
+    if identifier == CMBCreditInitStrategy.SOURCE_FILE_IDENTIFIER:
+        return cmb_credit_pdf_convert_to_csv(full_text()).encode()
+    elif identifier == BOCDebitInitStrategy.SOURCE_FILE_IDENTIFIER:
+        card_number = get_pdf_card_number(content, full_text, identifier)
+        string_content = boc_debit_pdf_convert_to_string(file, password, page_count)
         return boc_debit_string_convert_to_csv(string_content, card_number).encode()
-    elif ICBCDebitInitStrategy.SOURCE_FILE_IDENTIFIER in content:
-        card_number = get_card_number(content, ICBCDebitInitStrategy.SOURCE_FILE_IDENTIFIER)
-        return icbc_debit_pdf_convert_to_csv(file, card_number, password).encode()
+    elif identifier == ICBCDebitInitStrategy.SOURCE_FILE_IDENTIFIER:
+        card_number = get_pdf_card_number(content, full_text, identifier)
+        return icbc_debit_pdf_convert_to_csv(file, card_number, password, page_count).encode()
     else:
         raise UnsupportedFileTypeError("该 PDF 不是支持的账单类型（仅支持招商信用卡、中行/工行储蓄卡账单）")
 
+
+def get_pdf_card_number(scanned_text, full_text, identifier):
+    """优先从已扫描的页面中提取卡号，未找到时再提取全文"""
+    try:
+        return get_card_number(scanned_text, identifier)
+    except AttributeError:
+        return get_card_number(full_text(), identifier)
+
 def handle_zip(file, password=None):
     """
     解压 ZIP 文件并提取第一个支持的账单文件（csv/xls/xlsx/pdf），再转换为 CSV 字节。
@@ -128,14 +292,36 @@ def handle_zip(file, password=None):
         password (str): ZIP 解压密码，若压缩包受保护
 
     Returns:
-        转换后的文件内容（bytes）
+        (转换后的文件内容（bytes）, 声明编码)
+    """
+    with open_zip_bill(file, password) as (zf, target_info, pwd):
+        inner_bytes = zf.read(target_info, pwd=pwd)
+
+        # 构造类文件对象供 convert_to_csv 使用
+        inner_name = os.path.basename(target_info.filename)
+        inner_file = io.BytesIO(inner_bytes)
+        inner_file.name = inner_name
+
+    return convert_to_csv(inner_file, password)
+
+
+@contextmanager
+def open_zip_bill(file, password=None):
+    """打开 ZIP 文件并定位第一个支持的账单文件
+
+    Yields:
+        (zf, target_info, pwd): ZipFile 对象、账单文件信息与 bytes 形式的密码
+
+    Raises:
+        UnsupportedFileTypeError: ZIP 损坏或未找到支持的账单文件
+        DecryptionError: 口令错误
     """
     file.seek(0)
-    raw = file.read()
     pwd = password.encode('utf-8') if password else None
 
     try:
-        with zipfile.ZipFile(io.BytesIO(raw), 'r') as zf:
+        # 直接基于可寻址的文件对象读取中央目录与目标成员，不复制整个压缩包
+        with zipfile.ZipFile(file, 'r') as zf:
             # 查找第一个支持的扩展名
             supported = {ext.lower() for ext in SUPPORTED_EXTENSIONS if ext != '.zip'}
             target_info = None
@@ -151,45 +337,81 @@ def handle_zip(file, password=None):
                 raise UnsupportedFileTypeError("ZIP 压缩包内未找到支持的账单文件（csv/xls/xlsx/pdf）")
 
             try:
-                inner_bytes = zf.read(target_info, pwd=pwd)
+                yield zf, target_info, pwd
             except RuntimeError as e:
                 if 'password' in str(e).lower() or 'bad password' in str(e).lower():
                     raise DecryptionError("ZIP 解密失败：口令错误或文件已损坏", 401)
                 raise
             except zipfile.BadZipFile:
                 raise DecryptionError("ZIP 解密失败：口令错误或文件已损坏", 401)
-
-            # 构造类文件对象供 convert_to_csv_bytes 使用
-            inner_name = os.path.basename(target_info.filename)
-            inner_file = io.BytesIO(inner_bytes)
-            inner_file.name = inner_name
-
-            return convert_to_csv_bytes(inner_file, password)
     except zipfile.BadZipFile as e:
         logger.warning("ZIP 文件损坏或格式错误")
         raise UnsupportedFileTypeError("ZIP 文件损坏或格式不正确")
-    except DecryptionError:
-        raise
-    except UnsupportedFileTypeError:
-        raise
 
 
-def extract_text_from_pdf(pdf):
+def extract_text_from_pdf(pdf, start=0):
     content = ""
-    for page in pdf.pages:
+    for page in pdf.pages[start:]:
         content += page.extract_text() or ""
     return content
 
-def convert_to_utf8(content_bytes: bytes) -> bytes:
-    """将任意编码内容转换为UTF-8字节"""
+def detect_bom(content_bytes: bytes):
+    """根据 BOM 判断编码，返回 (encoding, bom_length)，无 BOM 时返回 (None, 0)"""
+    for bom, encoding in BOM_ENCODINGS:
+        if content_bytes.startswith(bom):
+            return encoding, len(bom)
+    return None, 0
+
+def resolve_encoding(content_bytes: bytes, declared_encoding=None, encoding_hint=None) -> str:
+    """确定内容编码
+
+    依次尝试：BOM → 转换器声明的编码 → 严格 UTF-8 解码 → 账单策略提供的编码提示
+    → 对有限长度样本运行 chardet。
+
+    Args:
+        content_bytes: 待识别的内容
+        declared_encoding: 生成该内容的转换器声明的编码（可信，不再校验）
+        encoding_hint: 账单策略提供的编码提示（需通过严格解码校验）
+    """
+    bom_encoding, _ = detect_bom(content_bytes)
+    if bom_encoding:
+        return bom_encoding
+
+    if declared_encoding:
+        return declared_encoding
+
+    try:
+        content_bytes.decode(UTF_8)
+        return UTF_8
+    except UnicodeDecodeError:
+        pass
+
+    if encoding_hint:
+        try:
+            content_bytes.decode(encoding_hint)
+            return encoding_hint
+        except (UnicodeDecodeError, LookupError):
+            pass
+
+    detected = chardet.detect(content_bytes[:ENCODING_SAMPLE_SIZE])
+    source_encoding = detected['encoding'] or UTF_8
+
+    # 处理中文编码特例
+    if source_encoding.lower() in ['gb2312', 'gbk', 'gb18030']:
+        source_encoding = 'gb18030'
+    return source_encoding
+
+def convert_to_utf8(content_bytes: bytes, declared_encoding=None, encoding_hint=None) -> bytes:
+    """将任意编码内容转换为UTF-8字节
+
+    已是 UTF-8 的内容（含转换器声明为 UTF-8 的输出）仅去除 BOM，不重新解码。
+    """
     try:
-        # 检测原始编码
-        detected = chardet.detect(content_bytes)
-        source_encoding = detected['encoding'] or 'utf-8'
+        source_encoding = resolve_encoding(content_bytes, declared_encoding, encoding_hint)
 
-        # 处理中文编码特例
-        if source_encoding.lower() in ['gb2312', 'gbk', 'gb18030']:
-            source_encoding = 'gb18030'
+        if source_encoding.lower() in (UTF_8, 'utf-8-sig'):
+            _, bom_length = detect_bom(content_bytes)
+            return content_bytes[bom_length:] if bom_length else content_bytes
 
         # 转换为UTF-8
         try:
@@ -211,7 +433,11 @@ def convert_to_utf8(content_bytes: bytes) -> bytes:
         return content_bytes
 
 def generate_file_hash(file):
-    """生成文件哈希值"""
+    """生成文件哈希值（上传处理器已在接收时计算的直接复用，无需再次读取文件）"""
+    precomputed = getattr(file, 'sha256', None)
+    if precomputed:
+        return precomputed
+
     hasher = hashlib.sha256()
     for chunk in file.chunks():
         hasher.update(chunk)
@@ -366,6 +592,7 @@ class BeanFileManager:
             with open(trans_main_path, 'w', encoding='utf-8') as f:
                 f.write("; Trans directory - Auto-generated includes\n")
                 f.write("; This file is automatically generated by the Beancount-Trans\n\n")
+            publish_ledger_change(user_or_username, [trans_main_path])
             logger.debug(f"创建 trans/main.bean 文件: {trans_main_path}")
 
     @staticmethod
@@ -408,6 +635,7 @@ plugin "beancount.plugins.auto_accounts"  ; 根据条目自动添加账户插件
 include "trans/main.bean"
 """
                 f.write(template)
+            publish_ledger_change(user_or_username, [main_bean_path])
             logger.debug(f"创建 main.bean 文件: {main_bean_path}")
         # else:
         #     # 确保 main.bean 包含 include "trans/main.bean"
@@ -438,6 +666,7 @@ include "trans/main.bean"
         if not os.path.exists(bean_path):
             with open(bean_path, 'w', encoding='utf-8') as f:
                 pass  # 创建空文件
+            publish_ledger_change(user_or_username, [bean_path])
 
         return os.path.basename(bean_path)
 
@@ -475,6 +704,7 @@ include "trans/main.bean"
             # 写入更新后的内容
             with open(trans_main_path, 'w', encoding='utf-8') as f:
                 f.writelines(lines)
+            publish_ledger_change(user_or_username, [trans_main_path])
             logger.debug(f"在 trans/main.bean 中添加 include: {bean_filename}")
 
     @staticmethod
@@ -505,6 +735,7 @@ include "trans/main.bean"
         if len(new_lines) != len(lines):
             with open(trans_main_path, 'w', encoding='utf-8') as f:
                 f.writelines(new_lines)
+            publish_ledger_change(user_or_username, [trans_main_path])
             logger.debug(f"从 trans/main.bean 中移除 include: {bean_filename}")
 
     # # 向后兼容的别名方法
@@ -540,6 +771,7 @@ include "trans/main.bean"
         bean_path = BeanFileManager.get_bean_file_path(user_or_username, bean_filename)
         if os.path.exists(bean_path):
             os.remove(bean_path)
+            publish_ledger_change(user_or_username, [bean_path])
 
     @staticmethod
     def clear_bean_file(user_or_username, bean_filename):
@@ -548,6 +780,7 @@ include "trans/main.bean"
         if os.path.exists(bean_path):
             with open(bean_path, 'w', encoding='utf-8') as f:
                 f.write('')  # 清空内容
+            publish_ledger_change(user_or_username, [bean_path])
 
     @staticmethod
     def update_main_bean_username(user_or_username, new_username):
@@ -575,6 +808,7 @@ include "trans/main.bean"
             
             with open(main_bean_path, 'w', encoding='utf-8') as f:
                 f.write(content)
+            publish_ledger_change(user_or_username, [main_bean_path])
 
     @staticmethod
     def rename_user_directory(old_username, new_username):
@@ -593,6 +827,9 @@ include "trans/main.bean"
         if os.path.exists(old_path) and not os.path.exists(new_path):
             try:
                 os.rename(old_path, new_path)
+                # 账本目录整体变化；调用时用户名可能尚未更新，新旧用户名均发布
+                for username in (old_username, new_username):
+                    publish_ledger_change(username)
                 logger.info(f"Renamed user directory from {old_path} to {new_path}")
                 return True
             except Exception as e:
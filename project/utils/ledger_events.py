@@ -0,0 +1,188 @@
+"""
+账本变更事件
+
+每个写入账本文件的位置（Git 同步、解析写入、对账指令、BeanFileManager）在写入完成后发布变更路径：
+- 用户账本代数（generation）在缓存中递增，跨进程共享
+- 每一代的变更路径集合单独缓存，订阅方可据此只更新受影响的文件
+- 进程内通过 ledger_changed 信号通知
+
+依赖账本内容的缓存使用 LedgerDerivedCache：每次读取先比较代数，代数未变直接返回；
+变更记录完整时增量更新，变更记录缺失（过期、路径未知）时才完整重建，因此不会返回过期数据。
+Fava 等平台之外的写入不会发布事件，订阅方可提供 changed_on_disk 按文件状态补充检测。
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.dispatch import Signal
+
+logger = logging.getLogger(__name__)
+
+# 用户账本代数缓存键（写入后递增）
+LEDGER_GENERATION_KEY = 'ledger_generation:{owner_id}'
+# 每一代的变更路径（相对用户账本目录）；全部变更时为 _ALL_CHANGED
+LEDGER_CHANGES_KEY = 'ledger_changes:{owner_id}:{generation}'
+LEDGER_CHANGES_TIMEOUT = 24 * 3600
+# 落后超过该代数时不再逐代合并变更，直接完整重建
+LEDGER_CHANGES_MAX_GAP = 100
+
+# 进程内账本变更信号，参数：owner_id、generation、paths（frozenset，None 表示全部变更）
+ledger_changed = Signal()
+
+# 变更记录中表示「全部变更」的占位值（缓存无法区分值为 None 与键不存在）
+_ALL_CHANGED = '*'
+
+
+def _resolve_owner_id(user_or_username):
+    """User 对象直接取 ID，username 字符串查询用户ID（用户不存在时返回 None）"""
+    if hasattr(user_or_username, 'username'):
+        return user_or_username.id
+    from django.contrib.auth import get_user_model
+    return get_user_model().objects.filter(username=user_or_username).values_list('id', flat=True).first()
+
+
+def _normalize_paths(user_or_username, paths):
+    """将绝对路径转换为相对用户账本目录的 POSIX 路径"""
+    from project.utils.file import BeanFileManager
+
+    assets_path = None
+    normalized = set()
+    for path in paths:
+        path = os.fspath(path)
+        if os.path.isabs(path):
+            if assets_path is None:
+                assets_path = BeanFileManager.get_user_assets_path(user_or_username)
+            path = os.path.relpath(path, assets_path)
+        normalized.add(path.replace(os.sep, '/'))
+    return frozenset(normalized)
+
+
+def get_ledger_generation(owner_id) -> int:
+    """获取用户账本代数；缺失时以当前时间初始化，保证不会与旧代数重合"""
+    key = LEDGER_GENERATION_KEY.format(owner_id=owner_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def publish_ledger_change(user_or_username, paths=None):
+    """
+    发布账本变更：递增用户账本代数并记录本次变更的路径
+
+    须在文件写入完成后调用。
+
+    Args:
+        user_or_username: User 对象或 username 字符串
+        paths: 变更文件路径序列（绝对路径或相对账本目录）；None 表示全部变更，订阅方完整重建
+
+    Returns:
+        int | None: 新的账本代数；用户不存在时返回 None
+    """
+    owner_id = _resolve_owner_id(user_or_username)
+    if owner_id is None:
+        return None
+
+    changed = None if paths is None else _normalize_paths(user_or_username, paths)
+
+    key = LEDGER_GENERATION_KEY.format(owner_id=owner_id)
+    get_ledger_generation(owner_id)
+    try:
+        generation = cache.incr(key)
+    except ValueError:
+        generation = time.time_ns()
+        cache.set(key, generation, timeout=None)
+
+    # 代数先于变更记录可见：读到新代数但变更记录尚未写入时按缺失处理（完整重建），不会返回过期数据
+    cache.set(
+        LEDGER_CHANGES_KEY.format(owner_id=owner_id, generation=generation),
+        _ALL_CHANGED if changed is None else changed,
+        timeout=LEDGER_CHANGES_TIMEOUT,
+    )
+    ledger_changed.send(sender=None, owner_id=owner_id, generation=generation, paths=changed)
+    return generation
+
+
+def get_ledger_changes(owner_id, since, until):
+    """
+    合并 (since, until] 之间各代的变更路径
+
+    Args:
+        owner_id: 用户ID
+        since: 订阅方已处理的代数
+        until: 当前代数
+
+    Returns:
+        frozenset | None: 变更路径集合；任一代为全部变更或记录缺失时返回 None（需完整重建）
+    """
+    if until < since or until - since > LEDGER_CHANGES_MAX_GAP:
+        return None
+    if until == since:
+        return frozenset()
+
+    keys = [
+        LEDGER_CHANGES_KEY.format(owner_id=owner_id, generation=generation)
+        for generation in range(since + 1, until + 1)
+    ]
+    records = cache.get_many(keys)
+    changed = set()
+    for key in keys:
+        paths = records.get(key)
+        if paths is None or paths == _ALL_CHANGED:
+            return None
+        changed.update(paths)
+    return frozenset(changed)
+
+
+class LedgerDerivedCache:
+    """
+    按账本代数失效的进程内缓存
+
+    build(user) 完整构建缓存值；update(user, value, paths) 根据变更路径增量更新，
+    返回新值，无法增量更新时返回 None 以回退到完整构建。
+    changed_on_disk(user, value) 返回缓存值依赖的文件中在磁盘上已变化的路径，用于发现未发布事件的写入。
+    """
+
+    def __init__(self, build, update=None, changed_on_disk=None, max_entries=64):
+        self.build = build
+        self.update = update
+        self.changed_on_disk = changed_on_disk
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user):
+        # 先读代数再读文件：构建期间发生的写入会使代数前进，下次读取时再处理
+        generation = get_ledger_generation(user.id)
+        with self._lock:
+            cached = self._entries.get(user.id)
+            if cached is not None:
+                self._entries.move_to_end(user.id)
+
+        value = None
+        if cached is not None:
+            cached_generation, cached_value = cached
+            paths = get_ledger_changes(user.id, cached_generation, generation)
+            if paths is not None and self.changed_on_disk is not None:
+                paths = paths | self.changed_on_disk(user, cached_value)
+            if paths is not None and not paths:
+                value = cached_value
+            elif paths is not None and self.update is not None:
+                value = self.update(user, cached_value, paths)
+        if value is None:
+            value = self.build(user)
+
+        with self._lock:
+            self._entries[user.id] = (generation, value)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -5,7 +5,8 @@
 
 import os
 import shutil
-from typing import Optional, BinaryIO, Dict, Any
+from contextlib import contextmanager
+from typing import Iterator, Optional, BinaryIO, Dict, Any
 from django.conf import settings
 from .storage_factory import StorageBackend
 import logging
@@ -78,6 +79,21 @@ class LocalStorageBackend(StorageBackend):
             logger.error(f"文件删除失败: {object_name}, 错误: {str(e)}")
             return False
 
+    def read_range(self, object_name: str, offset: int, length: int) -> Optional[bytes]:
+        """直接读取本地文件的指定区间"""
+        file_path = os.path.join(self.base_path, object_name)
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+
+    @contextmanager
+    def local_path(self, object_name: str) -> Iterator[Optional[str]]:
+        """文件已在本地磁盘，直接返回实际路径（无需复制）"""
+        file_path = os.path.join(self.base_path, object_name)
+        yield file_path if os.path.exists(file_path) else None
+
     def file_exists(self, object_name: str) -> bool:
         """检查本地文件系统中的文件是否存在"""
         file_path = os.path.join(self.base_path, object_name)
@@ -1,9 +1,10 @@
 from minio import Minio
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
+from minio.deleteobjects import DeleteObject
 from minio.error import S3Error
 from .storage_factory import StorageBackend
-from typing import Optional, BinaryIO, Dict
+from typing import Iterable, List, Optional, BinaryIO, Dict
 import logging
 from io import BytesIO
 
@@ -11,6 +12,9 @@ logger = logging.getLogger(__name__)
 
 _minio_client = None
 
+# 流式下载的分块大小
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 class MinIOBackend(StorageBackend):
     """MinIO存储后端实现"""
@@ -46,9 +50,11 @@ class MinIOBackend(StorageBackend):
         try:
             client = self._get_client()
 
-            # 获取文件大小
-            file_data.seek(0, 2)  # 移动到文件末尾
-            file_size = file_data.tell()
+            # 获取文件大小（上传文件对象自带 size 时直接使用）
+            file_size = getattr(file_data, 'size', None)
+            if file_size is None:
+                file_data.seek(0, 2)  # 移动到文件末尾
+                file_size = file_data.tell()
             file_data.seek(0)  # 重置到文件开头
 
             client.put_object(
@@ -81,6 +87,36 @@ class MinIOBackend(StorageBackend):
             logger.error(f"MinIO下载文件失败: {object_name}, 错误: {str(e)}")
             return None
 
+    def read_range(self, object_name: str, offset: int, length: int) -> Optional[bytes]:
+        """从MinIO读取文件指定区间"""
+        try:
+            client = self._get_client()
+            response = client.get_object(self.bucket_name, object_name, offset=offset, length=length)
+            try:
+                return response.read()
+            finally:
+                response.close()
+                response.release_conn()
+        except Exception as e:
+            logger.error(f"MinIO读取文件区间失败: {object_name}, 错误: {str(e)}")
+            return None
+
+    def download_to_file(self, object_name: str, file_obj: BinaryIO) -> bool:
+        """从MinIO分块下载文件到给定的文件对象"""
+        try:
+            client = self._get_client()
+            response = client.get_object(self.bucket_name, object_name)
+            try:
+                for chunk in response.stream(DOWNLOAD_CHUNK_SIZE):
+                    file_obj.write(chunk)
+            finally:
+                response.close()
+                response.release_conn()
+            return True
+        except Exception as e:
+            logger.error(f"MinIO下载文件失败: {object_name}, 错误: {str(e)}")
+            return False
+
     def delete_file(self, object_name: str) -> bool:
         """从MinIO删除文件"""
         try:
@@ -97,6 +133,26 @@ class MinIOBackend(StorageBackend):
             logger.error(f"MinIO删除文件失败: {object_name}, 错误: {str(e)}")
             return False
 
+    def delete_many(self, object_names: Iterable[str]) -> List[str]:
+        """使用 remove_objects 批量删除MinIO文件（客户端按 1000 个一批发送请求）"""
+        object_names = list(dict.fromkeys(object_names))
+        if not object_names:
+            return []
+        try:
+            client = self._get_client()
+            # remove_objects 惰性执行，需遍历结果才会发送请求
+            errors = client.remove_objects(self.bucket_name, [DeleteObject(name) for name in object_names])
+            failed = []
+            for error in errors:
+                if error.code == "NoSuchKey":
+                    continue
+                logger.error(f"MinIO删除文件失败: {error.name}, 错误: {error.message}")
+                failed.append(error.name)
+            return failed
+        except Exception as e:
+            logger.error(f"MinIO批量删除文件失败: {len(object_names)} 个对象, 错误: {str(e)}")
+            return object_names
+
     def file_exists(self, object_name: str) -> bool:
         """检查文件是否存在于MinIO"""
         try:
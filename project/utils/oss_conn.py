@@ -1,9 +1,10 @@
 import oss2
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
-from .storage_factory import StorageBackend
-from typing import Optional, BinaryIO, Dict
+from .storage_factory import DELETE_BATCH_SIZE, StorageBackend
+from typing import Iterable, List, Optional, BinaryIO, Dict
 import logging
+import shutil
 from io import BytesIO
 
 logger = logging.getLogger(__name__)
@@ -95,6 +96,33 @@ class OSSBackend(StorageBackend):
             logger.error(f"OSS下载文件失败: {object_name}, 错误: {str(e)}")
             return None
 
+    def read_range(self, object_name: str, offset: int, length: int) -> Optional[bytes]:
+        """从OSS读取文件指定区间"""
+        try:
+            bucket = self._get_client()
+            result = bucket.get_object(object_name, byte_range=(offset, offset + length - 1))
+            return result.read()
+        except oss2.exceptions.NoSuchKey:
+            logger.warning(f"OSS文件不存在: {object_name}")
+            return None
+        except Exception as e:
+            logger.error(f"OSS读取文件区间失败: {object_name}, 错误: {str(e)}")
+            return None
+
+    def download_to_file(self, object_name: str, file_obj: BinaryIO) -> bool:
+        """从OSS分块下载文件到给定的文件对象"""
+        try:
+            bucket = self._get_client()
+            result = bucket.get_object(object_name)
+            shutil.copyfileobj(result, file_obj)
+            return True
+        except oss2.exceptions.NoSuchKey:
+            logger.warning(f"OSS文件不存在: {object_name}")
+            return False
+        except Exception as e:
+            logger.error(f"OSS下载文件失败: {object_name}, 错误: {str(e)}")
+            return False
+
     def delete_file(self, object_name: str) -> bool:
         """从OSS删除文件"""
         try:
@@ -116,6 +144,24 @@ class OSSBackend(StorageBackend):
             logger.error(f"OSS删除文件失败: {object_name}, 错误: {str(e)}")
             return False
 
+    def delete_many(self, object_names: Iterable[str]) -> List[str]:
+        """使用 batch_delete_objects 批量删除OSS文件（每次请求最多 1000 个对象）"""
+        object_names = list(dict.fromkeys(object_names))
+        failed = []
+        bucket = None
+        for start in range(0, len(object_names), DELETE_BATCH_SIZE):
+            batch = object_names[start:start + DELETE_BATCH_SIZE]
+            try:
+                bucket = bucket or self._get_client()
+                result = bucket.batch_delete_objects(batch)
+                # 不存在的对象同样会出现在 deleted_keys 中
+                deleted = set(result.deleted_keys)
+                failed.extend(name for name in batch if name not in deleted)
+            except Exception as e:
+                logger.error(f"OSS批量删除文件失败: {len(batch)} 个对象, 错误: {str(e)}")
+                failed.extend(batch)
+        return failed
+
     def file_exists(self, object_name: str) -> bool:
         """检查文件是否存在于OSS"""
         try:
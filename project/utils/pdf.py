@@ -0,0 +1,112 @@
+# project/utils/pdf.py
+"""
+PDF 账单页级提取引擎
+
+按页区间切分 PDF，在进程池中并行提取每页内容（表格、文本等），再按页码顺序合并。
+页数较少或进程池不可用时退化为当前进程内顺序提取，结果与并行时一致。
+"""
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+import pdfplumber
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# 少于该页数时不启用进程池（进程启动与数据序列化成本高于收益）
+PARALLEL_MIN_PAGES = 20
+
+
+def read_pdf_bytes(file) -> bytes:
+    """读取上传文件的全部字节，并将文件指针复位"""
+    if isinstance(file, (bytes, bytearray)):
+        return bytes(file)
+    file.seek(0)
+    data = file.read()
+    file.seek(0)
+    return data
+
+
+def split_page_ranges(page_count: int, chunks: int) -> List[Tuple[int, int]]:
+    """将 [0, page_count) 切分为最多 chunks 个连续区间"""
+    if page_count <= 0:
+        return []
+    chunks = max(1, min(chunks, page_count))
+    size, extra = divmod(page_count, chunks)
+    ranges = []
+    start = 0
+    for i in range(chunks):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _extract_page_range(pdf_bytes: bytes, password: Optional[str], start: int, end: int,
+                        page_func: Callable) -> List:
+    """打开 PDF 并对 [start, end) 页逐页调用 page_func，返回各页结果列表"""
+    results = []
+    with pdfplumber.open(io.BytesIO(pdf_bytes), password=password or '') as pdf:
+        for page in pdf.pages[start:end]:
+            results.append(page_func(page))
+            # 释放页面布局缓存，避免大文件内存持续增长
+            page.close()
+    return results
+
+
+def _default_workers() -> int:
+    workers = getattr(settings, 'PDF_CONVERT_WORKERS', None)
+    if workers is None:
+        workers = min(4, os.cpu_count() or 1)
+    return max(1, int(workers))
+
+
+def extract_pages(pdf_bytes: bytes, password: Optional[str], page_func: Callable,
+                  page_count: Optional[int] = None, workers: Optional[int] = None) -> List:
+    """按页提取 PDF 内容
+
+    Args:
+        pdf_bytes: PDF 文件内容
+        password: PDF 解密密码
+        page_func: 单页处理函数 (pdfplumber.page.Page -> 任意可序列化结果)，
+            并行时需为模块级函数
+        page_count: 总页数（已知时传入，避免额外打开文档）
+        workers: 并行进程数，默认取 settings.PDF_CONVERT_WORKERS
+
+    Returns:
+        按页码顺序排列的 page_func 结果列表
+    """
+    workers = workers or _default_workers()
+
+    if page_count is None:
+        with pdfplumber.open(io.BytesIO(pdf_bytes), password=password or '') as pdf:
+            page_count = len(pdf.pages)
+
+    if workers <= 1 or page_count < PARALLEL_MIN_PAGES or 'fork' not in multiprocessing.get_all_start_methods():
+        return _extract_page_range(pdf_bytes, password, 0, page_count, page_func)
+
+    ranges = split_page_ranges(page_count, workers)
+    try:
+        executor = ProcessPoolExecutor(max_workers=len(ranges), mp_context=multiprocessing.get_context('fork'))
+    except (OSError, ValueError) as e:
+        logger.warning("PDF 并行提取进程池创建失败，退化为顺序提取: %s", e)
+        return _extract_page_range(pdf_bytes, password, 0, page_count, page_func)
+
+    try:
+        with executor:
+            futures = [
+                executor.submit(_extract_page_range, pdf_bytes, password, start, end, page_func)
+                for start, end in ranges
+            ]
+            results = []
+            for future in futures:
+                results.extend(future.result())
+            return results
+    except AssertionError as e:
+        # 守护进程（如部分 worker 模型）不允许创建子进程
+        logger.warning("PDF 并行提取不可用，退化为顺序提取: %s", e)
+        return _extract_page_range(pdf_bytes, password, 0, page_count, page_func)
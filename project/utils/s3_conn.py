@@ -2,8 +2,8 @@ import boto3
 from botocore.exceptions import ClientError, NoCredentialsError
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
-from .storage_factory import StorageBackend
-from typing import Optional, BinaryIO, Dict
+from .storage_factory import DELETE_BATCH_SIZE, StorageBackend
+from typing import Iterable, List, Optional, BinaryIO, Dict
 import logging
 from io import BytesIO
 
@@ -103,6 +103,44 @@ class S3Backend(StorageBackend):
             logger.error(f"S3下载文件失败: {object_name}, 错误: {str(e)}")
             return None
 
+    def read_range(self, object_name: str, offset: int, length: int) -> Optional[bytes]:
+        """从S3读取文件指定区间"""
+        try:
+            client = self._get_client()
+            response = client.get_object(
+                Bucket=self.bucket_name,
+                Key=object_name,
+                Range=f'bytes={offset}-{offset + length - 1}'
+            )
+            return response['Body'].read()
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            if error_code in ('NoSuchKey', '404'):
+                logger.warning(f"S3文件不存在: {object_name}")
+            else:
+                logger.error(f"S3读取文件区间失败: {object_name}, 错误: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"S3读取文件区间失败: {object_name}, 错误: {str(e)}")
+            return None
+
+    def download_to_file(self, object_name: str, file_obj: BinaryIO) -> bool:
+        """从S3分块下载文件到给定的文件对象"""
+        try:
+            client = self._get_client()
+            client.download_fileobj(self.bucket_name, object_name, file_obj)
+            return True
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            if error_code in ('NoSuchKey', '404'):
+                logger.warning(f"S3文件不存在: {object_name}")
+            else:
+                logger.error(f"S3下载文件失败: {object_name}, 错误: {str(e)}")
+            return False
+        except Exception as e:
+            logger.error(f"S3下载文件失败: {object_name}, 错误: {str(e)}")
+            return False
+
     def delete_file(self, object_name: str) -> bool:
         """从S3删除文件"""
         try:
@@ -124,6 +162,27 @@ class S3Backend(StorageBackend):
             logger.error(f"S3删除文件失败: {object_name}, 错误: {str(e)}")
             return False
 
+    def delete_many(self, object_names: Iterable[str]) -> List[str]:
+        """使用 delete_objects 批量删除S3文件（每次请求最多 1000 个对象）"""
+        object_names = list(dict.fromkeys(object_names))
+        failed = []
+        client = None
+        for start in range(0, len(object_names), DELETE_BATCH_SIZE):
+            batch = object_names[start:start + DELETE_BATCH_SIZE]
+            try:
+                client = client or self._get_client()
+                response = client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={'Objects': [{'Key': name} for name in batch], 'Quiet': True}
+                )
+                for error in response.get('Errors', []):
+                    logger.error(f"S3删除文件失败: {error.get('Key')}, 错误: {error.get('Message')}")
+                    failed.append(error.get('Key'))
+            except Exception as e:
+                logger.error(f"S3批量删除文件失败: {len(batch)} 个对象, 错误: {str(e)}")
+                failed.extend(batch)
+        return failed
+
     def file_exists(self, object_name: str) -> bool:
         """检查文件是否存在于S3"""
         try:
@@ -1,10 +1,23 @@
 from abc import ABC, abstractmethod
-from typing import Optional, BinaryIO, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional, BinaryIO, Dict, Any
 from django.conf import settings
+import io
 import logging
+import os
+import shutil
+import tempfile
 
 logger = logging.getLogger(__name__)
 
+# 批量删除：原生批量接口单次请求的对象数上限（S3/OSS 均为 1000）
+DELETE_BATCH_SIZE = 1000
+# 批量删除：不支持批量接口的后端逐个删除时的最大并发数
+DELETE_MAX_WORKERS = 8
+# 按需分段读取的块大小
+RANGE_BLOCK_SIZE = 64 * 1024
+
 
 class StorageBackend(ABC):
     """存储后端抽象基类"""
@@ -39,6 +52,172 @@ class StorageBackend(ABC):
         """获取文件访问URL"""
         pass
 
+    def delete_many(self, object_names: Iterable[str]) -> List[str]:
+        """
+        批量删除文件（默认以有限并发逐个调用 delete_file，子类可改用原生批量删除接口）
+
+        Args:
+            object_names: 存储对象名称
+
+        Returns:
+            List[str]: 删除失败的对象名称
+        """
+        object_names = list(dict.fromkeys(object_names))
+        if not object_names:
+            return []
+
+        def delete(object_name):
+            try:
+                return self.delete_file(object_name)
+            except Exception as e:
+                logger.error(f"删除文件失败: {object_name}, 错误: {str(e)}")
+                return False
+
+        with ThreadPoolExecutor(max_workers=min(DELETE_MAX_WORKERS, len(object_names))) as executor:
+            results = list(executor.map(delete, object_names))
+        return [name for name, deleted in zip(object_names, results) if not deleted]
+
+    def download_to_file(self, object_name: str, file_obj: BinaryIO) -> bool:
+        """将文件流式写入给定的文件对象（默认基于 download_file，子类可改为分块下载）"""
+        file_data = self.download_file(object_name)
+        if file_data is None:
+            return False
+        try:
+            shutil.copyfileobj(file_data, file_obj)
+        finally:
+            file_data.close()
+        return True
+
+    def read_range(self, object_name: str, offset: int, length: int) -> Optional[bytes]:
+        """
+        读取文件指定区间的内容（默认基于 download_file，子类应改用存储的区间读取）
+
+        Args:
+            object_name: 存储对象名称
+            offset: 起始偏移
+            length: 读取长度
+
+        Returns:
+            bytes: 区间内容（到达文件末尾时可能少于 length），文件不存在时返回 None
+        """
+        file_data = self.download_file(object_name)
+        if file_data is None:
+            return None
+        try:
+            file_data.seek(offset)
+            return file_data.read(length)
+        finally:
+            file_data.close()
+
+    def open_range_reader(self, object_name: str, size: int, max_bytes: Optional[int] = None,
+                          name: Optional[str] = None) -> BinaryIO:
+        """
+        以可寻址的只读文件对象打开存储对象，读取时按块从存储拉取所需区间
+
+        适用于只需读取文件一小部分的场景（如识别账单类型），zipfile、PyPDF2、openpyxl 只会拉取实际访问的块。
+
+        Args:
+            object_name: 存储对象名称
+            size: 文件大小
+            max_bytes: 累计拉取字节数上限，超出时抛出 RangeReadLimitExceeded
+            name: 文件对象的 name 属性（默认为对象名称）
+        """
+        raw = RangeReader(self, object_name, size, max_bytes)
+        if name is not None:
+            raw.name = name
+        return io.BufferedReader(raw, buffer_size=RANGE_BLOCK_SIZE)
+
+    @contextmanager
+    def local_path(self, object_name: str) -> Iterator[Optional[str]]:
+        """
+        获取文件的本地路径，供解析器直接按路径打开
+
+        远程存储流式下载到临时文件，退出上下文时删除；文件不存在时返回 None。
+
+        Args:
+            object_name: 存储对象名称
+
+        Yields:
+            str: 本地文件路径，文件不存在时为 None
+        """
+        _, extension = os.path.splitext(object_name)
+        with tempfile.NamedTemporaryFile(suffix=extension, delete=False) as temp:
+            temp_path = temp.name
+            downloaded = self.download_to_file(object_name, temp)
+        try:
+            yield temp_path if downloaded else None
+        finally:
+            os.remove(temp_path)
+
+
+class RangeReadLimitExceeded(Exception):
+    """按需读取的累计字节数超出上限"""
+
+
+class RangeReader(io.RawIOBase):
+    """按块读取存储对象的只读文件对象，已拉取的块缓存在内存中"""
+
+    def __init__(self, backend: StorageBackend, object_name: str, size: int, max_bytes: Optional[int] = None):
+        self.backend = backend
+        self.object_name = object_name
+        self.name = object_name
+        self.size = size
+        self.max_bytes = max_bytes
+        self.bytes_fetched = 0
+        self.limit_exceeded = False
+        self._blocks: Dict[int, bytes] = {}
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self.size + offset
+        else:
+            raise ValueError(f"invalid whence: {whence}")
+        if self._pos < 0:
+            raise ValueError("negative seek position")
+        return self._pos
+
+    def _block(self, index):
+        block = self._blocks.get(index)
+        if block is None:
+            offset = index * RANGE_BLOCK_SIZE
+            length = min(RANGE_BLOCK_SIZE, self.size - offset)
+            if self.max_bytes is not None and self.bytes_fetched + length > self.max_bytes:
+                self.limit_exceeded = True
+                raise RangeReadLimitExceeded(f"读取超出上限 {self.max_bytes} 字节: {self.object_name}")
+            block = self.backend.read_range(self.object_name, offset, length)
+            if block is None:
+                raise FileNotFoundError(self.object_name)
+            self.bytes_fetched += len(block)
+            self._blocks[index] = block
+        return block
+
+    def readinto(self, buffer):
+        view = memoryview(buffer).cast('B')
+        written = 0
+        while written < len(view) and self._pos < self.size:
+            index, start = divmod(self._pos, RANGE_BLOCK_SIZE)
+            chunk = self._block(index)[start:start + len(view) - written]
+            if not chunk:
+                break
+            view[written:written + len(chunk)] = chunk
+            written += len(chunk)
+            self._pos += len(chunk)
+        return written
+
 
 class StorageFactory:
     """存储工厂类"""
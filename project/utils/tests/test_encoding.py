@@ -0,0 +1,65 @@
+"""
+账单编码识别测试
+
+验证 UTF-8/BOM 快速路径、转换器声明编码与账单策略编码提示的优先级，以及 chardet 仅作用于有限样本。
+"""
+import codecs
+import io
+from unittest.mock import patch
+
+from project.apps.translate.services.init.bill_init_factory import InitFactory
+from project.apps.translate.services.init.strategies.alipay_init_strategy import AlipayInitStrategy
+from project.utils.file import ENCODING_SAMPLE_SIZE, convert_to_csv, convert_to_utf8, resolve_encoding
+
+
+ALIPAY_TEXT = AlipayInitStrategy.HEADER_MARKER + '\n' + '交易时间,交易分类,交易对方,商品说明\n' * 20
+WECHAT_TEXT = '微信支付账单明细,,,,\n微信昵称：[测试],,,,\n'
+
+
+def test_utf8_returned_without_decoding():
+    content = WECHAT_TEXT.encode('utf-8')
+    with patch('project.utils.file.chardet.detect') as detect:
+        assert convert_to_utf8(content) is content
+    detect.assert_not_called()
+
+
+def test_bom_stripped():
+    content = WECHAT_TEXT.encode('utf-8')
+    assert convert_to_utf8(codecs.BOM_UTF8 + content) == content
+    assert convert_to_utf8(WECHAT_TEXT.encode('utf-16')) == content
+    assert resolve_encoding(codecs.BOM_UTF32_LE + b'\x00' * 4) == 'utf-32'
+
+
+def test_declared_utf8_skips_detection():
+    content = codecs.BOM_UTF8 + WECHAT_TEXT.encode('utf-8')
+    with patch('project.utils.file.chardet.detect') as detect:
+        assert convert_to_utf8(content, declared_encoding='utf-8') == content[len(codecs.BOM_UTF8):]
+    detect.assert_not_called()
+
+
+def test_alipay_gb18030_uses_strategy_hint():
+    content = ALIPAY_TEXT.encode('gb18030')
+    hint = InitFactory.encoding_hint(content[:1024])
+    assert hint == AlipayInitStrategy.SOURCE_ENCODING
+
+    with patch('project.utils.file.chardet.detect') as detect:
+        assert convert_to_utf8(content, encoding_hint=hint) == ALIPAY_TEXT.encode('utf-8')
+    detect.assert_not_called()
+
+
+def test_invalid_hint_falls_back_to_sampled_detection():
+    content = ('交易时间,金额\n' * 20000).encode('gb18030')
+    assert len(content) > ENCODING_SAMPLE_SIZE
+
+    with patch('project.utils.file.chardet.detect', return_value={'encoding': 'GB2312'}) as detect:
+        result = convert_to_utf8(content, encoding_hint='shift_jis')
+
+    sample = detect.call_args.args[0]
+    assert len(sample) == ENCODING_SAMPLE_SIZE
+    assert result == content.decode('gb18030').encode('utf-8')
+
+
+def test_convert_to_csv_declares_encoding():
+    upload = io.BytesIO(WECHAT_TEXT.encode('utf-8'))
+    upload.name = 'wechat.csv'
+    assert convert_to_csv(upload) == (WECHAT_TEXT.encode('utf-8'), None)
@@ -0,0 +1,79 @@
+"""
+XLSX 流式读取测试
+
+验证只读流式转换与原有 pandas 转换结果逐字节一致。
+"""
+import datetime
+import io
+
+import pandas as pd
+from openpyxl import Workbook
+
+from project.apps.translate.services.init.strategies.ccb_debit_init_strategy import CCBDebitInitStrategy
+from project.apps.translate.views.CCB_Debit import ccb_debit_string_convert_to_csv
+from project.utils.excel import is_xlsx, read_xlsx_rows, rows_to_csv_bytes
+from project.utils.file import convert_df_to_csv_bytes, handle_excel, is_ccb_bill
+
+
+def build_xlsx(rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    buffer.name = 'bill.xlsx'
+    return buffer
+
+
+def legacy_dataframe(file):
+    file.seek(0)
+    df = pd.read_excel(file, header=None, dtype=str)
+    df.fillna('', inplace=True)
+    file.seek(0)
+    return df
+
+
+WECHAT_ROWS = [
+    ['微信支付账单明细'],
+    ['微信昵称：[test]'],
+    [],
+    ['交易时间', '交易类型', '交易对方', '商品', '收/支', '金额(元)', '支付方式', '当前状态', '交易单号', '商户单号', '备注'],
+    [datetime.datetime(2025, 1, 2, 3, 4, 5), '商户消费', '商家,A', '"午餐"', '支出', 12.5, '零钱', '支付成功', 420000001, '/', None],
+    ['2025-01-03 10:00:00', '转账', '张三', '/', '收入', 100, '零钱', '已收钱', 420000002, '/', '多行\n备注'],
+]
+
+CCB_ROWS = [
+    [None, None, None, None, CCBDebitInitStrategy.SOURCE_FILE_IDENTIFIER],
+    [None, '账号:6217000000000000000'],
+    ['序号', '摘要', '币别', '钞汇', '交易日期', '交易金额', '账户余额', '交易地点/附言', '对方账号与户名'],
+    [1, '消费', '人民币', '钞', '20250102', -12.5, 987.5, '超市,一号店', '6222000000000000/某超市'],
+    [2, '工资', '人民币', '钞', '20250103', 1000, 1987.5, '', ''],
+]
+
+
+def test_is_xlsx():
+    assert is_xlsx(build_xlsx(WECHAT_ROWS))
+    legacy = io.BytesIO(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1' + b'\x00' * 16)
+    assert not is_xlsx(legacy)
+    assert legacy.tell() == 0
+
+
+def test_stream_rows_match_pandas():
+    file = build_xlsx(WECHAT_ROWS)
+    expected = convert_df_to_csv_bytes(legacy_dataframe(file))
+    assert rows_to_csv_bytes(read_xlsx_rows(file)) == expected
+    assert handle_excel(file) == expected
+
+
+def test_ccb_bill_stream_matches_pandas():
+    file = build_xlsx(CCB_ROWS)
+    df = legacy_dataframe(file)
+    assert is_ccb_bill(df)
+    assert handle_excel(file) == ccb_debit_string_convert_to_csv(df)
+
+
+def test_is_ccb_bill_vectorized():
+    assert not is_ccb_bill(legacy_dataframe(build_xlsx(WECHAT_ROWS)))
+    assert not is_ccb_bill(pd.DataFrame())
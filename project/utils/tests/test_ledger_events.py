@@ -0,0 +1,95 @@
+"""
+账本变更事件测试
+
+验证发布变更递增账本代数并记录变更路径，订阅缓存只在需要时完整重建且不会返回过期数据。
+"""
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+
+from project.utils.ledger_events import (
+    LEDGER_CHANGES_KEY,
+    LedgerDerivedCache,
+    get_ledger_changes,
+    get_ledger_generation,
+    ledger_changed,
+    publish_ledger_change,
+)
+
+User = get_user_model()
+
+
+@pytest.fixture
+def user(tmp_path):
+    with override_settings(ASSETS_BASE_PATH=tmp_path):
+        yield User.objects.create_user(username='ledger_events_user', password='x')
+
+
+@pytest.mark.django_db
+def test_publish_bumps_generation_and_records_relative_paths(user, tmp_path):
+    received = []
+
+    def receiver(sender, **kwargs):
+        received.append(kwargs)
+
+    ledger_changed.connect(receiver)
+    try:
+        start = get_ledger_generation(user.id)
+        first = publish_ledger_change(user, [tmp_path / user.username / 'trans' / 'a.bean'])
+        second = publish_ledger_change(user.username, ['main.bean'])
+    finally:
+        ledger_changed.disconnect(receiver)
+
+    assert (first, second) == (start + 1, start + 2)
+    assert received[0]['paths'] == frozenset({'trans/a.bean'})
+    assert get_ledger_changes(user.id, start, second) == frozenset({'trans/a.bean', 'main.bean'})
+    assert get_ledger_changes(user.id, second, second) == frozenset()
+
+    # 全部变更或变更记录缺失时需要完整重建
+    third = publish_ledger_change(user)
+    assert get_ledger_changes(user.id, second, third) is None
+    cache.delete(LEDGER_CHANGES_KEY.format(owner_id=user.id, generation=first))
+    assert get_ledger_changes(user.id, start, second) is None
+    assert publish_ledger_change('missing_user', ['main.bean']) is None
+
+
+@pytest.mark.django_db
+def test_derived_cache_updates_only_changed_paths(user):
+    ledger = {'trans/a.bean': 1, 'trans/b.bean': 1}
+    builds = []
+    updates = []
+
+    def build(u):
+        builds.append(u.id)
+        return dict(ledger)
+
+    def update(u, value, paths):
+        updates.append(paths)
+        if 'main.bean' in paths:
+            return None
+        value = dict(value)
+        value.update({path: ledger[path] for path in paths})
+        return value
+
+    derived = LedgerDerivedCache(build, update)
+
+    assert derived.get(user) == ledger
+    assert derived.get(user) == ledger
+    assert len(builds) == 1
+
+    ledger['trans/a.bean'] = 2
+    publish_ledger_change(user, ['trans/a.bean'])
+    assert derived.get(user) == ledger
+    assert updates == [frozenset({'trans/a.bean'})]
+    assert len(builds) == 1
+
+    ledger['trans/b.bean'] = 2
+    publish_ledger_change(user, ['main.bean', 'trans/b.bean'])
+    assert derived.get(user) == ledger
+    assert len(builds) == 2
+
+    ledger['trans/a.bean'] = 3
+    publish_ledger_change(user)
+    assert derived.get(user) == ledger
+    assert len(builds) == 3
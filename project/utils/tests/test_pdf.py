@@ -0,0 +1,119 @@
+"""
+PDF 页级提取引擎测试
+
+使用最小 PDF 生成器构造带表格线的多页账单，验证并行提取与顺序提取结果一致且按页序合并。
+"""
+import io
+from unittest.mock import patch
+
+import pytest
+
+from project.apps.translate.services.init.strategies.boc_debit_init_strategy import BOCDebitInitStrategy
+from project.apps.translate.views.BOC_Debit import boc_debit_extract_page_tables
+from project.utils.file import handle_pdf
+from project.utils.pdf import extract_pages, split_page_ranges
+
+
+HEADER = ['Date', 'Time', 'Summary', 'Amount', 'Balance']
+
+
+def build_table_pdf(page_count, rows_per_page=5):
+    """生成每页一个带表格线的 PDF（仅使用 Helvetica 与 ASCII 文本）"""
+    col_widths = [80, 60, 160, 80, 80]
+    row_height = 20
+    left, top = 40, 780
+
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(None)
+    pages_id = add(None)
+    font_id = add(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>')
+    page_ids = []
+    for page_no in range(page_count):
+        rows = [HEADER] + [
+            [f'2025-01-{page_no % 28 + 1:02d}', f'{row_no:02d}:00:00', f'P{page_no}R{row_no}',
+             f'{page_no}.{row_no:02d}', f'{page_no * 100 + row_no}.00']
+            for row_no in range(rows_per_page)
+        ]
+        ops = ['0.5 w']
+        width = sum(col_widths)
+        for i in range(len(rows) + 1):
+            y = top - i * row_height
+            ops.append(f'{left} {y} m {left + width} {y} l S')
+        x = left
+        for w in col_widths + [0]:
+            ops.append(f'{x} {top} m {x} {top - len(rows) * row_height} l S')
+            x += w
+        for i, row in enumerate(rows):
+            x = left
+            y = top - (i + 1) * row_height + 6
+            for w, cell in zip(col_widths, row):
+                ops.append(f'BT /F1 9 Tf {x + 3} {y} Td ({cell}) Tj ET')
+                x += w
+        stream = '\n'.join(ops).encode()
+        content_id = add(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        page_ids.append(add(
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] '
+            b'/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>' % (pages_id, font_id, content_id)
+        ))
+    objects[catalog_id - 1] = b'<< /Type /Catalog /Pages %d 0 R >>' % pages_id
+    kids = b' '.join(b'%d 0 R' % pid for pid in page_ids)
+    objects[pages_id - 1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, page_count)
+
+    out = io.BytesIO()
+    out.write(b'%PDF-1.4\n')
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b'%d 0 obj\n' % i + body + b'\nendobj\n')
+    xref = out.tell()
+    out.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b'%010d 00000 n \n' % offset)
+    out.write(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, catalog_id, xref))
+    return out.getvalue()
+
+
+def test_split_page_ranges():
+    assert split_page_ranges(0, 4) == []
+    assert split_page_ranges(3, 8) == [(0, 1), (1, 2), (2, 3)]
+    assert split_page_ranges(10, 3) == [(0, 4), (4, 7), (7, 10)]
+
+
+def test_extract_pages_parallel_matches_sequential():
+    pdf_bytes = build_table_pdf(24, rows_per_page=3)
+
+    sequential = extract_pages(pdf_bytes, None, boc_debit_extract_page_tables, workers=1)
+    parallel = extract_pages(pdf_bytes, None, boc_debit_extract_page_tables, page_count=24, workers=4)
+
+    assert parallel == sequential
+    assert len(parallel) == 24
+    # 按页序合并：每页第一条明细的摘要依次为 P0R0、P1R0 ...
+    assert [tables[0][1][2] for tables in parallel] == [f'P{i}R0' for i in range(24)]
+
+
+def test_handle_pdf_boc_reads_pages_once_in_order():
+    pdf_bytes = build_table_pdf(3, rows_per_page=2)
+    upload = io.BytesIO(pdf_bytes)
+    upload.name = 'boc.pdf'
+    detected = (BOCDebitInitStrategy.SOURCE_FILE_IDENTIFIER, '卡号 6217000000000000000', 1)
+
+    with patch('project.utils.file.detect_pdf_bill', return_value=detected):
+        csv_text = handle_pdf(upload, None).decode()
+
+    lines = csv_text.split('\n')
+    assert lines[0] == BOCDebitInitStrategy.HEADER_MARKER + ' 卡号: 6217000000000000000'
+    assert lines[1] == ','.join(HEADER)
+    assert [line.split(',')[2] for line in lines[2:]] == ['P0R0', 'P0R1', 'P1R0', 'P1R1', 'P2R0', 'P2R1']
+
+
+def test_handle_pdf_unsupported():
+    upload = io.BytesIO(build_table_pdf(2))
+    upload.name = 'unknown.pdf'
+    from project.utils.exceptions import UnsupportedFileTypeError
+    with pytest.raises(UnsupportedFileTypeError):
+        handle_pdf(upload, None)
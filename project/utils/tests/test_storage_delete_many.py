@@ -0,0 +1,85 @@
+"""
+存储批量删除测试
+
+验证本地存储以有限并发删除，MinIO/S3 使用原生批量删除接口（以兼容的替身客户端模拟）。
+"""
+import io
+import os
+from unittest.mock import patch
+
+from minio.deleteobjects import DeleteError
+
+from project.utils.local_storage import LocalStorageBackend
+from project.utils.minio import MinIOBackend
+from project.utils.s3_conn import S3Backend
+
+
+class FakeMinioClient:
+    """MinIO 兼容替身：对象保存在字典中，remove_objects 与 minio 客户端一样惰性返回删除错误"""
+
+    def __init__(self, object_names, locked=()):
+        self.objects = set(object_names)
+        self.locked = set(locked)
+        self.requests = 0
+
+    def remove_objects(self, bucket_name, delete_object_list):
+        self.requests += 1
+        for delete_object in delete_object_list:
+            name = delete_object.name
+            if name in self.locked:
+                yield DeleteError('AccessDenied', 'Access Denied.', name, None)
+                continue
+            self.objects.discard(name)
+
+
+class FakeS3Client:
+    """S3 兼容替身：记录每次 delete_objects 请求的对象数量"""
+
+    def __init__(self, object_names):
+        self.objects = set(object_names)
+        self.batch_sizes = []
+
+    def delete_objects(self, Bucket, Delete):
+        keys = [item['Key'] for item in Delete['Objects']]
+        self.batch_sizes.append(len(keys))
+        self.objects.difference_update(keys)
+        return {}
+
+
+def test_local_storage_delete_many(tmp_path):
+    backend = LocalStorageBackend({'BASE_PATH': str(tmp_path)})
+    names = [f'{i}.csv' for i in range(50)]
+    for name in names:
+        backend.upload_file(name, io.BytesIO(b'a,b\n'))
+
+    failed = backend.delete_many(names + ['missing.csv', names[0]])
+
+    assert failed == ['missing.csv']
+    assert os.listdir(tmp_path) == []
+    assert backend.delete_many([]) == []
+
+
+def test_minio_delete_many_uses_single_bulk_request():
+    names = [f'{i}.csv' for i in range(2500)]
+    client = FakeMinioClient(names, locked=['7.csv'])
+    backend = MinIOBackend({'BUCKET_NAME': 'test-bucket'})
+
+    with patch.object(MinIOBackend, '_get_client', return_value=client):
+        failed = backend.delete_many(names)
+
+    assert failed == ['7.csv']
+    assert client.requests == 1
+    assert client.objects == {'7.csv'}
+
+
+def test_s3_delete_many_batches_by_thousand():
+    names = [f'{i}.csv' for i in range(2500)]
+    client = FakeS3Client(names)
+    backend = S3Backend({'BUCKET_NAME': 'test-bucket'})
+
+    with patch.object(S3Backend, '_get_client', return_value=client):
+        failed = backend.delete_many(names)
+
+    assert failed == []
+    assert client.batch_sizes == [1000, 1000, 500]
+    assert client.objects == set()
@@ -0,0 +1,99 @@
+"""
+存储本地路径接口测试
+
+验证本地存储直接返回原文件路径，远程存储流式下载到临时文件并在使用后删除，
+以及解析器可直接基于磁盘文件处理 ZIP 账单。
+"""
+import io
+import os
+import zipfile
+
+import pytest
+
+from project.utils.file import convert_to_csv
+from project.utils.local_storage import LocalStorageBackend
+from project.utils.storage_factory import StorageBackend
+
+
+class InMemoryBackend(StorageBackend):
+    """仅实现 download_file 的远程存储替身，用于验证默认的临时文件下载"""
+
+    def __init__(self, objects):
+        super().__init__({})
+        self.objects = objects
+
+    def upload_file(self, object_name, file_data, content_type=None, metadata=None):
+        self.objects[object_name] = file_data.read()
+        return True
+
+    def download_file(self, object_name):
+        if object_name not in self.objects:
+            return None
+        return io.BytesIO(self.objects[object_name])
+
+    def delete_file(self, object_name):
+        return self.objects.pop(object_name, None) is not None
+
+    def file_exists(self, object_name):
+        return object_name in self.objects
+
+    def get_file_url(self, object_name, expires=3600):
+        return ''
+
+
+def test_local_storage_yields_real_path(tmp_path):
+    backend = LocalStorageBackend({'BASE_PATH': str(tmp_path)})
+    backend.upload_file('bill.csv', io.BytesIO(b'a,b\n'))
+
+    with backend.local_path('bill.csv') as file_path:
+        assert file_path == os.path.join(str(tmp_path), 'bill.csv')
+    # 本地文件不是临时副本，退出后仍保留
+    assert os.path.exists(file_path)
+
+    with backend.local_path('missing.csv') as file_path:
+        assert file_path is None
+
+
+def test_remote_storage_downloads_to_temporary_file():
+    backend = InMemoryBackend({'statement.pdf': b'%PDF-1.4 content'})
+
+    with backend.local_path('statement.pdf') as file_path:
+        assert file_path.endswith('.pdf')
+        with open(file_path, 'rb') as f:
+            assert f.read() == b'%PDF-1.4 content'
+    assert not os.path.exists(file_path)
+
+    with backend.local_path('missing.pdf') as file_path:
+        assert file_path is None
+
+
+def test_zip_bill_converted_from_file_on_disk(tmp_path):
+    zip_path = tmp_path / 'bill.zip'
+    with zipfile.ZipFile(zip_path, 'w') as zf:
+        zf.writestr('账单/bill.csv', '日期,金额\n2025-01-01,10.00\n'.encode('utf-8'))
+
+    with open(zip_path, 'rb') as f:
+        csv_bytes, declared_encoding = convert_to_csv(f)
+
+    assert csv_bytes == '日期,金额\n2025-01-01,10.00\n'.encode('utf-8')
+    assert declared_encoding is None
+
+
+def test_range_reader_fetches_only_accessed_blocks():
+    from project.utils.storage_factory import RANGE_BLOCK_SIZE, RangeReadLimitExceeded
+
+    content = bytes(range(256)) * (RANGE_BLOCK_SIZE // 64)
+    backend = InMemoryBackend({'big.bin': content})
+    reader = backend.open_range_reader('big.bin', len(content), max_bytes=2 * RANGE_BLOCK_SIZE, name='big.bin')
+
+    assert reader.name == 'big.bin'
+    assert reader.read(10) == content[:10]
+    reader.seek(-5, io.SEEK_END)
+    assert reader.read() == content[-5:]
+    assert reader.raw.bytes_fetched == 2 * RANGE_BLOCK_SIZE
+
+    # 超出上限时拒绝继续拉取
+    reader.seek(RANGE_BLOCK_SIZE)
+    with pytest.raises(RangeReadLimitExceeded):
+        reader.read(1)
+    assert reader.raw.limit_exceeded
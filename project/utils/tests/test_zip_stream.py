@@ -0,0 +1,57 @@
+"""
+流式 ZIP 生成测试
+
+验证生成结果为合法 ZIP（使用数据描述符），已压缩格式按 STORED 写入，
+且首个数据块在读取后续文件之前产出。
+"""
+import io
+import zipfile
+
+from project.utils.zip_stream import iter_zip_stream
+
+
+def build_entries(tmp_path):
+    bean = tmp_path / 'main.bean'
+    bean.write_text('include "2025.bean"\n' * 2000, encoding='utf-8')
+    pdf = tmp_path / 'statement.pdf'
+    pdf.write_bytes(b'%PDF-1.4' + bytes(range(256)) * 64)
+    return [(str(bean), 'trans/main.bean'), (str(pdf), 'trans/statement.pdf')]
+
+
+def test_stream_is_valid_zip_with_data_descriptors(tmp_path):
+    entries = build_entries(tmp_path)
+
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(iter_zip_stream(entries, chunk_size=1024))))
+
+    assert archive.testzip() is None
+    infos = {info.filename: info for info in archive.infolist()}
+    assert infos['trans/main.bean'].compress_type == zipfile.ZIP_DEFLATED
+    assert infos['trans/main.bean'].compress_size < infos['trans/main.bean'].file_size
+    assert infos['trans/statement.pdf'].compress_type == zipfile.ZIP_STORED
+    assert all(info.flag_bits & 0x08 for info in infos.values())
+    assert archive.read('trans/main.bean') == (tmp_path / 'main.bean').read_bytes()
+
+
+def test_stream_without_compression(tmp_path):
+    entries = build_entries(tmp_path)
+
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(iter_zip_stream(entries, compress=False))))
+
+    assert {info.compress_type for info in archive.infolist()} == {zipfile.ZIP_STORED}
+    assert archive.read('trans/statement.pdf') == (tmp_path / 'statement.pdf').read_bytes()
+
+
+def test_first_chunk_before_remaining_files_are_read(tmp_path):
+    entries = build_entries(tmp_path)
+    consumed = []
+
+    def lazy_entries():
+        for entry in entries * 50:
+            consumed.append(entry)
+            yield entry
+
+    stream = iter_zip_stream(lazy_entries(), chunk_size=1024)
+    first_chunk = next(stream)
+
+    assert first_chunk.startswith(b'PK\x03\x04')
+    assert len(consumed) == 1
@@ -0,0 +1,43 @@
+"""
+上传处理器
+在 Django 解析请求体时同步计算上传文件的 SHA-256，避免上传后再次完整读取文件计算哈希
+"""
+import hashlib
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+class HashingUploadHandlerMixin:
+    """接收数据块的同时计算 SHA-256，完成后写入上传文件的 sha256 属性"""
+
+    def new_file(self, *args, **kwargs):
+        # 内存处理器接管文件时 new_file 会抛出 StopFutureHandlers，需先初始化哈希对象
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def should_hash(self) -> bool:
+        """当前处理器是否负责保存该文件"""
+        return True
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.should_hash():
+            self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.sha256 = self.hasher.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadHandlerMixin, MemoryFileUploadHandler):
+    """小文件保存在内存中并计算哈希"""
+
+    def should_hash(self) -> bool:
+        # 超过内存上限时数据块交给临时文件处理器，由其计算哈希
+        return self.activated
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadHandlerMixin, TemporaryFileUploadHandler):
+    """大文件写入临时文件并计算哈希"""